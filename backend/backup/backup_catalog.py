@@ -0,0 +1,177 @@
+"""
+备份目录模块
+在备份根目录下的 catalog.db（SQLite）中记录每个备份的类型、时间、大小、完整性和备份链，
+备份列表的筛选、排序和分页直接查询目录，不必每次扫描备份目录、解析文件名和检查每个文件
+
+目录与备份文件放在一起，不随主数据库的恢复而回退。
+创建、删除、清理和校验备份时由 BackupManager 更新目录，
+BackupManager.reconcile_catalog 按磁盘上的文件修复目录（补充缺少的文件、更新大小或修改时间有变化的文件、删除已不存在的文件）。
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CATALOG_FILENAME = "catalog.db"
+
+# 可排序的字段及对应的列
+CATALOG_SORT_COLUMNS = {
+    "timestamp": "timestamp",
+    "filename": "filename",
+    "type": "backup_type",
+    "size": "size_bytes"
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backup_catalog (
+    filename TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    backup_type TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    compression TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    integrity INTEGER NOT NULL,
+    verification TEXT NOT NULL DEFAULT '{}',
+    chain TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS ix_backup_catalog_timestamp ON backup_catalog (timestamp);
+CREATE INDEX IF NOT EXISTS ix_backup_catalog_type_timestamp ON backup_catalog (backup_type, timestamp);
+"""
+
+_COLUMNS = ("filename", "path", "backup_type", "kind", "compression", "timestamp",
+            "size_bytes", "mtime", "integrity", "verification", "chain")
+
+
+class BackupCatalog:
+    """备份目录"""
+
+    def __init__(self, catalog_path: Path):
+        """
+        Args:
+            catalog_path: 目录数据库文件路径
+        """
+        self.catalog_path = catalog_path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.catalog_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_row(entry: Dict) -> Tuple:
+        return (
+            entry["filename"], entry["path"], entry["type"], entry["kind"], entry["compression"],
+            entry["timestamp"].isoformat(), entry["size_bytes"], entry["mtime"], int(entry["integrity"]),
+            json.dumps(entry.get("verification", {}), ensure_ascii=False),
+            json.dumps(entry.get("chain", []), ensure_ascii=False)
+        )
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict:
+        return {
+            "filename": row["filename"],
+            "path": row["path"],
+            "type": row["backup_type"],
+            "kind": row["kind"],
+            "compression": row["compression"],
+            "timestamp": datetime.fromisoformat(row["timestamp"]),
+            "size_bytes": row["size_bytes"],
+            "mtime": row["mtime"],
+            "integrity": bool(row["integrity"]),
+            "verification": json.loads(row["verification"]),
+            "chain": json.loads(row["chain"])
+        }
+
+    def upsert(self, entries: List[Dict]):
+        """新增或更新备份记录"""
+        if not entries:
+            return
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO backup_catalog ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                [self._to_row(entry) for entry in entries]
+            )
+
+    def remove(self, filenames: List[str]):
+        """删除备份记录"""
+        if not filenames:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM backup_catalog WHERE filename = ?", [(name,) for name in filenames])
+
+    def get(self, filename: str) -> Optional[Dict]:
+        """按文件名查询备份记录"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM backup_catalog WHERE filename = ?", (filename,)).fetchone()
+        return self._to_entry(row) if row else None
+
+    def file_states(self) -> Dict[str, Tuple[int, float]]:
+        """所有备份记录的 {文件名: (文件大小, 修改时间)}，用于与磁盘上的文件比较"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT filename, size_bytes, mtime FROM backup_catalog").fetchall()
+        return {row["filename"]: (row["size_bytes"], row["mtime"]) for row in rows}
+
+    def query(self, backup_types: Optional[List[str]] = None,
+              start_date: Optional[datetime] = None,
+              end_date: Optional[datetime] = None,
+              keyword: Optional[str] = None,
+              sort_by: str = "timestamp",
+              sort_order: str = "desc",
+              offset: int = 0,
+              limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """
+        查询备份记录
+
+        Args:
+            backup_types: 备份类型，为空时不限
+            start_date: 开始时间
+            end_date: 结束时间
+            keyword: 文件名关键词，多个关键词以空格分隔（AND关系，不区分大小写）
+            sort_by: 排序字段（timestamp, filename, type, size），其他值按时间排序
+            sort_order: 排序顺序（asc, desc）
+            offset: 跳过的记录数
+            limit: 返回的记录数，为空时返回全部
+
+        Returns:
+            (备份记录列表, 符合条件的总数)
+        """
+        conditions, params = [], []
+        if backup_types is not None:
+            conditions.append(f"backup_type IN ({', '.join('?' for _ in backup_types)})")
+            params.extend(backup_types)
+        if start_date is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            conditions.append("timestamp <= ?")
+            params.append(end_date.isoformat())
+        for word in (keyword or "").split():
+            escaped = word.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("lower(filename) LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        column = CATALOG_SORT_COLUMNS.get(sort_by, "timestamp")
+        direction = "ASC" if sort_order.lower() == "asc" else "DESC"
+        page = "" if limit is None else " LIMIT ? OFFSET ?"
+        page_params = [] if limit is None else [limit, offset]
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT count(*) FROM backup_catalog {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM backup_catalog {where} ORDER BY {column} {direction}, filename {direction}{page}",
+                params + page_params
+            ).fetchall()
+        return [self._to_entry(row) for row in rows], total
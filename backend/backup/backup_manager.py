@@ -2,35 +2,97 @@
 备份管理模块
 负责管理数据库备份文件
 支持主数据库的备份
+
+每日备份使用增量备份：每隔 full_backup_interval_days 天做一次全量基准备份，
+其余每天只保存与上一次备份相比发生变化的页（见 backup/incremental_backup.py）。
+月度备份和用户全量备份始终为全量备份。
+备份文件按 compression 流式压缩（见 backup/compression.py），
+可通过环境变量 BACKUP_COMPRESSION、BACKUP_COMPRESSION_LEVEL 配置。
+复制分步进行（BACKUP_STEP_PAGES、BACKUP_STEP_SLEEP_MS），手动备份在后台线程中执行并报告进度。
+备份按清单快速校验或深度校验（见 backup/backup_verification.py），定时任务轮流深度校验各备份。
 """
 
 import os
 import json
 import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 # 使用全局日志配置
 from core.logging_config import get_logger
+from backup.backup_catalog import CATALOG_FILENAME, BackupCatalog
+from backup.backup_verification import verify_backup
+from backup.compression import COMPRESSION_SUFFIXES, check_compression, compression_of, strip_compression_suffix
+from backup.incremental_backup import (
+    DELTA_SUFFIX,
+    BackupPacing,
+    ProgressCallback,
+    FULL_SUFFIX,
+    create_full_backup,
+    create_incremental_backup,
+    is_delta_backup,
+    is_plain_database,
+    load_manifest,
+    manifest_path,
+    page_index_path,
+    validate_backup_file
+)
 
 logger = get_logger(__name__)
 
 class BackupManager:
     """备份管理器类"""
     
-    def __init__(self, db_path: str = "data/warehouse.db", backup_base_dir: str = "backups"):
+    # 备份类型
+    BACKUP_TYPES = ("daily", "monthly", "user_full")
+    # 使用增量备份的备份类型
+    INCREMENTAL_BACKUP_TYPES = ("daily",)
+    # 备份文件扩展名（全量备份、增量备份，及其压缩文件）
+    BACKUP_FILE_PATTERNS = tuple(
+        f"*{kind_suffix}{compression_suffix}"
+        for kind_suffix in (FULL_SUFFIX, DELTA_SUFFIX)
+        for compression_suffix in COMPRESSION_SUFFIXES.values()
+    )
+    
+    # 保留的后台备份任务记录数
+    MAX_TASK_HISTORY = 20
+    
+    def __init__(self, db_path: str = "data/warehouse.db", backup_base_dir: str = "backups",
+                 full_backup_interval_days: int = 7, compression: str = "gzip",
+                 compression_level: Optional[int] = None, step_pages: int = 2560,
+                 step_sleep: float = 0.01):
         """
         初始化备份管理器
         
         Args:
             db_path: 数据库文件路径
             backup_base_dir: 备份文件基础目录
+            full_backup_interval_days: 增量备份链的全量基准备份间隔天数
+            compression: 备份文件压缩方式（none, gzip, lzma, zstd）
+            compression_level: 压缩级别，为空时使用压缩方式的默认级别
+            step_pages: 分步复制时每一步复制的页数
+            step_sleep: 每一步之后暂停的秒数
         """
+        if step_pages <= 0 or step_sleep < 0:
+            raise ValueError("分步复制的页数必须大于0，暂停时间不能为负数")
+        check_compression(compression, compression_level)
         self.db_path = Path(db_path)
         self.backup_base_dir = Path(backup_base_dir)
+        self.full_backup_interval_days = full_backup_interval_days
+        self.compression = compression
+        self.compression_level = compression_level
+        self.pacing = BackupPacing(step_pages=step_pages, step_sleep=step_sleep)
         
-
+        # 同一时间只执行一个备份（定时备份和手动备份共用）
+        self._backup_lock = threading.Lock()
+        # 后台备份任务状态
+        self._task_lock = threading.Lock()
+        self._tasks: "OrderedDict[str, Dict]" = OrderedDict()
         
         # 备份目录结构
         self.daily_dir = self.backup_base_dir / "daily"
@@ -39,6 +101,10 @@ class BackupManager:
         
         # 创建备份目录
         self._ensure_directories()
+        
+        # 备份目录（索引），第一次查询时按磁盘上的文件修复
+        self.catalog = BackupCatalog(self.backup_base_dir / CATALOG_FILENAME)
+        self._catalog_reconciled = False
     
     def _ensure_directories(self):
         """确保所有备份目录存在"""
@@ -55,7 +121,7 @@ class BackupManager:
                        start_date: Optional[datetime] = None,
                        end_date: Optional[datetime] = None) -> List[Dict]:
         """
-        获取备份列表
+        获取备份列表（从备份目录查询，不扫描备份文件）
         
         Args:
             backup_type: 备份类型（daily, monthly, user_full, all）
@@ -63,52 +129,144 @@ class BackupManager:
             end_date: 结束日期
             
         Returns:
-            备份文件信息列表
+            备份文件信息列表（按时间倒序）
+        """
+        backups, _ = self.query_backups(backup_type, start_date, end_date)
+        return backups
+    
+    def query_backups(self, backup_type: str = "all",
+                      start_date: Optional[datetime] = None,
+                      end_date: Optional[datetime] = None,
+                      keyword: Optional[str] = None,
+                      sort_by: str = "timestamp",
+                      sort_order: str = "desc",
+                      page: int = 1,
+                      page_size: Optional[int] = None) -> Tuple[List[Dict], int]:
         """
-        backups = []
+        从备份目录筛选、排序、分页查询备份
         
-        # 确定要搜索的目录
+        Args:
+            backup_type: 备份类型（daily, monthly, user_full, all）
+            start_date: 开始日期
+            end_date: 结束日期
+            keyword: 文件名关键词，多个关键词以空格分隔（AND关系）
+            sort_by: 排序字段（timestamp, filename, type, size）
+            sort_order: 排序顺序（asc, desc）
+            page: 页码
+            page_size: 每页数量，为空时返回全部
+            
+        Returns:
+            (备份文件信息列表, 符合条件的总数)
+        """
         if backup_type == "all":
-            directories = [self.daily_dir, self.monthly_dir, self.user_full_dir]
-        elif backup_type == "daily":
-            directories = [self.daily_dir]
-        elif backup_type == "monthly":
-            directories = [self.monthly_dir]
-        elif backup_type == "user_full":
-            directories = [self.user_full_dir]
+            backup_types = None
+        elif backup_type in self.BACKUP_TYPES:
+            backup_types = [backup_type]
         else:
             raise ValueError(f"不支持的备份类型: {backup_type}")
         
-        for directory in directories:
-            for backup_file in directory.glob("*.db"):
-                # 解析文件名中的时间戳
-                file_info = self._parse_backup_filename(backup_file)
-                if file_info:
-                    # 时间范围筛选
-                    if start_date and file_info["timestamp"] < start_date:
-                        continue
-                    if end_date and file_info["timestamp"] > end_date:
-                        continue
-                    
-                    # 添加文件大小和完整性信息
-                    file_info["size"] = f"{backup_file.stat().st_size // 1024}KB"
-                    file_info["integrity"] = self.validate_backup_integrity(backup_file)
-                    
-                    # 添加文件路径信息
-                    file_info["path"] = str(backup_file)
-                    
-                    # 添加默认描述（实际项目中可以从备份元数据中获取）
-                    # 这里使用默认描述，实际项目中应该从备份元数据中获取原始描述
-                    file_info["description"] = f"{file_info['type']}备份 - {file_info['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
-                    
-                    # 将timestamp转换为ISO格式字符串,确保前端能正确解析时区
-                    file_info["timestamp"] = file_info["timestamp"].isoformat()
-                    
-                    backups.append(file_info)
-        
-        # 按时间戳排序
-        backups.sort(key=lambda x: x["timestamp"], reverse=True)
-        return backups
+        self._ensure_catalog()
+        entries, total = self.catalog.query(
+            backup_types, start_date, end_date, keyword, sort_by, sort_order,
+            offset=(page - 1) * page_size if page_size else 0,
+            limit=page_size
+        )
+        return [self._backup_info(entry) for entry in entries], total
+    
+    def _backup_info(self, entry: Dict) -> Dict:
+        """备份目录记录转换为备份列表中的文件信息"""
+        return {
+            "filename": entry["filename"],
+            "timestamp": entry["timestamp"].isoformat(),
+            "type": entry["type"],
+            "size": f"{entry['size_bytes'] // 1024}KB",
+            "size_bytes": entry["size_bytes"],
+            "integrity": entry["integrity"],
+            "verification": entry["verification"],
+            "path": entry["path"],
+            # 全量备份或增量备份、压缩方式
+            "kind": entry["kind"],
+            "compression": entry["compression"],
+            "description": f"{entry['type']}备份 - {entry['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
+        }
+    
+    def _catalog_entry(self, backup_file: Path) -> Optional[Dict]:
+        """读取备份文件的信息生成目录记录，文件名无法解析时返回None"""
+        file_info = self._parse_backup_filename(backup_file)
+        if not file_info:
+            return None
+        stat = backup_file.stat()
+        manifest = load_manifest(backup_file) or {}
+        # 最近一次快速/深度校验的结果，校验未通过时视为不完整
+        verification = manifest.get("verification", {})
+        integrity = self.validate_backup_integrity(backup_file) and all(
+            record["ok"] for record in verification.values()
+        )
+        return {
+            "filename": backup_file.name,
+            "path": str(backup_file),
+            "type": file_info["type"],
+            "kind": "incremental" if is_delta_backup(backup_file) else "full",
+            "compression": compression_of(backup_file),
+            "timestamp": file_info["timestamp"],
+            "size_bytes": stat.st_size,
+            "mtime": stat.st_mtime,
+            "integrity": integrity,
+            "verification": verification,
+            "chain": manifest.get("chain", [])
+        }
+    
+    def _catalog_backup(self, backup_file: Path):
+        """把新建或校验过的备份写入备份目录，失败时留待 reconcile_catalog 修复"""
+        try:
+            entry = self._catalog_entry(backup_file)
+            if entry:
+                self.catalog.upsert([entry])
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"更新备份目录失败 {backup_file.name}: {e}")
+    
+    def _ensure_catalog(self):
+        """本进程第一次查询备份目录前按磁盘上的文件修复一次"""
+        if not self._catalog_reconciled:
+            self.reconcile_catalog()
+    
+    def reconcile_catalog(self) -> Dict[str, int]:
+        """
+        按磁盘上的备份文件修复备份目录
+        
+        只对目录中缺少或大小、修改时间有变化的文件读取清单和检查完整性，
+        目录中有但磁盘上已不存在的文件从目录中删除。
+        
+        Returns:
+            修复结果统计：新增、更新、删除的记录数
+        """
+        catalogued = self.catalog.file_states()
+        on_disk = {}
+        for directory in (self.daily_dir, self.monthly_dir, self.user_full_dir):
+            for pattern in self.BACKUP_FILE_PATTERNS:
+                for backup_file in directory.glob(pattern):
+                    on_disk[backup_file.name] = backup_file
+        
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        entries = []
+        for filename, backup_file in on_disk.items():
+            stat = backup_file.stat()
+            state = catalogued.get(filename)
+            if state == (stat.st_size, stat.st_mtime):
+                continue
+            entry = self._catalog_entry(backup_file)
+            if entry:
+                entries.append(entry)
+                stats["updated" if state else "added"] += 1
+        removed = [filename for filename in catalogued if filename not in on_disk]
+        stats["removed"] = len(removed)
+        
+        self.catalog.upsert(entries)
+        self.catalog.remove(removed)
+        self._catalog_reconciled = True
+        if any(stats.values()):
+            logger.info(f"备份目录已修复: 新增 {stats['added']}，更新 {stats['updated']}，删除 {stats['removed']}")
+        return stats
     
     def _parse_backup_filename(self, file_path: Path) -> Optional[Dict]:
         """
@@ -120,7 +278,11 @@ class BackupManager:
         Returns:
             文件信息字典，包含时间戳和类型
         """
-        filename = file_path.stem  # 去掉扩展名
+        filename = strip_compression_suffix(file_path.name)  # 去掉压缩扩展名和备份扩展名
+        for kind_suffix in (FULL_SUFFIX, DELTA_SUFFIX):
+            if filename.endswith(kind_suffix):
+                filename = filename[:-len(kind_suffix)]
+                break
         
         # 解析不同类型的备份文件名格式
         if filename.startswith("daily_warehouse_"):
@@ -151,17 +313,27 @@ class BackupManager:
     
 
     
-    def create_backup(self, backup_type: str = "daily") -> Dict[str, str]:
+    def create_backup(self, backup_type: str = "daily",
+                      progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
         """
-        使用sqlite3_backup API创建数据库备份
-        同时备份主数据库和系统配置数据库
+        从数据库的一致快照分步流式创建（压缩）备份文件
+        每日备份在全量基准备份未超过间隔天数时创建增量备份
+        其他备份正在执行时等待其完成
         
         Args:
             backup_type: 备份类型（daily, monthly, user_full）
+            progress: 进度回调 (已复制页数, 总页数)
             
         Returns:
             备份结果信息
         """
+        with self._backup_lock:
+            backup_info = self._create_backup(backup_type, progress)
+            self._catalog_backup(Path(backup_info["path"]))
+            return backup_info
+    
+    def _create_backup(self, backup_type: str, progress: Optional[ProgressCallback]) -> Dict[str, str]:
+        """创建备份（调用方持有备份锁）"""
         try:
             # 确定备份目录
             if backup_type == "daily":
@@ -175,47 +347,211 @@ class BackupManager:
             
             # 生成备份文件名
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"{backup_type}_warehouse_{timestamp}.db"
-            backup_path = backup_dir / backup_filename
+            compression_suffix = COMPRESSION_SUFFIXES[self.compression]
             
             # 确保备份目录存在
             backup_dir.mkdir(parents=True, exist_ok=True)
             
-            # 备份主数据库
-            source_conn = sqlite3.connect(str(self.db_path))
-            backup_conn = sqlite3.connect(str(backup_path))
+            # 增量备份
+            if backup_type in self.INCREMENTAL_BACKUP_TYPES:
+                parent_path = self._find_incremental_parent(backup_dir)
+                if parent_path:
+                    backup_path = backup_dir / f"{backup_type}_warehouse_{timestamp}{DELTA_SUFFIX}{compression_suffix}"
+                    try:
+                        manifest = create_incremental_backup(
+                            self.db_path, parent_path, backup_path, backup_type,
+                            self.compression, self.compression_level, self.pacing, progress
+                        )
+                        backup_info = {
+                            "filename": backup_path.name,
+                            "path": str(backup_path),
+                            "type": backup_type,
+                            "kind": "incremental",
+                            "timestamp": datetime.now(),
+                            "size": manifest["file_size"],
+                            "integrity": self.validate_backup_integrity(backup_path),
+                            "base": manifest["base"],
+                            "parent": manifest["parent"],
+                            "changed_pages": manifest["changed_pages"],
+                            "page_count": manifest["page_count"],
+                            "compression": self.compression
+                        }
+                        logger.info(
+                            f"成功创建{backup_type}增量备份: {backup_path.name}，"
+                            f"变化页 {manifest['changed_pages']}/{manifest['page_count']}"
+                        )
+                        return backup_info
+                    except (ValueError, RuntimeError, sqlite3.Error) as e:
+                        logger.warning(f"增量备份失败，改为全量备份: {e}")
             
-            try:
-                # 获取源数据库的备份对象
-                source_conn.backup(backup_conn)
-                
-                # 记录备份元数据
-                backup_info = {
-                    "filename": backup_filename,
-                    "path": str(backup_path),
-                    "type": backup_type,
-                    "timestamp": datetime.now(),
-                    "size": backup_path.stat().st_size,
-                    "integrity": self.validate_backup_integrity(backup_path)
-                }
-                
-                logger.info(f"成功创建{backup_type}备份: {backup_filename}")
-                return backup_info
-                
-            except sqlite3.Error as e:
-                logger.error(f"备份过程失败: {e}")
-                # 如果备份失败，删除不完整的备份文件
-                if backup_path.exists():
-                    backup_path.unlink()
-                raise
-            finally:
-                source_conn.close()
-                backup_conn.close()
+            backup_filename = f"{backup_type}_warehouse_{timestamp}{FULL_SUFFIX}{compression_suffix}"
+            backup_path = backup_dir / backup_filename
+            
+            # 从数据库快照流式写入（压缩）备份文件，同时生成清单和页摘要
+            manifest = create_full_backup(
+                self.db_path, backup_path, backup_type, self.compression, self.compression_level,
+                self.pacing, progress
+            )
+            
+            # 记录备份元数据
+            backup_info = {
+                "filename": backup_filename,
+                "path": str(backup_path),
+                "type": backup_type,
+                "kind": "full",
+                "timestamp": datetime.now(),
+                "size": manifest["file_size"],
+                "integrity": self.validate_backup_integrity(backup_path),
+                "compression": self.compression,
+                "database_size": manifest["database_size"]
+            }
+            
+            logger.info(f"成功创建{backup_type}备份: {backup_filename}")
+            return backup_info
                 
         except Exception as e:
             logger.error(f"备份创建失败: {e}")
             raise
     
+    def start_backup_task(self, backup_type: str = "user_full") -> Dict:
+        """
+        在后台线程中创建备份，立即返回任务状态
+        
+        Args:
+            backup_type: 备份类型
+            
+        Returns:
+            任务状态（通过 get_backup_task 查询进度）
+            
+        Raises:
+            ValueError: 备份类型不支持
+            RuntimeError: 已有后台备份任务正在进行
+        """
+        if backup_type not in self.BACKUP_TYPES:
+            raise ValueError(f"不支持的备份类型: {backup_type}")
+        with self._task_lock:
+            if any(task["status"] == "running" for task in self._tasks.values()):
+                raise RuntimeError("已有备份任务正在进行中")
+            task_id = uuid.uuid4().hex[:12]
+            task = {
+                "task_id": task_id,
+                "backup_type": backup_type,
+                "status": "running",
+                "progress": 0.0,
+                "pages_copied": 0,
+                "page_count": None,
+                "started_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "elapsed_seconds": 0.0,
+                "eta_seconds": None,
+                "result": None,
+                "error": None
+            }
+            self._tasks[task_id] = task
+            while len(self._tasks) > self.MAX_TASK_HISTORY:
+                self._tasks.popitem(last=False)
+            snapshot = dict(task)
+        
+        thread = threading.Thread(
+            target=self._run_backup_task, args=(task_id, backup_type),
+            name=f"backup-{task_id}", daemon=True
+        )
+        thread.start()
+        return snapshot
+    
+    def get_backup_task(self, task_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        查询后台备份任务状态
+        
+        Args:
+            task_id: 任务ID，为空时返回最近一个任务
+            
+        Returns:
+            任务状态，不存在时返回None
+        """
+        with self._task_lock:
+            if task_id is None:
+                task = next(reversed(self._tasks.values()), None)
+            else:
+                task = self._tasks.get(task_id)
+            return dict(task) if task else None
+    
+    def _run_backup_task(self, task_id: str, backup_type: str):
+        """后台线程：执行备份并更新任务进度"""
+        started = time.monotonic()
+        
+        def on_progress(pages_copied: int, page_count: int):
+            elapsed = time.monotonic() - started
+            with self._task_lock:
+                task = self._tasks.get(task_id)
+                if task is None:
+                    return
+                task["pages_copied"] = pages_copied
+                task["page_count"] = page_count
+                task["elapsed_seconds"] = round(elapsed, 1)
+                task["progress"] = round(pages_copied * 100 / page_count, 1) if page_count else 100.0
+                # 按已复制页数的平均速度估算剩余时间
+                task["eta_seconds"] = (
+                    round(elapsed * (page_count - pages_copied) / pages_copied, 1) if pages_copied else None
+                )
+        
+        try:
+            result = self.create_backup(backup_type, progress=on_progress)
+            result = {**result, "timestamp": result["timestamp"].isoformat()}
+            status, error = "completed", None
+        except Exception as e:
+            logger.error(f"后台备份任务 {task_id} 失败: {e}")
+            result, status, error = None, "failed", str(e)
+        
+        with self._task_lock:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                task.update({
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "finished_at": datetime.now().isoformat(),
+                    "elapsed_seconds": round(time.monotonic() - started, 1),
+                    "eta_seconds": 0 if status == "completed" else None
+                })
+                if status == "completed":
+                    task["progress"] = 100.0
+    
+    def _find_incremental_parent(self, backup_dir: Path) -> Optional[Path]:
+        """
+        查找增量备份的父备份：目录中最新的带清单和页摘要的备份
+        
+        基准备份超过间隔天数、备份链上有文件缺失时返回None（需要全量备份）
+        
+        Args:
+            backup_dir: 备份目录
+            
+        Returns:
+            父备份文件路径
+        """
+        candidates = []
+        for pattern in self.BACKUP_FILE_PATTERNS:
+            for backup_file in backup_dir.glob(pattern):
+                file_info = self._parse_backup_filename(backup_file)
+                if file_info:
+                    candidates.append((file_info["timestamp"], backup_file))
+        if not candidates:
+            return None
+        
+        # 最新的备份不带清单（如旧版本创建的备份）时重新开始备份链
+        _, latest = max(candidates)
+        manifest = load_manifest(latest)
+        if not manifest or not page_index_path(latest).exists():
+            return None
+        
+        base_info = self._parse_backup_filename(backup_dir / (manifest["base"] or latest.name))
+        if not base_info or datetime.now() - base_info["timestamp"] >= timedelta(days=self.full_backup_interval_days):
+            return None
+        if not all((backup_dir / filename).exists() for filename in manifest["chain"]):
+            logger.warning(f"备份链上的文件缺失，重新创建全量备份: {latest.name}")
+            return None
+        return latest
+    
     def validate_backup_integrity(self, backup_file: Path) -> bool:
         """
         验证备份文件完整性
@@ -235,6 +571,10 @@ class BackupManager:
             if backup_file.stat().st_size == 0:
                 return False
             
+            # 增量备份和压缩的备份检查清单和备份链
+            if not is_plain_database(backup_file):
+                return validate_backup_file(backup_file)
+            
             # 尝试连接数据库验证完整性
             conn = sqlite3.connect(str(backup_file))
             try:
@@ -261,6 +601,62 @@ class BackupManager:
     
 
     
+    def _find_backup_file(self, filename: str) -> Optional[Path]:
+        """在所有备份目录中按文件名查找备份文件"""
+        for backup_dir in (self.daily_dir, self.monthly_dir, self.user_full_dir):
+            backup_path = backup_dir / filename
+            if backup_path.is_file():
+                return backup_path
+        return None
+    
+    def verify_backup_by_filename(self, filename: str, mode: str = "fast") -> Optional[Dict]:
+        """
+        校验指定文件名的备份
+        
+        Args:
+            filename: 备份文件名
+            mode: 校验方式（fast：清单 + quick_check，deep：SHA-256 + integrity_check + 各表行数）
+            
+        Returns:
+            校验结果，未找到备份文件时返回None
+            
+        Raises:
+            ValueError: 校验方式不支持
+        """
+        backup_path = self._find_backup_file(filename)
+        if backup_path is None:
+            return None
+        result = verify_backup(backup_path, mode)
+        self._catalog_backup(backup_path)
+        return result
+    
+    def verify_backups_in_rotation(self, time_budget: float = 1800) -> List[Dict]:
+        """
+        轮流深度校验备份：从从未深度校验或最久未校验的备份开始依次校验，
+        用完时间预算后停止（至少校验一个），下次从剩余的备份继续
+        
+        Args:
+            time_budget: 本次校验的时间预算（秒）
+            
+        Returns:
+            本次各备份的校验结果
+        """
+        self._ensure_catalog()
+        entries, _ = self.catalog.query()
+        entries.sort(key=lambda entry: entry["verification"].get("deep", {}).get("verified_at", ""))
+        
+        results = []
+        started = time.monotonic()
+        for entry in entries:
+            if results and time.monotonic() - started >= time_budget:
+                break
+            backup_path = Path(entry["path"])
+            if not backup_path.exists():
+                continue
+            results.append(verify_backup(backup_path, "deep"))
+            self._catalog_backup(backup_path)
+        return results
+    
     def cleanup_old_backups(self, keep_days: int = 30, 
                            keep_monthly: int = 12) -> Dict[str, int]:
         """
@@ -281,31 +677,50 @@ class BackupManager:
         
         current_time = datetime.now()
         
-        # 清理每日备份
-        daily_backups = self.get_backup_list("daily")
-        for backup in daily_backups:
-            if (current_time - backup["timestamp"]) > timedelta(days=keep_days):
-                try:
-                    backup_path = Path(backup["path"])
-                    backup_path.unlink()
-                    cleanup_stats["daily_deleted"] += 1
-                except Exception as e:
-                    logger.error(f"删除每日备份失败 {backup['path']}: {e}")
+        # 清理每日备份（仍被保留的增量备份依赖的基准备份和增量备份不删除）
+        self._ensure_catalog()
+        daily_backups, _ = self.catalog.query(["daily"])
+        expired = [
+            backup for backup in daily_backups
+            if (current_time - backup["timestamp"]) > timedelta(days=keep_days)
+        ]
+        expired_names = {backup["filename"] for backup in expired}
+        required = {
+            filename for backup in daily_backups if backup["filename"] not in expired_names
+            for filename in backup["chain"]
+        }
+        for backup in expired:
+            if backup["filename"] in required:
+                continue
+            try:
+                self._delete_backup_files(Path(backup["path"]))
+                cleanup_stats["daily_deleted"] += 1
+            except Exception as e:
+                logger.error(f"删除每日备份失败 {backup['path']}: {e}")
         
         # 清理月度备份（保留指定数量的最新备份）
-        monthly_backups = self.get_backup_list("monthly")
-        monthly_backups.sort(key=lambda x: x["timestamp"], reverse=True)
+        monthly_backups, _ = self.catalog.query(["monthly"])
         
         if len(monthly_backups) > keep_monthly:
             for backup in monthly_backups[keep_monthly:]:
                 try:
-                    backup_path = Path(backup["path"])
-                    backup_path.unlink()
+                    self._delete_backup_files(Path(backup["path"]))
                     cleanup_stats["monthly_deleted"] += 1
                 except Exception as e:
                     logger.error(f"删除月度备份失败 {backup['path']}: {e}")        
         
         return cleanup_stats
+    
+    def _delete_backup_files(self, backup_path: Path):
+        """删除备份文件及其清单和页摘要，并从备份目录中删除"""
+        backup_path.unlink()
+        for sidecar in (manifest_path(backup_path), page_index_path(backup_path)):
+            if sidecar.exists():
+                sidecar.unlink()
+        try:
+            self.catalog.remove([backup_path.name])
+        except sqlite3.Error as e:
+            logger.warning(f"更新备份目录失败 {backup_path.name}: {e}")
 
     def delete_backup_by_filename(self, filename: str) -> bool:
         """
@@ -316,21 +731,29 @@ class BackupManager:
             
         Returns:
             是否成功删除
+            
+        Raises:
+            ValueError: 有增量备份依赖该备份
         """
         try:
             # 在所有备份目录中查找文件
-            backup_dirs = [self.daily_dir, self.monthly_dir, self.user_full_dir]
+            backup_path = self._find_backup_file(filename)
+            if backup_path is None:
+                logger.warning(f"未找到备份文件: {filename}")
+                return False
             
-            for backup_dir in backup_dirs:
-                backup_path = backup_dir / filename
-                if backup_path.exists():
-                    backup_path.unlink()
-                    logger.info(f"成功删除备份文件: {filename}")
-                    return True
-            
-            logger.warning(f"未找到备份文件: {filename}")
-            return False
+            self._ensure_catalog()
+            entry = self.catalog.get(filename)
+            same_type, _ = self.catalog.query([entry["type"]] if entry else None)
+            dependents = [backup["filename"] for backup in same_type if filename in backup["chain"]]
+            if dependents:
+                raise ValueError(f"备份 {filename} 被 {len(dependents)} 个增量备份依赖，请先删除这些增量备份")
+            self._delete_backup_files(backup_path)
+            logger.info(f"成功删除备份文件: {filename}")
+            return True
             
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"删除备份文件失败 {filename}: {e}")
             return False
@@ -342,7 +765,13 @@ def get_backup_manager() -> BackupManager:
     """获取备份管理器实例（单例模式）"""
     global _backup_manager
     if _backup_manager is None:
-        _backup_manager = BackupManager()
+        compression_level = os.getenv("BACKUP_COMPRESSION_LEVEL")
+        _backup_manager = BackupManager(
+            compression=os.getenv("BACKUP_COMPRESSION", "gzip"),
+            compression_level=int(compression_level) if compression_level else None,
+            step_pages=int(os.getenv("BACKUP_STEP_PAGES", "2560")),
+            step_sleep=int(os.getenv("BACKUP_STEP_SLEEP_MS", "10")) / 1000
+        )
     return _backup_manager
 
 if __name__ == "__main__":
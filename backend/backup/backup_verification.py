@@ -0,0 +1,198 @@
+"""
+备份校验模块
+按备份清单（文件大小、SHA-256、页数、各表行数）校验备份，不必每次对备份执行完整的 integrity_check
+
+校验方式：
+- fast：检查清单（文件大小、文件头、备份链上的文件），再对数据库执行 PRAGMA quick_check；
+  增量备份和压缩的备份先重组（解压）到临时文件，重组时按清单校验各文件和数据库的SHA-256
+- deep：在fast的基础上校验未压缩备份文件的SHA-256，执行 PRAGMA integrity_check（含索引与表数据的一致性），
+  并核对各表行数与清单一致
+
+校验结果记录在清单的 verification 中（fast、deep各保留最近一次），
+没有清单的旧版本全量备份深度校验通过后补写清单，之后可以按清单快速校验。
+"""
+
+import hashlib
+import os
+import sqlite3
+import struct
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.logging_config import get_logger
+from backup.incremental_backup import (
+    MANIFEST_FORMAT_VERSION,
+    count_table_rows,
+    is_plain_database,
+    load_manifest,
+    materialize_backup,
+    validate_backup_file,
+    write_manifest
+)
+
+logger = get_logger(__name__)
+
+VERIFY_MODES = ("fast", "deep")
+# quick_check / integrity_check 最多报告的问题条数
+MAX_CHECK_ERRORS = 20
+
+
+def run_integrity_checks(conn: sqlite3.Connection, deep: bool = False,
+                         expected_row_counts: Optional[Dict[str, int]] = None) -> Tuple[List[str], Dict[str, int]]:
+    """
+    对数据库执行 quick_check（deep时为 integrity_check），并核对各表行数
+
+    Args:
+        conn: 数据库连接
+        deep: 是否执行完整的 integrity_check
+        expected_row_counts: 清单中的各表行数，为空时不核对
+
+    Returns:
+        (发现的问题列表, 各表行数)，只在需要核对或deep时统计行数
+    """
+    pragma = "integrity_check" if deep else "quick_check"
+    try:
+        results = [row[0] for row in conn.execute(f"PRAGMA {pragma}({MAX_CHECK_ERRORS})")]
+        errors = [] if results == ["ok"] else [f"{pragma}: {result}" for result in results]
+        row_counts = {}
+        if expected_row_counts is not None or deep:
+            row_counts = count_table_rows(conn)
+        if expected_row_counts is not None:
+            for table in sorted(set(expected_row_counts) | set(row_counts)):
+                expected, actual = expected_row_counts.get(table), row_counts.get(table)
+                if expected != actual:
+                    errors.append(f"表 {table} 行数不一致: 清单 {expected}，实际 {actual}")
+        return errors, row_counts
+    except sqlite3.DatabaseError as e:
+        return [f"无法读取数据库: {e}"], {}
+
+
+def _check_database_file(db_path: Path, deep: bool,
+                         expected_row_counts: Optional[Dict[str, int]]) -> Tuple[List[str], Dict[str, int]]:
+    """以只读、不加锁的方式打开备份数据库文件执行检查"""
+    try:
+        conn = sqlite3.connect(db_path.resolve().as_uri() + "?mode=ro&immutable=1", uri=True)
+    except sqlite3.Error as e:
+        return [f"无法打开数据库: {e}"], {}
+    try:
+        return run_integrity_checks(conn, deep, expected_row_counts)
+    finally:
+        conn.close()
+
+
+def _file_sha256(path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _legacy_manifest(backup_path: Path, file_sha256: str, row_counts: Dict[str, int]) -> Dict:
+    """为没有清单的未压缩全量备份生成清单"""
+    with open(backup_path, "rb") as f:
+        header = f.read(100)
+    page_size = struct.unpack(">H", header[16:18])[0]
+    page_size = 65536 if page_size == 1 else page_size
+    stat = backup_path.stat()
+    page_count = stat.st_size // page_size
+    return {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "filename": backup_path.name,
+        "type": backup_path.parent.name,
+        "kind": "full",
+        "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        "compression": "none",
+        "compression_level": None,
+        "page_size": page_size,
+        "page_count": page_count,
+        "changed_pages": page_count,
+        "database_size": stat.st_size,
+        "file_size": stat.st_size,
+        "file_sha256": file_sha256,
+        "database_sha256": file_sha256,
+        "table_row_counts": row_counts,
+        "base": None,
+        "parent": None,
+        "chain": []
+    }
+
+
+def verify_backup(backup_path: Path, mode: str = "fast") -> Dict:
+    """
+    校验备份文件
+
+    Args:
+        backup_path: 备份文件路径
+        mode: 校验方式（fast, deep）
+
+    Returns:
+        校验结果：文件名、校验方式、是否通过、发现的问题、校验时间、耗时秒数
+
+    Raises:
+        ValueError: 校验方式不支持
+    """
+    if mode not in VERIFY_MODES:
+        raise ValueError(f"不支持的校验方式: {mode}，可选值: {', '.join(VERIFY_MODES)}")
+    deep = mode == "deep"
+    started = time.monotonic()
+    manifest = load_manifest(backup_path)
+    expected_row_counts = manifest.get("table_row_counts") if manifest else None
+    file_sha256 = None
+    row_counts: Dict[str, int] = {}
+    errors: List[str] = []
+
+    if manifest is None and not is_plain_database(backup_path):
+        errors.append("备份缺少清单")
+    elif manifest is not None and not validate_backup_file(backup_path):
+        errors.append("备份文件与清单不一致（文件大小、文件头或备份链）")
+    elif is_plain_database(backup_path):
+        if deep:
+            file_sha256 = _file_sha256(backup_path)
+            if manifest and file_sha256 != manifest["file_sha256"]:
+                errors.append("备份文件SHA-256与清单不一致")
+        if not errors:
+            errors, row_counts = _check_database_file(backup_path, deep, expected_row_counts)
+    else:
+        fd, temp_name = tempfile.mkstemp(prefix=".verify-", suffix=".tmp", dir=backup_path.parent)
+        os.close(fd)
+        temp_path = Path(temp_name)
+        try:
+            materialize_backup(backup_path, temp_path)
+            errors, row_counts = _check_database_file(temp_path, deep, expected_row_counts)
+        except ValueError as e:
+            errors.append(str(e))
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    result = {
+        "filename": backup_path.name,
+        "mode": mode,
+        "ok": not errors,
+        "errors": errors,
+        "verified_at": datetime.now().isoformat(),
+        "duration_seconds": round(time.monotonic() - started, 3)
+    }
+
+    # 校验期间备份被删除时不再记录结果
+    if not backup_path.exists():
+        return result
+    if manifest is None and deep and result["ok"]:
+        manifest = _legacy_manifest(backup_path, file_sha256, row_counts)
+        logger.info(f"已为旧版本备份补写清单: {backup_path.name}")
+    if manifest is not None:
+        manifest.setdefault("verification", {})[mode] = {
+            key: result[key] for key in ("ok", "errors", "verified_at", "duration_seconds")
+        }
+        write_manifest(backup_path, manifest)
+
+    if result["ok"]:
+        logger.info(f"备份校验通过（{mode}）: {backup_path.name}，耗时 {result['duration_seconds']} 秒")
+    else:
+        logger.error(f"备份校验失败（{mode}）: {backup_path.name}: {'; '.join(errors)}")
+    return result
+
@@ -0,0 +1,236 @@
+"""
+备份文件压缩模块
+按块流式压缩和解压备份文件，不产生未压缩的临时文件
+
+支持的压缩方式（由文件扩展名区分）：
+- none：不压缩
+- gzip：.gz（标准库）
+- lzma：.xz（标准库）
+- zstd：.zst（需要安装 zstandard）
+"""
+
+import gzip
+import hashlib
+import lzma
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd为可选依赖，未安装时不可用
+    zstandard = None
+
+# 压缩方式对应的文件扩展名
+COMPRESSION_SUFFIXES = {
+    "none": "",
+    "gzip": ".gz",
+    "lzma": ".xz",
+    "zstd": ".zst"
+}
+# 未指定压缩级别时使用的级别
+# 备份数据以数字和重复文本为主：gzip 1 比 gzip 6 快约3倍，文件只大20%左右；lzma 6 比 lzma 0 慢10倍以上
+# （测量方法见 benchmarks/bench_backup_compression.py）
+DEFAULT_COMPRESSION_LEVELS = {
+    "gzip": 1,
+    "lzma": 0,
+    "zstd": 3
+}
+# 各压缩方式的压缩级别范围
+COMPRESSION_LEVEL_RANGES = {
+    "gzip": (1, 9),
+    "lzma": (0, 9),
+    "zstd": (1, 22)
+}
+
+# 解压损坏或不完整的文件时可能抛出的异常（gzip的CRC错误为OSError，压缩数据本身损坏时为zlib.error）
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def available_compressions() -> List[str]:
+    """当前环境可用的压缩方式"""
+    return [name for name in COMPRESSION_SUFFIXES if name != "zstd" or zstandard is not None]
+
+
+def check_compression(compression: str, level: Optional[int] = None):
+    """
+    检查压缩方式和压缩级别
+
+    Raises:
+        ValueError: 压缩方式不可用或压缩级别超出范围
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"不支持的压缩方式: {compression}，可选值: {', '.join(COMPRESSION_SUFFIXES)}")
+    if compression not in available_compressions():
+        raise ValueError(f"压缩方式 {compression} 不可用，请安装 zstandard")
+    if level is not None and compression != "none":
+        low, high = COMPRESSION_LEVEL_RANGES[compression]
+        if not low <= level <= high:
+            raise ValueError(f"{compression} 压缩级别应在 {low}-{high} 之间")
+
+
+def compression_of(path: Path) -> str:
+    """按文件扩展名判断压缩方式"""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and path.name.endswith(suffix):
+            return compression
+    return "none"
+
+
+def strip_compression_suffix(filename: str) -> str:
+    """去掉文件名的压缩扩展名"""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if suffix and filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+class _HashingFile:
+    """包装文件对象，统计读写的字节数并计算SHA-256"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self.fileobj.readinto(buffer)
+        self.sha256.update(memoryview(buffer)[:count])
+        self.size += count
+        return count
+
+    def readable(self) -> bool:
+        return self.fileobj.readable()
+
+    def writable(self) -> bool:
+        return self.fileobj.writable()
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def close(self):
+        self.fileobj.close()
+
+
+class BackupFileWriter:
+    """
+    流式写入（压缩）备份文件
+
+    先写入 <文件名>.tmp，正常关闭后替换为目标文件，异常退出时删除临时文件。
+    file_size、file_sha256 为写入磁盘的（压缩后）字节数和摘要。
+    """
+
+    def __init__(self, path: Path, compression: str = "none", level: Optional[int] = None):
+        check_compression(compression, level)
+        self.path = path
+        self.temp_path = path.with_name(path.name + ".tmp")
+        self.compression = compression
+        self.level = level if level is not None else DEFAULT_COMPRESSION_LEVELS.get(compression)
+        self._raw: Optional[_HashingFile] = None
+        self._stream = None
+        self.file_size = 0
+        self.file_sha256 = ""
+
+    def __enter__(self) -> "BackupFileWriter":
+        self._raw = _HashingFile(open(self.temp_path, "wb"))
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=self.level, mtime=0)
+        elif self.compression == "lzma":
+            self._stream = lzma.LZMAFile(self._raw, "wb", preset=self.level)
+        elif self.compression == "zstd":
+            self._stream = zstandard.ZstdCompressor(level=self.level).stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = None
+        return self
+
+    def write(self, data: bytes):
+        if self._stream is not None:
+            self._stream.write(data)
+        else:
+            self._raw.write(data)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._stream is not None:
+                self._stream.close()
+        finally:
+            self._raw.close()
+        if exc_type is not None:
+            if self.temp_path.exists():
+                self.temp_path.unlink()
+            return False
+        self.file_size = self._raw.size
+        self.file_sha256 = self._raw.sha256.hexdigest()
+        self.temp_path.replace(self.path)
+        return False
+
+
+class BackupFileReader:
+    """
+    流式读取（解压）备份文件
+
+    读到文件末尾后 file_sha256 为磁盘上（压缩后）文件的摘要，可与清单比较。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.compression = compression_of(path)
+        if self.compression not in available_compressions():
+            raise ValueError(f"无法读取 {path.name}：压缩方式 {self.compression} 不可用，请安装 zstandard")
+        self._raw: Optional[_HashingFile] = None
+        self._stream = None
+
+    def __enter__(self) -> "BackupFileReader":
+        self._raw = _HashingFile(open(self.path, "rb"))
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="rb")
+        elif self.compression == "lzma":
+            self._stream = lzma.LZMAFile(self._raw, "rb")
+        elif self.compression == "zstd":
+            self._stream = zstandard.ZstdDecompressor().stream_reader(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+        return self
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    def read_exactly(self, size: int) -> bytes:
+        """读取指定字节数（解压流单次read可能返回较少的字节），文件结束时返回已读到的部分"""
+        parts = []
+        remaining = size
+        while remaining > 0:
+            data = self._stream.read(remaining)
+            if not data:
+                break
+            parts.append(data)
+            remaining -= len(data)
+        return b"".join(parts)
+
+    def drain(self):
+        """读完剩余内容，使 file_sha256 覆盖整个文件"""
+        while self._stream.read(1024 * 1024):
+            pass
+
+    @property
+    def file_sha256(self) -> str:
+        return self._raw.sha256.hexdigest()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._stream is not self._raw:
+                self._stream.close()
+        finally:
+            self._raw.close()
+        return False
@@ -0,0 +1,429 @@
+"""
+全量/增量备份模块
+从数据库的一致快照按页读取，流式写入（压缩）备份文件；增量备份只保存与上一次备份相比发生变化的页
+
+备份链：定期的全量基准备份（.db）+ 之后每次的增量备份（.delta），
+备份文件可以压缩（扩展名后加 .gz/.xz/.zst，见 backup/compression.py）
+- 每个备份旁边保存清单文件 <备份文件名>.manifest.json 和页摘要文件 <备份文件名>.pages
+- 页摘要文件按页号依次保存每页内容的blake2b摘要，增量备份只与上一次备份的页摘要比较，
+  不需要读取上一次的备份文件
+- 增量文件格式：文件头（魔数、页大小、页数）+ 若干条（页号, 页内容）
+- 恢复时解压基准备份，按顺序写入链上各增量文件的页，截断到清单记录的页数，
+  再用清单中的SHA-256校验备份文件和重组出的数据库
+- 清单同时记录快照中各表的行数，供校验备份（见 backup/backup_verification.py）和恢复后核对
+
+读取快照时先在持有写锁的情况下把WAL全部检查点到数据库文件，再开启读事务，
+读事务结束前其他连接的写入只追加到WAL，数据库文件内容保持不变。
+复制按 BackupPacing 分步进行：每复制一定页数报告一次进度并短暂暂停，让出磁盘I/O给业务读写。
+"""
+
+import hashlib
+import json
+import sqlite3
+import struct
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from core.logging_config import get_logger
+from backup.compression import DECOMPRESSION_ERRORS, BackupFileReader, BackupFileWriter, strip_compression_suffix
+
+logger = get_logger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+PAGE_INDEX_SUFFIX = ".pages"
+FULL_SUFFIX = ".db"
+DELTA_SUFFIX = ".delta"
+SQLITE_MAGIC = b"SQLite format 3\x00"
+MANIFEST_FORMAT_VERSION = 1
+
+# 页摘要长度（字节）
+PAGE_DIGEST_SIZE = 16
+# 增量文件头：魔数、页大小、数据库页数
+DELTA_MAGIC = b"WHDELTA1"
+DELTA_HEADER = struct.Struct(">8sII")
+PAGE_NUMBER = struct.Struct(">I")
+# 顺序读取数据库文件时每次读取的页数
+READ_CHUNK_PAGES = 256
+# 获取一致快照的重试次数（WAL被其他读事务占用无法全部检查点时重试）
+SNAPSHOT_ATTEMPTS = 5
+
+# 进度回调：(已复制页数, 总页数)
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class BackupPacing:
+    """分步复制参数：每复制 step_pages 页报告一次进度并暂停 step_sleep 秒"""
+    step_pages: int = 2560
+    step_sleep: float = 0.01
+
+
+def manifest_path(backup_path: Path) -> Path:
+    """备份的清单文件路径"""
+    return backup_path.with_name(backup_path.name + MANIFEST_SUFFIX)
+
+
+def page_index_path(backup_path: Path) -> Path:
+    """备份的页摘要文件路径"""
+    return backup_path.with_name(backup_path.name + PAGE_INDEX_SUFFIX)
+
+
+def load_manifest(backup_path: Path) -> Optional[Dict]:
+    """读取备份清单，不存在或无法解析时返回None"""
+    path = manifest_path(backup_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"无法读取备份清单 {path}: {e}")
+        return None
+
+
+def write_manifest(backup_path: Path, manifest: Dict):
+    """写入备份清单（先写临时文件再替换）"""
+    path = manifest_path(backup_path)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    temp_path.replace(path)
+
+
+def count_table_rows(conn: sqlite3.Connection) -> Dict[str, int]:
+    """统计数据库中各表的行数（不含SQLite内部表和虚拟表）"""
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+        "AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name"
+    )]
+    counts = {}
+    for table in tables:
+        quoted = table.replace('"', '""')
+        counts[table] = conn.execute(f'SELECT count(*) FROM "{quoted}"').fetchone()[0]
+    return counts
+
+
+def _page_digest(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=PAGE_DIGEST_SIZE).digest()
+
+
+def _iter_pages(f, page_size: int, page_count: int) -> Iterator[Tuple[int, bytes]]:
+    """从文件开头按页读取，返回 (页号, 页内容)，页号从1开始"""
+    pgno = 0
+    while pgno < page_count:
+        chunk = f.read(page_size * min(READ_CHUNK_PAGES, page_count - pgno))
+        if not chunk:
+            break
+        for offset in range(0, len(chunk), page_size):
+            pgno += 1
+            yield pgno, chunk[offset:offset + page_size]
+
+
+def is_delta_backup(backup_path: Path) -> bool:
+    """是否为增量备份文件（含压缩的增量备份）"""
+    return strip_compression_suffix(backup_path.name).endswith(DELTA_SUFFIX)
+
+
+def is_plain_database(backup_path: Path) -> bool:
+    """是否为可以直接用SQLite打开的未压缩全量备份"""
+    return backup_path.name.endswith(FULL_SUFFIX)
+
+
+def _write_snapshot(db_path: Path, backup_path: Path, backup_type: str, compression: str,
+                    level: Optional[int], parent_path: Optional[Path] = None,
+                    pacing: Optional[BackupPacing] = None, progress: Optional[ProgressCallback] = None) -> Dict:
+    """
+    读取数据库快照写入备份文件，同时生成页摘要和清单
+
+    parent_path为空时写入全部页（全量备份），否则只写入与父备份页摘要不同的页（增量备份）。
+    回滚日志模式下读事务会阻塞写入，不在步骤之间暂停。
+    """
+    pacing = pacing or BackupPacing()
+    parent_manifest = None
+    parent_digests = b""
+    if parent_path is not None:
+        parent_manifest = load_manifest(parent_path)
+        parent_index = page_index_path(parent_path)
+        if not parent_manifest or not parent_index.exists():
+            raise ValueError(f"父备份缺少清单或页摘要: {parent_path.name}")
+        parent_digests = parent_index.read_bytes()
+
+    database_hash = hashlib.sha256()
+    digests = bytearray()
+    changed_pages = 0
+
+    with open_consistent_snapshot(db_path) as (snapshot, page_size, page_count, is_wal):
+        step_sleep = pacing.step_sleep if is_wal else 0
+        if progress:
+            progress(0, page_count)
+        if parent_manifest and page_size != parent_manifest["page_size"]:
+            raise ValueError(f"页大小已变化（{parent_manifest['page_size']} -> {page_size}），需要全量备份")
+
+        with open(db_path, "rb") as source, BackupFileWriter(backup_path, compression, level) as writer:
+            if parent_manifest:
+                writer.write(DELTA_HEADER.pack(DELTA_MAGIC, page_size, page_count))
+            for pgno, page in _iter_pages(source, page_size, page_count):
+                if pgno % pacing.step_pages == 0:
+                    if progress:
+                        progress(pgno, page_count)
+                    if step_sleep:
+                        time.sleep(step_sleep)
+                digest = _page_digest(page)
+                digests += digest
+                database_hash.update(page)
+                if parent_manifest is None:
+                    writer.write(page)
+                    changed_pages += 1
+                    continue
+                start = (pgno - 1) * PAGE_DIGEST_SIZE
+                if parent_digests[start:start + PAGE_DIGEST_SIZE] != digest:
+                    writer.write(PAGE_NUMBER.pack(pgno) + page)
+                    changed_pages += 1
+            if len(digests) != page_count * PAGE_DIGEST_SIZE:
+                raise ValueError("读取的数据库页数与快照不一致")
+        # 在同一读事务中统计，行数与备份的页一致
+        table_row_counts = count_table_rows(snapshot)
+        if progress:
+            progress(page_count, page_count)
+
+    page_index_path(backup_path).write_bytes(bytes(digests))
+    manifest = {
+        "format_version": MANIFEST_FORMAT_VERSION,
+        "filename": backup_path.name,
+        "type": backup_type,
+        "kind": "incremental" if parent_manifest else "full",
+        "created_at": datetime.now().isoformat(),
+        "compression": compression,
+        "compression_level": writer.level,
+        "page_size": page_size,
+        "page_count": page_count,
+        "changed_pages": changed_pages,
+        "database_size": page_size * page_count,
+        "file_size": writer.file_size,
+        "file_sha256": writer.file_sha256,
+        "database_sha256": database_hash.hexdigest(),
+        "table_row_counts": table_row_counts,
+        "base": (parent_manifest["base"] or parent_path.name) if parent_manifest else None,
+        "parent": parent_path.name if parent_manifest else None,
+        "chain": parent_manifest["chain"] + [parent_path.name] if parent_manifest else []
+    }
+    write_manifest(backup_path, manifest)
+    return manifest
+
+
+def create_full_backup(db_path: Path, backup_path: Path, backup_type: str,
+                       compression: str = "none", level: Optional[int] = None,
+                       pacing: Optional[BackupPacing] = None, progress: Optional[ProgressCallback] = None) -> Dict:
+    """
+    创建全量备份
+
+    Args:
+        db_path: 数据库文件路径
+        backup_path: 备份文件路径（.db，压缩时带压缩扩展名）
+        backup_type: 备份类型
+        compression: 压缩方式
+        level: 压缩级别
+        pacing: 分步复制参数
+        progress: 进度回调
+
+    Returns:
+        备份清单
+
+    Raises:
+        RuntimeError: 无法获取一致的数据库快照
+    """
+    return _write_snapshot(db_path, backup_path, backup_type, compression, level, None, pacing, progress)
+
+
+@contextmanager
+def open_consistent_snapshot(db_path: Path):
+    """
+    打开数据库的一致快照，在with块内数据库文件的前page_count页不会被修改
+
+    WAL模式下：占用写锁阻止新的提交，被动检查点把WAL全部写回数据库文件，
+    开启读事务后释放写锁。之后的提交只追加到WAL，检查点也不会越过本读事务写回数据库文件。
+    回滚日志模式下读事务持有共享锁，写入在读事务结束前无法提交。
+
+    Yields:
+        (处于快照读事务中的连接, 页大小, 页数, 是否为WAL模式)
+
+    Raises:
+        RuntimeError: WAL被其他读事务占用，多次重试后仍无法全部检查点
+    """
+    reader = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        journal_mode = reader.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        if journal_mode == "wal":
+            writer = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+            try:
+                for attempt in range(SNAPSHOT_ATTEMPTS):
+                    writer.execute("BEGIN IMMEDIATE")
+                    try:
+                        _, wal_frames, checkpointed = reader.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+                        if wal_frames == checkpointed:
+                            reader.execute("BEGIN")
+                            reader.execute("SELECT count(*) FROM sqlite_master").fetchone()
+                            break
+                    finally:
+                        writer.execute("ROLLBACK")
+                    time.sleep(0.2 * (attempt + 1))
+                else:
+                    raise RuntimeError("WAL被其他读事务占用，无法获取一致的数据库快照")
+            finally:
+                writer.close()
+        else:
+            reader.execute("BEGIN")
+            reader.execute("SELECT count(*) FROM sqlite_master").fetchone()
+
+        page_size = reader.execute("PRAGMA page_size").fetchone()[0]
+        page_count = reader.execute("PRAGMA page_count").fetchone()[0]
+        yield reader, page_size, page_count, journal_mode == "wal"
+    finally:
+        if reader.in_transaction:
+            reader.execute("ROLLBACK")
+        reader.close()
+
+
+def create_incremental_backup(db_path: Path, parent_path: Path, backup_path: Path, backup_type: str,
+                              compression: str = "none", level: Optional[int] = None,
+                              pacing: Optional[BackupPacing] = None,
+                              progress: Optional[ProgressCallback] = None) -> Dict:
+    """
+    以上一次备份为父备份创建增量备份
+
+    Args:
+        db_path: 数据库文件路径
+        parent_path: 父备份（全量或增量）文件路径
+        backup_path: 增量备份文件路径（.delta，压缩时带压缩扩展名）
+        backup_type: 备份类型
+        compression: 压缩方式
+        level: 压缩级别
+        pacing: 分步复制参数
+        progress: 进度回调
+
+    Returns:
+        备份清单
+
+    Raises:
+        ValueError: 父备份缺少清单或页摘要、页大小已变化
+        RuntimeError: 无法获取一致的数据库快照
+    """
+    return _write_snapshot(db_path, backup_path, backup_type, compression, level, parent_path, pacing, progress)
+
+
+def validate_backup_file(backup_path: Path) -> bool:
+    """
+    检查带清单的备份文件：文件大小与清单一致、文件头可以读取（压缩文件可以解压）、
+    备份链上的文件都存在
+
+    Args:
+        backup_path: 备份文件路径
+
+    Returns:
+        是否有效
+    """
+    manifest = load_manifest(backup_path)
+    if not manifest:
+        return False
+    try:
+        if backup_path.stat().st_size != manifest["file_size"]:
+            return False
+        with BackupFileReader(backup_path) as reader:
+            if is_delta_backup(backup_path):
+                magic, page_size, page_count = DELTA_HEADER.unpack(reader.read_exactly(DELTA_HEADER.size))
+                if magic != DELTA_MAGIC or page_size != manifest["page_size"] or page_count != manifest["page_count"]:
+                    return False
+            elif not reader.read_exactly(len(SQLITE_MAGIC)) == SQLITE_MAGIC:
+                return False
+    except DECOMPRESSION_ERRORS + (ValueError, struct.error) as e:
+        logger.error(f"备份文件检查失败 {backup_path}: {e}")
+        return False
+    return all((backup_path.parent / filename).exists() for filename in manifest["chain"])
+
+
+def _apply_delta(delta_path: Path, target, page_size: int) -> str:
+    """把增量文件中的页写入目标文件，返回增量文件的SHA-256"""
+    record_size = PAGE_NUMBER.size + page_size
+    with BackupFileReader(delta_path) as reader:
+        magic, delta_page_size, _ = DELTA_HEADER.unpack(reader.read_exactly(DELTA_HEADER.size))
+        if magic != DELTA_MAGIC or delta_page_size != page_size:
+            raise ValueError(f"增量备份文件格式错误: {delta_path.name}")
+        while True:
+            record = reader.read_exactly(record_size)
+            if not record:
+                break
+            if len(record) != record_size:
+                raise ValueError(f"增量备份文件不完整: {delta_path.name}")
+            pgno = PAGE_NUMBER.unpack_from(record)[0]
+            target.seek((pgno - 1) * page_size)
+            target.write(record[PAGE_NUMBER.size:])
+        reader.drain()
+        return reader.file_sha256
+
+
+def materialize_backup(backup_path: Path, target_path: Path) -> Dict:
+    """
+    把备份（全量或增量，压缩或未压缩）重组为完整的数据库文件
+
+    Args:
+        backup_path: 备份文件路径
+        target_path: 重组后的数据库文件路径
+
+    Returns:
+        重组结果：应用的增量文件数、页数
+
+    Raises:
+        ValueError: 清单缺失、备份链上的文件缺失或校验不一致
+    """
+    manifest = load_manifest(backup_path)
+    if not manifest:
+        raise ValueError(f"备份缺少清单: {backup_path.name}")
+    directory = backup_path.parent
+    chain = [directory / filename for filename in manifest["chain"]] + [backup_path]
+    missing = [path.name for path in chain if not path.exists()]
+    if missing:
+        raise ValueError(f"备份链上的文件缺失: {', '.join(missing)}")
+
+    try:
+        return _materialize_chain(chain, manifest, target_path)
+    except DECOMPRESSION_ERRORS as e:
+        raise ValueError(f"备份文件损坏或不完整: {e}")
+
+
+def _materialize_chain(chain, manifest: Dict, target_path: Path) -> Dict:
+    base_path, deltas = chain[0], chain[1:]
+    base_manifest = load_manifest(base_path)
+    if not base_manifest:
+        raise ValueError(f"基准备份缺少清单: {base_path.name}")
+    database_hash = hashlib.sha256()
+    with BackupFileReader(base_path) as reader, open(target_path, "wb") as target:
+        for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+            database_hash.update(chunk)
+            target.write(chunk)
+        if reader.file_sha256 != base_manifest["file_sha256"]:
+            raise ValueError(f"基准备份校验失败: {base_path.name}")
+
+    page_size = manifest["page_size"]
+    if deltas:
+        with open(target_path, "r+b") as target:
+            for delta_path in deltas:
+                delta_manifest = load_manifest(delta_path)
+                if not delta_manifest:
+                    raise ValueError(f"增量备份缺少清单: {delta_path.name}")
+                if _apply_delta(delta_path, target, page_size) != delta_manifest["file_sha256"]:
+                    raise ValueError(f"增量备份校验失败: {delta_path.name}")
+            target.truncate(manifest["page_count"] * page_size)
+
+        database_hash = hashlib.sha256()
+        with open(target_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                database_hash.update(chunk)
+    if database_hash.hexdigest() != manifest["database_sha256"]:
+        raise ValueError(f"重组后的数据库校验失败: {chain[-1].name}")
+
+    logger.info(f"备份 {chain[-1].name} 已重组到 {target_path}（应用 {len(deltas)} 个增量文件）")
+    return {"applied_deltas": len(deltas), "page_count": manifest["page_count"]}
@@ -20,6 +20,8 @@ sys.path.insert(0, str(project_root))
 
 # 使用全局日志配置
 from core.logging_config import get_logger
+from backup.backup_verification import run_integrity_checks
+from backup.incremental_backup import is_plain_database, load_manifest, materialize_backup
 
 # 使用专门的恢复处理器日志记录器，确保日志写入restore_processor.log
 logger = get_logger("backup.restore_processor")
@@ -40,6 +42,8 @@ class FixedManualRecovery:
         self.temp_dir = Path("temp_recovery")
         self.main_db_path = Path("data/warehouse.db")
         self.backup_db_path = self.temp_dir / "warehouse_backup.db"
+        # 增量备份或压缩的备份重组（解压）后的完整数据库
+        self.restore_source_path = self.temp_dir / "warehouse_restore_source.db"
     
     def update_status(self, status: str, error_message: Optional[str] = None):
         """更新恢复状态"""
@@ -184,8 +188,16 @@ class FixedManualRecovery:
             # 确保目标目录存在
             self.main_db_path.parent.mkdir(parents=True, exist_ok=True)
             
+            # 增量备份和压缩的备份先重组（解压）为完整数据库
+            source_path = self.backup_file_path
+            if not is_plain_database(source_path):
+                logger.info("正在重组（解压）备份文件...")
+                self.temp_dir.mkdir(exist_ok=True)
+                materialize_backup(self.backup_file_path, self.restore_source_path)
+                source_path = self.restore_source_path
+            
             # 使用SQLite的backup API进行恢复，避免数据库损坏
-            backup_conn = sqlite3.connect(str(self.backup_file_path))
+            backup_conn = sqlite3.connect(str(source_path))
             target_conn = sqlite3.connect(str(self.main_db_path))
             
             try:
@@ -204,6 +216,15 @@ class FixedManualRecovery:
             logger.error(f"数据库恢复失败: {str(e)}")
             return False
     
+    def check_against_manifest(self, conn) -> bool:
+        """对恢复后的数据库执行 quick_check，备份清单记录了各表行数时核对行数"""
+        manifest = load_manifest(self.backup_file_path)
+        expected_row_counts = manifest.get("table_row_counts") if manifest else None
+        errors, _ = run_integrity_checks(conn, expected_row_counts=expected_row_counts)
+        for error in errors:
+            logger.error(f"恢复后的数据库校验失败: {error}")
+        return not errors
+    
     def validate_database_integrity(self):
         """验证数据库完整性"""
         logger.info("正在验证数据库完整性...")
@@ -225,6 +246,11 @@ class FixedManualRecovery:
             if not tables:
                 logger.warning("数据库中没有表")
             
+            # quick_check 并与备份清单中的各表行数核对，代替耗时的完整 integrity_check
+            if not self.check_against_manifest(conn):
+                conn.close()
+                return False
+            
             conn.close()
             logger.info("数据库完整性验证通过")
             return True
@@ -287,6 +313,10 @@ class FixedManualRecovery:
                 self.backup_db_path.unlink()
                 logger.info("临时备份文件已删除")
             
+            if self.restore_source_path.exists():
+                self.restore_source_path.unlink()
+                logger.info("重组的备份数据库文件已删除")
+            
             # 清理state_backup目录中的状态备份文件
             state_backup_dir = Path("backups/state_backup")
             if state_backup_dir.exists():
@@ -82,7 +82,7 @@ class ScheduledBackupManager:
         
         # 获取最新的备份
         latest_backup = backups[0]  # 已按时间倒序排序
-        last_time = latest_backup["timestamp"]
+        last_time = datetime.fromisoformat(latest_backup["timestamp"])
         days_since = (datetime.now() - last_time).days
         
         logger.info(
@@ -241,8 +241,7 @@ class ScheduledBackupManager:
             if len(backups) > self.user_full_retention_count:
                 for backup in backups[self.user_full_retention_count:]:
                     try:
-                        backup_path = Path(backup["path"])
-                        backup_path.unlink()
+                        self.backup_manager.delete_backup_by_filename(backup["filename"])
                         deleted_count += 1
                         logger.info(f"删除过期用户全量备份: {backup['filename']}")
                     except Exception as e:
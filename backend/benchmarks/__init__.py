@@ -0,0 +1,6 @@
+"""
+性能基准脚本（不由pytest收集，按需手动运行）
+
+在backend目录下运行：
+    python -m benchmarks.<脚本名> [--help]
+"""
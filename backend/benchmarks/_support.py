@@ -0,0 +1,72 @@
+"""
+基准测试公共工具：临时数据库、计时和结果输出
+
+基准脚本在backend目录下以模块方式运行，例如：
+    python -m benchmarks.bench_inventory_valuation
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from database.main_database import create_missing_tables, get_database_url, get_engine, set_database_url
+
+
+@contextmanager
+def temporary_database() -> Iterator:
+    """临时目录中的独立SQLite数据库（已创建全部业务表），引擎配置与正式环境相同"""
+    original_url = get_database_url()
+    with tempfile.TemporaryDirectory(prefix="warehouse-bench-") as directory:
+        set_database_url(f"sqlite:///{os.path.join(directory, 'warehouse.db')}")
+        create_missing_tables()
+        engine = get_engine()
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+            set_database_url(original_url)
+
+
+class Timings:
+    """按标签记录耗时并输出对齐的结果表"""
+
+    def __init__(self):
+        self.rows: List[Tuple[str, Optional[float], str]] = []
+
+    @contextmanager
+    def measure(self, label: str, note: str = ""):
+        started = time.perf_counter()
+        yield
+        self.rows.append((label, time.perf_counter() - started, note))
+
+    def add(self, label: str, seconds: Optional[float], note: str = ""):
+        """记录一行结果，seconds为None时只输出说明"""
+        self.rows.append((label, seconds, note))
+
+    def report(self, title: str):
+        print(f"\n{title}")
+        width = max((len(label) for label, _, _ in self.rows), default=0)
+        for label, seconds, note in self.rows:
+            if seconds is None:
+                elapsed = " " * 12
+            elif seconds < 1:
+                elapsed = f"{seconds * 1000:9.1f} ms"
+            else:
+                elapsed = f"{seconds:9.2f} s "
+            print(f"  {label.ljust(width)}  {elapsed}  {note}")
+
+
+def format_bytes(size: float) -> str:
+    """字节数的可读形式"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
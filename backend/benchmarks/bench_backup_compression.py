@@ -0,0 +1,76 @@
+"""
+备份压缩基准：各压缩方式、压缩级别下备份文件的大小、压缩耗时和解压耗时（DEFAULT_COMPRESSION_LEVELS 的依据）
+
+数据库与增量备份基准相同（类似出入库流水的表，以数字和重复文本为主），
+按备份的方式把数据库文件流式写入 BackupFileWriter，再用 BackupFileReader 读完。
+
+运行（backend目录下）：
+    python -m benchmarks.bench_backup_compression [--rows 1000000] [--seed 47]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._support import Timings, format_bytes
+from benchmarks.bench_incremental_backup import build_database
+
+from backup.compression import (
+    COMPRESSION_SUFFIXES, DEFAULT_COMPRESSION_LEVELS, BackupFileReader, BackupFileWriter, available_compressions
+)
+
+# 各压缩方式比较的级别
+LEVELS = {
+    "none": (None,),
+    "gzip": (1, 3, 6, 9),
+    "lzma": (0, 1, 3, 6),
+    "zstd": (1, 3, 9, 19)
+}
+CHUNK_SIZE = 1024 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="备份压缩基准")
+    parser.add_argument("--rows", type=int, default=1000000, help="数据库行数")
+    parser.add_argument("--seed", type=int, default=47, help="随机种子")
+    args = parser.parse_args()
+
+    timings = Timings()
+    with tempfile.TemporaryDirectory(prefix="warehouse-bench-") as directory:
+        directory = Path(directory)
+        db_path = directory / "warehouse.db"
+        connection = build_database(db_path, args.rows, random.Random(args.seed))
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.close()
+        database_size = db_path.stat().st_size
+
+        for compression in available_compressions():
+            for level in LEVELS[compression]:
+                label = compression if level is None else f"{compression} {level}"
+                if level is not None and level == DEFAULT_COMPRESSION_LEVELS[compression]:
+                    label += "（默认）"
+                backup_path = directory / f"backup.db{COMPRESSION_SUFFIXES[compression]}"
+
+                started = time.perf_counter()
+                with open(db_path, "rb") as source, BackupFileWriter(backup_path, compression, level) as writer:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                        writer.write(chunk)
+                compress_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                with BackupFileReader(backup_path) as reader:
+                    reader.drain()
+                decompress_seconds = time.perf_counter() - started
+
+                timings.add(f"{label} 压缩", compress_seconds,
+                            f"{format_bytes(writer.file_size)}，{writer.file_size / database_size:.1%}")
+                timings.add(f"{label} 解压", decompress_seconds)
+                backup_path.unlink()
+
+    timings.report(f"备份压缩：{args.rows} 行，数据库 {format_bytes(database_size)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+导入文件格式基准：同一批供应商数据分别保存为xlsx、CSV（UTF-8 BOM、GBK）和TSV，
+比较读取（read_import_file）和读取加验证的耗时，并检查各格式读出的实体数据相同
+
+运行（backend目录下）：
+    python -m benchmarks.bench_import_file_formats [--rows 50000]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import sys
+import time
+
+from benchmarks._support import Timings, format_bytes, temporary_database
+
+from openpyxl import Workbook
+from sqlmodel import Session
+
+from config.import_config import get_supplier_import_config
+from utils.import_utils import read_import_file, validate_entity_data
+
+
+def build_files(row_count: int, config):
+    """生成各格式的文件内容：[(名称, 扩展名, 内容), ...]"""
+    header = [field.label for field in config.template_fields]
+    rows = [
+        [f"供应商{index}", "北京", f"朝阳区某街道{index % 500}号", f"张{index % 100}", "13800138000", index % 5 + 1]
+        for index in range(row_count)
+    ]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    xlsx = io.BytesIO()
+    workbook.save(xlsx)
+
+    files = [("xlsx", ".xlsx", xlsx.getvalue())]
+    for name, extension, delimiter, encoding in (("CSV UTF-8 BOM", ".csv", ",", "utf-8-sig"),
+                                                  ("CSV GBK", ".csv", ",", "gbk"),
+                                                  ("TSV UTF-8", ".tsv", "\t", "utf-8")):
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter=delimiter)
+        writer.writerow(header)
+        writer.writerows(rows)
+        files.append((name, extension, text.getvalue().encode(encoding)))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入文件格式基准")
+    parser.add_argument("--rows", type=int, default=50000, help="数据行数")
+    args = parser.parse_args()
+
+    config = get_supplier_import_config()
+    timings = Timings()
+    started = time.perf_counter()
+    files = build_files(args.rows, config)
+    timings.add("生成文件", time.perf_counter() - started)
+
+    reference = None
+    all_match = True
+    with temporary_database() as engine, Session(engine) as db:
+        for name, extension, contents in files:
+            started = time.perf_counter()
+            entities_data, _ = read_import_file(contents, extension, config)
+            read_seconds = time.perf_counter() - started
+            asyncio.run(validate_entity_data([data for _, data in entities_data], config, db,
+                                             row_indexes=[row_index for row_index, _ in entities_data]))
+            total_seconds = time.perf_counter() - started
+
+            if reference is None:
+                reference = entities_data
+            match = entities_data == reference
+            all_match &= match
+            timings.add(f"{name} 读取", read_seconds,
+                        f"{format_bytes(len(contents))}，{len(entities_data)} 行，{'数据一致' if match else '与xlsx读出的数据不一致'}")
+            timings.add(f"{name} 读取+验证", total_seconds)
+
+    timings.report(f"导入文件格式：供应商 {args.rows} 行")
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
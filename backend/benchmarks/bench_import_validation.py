@@ -0,0 +1,121 @@
+"""
+导入验证基准：1万/10万行供应商数据（含各类错误）在预编译验证流水线下的验证耗时
+
+数据库中预置已有供应商，用于检查与现有数据的重复。生成数据时记录每行应当报出的错误字段，
+与 validate_entity_data 返回的错误逐行比对。
+
+运行（backend目录下）：
+    python -m benchmarks.bench_import_validation [--rows 10000 100000] [--existing 2000] [--seed 26]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from benchmarks._support import Timings, temporary_database
+
+from sqlmodel import Session
+
+from config.import_config import get_supplier_import_config
+from models.base.supplier import Supplier
+from utils.import_utils import validate_entity_data
+
+
+def generate_rows(row_count: int, existing_count: int, rng: random.Random):
+    """
+    生成供应商数据行和应当报出的错误
+
+    Returns:
+        (数据行列表, Counter((行号, 字段) -> 错误数))
+    """
+    rows = []
+    expected = Counter()
+    # 每个重复值只出现两次，避免多行重复时错误数不好预计
+    used_names = set()
+    existing_names = iter(rng.sample(range(existing_count), existing_count))
+    for index in range(row_count):
+        row_index = index + 2
+        row = {
+            "supplier_name": f"导入供应商{index}",
+            "supplier_city": "北京",
+            "supplier_address": "朝阳区某街道",
+            "supplier_manager": f"联系人{index % 100}",
+            "supplier_contact": "13800138000",
+            "supplier_level": rng.choice((None, 1, 2, 3, 4, 5)),
+        }
+        kind = rng.random()
+        if kind < 0.03:
+            row["supplier_name"] = ""
+            expected[(row_index, "supplier_name")] += 1
+        elif kind < 0.04 and rows and rows[-1]["supplier_name"].startswith("导入供应商") \
+                and rows[-1]["supplier_name"] not in used_names:
+            # 与上一行重复：两行都报输入数据中重复
+            row["supplier_name"] = rows[-1]["supplier_name"]
+            used_names.add(row["supplier_name"])
+            expected[(row_index, "supplier_name")] += 1
+            expected[(row_index - 1, "supplier_name")] += 1
+        elif kind < 0.06:
+            existing_index = next(existing_names, None)
+            if existing_index is not None:
+                row["supplier_name"] = f"已有供应商{existing_index}"
+                expected[(row_index, "supplier_name")] += 1
+        elif kind < 0.065:
+            row["supplier_name"] = f"{index}" + "长" * 120
+            expected[(row_index, "supplier_name")] += 1
+
+        kind = rng.random()
+        if kind < 0.01:
+            row["supplier_city"] = "城" * 60
+            expected[(row_index, "supplier_city")] += 1
+        kind = rng.random()
+        if kind < 0.02:
+            row["supplier_level"] = 7
+            expected[(row_index, "supplier_level")] += 1
+        elif kind < 0.03:
+            row["supplier_level"] = "一级"
+            expected[(row_index, "supplier_level")] += 1
+        rows.append(row)
+    return rows, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入验证基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="导入行数（可多个）")
+    parser.add_argument("--existing", type=int, default=2000, help="数据库中已有的供应商数")
+    parser.add_argument("--seed", type=int, default=26, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    config = get_supplier_import_config()
+    timings = Timings()
+    all_match = True
+    with temporary_database() as engine:
+        with Session(engine) as db:
+            db.execute(Supplier.__table__.insert(), [
+                {"supplier_name": f"已有供应商{index}", "creator": "bench", "is_delete": False}
+                for index in range(args.existing)
+            ])
+            db.commit()
+
+            for row_count in args.rows:
+                rows, expected = generate_rows(row_count, args.existing, rng)
+                started = time.perf_counter()
+                errors = asyncio.run(validate_entity_data(rows, config, db))
+                elapsed = time.perf_counter() - started
+
+                actual = Counter((error.row_index, error.field) for error in errors)
+                match = actual == expected
+                all_match &= match
+                timings.add(f"{row_count} 行 验证", elapsed,
+                            f"{row_count / elapsed:,.0f} 行/秒，{len(errors)} 个错误，"
+                            f"{'与预期一致' if match else f'与预期不一致（{len(actual - expected)} 多报，{len(expected - actual)} 漏报）'}")
+
+    timings.report(f"导入验证：供应商，数据库已有 {args.existing} 条")
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+增量备份基准：同一数据库状态下增量备份与全量备份的耗时和写入字节数，以及重组备份链的耗时
+
+数据库为一张类似出入库流水的表，依次做几种典型的日常修改，每次修改后分别做增量备份（以上一次备份为父备份）
+和全量备份，写入字节数包括备份文件、页摘要文件和清单文件。
+
+运行（backend目录下）：
+    python -m benchmarks.bench_incremental_backup [--rows 1000000] [--compression gzip] [--seed 46]
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._support import Timings, format_bytes
+
+from backup.compression import COMPRESSION_SUFFIXES, available_compressions
+from backup.incremental_backup import (
+    DELTA_SUFFIX, FULL_SUFFIX, create_full_backup, create_incremental_backup, manifest_path,
+    materialize_backup, page_index_path
+)
+
+CREATORS = ("admin", "zhang", "li", "wang")
+REMARKS = (None, "入库", "出库", "移库", "盘点调整")
+
+
+def build_database(path: Path, row_count: int, rng: random.Random) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE inventory_transactions (transaction_id INTEGER PRIMARY KEY, material_id INTEGER, "
+        "batch_number TEXT, bin_name TEXT, quantity_change INTEGER, creator TEXT, transaction_time TEXT, remark TEXT)"
+    )
+    connection.execute("CREATE INDEX ix_material_time ON inventory_transactions (material_id, transaction_time)")
+    insert_rows(connection, row_count, rng)
+    return connection
+
+
+def insert_rows(connection: sqlite3.Connection, row_count: int, rng: random.Random):
+    connection.execute("BEGIN")
+    connection.executemany(
+        "INSERT INTO inventory_transactions (material_id, batch_number, bin_name, quantity_change, creator, "
+        "transaction_time, remark) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randint(1, 50000), f"B2025{rng.randint(1, 99999):05d}",
+          f"A-{rng.randint(1, 40):02d}-{rng.randint(1, 20):02d}", rng.randint(-50, 50), rng.choice(CREATORS),
+          f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00", rng.choice(REMARKS))
+         for _ in range(row_count))
+    )
+    connection.execute("COMMIT")
+
+
+def update_rows(connection: sqlite3.Connection, row_count: int, total_rows: int, rng: random.Random):
+    connection.execute("BEGIN")
+    connection.executemany(
+        "UPDATE inventory_transactions SET quantity_change = quantity_change + 1 WHERE transaction_id = ?",
+        ((rng.randint(1, total_rows),) for _ in range(row_count))
+    )
+    connection.execute("COMMIT")
+
+
+def written_bytes(backup_path: Path) -> int:
+    """备份文件、页摘要文件和清单文件的大小"""
+    return sum(path.stat().st_size for path in (backup_path, page_index_path(backup_path), manifest_path(backup_path)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量备份基准")
+    parser.add_argument("--rows", type=int, default=1000000, help="初始行数")
+    parser.add_argument("--compression", default="gzip", choices=available_compressions(), help="压缩方式")
+    parser.add_argument("--seed", type=int, default=46, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    suffix = COMPRESSION_SUFFIXES[args.compression]
+    timings = Timings()
+    with tempfile.TemporaryDirectory(prefix="warehouse-bench-") as directory:
+        directory = Path(directory)
+        db_path = directory / "warehouse.db"
+        with timings.measure("生成数据库"):
+            connection = build_database(db_path, args.rows, rng)
+        total_rows = args.rows
+
+        parent = directory / f"base{FULL_SUFFIX}{suffix}"
+        with timings.measure("全量基准备份"):
+            manifest = create_full_backup(db_path, parent, "daily", args.compression)
+        timings.add("全量基准备份 写入", None, f"{format_bytes(written_bytes(parent))}，"
+                                        f"数据库 {format_bytes(manifest['database_size'])}")
+
+        changes = (
+            ("修改0.2%的行", lambda: update_rows(connection, total_rows // 500, total_rows, rng), 0),
+            ("追加0.5%的行", lambda: insert_rows(connection, total_rows // 200, rng), total_rows // 200),
+            ("修改2%的行", lambda: update_rows(connection, total_rows // 50, total_rows, rng), 0),
+        )
+        for index, (label, apply_change, added_rows) in enumerate(changes, 1):
+            apply_change()
+            total_rows += added_rows
+
+            delta = directory / f"delta{index}{DELTA_SUFFIX}{suffix}"
+            started = time.perf_counter()
+            manifest = create_incremental_backup(db_path, parent, delta, "daily", args.compression)
+            incremental_seconds = time.perf_counter() - started
+            full = directory / f"full{index}{FULL_SUFFIX}{suffix}"
+            started = time.perf_counter()
+            create_full_backup(db_path, full, "daily", args.compression)
+            full_seconds = time.perf_counter() - started
+
+            timings.add(f"{label} 增量备份", incremental_seconds,
+                        f"{format_bytes(written_bytes(delta))}，{manifest['changed_pages']}/{manifest['page_count']} 页")
+            timings.add(f"{label} 全量备份", full_seconds, format_bytes(written_bytes(full)))
+            timings.add(f"{label} 增量/全量", None,
+                        f"耗时 {incremental_seconds / full_seconds:.0%}，"
+                        f"写入 {written_bytes(delta) / written_bytes(full):.1%}")
+            full.unlink()
+            parent = delta
+
+        target = directory / "restored.db"
+        with timings.measure("重组备份链", f"基准 + {len(changes)} 个增量"):
+            materialize_backup(parent, target)
+        connection.close()
+
+    timings.report(f"增量备份：{args.rows} 行，压缩方式 {args.compression}")
+
+
+if __name__ == "__main__":
+    main()
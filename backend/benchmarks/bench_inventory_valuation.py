@@ -0,0 +1,159 @@
+"""
+库存计价基准：5万器材、10万批次、50万条流水（含移库）下计价的冷启动和缓存耗时，
+并与逐条计算的参考实现（tests/test_inventory_valuation_utils.py）逐分组比对
+
+运行（backend目录下）：
+    python -m benchmarks.bench_inventory_valuation [--materials 50000] [--seed 5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from benchmarks._support import Timings, temporary_database
+
+from sqlmodel import Session
+
+from models.base.bin import Bin
+from models.base.warehouse import Warehouse
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction, ReferenceType
+from models.material.material import Material
+from tests.test_inventory_valuation_utils import as_result_map, reference_valuation
+from utils.inventory_valuation_utils import clear_valuation_cache, compute_inventory_valuation
+
+# 货位ID -> 仓库ID
+WAREHOUSE_OF = {1: 1, 2: 1, 3: 1, 4: 2, 5: 2}
+START_TIME = datetime(2023, 1, 1)
+# 每多少条流水插入一次移库
+TRANSFER_EVERY = 50
+
+
+def generate(material_count: int, seed: int):
+    """生成批次单价和流水：每个批次有固定的入库货位，出库不超过该货位的结存，部分批次跨仓库移库"""
+    rng = random.Random(seed)
+    batch_count = material_count * 2
+    transaction_count = material_count * 10
+    prices = {batch_id: round(rng.uniform(1, 100), 2) for batch_id in range(1, batch_count + 1)}
+    home_bin = {batch_id: rng.randint(1, 5) for batch_id in range(1, batch_count + 1)}
+    # 参与移库的批次流水都记录货位；其余批次约3成流水不记录货位，按批次结存最多的货位（即入库货位）归属
+    transferable = {batch_id for batch_id in prices if batch_id % 10 == 0}
+
+    balances = defaultdict(int)
+    transactions = []
+    times = sorted(START_TIME + timedelta(seconds=rng.randint(0, 3 * 365 * 86400)) for _ in range(transaction_count))
+    for index, moment in enumerate(times):
+        batch_id = rng.randint(1, batch_count)
+        material_id = (batch_id - 1) % material_count + 1
+        bin_id = home_bin[batch_id]
+        balance = balances[(batch_id, bin_id)]
+        quantity = rng.randint(1, 20) if balance <= 0 or rng.random() < 0.55 else -rng.randint(1, balance)
+        balances[(batch_id, bin_id)] += quantity
+        recorded_bin = bin_id if batch_id in transferable or rng.random() < 0.7 else None
+        transactions.append((len(transactions) + 1, moment, material_id, batch_id, recorded_bin, quantity,
+                             ReferenceType.INBOUND if quantity > 0 else ReferenceType.OUTBOUND, index + 1))
+
+        if index % TRANSFER_EVERY == 0:
+            batch_id = rng.choice(tuple(transferable))
+            source = home_bin[batch_id]
+            if balances[(batch_id, source)] > 1:
+                target = rng.choice([candidate for candidate in WAREHOUSE_OF if candidate != source])
+                moved = rng.randint(1, balances[(batch_id, source)] // 2)
+                material_id = (batch_id - 1) % material_count + 1
+                for bin_id, change in ((source, -moved), (target, moved)):
+                    balances[(batch_id, bin_id)] += change
+                    transactions.append((len(transactions) + 1, moment, material_id, batch_id, bin_id, change,
+                                         ReferenceType.TRANSFER, index + 1))
+    return prices, home_bin, transactions, balances
+
+
+def seed_database(engine, material_count: int, prices, transactions, balances):
+    with Session(engine) as db:
+        db.execute(Warehouse.__table__.insert(), [
+            {"id": warehouse_id, "warehouse_name": f"{warehouse_id}号仓库", "creator": "bench"} for warehouse_id in (1, 2)
+        ])
+        db.execute(Bin.__table__.insert(), [
+            {"id": bin_id, "bin_name": f"货位{bin_id}", "warehouse_id": warehouse_id,
+             "warehouse_name": f"{warehouse_id}号仓库", "creator": "bench"}
+            for bin_id, warehouse_id in WAREHOUSE_OF.items()
+        ])
+        db.execute(Material.__table__.insert(), [
+            {"id": material_id, "material_code": f"M{material_id:06d}", "material_name": f"器材{material_id}"}
+            for material_id in range(1, material_count + 1)
+        ])
+        db.execute(InventoryBatch.__table__.insert(), [
+            {"batch_id": batch_id, "batch_number": f"B{batch_id:07d}", "material_id": (batch_id - 1) % material_count + 1,
+             "unit_price": price}
+            for batch_id, price in prices.items()
+        ])
+        db.execute(InventoryTransaction.__table__.insert(), [
+            {"transaction_id": transaction_id, "transaction_time": moment, "material_id": material_id,
+             "batch_id": batch_id, "bin_id": bin_id, "quantity_change": quantity,
+             "change_type": ChangeType.ADJUST if reference_type == ReferenceType.TRANSFER
+             else (ChangeType.IN if quantity > 0 else ChangeType.OUT),
+             "quantity_before": 0, "quantity_after": 0, "reference_type": reference_type,
+             "reference_id": reference_id, "creator": "bench"}
+            for transaction_id, moment, material_id, batch_id, bin_id, quantity, reference_type, reference_id in transactions
+        ])
+        db.execute(InventoryDetail.__table__.insert(), [
+            {"batch_id": batch_id, "material_id": (batch_id - 1) % material_count + 1, "bin_id": bin_id,
+             "quantity": quantity, "last_updated": date.today()}
+            for (batch_id, bin_id), quantity in balances.items() if quantity
+        ])
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="库存计价基准")
+    parser.add_argument("--materials", type=int, default=50000, help="器材数量（批次为2倍，流水为10倍）")
+    parser.add_argument("--seed", type=int, default=5, help="随机种子")
+    args = parser.parse_args()
+
+    timings = Timings()
+    started = time.perf_counter()
+    prices, home_bin, transactions, balances = generate(args.materials, args.seed)
+    # 参考实现中未记录货位的流水归属到批次的入库货位（批次已没有库存明细时无法确定仓库）
+    resolved = [
+        row[:4] + (row[4] or (home_bin[row[3]] if balances[(row[3], home_bin[row[3]])] else None),) + row[5:]
+        for row in transactions
+    ]
+    timings.add("生成数据", time.perf_counter() - started, f"{len(transactions)} 条流水")
+
+    all_match = True
+    with temporary_database() as engine:
+        with timings.measure("写入数据库"):
+            seed_database(engine, args.materials, prices, transactions, balances)
+
+        with Session(engine) as db:
+            for as_of in (datetime(2024, 6, 30, 23, 59, 59), None):
+                for group_by in ("material", "warehouse"):
+                    label = f"{as_of.date() if as_of else '当前'} 按{'器材' if group_by == 'material' else '器材+仓库'}"
+                    clear_valuation_cache()
+                    with timings.measure(f"{label} 冷启动"):
+                        rows = compute_inventory_valuation(db, as_of, group_by)
+                    with timings.measure(f"{label} 命中缓存"):
+                        compute_inventory_valuation(db, as_of, group_by)
+
+                    selected = [row for row in resolved if as_of is None or row[1] <= as_of]
+                    expected = reference_valuation(selected, prices, WAREHOUSE_OF if group_by == "warehouse" else None)
+                    actual = as_result_map(rows)
+                    mismatched = [
+                        key for key in expected.keys() | actual.keys()
+                        if key not in expected or key not in actual
+                        or expected[key][0] != actual[key][0]
+                        or any(abs(expected[key][i] - actual[key][i]) > 0.02 for i in (1, 2, 3))
+                    ]
+                    all_match &= not mismatched
+                    timings.add(f"{label} 参考比对", None,
+                                f"{len(actual)} 个分组，{'一致' if not mismatched else f'{len(mismatched)} 个分组不一致，如 {mismatched[:3]}'}")
+
+    timings.report(f"库存计价：{args.materials} 器材 / {len(prices)} 批次 / {len(transactions)} 条流水")
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+出入库单统计基准：一年的模拟单据（默认出入库各2万单、每单3条明细）下统计接口的耗时和SQL语句数，
+并与按生成数据逐单计算的结果比对
+
+运行（backend目录下）：
+    python -m benchmarks.bench_order_statistics [--orders 20000] [--items 3] [--seed 31]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from benchmarks._support import Timings, temporary_database
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from models.base.customer import Customer
+from models.base.supplier import Supplier
+from models.material.inbound_order import InboundOrder
+from models.material.inbound_order_item import InboundOrderItem
+from models.material.inventory_batch import InventoryBatch
+from models.material.material import Material
+from models.material.outbound_order import OutboundOrder
+from models.material.outbound_order_item import OutboundOrderItem
+from routes.material.inbound_order_routes import get_inbound_order_statistics
+from routes.material.outbound_order_routes import get_outbound_order_statistics
+
+PARTNER_COUNT = 20
+MATERIAL_COUNT = 200
+YEAR_START = datetime(2025, 1, 1)
+
+
+def generate_orders(order_count: int, item_count: int, partner_key: str, unit_prices, rng: random.Random):
+    """生成一年内的单据和明细，返回 (单据行, 明细行, 参考统计)"""
+    orders, items = [], []
+    expected = {"by_partner": defaultdict(lambda: [0, 0, 0.0]), "by_date": defaultdict(lambda: [0, 0, 0.0])}
+    for order_id in range(1, order_count + 1):
+        create_time = YEAR_START + timedelta(minutes=rng.randrange(365 * 1440))
+        partner_index = rng.randrange(PARTNER_COUNT)
+        total_quantity, amount = 0, 0.0
+        for _ in range(item_count):
+            quantity, unit_price = rng.randint(1, 20), rng.choice(unit_prices)
+            total_quantity += quantity
+            amount += quantity * unit_price
+            items.append({
+                "order_id": order_id, "material_id": rng.randint(1, MATERIAL_COUNT), "material_code": "M",
+                "material_name": "器材", "material_specification": "", "quantity": quantity,
+                "unit_price": unit_price, "unit": "个", "batch_id": 1
+            })
+        orders.append({
+            "order_id": order_id, "order_number": f"{partner_key[0].upper()}{order_id:08d}",
+            "total_quantity": total_quantity, f"{partner_key}_id": partner_index + 1,
+            f"{partner_key}_name": f"{partner_key}{partner_index:02d}", "creator": "bench",
+            "create_time": create_time, "update_time": create_time
+        })
+        for key, group in ((f"{partner_key}{partner_index:02d}", "by_partner"),
+                           (create_time.date().isoformat(), "by_date")):
+            stats = expected[group][key]
+            stats[0] += 1
+            stats[1] += total_quantity
+            stats[2] += amount
+    return orders, items, expected
+
+
+def matches(actual_rows, expected_stats) -> bool:
+    """比较 (分组键, 单数, 数量, 金额) 列表与参考统计"""
+    return len(actual_rows) == len(expected_stats) and all(
+        key in expected_stats and expected_stats[key][:2] == [count, quantity]
+        and abs(expected_stats[key][2] - amount) < 0.01
+        for key, count, quantity, amount in actual_rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出入库单统计基准")
+    parser.add_argument("--orders", type=int, default=20000, help="出库单、入库单各自的数量")
+    parser.add_argument("--items", type=int, default=3, help="每单明细数")
+    parser.add_argument("--seed", type=int, default=31, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    outbound_orders, outbound_items, outbound_expected = generate_orders(
+        args.orders, args.items, "customer", (1.5, 2.25, 10.0), rng)
+    inbound_orders, inbound_items, inbound_expected = generate_orders(
+        args.orders, args.items, "supplier", (1.0, 2.0, 8.5), rng)
+
+    timings = Timings()
+    all_match = True
+    with temporary_database() as engine:
+        with Session(engine) as db:
+            db.execute(Customer.__table__.insert(), [
+                {"id": index + 1, "customer_name": f"customer{index:02d}", "creator": "bench"} for index in range(PARTNER_COUNT)
+            ])
+            db.execute(Supplier.__table__.insert(), [
+                {"id": index + 1, "supplier_name": f"supplier{index:02d}", "creator": "bench"} for index in range(PARTNER_COUNT)
+            ])
+            db.execute(Material.__table__.insert(), [
+                {"id": index, "material_code": f"M{index:04d}", "material_name": f"器材{index}"}
+                for index in range(1, MATERIAL_COUNT + 1)
+            ])
+            db.execute(InventoryBatch.__table__.insert(), [
+                {"batch_id": 1, "batch_number": "B1", "material_id": 1, "unit_price": 1.0}
+            ])
+            with timings.measure("写入数据", f"出入库各 {args.orders} 单 × {args.items} 条明细"):
+                db.execute(OutboundOrder.__table__.insert(), outbound_orders)
+                db.execute(OutboundOrderItem.__table__.insert(), outbound_items)
+                db.execute(InboundOrder.__table__.insert(), inbound_orders)
+                db.execute(InboundOrderItem.__table__.insert(), inbound_items)
+                db.commit()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        for label, endpoint, expected, partner_field in (
+            ("出库统计", get_outbound_order_statistics, outbound_expected, "customer_stats"),
+            ("入库统计", get_inbound_order_statistics, inbound_expected, "supplier_stats"),
+        ):
+            for range_label, start_date, end_date in (("全年", date(2025, 1, 1), date(2026, 1, 1)),
+                                                      ("不限日期", None, None)):
+                statements.clear()
+                with Session(engine) as db:
+                    with timings.measure(f"{label} {range_label}"):
+                        result = asyncio.run(endpoint(start_date=start_date, end_date=end_date, db=db, current_user=None))
+
+                partner_rows = [tuple(row.values()) for row in getattr(result, partner_field)]
+                date_rows = [tuple(row.values()) for row in result.date_stats]
+                match = (matches(partner_rows, expected["by_partner"]) and matches(date_rows, expected["by_date"])
+                         and result.total_orders == args.orders)
+                all_match &= match
+                timings.add(f"{label} {range_label} 比对", None,
+                            f"{len(statements)} 条SQL，{len(partner_rows)} 个往来单位，{len(date_rows)} 天，"
+                            f"{'与逐单计算一致' if match else '与逐单计算不一致'}")
+
+    timings.report(f"出入库单统计：出入库各 {args.orders} 单，每单 {args.items} 条明细")
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == "__main__":
+    main()
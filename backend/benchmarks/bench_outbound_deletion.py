@@ -0,0 +1,159 @@
+"""
+出库明细删除基准：批量删除出库明细、删除整张出库单时执行的SQL语句数和耗时随明细行数的变化，
+并核对删除后的库存、流水、出库单合计数量和每日出入库汇总
+
+每个规模创建两张出库单：批量删除第一张的一半明细（含一个不存在的明细ID），删除整张第二张。
+
+运行（backend目录下）：
+    python -m benchmarks.bench_outbound_deletion [--lines 50 500 2000] [--batches 200] [--seed 42]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from benchmarks._support import Timings, temporary_database
+
+from sqlalchemy import event
+from sqlmodel import Session, func, select
+
+from models.base.bin import Bin
+from models.base.customer import Customer
+from models.material.daily_inventory_movement import DailyInventoryMovement
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import InventoryTransaction
+from models.material.material import Material
+from models.material.outbound_order import OutboundOrder
+from models.material.outbound_order_item import OutboundOrderItem
+from routes.material.outbound_order_routes import (
+    batch_delete_outbound_order_items, create_outbound_order, delete_outbound_order
+)
+from schemas.material.outbound_order import OutboundOrderCreate, OutboundOrderItemBatchDelete
+from utils.inventory_movement_utils import backfill_daily_movement
+
+MATERIAL_COUNT = 50
+INITIAL_QUANTITY = 100000
+USER = SimpleNamespace(username="bench")
+
+
+def seed_stock(engine, batch_count: int):
+    with Session(engine) as db:
+        db.add(Customer(customer_name="客户", creator="bench"))
+        db.add(Bin(bin_name="A-01", warehouse_id=1, warehouse_name="1号仓库", creator="bench"))
+        db.add_all([
+            Material(material_code=f"M{index:03d}", material_name=f"器材{index}", creator="bench",
+                     create_time=datetime.now(), update_time=datetime.now())
+            for index in range(1, MATERIAL_COUNT + 1)
+        ])
+        db.flush()
+        for batch_id in range(1, batch_count + 1):
+            material_id = (batch_id - 1) % MATERIAL_COUNT + 1
+            db.add(InventoryBatch(batch_id=batch_id, batch_number=f"B{batch_id:05d}", material_id=material_id,
+                                  unit_price=1.5, inbound_date=date.today(), creator="bench",
+                                  create_time=datetime.now(), update_time=datetime.now()))
+            db.add(InventoryDetail(batch_id=batch_id, material_id=material_id, bin_id=1,
+                                   quantity=INITIAL_QUANTITY, last_updated=date.today()))
+        db.commit()
+
+
+def create_order(engine, order_number: str, line_count: int, batch_count: int, rng: random.Random) -> int:
+    items = [{"batch_id": rng.randint(1, batch_count), "quantity": rng.randint(1, 5)} for _ in range(line_count)]
+    with Session(engine) as db:
+        order = asyncio.run(create_outbound_order(
+            OutboundOrderCreate(order_number=order_number, customer_id=1, items=items),
+            idempotency_key=None, db=db, current_user=USER
+        ))
+        return order.order_id
+
+
+def movement_rows(db: Session):
+    return sorted(db.exec(select(
+        DailyInventoryMovement.movement_date, DailyInventoryMovement.material_id, DailyInventoryMovement.direction,
+        DailyInventoryMovement.order_count, DailyInventoryMovement.quantity, DailyInventoryMovement.amount
+    )).all())
+
+
+def check_consistency(engine, batch_count: int) -> bool:
+    """
+    库存 + 剩余明细数量 = 初始库存，流水合计 = -剩余明细数量，出库单合计数量 = 其明细数量之和，
+    写入路径维护的每日出入库汇总与全量回填的结果相同
+    """
+    with Session(engine) as db:
+        maintained = movement_rows(db)
+        backfill_daily_movement(db)
+        rebuilt = movement_rows(db)
+        stock = dict(db.exec(select(InventoryDetail.batch_id, InventoryDetail.quantity)).all())
+        issued = dict(db.exec(
+            select(OutboundOrderItem.batch_id, func.sum(OutboundOrderItem.quantity)).group_by(OutboundOrderItem.batch_id)
+        ).all())
+        ledger = dict(db.exec(
+            select(InventoryTransaction.batch_id, func.sum(InventoryTransaction.quantity_change))
+            .group_by(InventoryTransaction.batch_id)
+        ).all())
+        order_totals = db.exec(
+            select(OutboundOrder.total_quantity, func.coalesce(func.sum(OutboundOrderItem.quantity), 0))
+            .select_from(OutboundOrder)
+            .outerjoin(OutboundOrderItem, OutboundOrderItem.order_id == OutboundOrder.order_id)
+            .group_by(OutboundOrder.order_id)
+        ).all()
+    return (
+        all(stock[batch_id] + issued.get(batch_id, 0) == INITIAL_QUANTITY for batch_id in range(1, batch_count + 1))
+        and all(ledger.get(batch_id, 0) == -issued.get(batch_id, 0) for batch_id in range(1, batch_count + 1))
+        and all(total == items_total for total, items_total in order_totals)
+        and maintained == rebuilt
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出库明细删除基准")
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 500, 2000], help="每张出库单的明细行数（可多个）")
+    parser.add_argument("--batches", type=int, default=200, help="批次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings = Timings()
+    all_consistent = True
+    with temporary_database() as engine:
+        seed_stock(engine, args.batches)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *event_args: statements.append(event_args[2]))
+
+        for line_count in args.lines:
+            partial_order = create_order(engine, f"A{line_count}", line_count, args.batches, rng)
+            whole_order = create_order(engine, f"B{line_count}", line_count, args.batches, rng)
+            with Session(engine) as db:
+                item_ids = db.exec(
+                    select(OutboundOrderItem.item_id).where(OutboundOrderItem.order_id == partial_order)
+                ).all()
+            item_ids = rng.sample(item_ids, line_count // 2) + [max(item_ids) + 1000000]
+
+            statements.clear()
+            with Session(engine) as db:
+                with timings.measure(f"{line_count} 行 批量删除一半明细"):
+                    result = asyncio.run(batch_delete_outbound_order_items(
+                        partial_order, OutboundOrderItemBatchDelete(item_ids=item_ids), db=db, current_user=USER
+                    ))
+            timings.add(f"{line_count} 行 批量删除 语句数", None,
+                        f"{len(statements)} 条SQL，删除 {result.deleted_count} 条明细")
+
+            statements.clear()
+            with Session(engine) as db:
+                with timings.measure(f"{line_count} 行 删除整张出库单"):
+                    asyncio.run(delete_outbound_order(whole_order, db=db, current_user=USER))
+            timings.add(f"{line_count} 行 删除出库单 语句数", None, f"{len(statements)} 条SQL")
+
+            consistent = check_consistency(engine, args.batches)
+            all_consistent &= consistent
+            timings.add(f"{line_count} 行 库存、流水和汇总核对", None, "一致" if consistent else "不一致")
+
+    timings.report(f"出库明细删除：{args.batches} 个批次")
+    sys.exit(0 if all_consistent else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, TYPE_CHECKING
 from schemas.common.import_schemas import ImportConfig, TemplateField, ValidationRule, PreviewColumn
 
+if TYPE_CHECKING:
+    from utils.import_validator import CompiledImportConfig
+
 def get_supplier_import_config() -> ImportConfig:
     """获取供应商导入配置"""
     return ImportConfig(
@@ -457,4 +460,11 @@ def get_import_config(entity_type: str) -> Optional[ImportConfig]:
     }
     
     config_func = configs.get(entity_type)
-    return config_func() if config_func else None
\ No newline at end of file
+    return config_func() if config_func else None
+
+def get_compiled_import_config(entity_type: str) -> Optional["CompiledImportConfig"]:
+    """根据实体类型获取预编译的导入配置（验证流水线只编译一次）"""
+    from utils.import_validator import compile_import_config
+
+    config = get_import_config(entity_type)
+    return compile_import_config(config) if config else None
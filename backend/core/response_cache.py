@@ -0,0 +1,168 @@
+"""
+响应缓存 - 主页仪表板等只读接口的共享缓存，按数据版本号失效
+
+数据版本号在出入库、库存相关表提交写入后递增：
+- ORM对象写入通过after_flush记录，批量INSERT/UPDATE/DELETE语句通过do_orm_execute记录
+- text()语句和exec_driver_sql原生SQL无法确定目标表，除查询语句外一律保守地记录为写入
+- 会话提交（或回滚）后才递增版本号并清空缓存，避免并发请求在提交前把旧数据缓存到新版本下
+缓存键包含当天日期，跨天后"今日"类统计自动重新计算。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 写入后需要使缓存失效的业务表
+WATCHED_TABLES = frozenset({
+    "materials",
+    "inbound_orders",
+    "inbound_order_items",
+    "outbound_orders",
+    "outbound_order_items",
+    "inventory_batches",
+    "inventory_details",
+    "inventory_transactions",
+    "daily_inventory_movement",
+})
+
+_SESSION_FLAG = "data_version_changed"
+_CONNECTION_FLAG = "raw_sql_written"
+_SESSION_CONNECTIONS = "cache_connection_infos"
+
+# 不修改数据的原生SQL语句（按首个关键字判断）
+_READ_ONLY_KEYWORDS = frozenset({
+    "SELECT", "PRAGMA", "EXPLAIN",
+    "BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE",
+})
+
+
+def _is_read_only_sql(sql: str) -> bool:
+    """原生SQL是否为查询或事务控制语句"""
+    parts = sql.lstrip(" \t\r\n(").split(None, 1)
+    return bool(parts) and parts[0].upper() in _READ_ONLY_KEYWORDS
+
+
+class ResponseCache:
+    """按数据版本号失效的响应缓存"""
+
+    def __init__(self, max_entries: int = 256):
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._max_entries = max_entries
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def data_version(self) -> int:
+        """当前数据版本号"""
+        return self._version
+
+    def bump_version(self):
+        """递增数据版本号并清空缓存（出入库、库存数据提交后调用）"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get_or_compute(self, namespace: str, params: tuple, compute: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中时计算并缓存
+
+        Args:
+            namespace: 接口标识
+            params: 影响结果的参数
+            compute: 计算函数
+
+        Returns:
+            缓存或新计算的结果
+        """
+        key = (namespace, params, date.today())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            version = self._version
+
+        result = compute()
+
+        with self._lock:
+            # 计算期间数据已变更时不缓存，避免旧结果在新版本下被读取
+            if version == self._version:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+
+# 全局响应缓存实例
+_response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取响应缓存实例"""
+    return _response_cache
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed_changes(session, flush_context):
+    """ORM对象写入涉及监视的表时标记会话"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if getattr(instance, "__tablename__", None) in WATCHED_TABLES:
+            session.info[_SESSION_FLAG] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_changes(orm_execute_state):
+    """批量写入语句涉及监视的表时标记会话，无法确定目标表的非查询语句保守地标记"""
+    if orm_execute_state.is_select:
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    table_name = getattr(table, "name", None)
+    if table_name is not None:
+        if table_name in WATCHED_TABLES:
+            orm_execute_state.session.info[_SESSION_FLAG] = True
+    elif not _is_read_only_sql(str(statement)):
+        # text()等语句
+        orm_execute_state.session.info[_SESSION_FLAG] = True
+
+
+@event.listens_for(Session, "after_begin")
+def _track_connection(session, transaction, connection):
+    """记录会话使用的连接，提交时检查其上通过exec_driver_sql执行的写入"""
+    session.info.setdefault(_SESSION_CONNECTIONS, []).append(connection.info)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _mark_raw_sql_changes(conn, cursor, statement, parameters, context, executemany):
+    """exec_driver_sql执行的非查询语句标记在连接上（未经过会话的do_orm_execute）"""
+    if context is not None and context.compiled is None and not _is_read_only_sql(statement):
+        conn.info[_CONNECTION_FLAG] = True
+
+
+def _pop_session_changes(session) -> bool:
+    """取出并清除会话及其连接上的写入标记"""
+    changed = session.info.pop(_SESSION_FLAG, False)
+    for connection_info in session.info.pop(_SESSION_CONNECTIONS, []):
+        changed = connection_info.pop(_CONNECTION_FLAG, False) or changed
+    return changed
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    if _pop_session_changes(session):
+        _response_cache.bump_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _bump_after_rollback(session):
+    # 数据库为自动提交模式时，部分语句在回滚前已生效，保守地使缓存失效
+    if _pop_session_changes(session):
+        _response_cache.bump_version()
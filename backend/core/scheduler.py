@@ -8,7 +8,7 @@ from typing import Dict, Any
 from sqlmodel import Session
 from .login_record_manager import get_login_record_manager
 from backup.backup_manager import get_backup_manager
-from database import get_db
+from database import get_db, get_session
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +39,26 @@ class Scheduler:
                 self._backup_cleanup_task()
             )
             
+            # 启动备份轮流深度校验任务（每天凌晨4点执行）
+            self._tasks["backup_verify"] = asyncio.create_task(
+                self._backup_verify_task()
+            )
+            
+            # 启动库存快照任务（每天凌晨1点检查，本月没有快照时创建）
+            self._tasks["inventory_snapshot"] = asyncio.create_task(
+                self._inventory_snapshot_task()
+            )
+            
+            # 启动月结任务（每天凌晨0点30分检查，结账已结束但未结账的期间）
+            self._tasks["period_closing"] = asyncio.create_task(
+                self._period_closing_task()
+            )
+            
+            # 启动补货建议刷新任务（每天凌晨1点30分按出库消耗重新计算）
+            self._tasks["reorder_suggestions"] = asyncio.create_task(
+                self._reorder_suggestions_task()
+            )
+            
             logger.info("定时任务已启动")
     
     async def stop(self):
@@ -114,6 +134,147 @@ class Scheduler:
                 # 出错后等待1小时再重试
                 await asyncio.sleep(3600)
     
+    async def _backup_verify_task(self):
+        """备份轮流深度校验任务"""
+        while self._running:
+            try:
+                # 计算下一次执行时间（明天凌晨4点，避开2点的定时备份和3点的备份清理）
+                now = datetime.now()
+                next_run = (now + timedelta(days=1)).replace(hour=4, minute=0, second=0, microsecond=0)
+                wait_seconds = (next_run - now).total_seconds()
+                
+                logger.info(f"备份深度校验任务将在 {wait_seconds:.0f} 秒后执行")
+                
+                # 等待到执行时间
+                await asyncio.sleep(wait_seconds)
+                
+                if not self._running:
+                    break
+                
+                # 在线程中执行，避免阻塞事件循环
+                await asyncio.to_thread(self._verify_backups)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"备份深度校验任务执行失败: {e}")
+                # 出错后等待1小时再重试
+                await asyncio.sleep(3600)
+    
+    def _verify_backups(self):
+        """在时间预算内轮流深度校验备份，每天校验一部分，逐步覆盖所有备份"""
+        results = get_backup_manager().verify_backups_in_rotation()
+        failed = [result["filename"] for result in results if not result["ok"]]
+        logger.info(f"备份深度校验完成: 校验 {len(results)} 个备份，未通过 {len(failed)} 个")
+        if failed:
+            logger.error(f"备份深度校验未通过: {', '.join(failed)}")
+    
+    async def _inventory_snapshot_task(self):
+        """库存快照任务"""
+        while self._running:
+            try:
+                # 计算下一次执行时间（明天凌晨1点）
+                now = datetime.now()
+                next_run = (now + timedelta(days=1)).replace(hour=1, minute=0, second=0, microsecond=0)
+                wait_seconds = (next_run - now).total_seconds()
+                
+                logger.info(f"库存快照任务将在 {wait_seconds:.0f} 秒后执行")
+                
+                # 等待到执行时间
+                await asyncio.sleep(wait_seconds)
+                
+                if not self._running:
+                    break
+                
+                # 在线程中执行，避免阻塞事件循环
+                await asyncio.to_thread(self._create_monthly_inventory_snapshot)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"库存快照任务执行失败: {e}")
+                # 出错后等待1小时再重试
+                await asyncio.sleep(3600)
+    
+    def _create_monthly_inventory_snapshot(self):
+        """本月还没有库存快照时创建"""
+        from utils.inventory_snapshot_utils import ensure_monthly_snapshot
+        
+        with get_session() as db:
+            snapshot = ensure_monthly_snapshot(db)
+            if snapshot:
+                logger.info(f"月度库存快照已创建: 快照ID {snapshot.snapshot_id}，明细 {snapshot.row_count} 行")
+    
+    async def _period_closing_task(self):
+        """月结任务"""
+        while self._running:
+            try:
+                # 计算下一次执行时间（明天凌晨0点30分）
+                now = datetime.now()
+                next_run = (now + timedelta(days=1)).replace(hour=0, minute=30, second=0, microsecond=0)
+                wait_seconds = (next_run - now).total_seconds()
+                
+                logger.info(f"月结任务将在 {wait_seconds:.0f} 秒后执行")
+                
+                # 等待到执行时间
+                await asyncio.sleep(wait_seconds)
+                
+                if not self._running:
+                    break
+                
+                # 在线程中执行，避免阻塞事件循环
+                await asyncio.to_thread(self._close_pending_periods)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"月结任务执行失败: {e}")
+                # 出错后等待1小时再重试
+                await asyncio.sleep(3600)
+    
+    def _close_pending_periods(self):
+        """结账已结束但未结账的会计期间"""
+        from utils.period_balance_utils import close_pending_periods
+        
+        with get_session() as db:
+            periods = close_pending_periods(db)
+            if periods:
+                logger.info(f"月结完成: {', '.join(periods)}")
+    
+    async def _reorder_suggestions_task(self):
+        """补货建议刷新任务"""
+        while self._running:
+            try:
+                # 计算下一次执行时间（明天凌晨1点30分）
+                now = datetime.now()
+                next_run = (now + timedelta(days=1)).replace(hour=1, minute=30, second=0, microsecond=0)
+                wait_seconds = (next_run - now).total_seconds()
+                
+                logger.info(f"补货建议刷新任务将在 {wait_seconds:.0f} 秒后执行")
+                
+                # 等待到执行时间
+                await asyncio.sleep(wait_seconds)
+                
+                if not self._running:
+                    break
+                
+                # 在线程中执行，避免阻塞事件循环
+                await asyncio.to_thread(self._refresh_reorder_suggestions)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"补货建议刷新任务执行失败: {e}")
+                # 出错后等待1小时再重试
+                await asyncio.sleep(3600)
+    
+    def _refresh_reorder_suggestions(self):
+        """按出库消耗速度重新计算补货建议"""
+        from utils.reorder_utils import refresh_reorder_suggestions
+        
+        with get_session() as db:
+            refresh_reorder_suggestions(db)
+    
     async def _cleanup_login_records(self):
         """清理登录记录"""
         try:
@@ -148,6 +309,9 @@ class Scheduler:
             # 获取备份管理器
             backup_manager = get_backup_manager()
             
+            # 先按磁盘上的文件修复备份目录，清理按备份目录进行
+            backup_manager.reconcile_catalog()
+            
             # 清理旧的备份文件
             cleanup_stats = backup_manager.cleanup_old_backups(keep_days=30, keep_monthly=12)
             
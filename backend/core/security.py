@@ -251,6 +251,7 @@ ROUTE_PERMISSIONS: Dict[str, List[Permission]] = {
     "/outbound-orders/items/delete": [Permission.IO_EDIT],
     "/outbound-orders/generate-order-number": [Permission.IO_EDIT],
     "/outbound-orders/customers": [Permission.IO_READ],
+    "/outbound-orders/allocation": [Permission.IO_READ],
     "/outbound-orders/pdf": [Permission.IO_EDIT],
     "/outbound-orders/excel": [Permission.IO_EDIT],
     
@@ -260,14 +261,35 @@ ROUTE_PERMISSIONS: Dict[str, List[Permission]] = {
     "/inventory-details/major-ids": [Permission.STOCK_READ],
     "/inventory-details/equipment-ids": [Permission.STOCK_READ],
     "/inventory-details/export-excel": [Permission.STOCK_READ],
+    
+    # 库存快照与历史库存
+    "/inventory-snapshots": [Permission.STOCK_READ],
+    "/inventory-snapshots/new": [Permission.SYSTEM_EDIT],
+    "/inventory-snapshots/stock-as-of": [Permission.STOCK_READ],
+    "/period-balances/closings": [Permission.STOCK_READ],
+    "/period-balances/close": [Permission.SYSTEM_EDIT],
+    "/inventory-valuation": [Permission.STOCK_READ],
+    "/inventory-aging": [Permission.STOCK_READ],
+    "/inventory-aging/summary": [Permission.STOCK_READ],
+    "/inventory-aging/export-excel": [Permission.STOCK_READ],
+    "/reorder-suggestions": [Permission.STOCK_READ],
+    "/reorder-suggestions/refresh": [Permission.SYSTEM_EDIT],
+    "/stock-transfers": [Permission.IO_EDIT],
+    "/stocktakes": [Permission.STOCK_READ],
+    "/stocktakes/new": [Permission.IO_EDIT],
+    "/stocktakes/counts": [Permission.IO_EDIT],
+    "/stocktakes/post": [Permission.IO_EDIT],
 
     # 器材分类账页
     "/material-ledger/pdf": [Permission.IO_EDIT],
+    "/material-ledger/stock-card": [Permission.STOCK_READ],
     
     # 数据库恢复管理
     "/api/backup/create": [Permission.SYSTEM_EDIT],
     "/api/backup/recover": [Permission.SYSTEM_EDIT],
     "/api/backup/status": [Permission.SYSTEM_READ],
+    "/api/backup/verify": [Permission.SYSTEM_EDIT],
+    "/api/backup/catalog": [Permission.SYSTEM_EDIT],
     "/api/backup/backups": [Permission.SYSTEM_READ],
     "/api/backup/history": [Permission.SYSTEM_READ],
     "/api/backup/cleanup": [Permission.SYSTEM_EDIT],
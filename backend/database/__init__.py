@@ -8,6 +8,7 @@ from .main_database import (
     get_db, 
     get_session, 
     init_db, 
+    create_missing_tables,
     check_database_exists,
     set_database_url,
     get_database_url,
@@ -28,6 +29,7 @@ __all__ = [
     'get_db', 
     'get_session',
     'init_db',
+    'create_missing_tables',
     'check_database_exists',
     'set_database_url',
     'get_database_url',
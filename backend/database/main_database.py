@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy import event
+from sqlalchemy import event, inspect
 import os
 from typing import Generator
 
@@ -112,19 +112,13 @@ def check_database_exists() -> bool:
     print(f"[INFO] 数据库文件存在: {db_path}")
     return True
 
-def init_db():
-    """初始化数据库，创建所有表"""
-    engine = get_engine()
-    print(f"[DEBUG] 开始创建数据库表...")
-    #删除所有表
-    SQLModel.metadata.drop_all(engine)
-    print(f"[DEBUG] 所有数据库表已删除")
-    # 创建业务相关的元数据，排除系统配置表
+def _get_business_metadata():
+    """构建只包含业务表的元数据（排除系统配置表）"""
     from sqlmodel import MetaData
     from models import (
         Permission, Role, User, RolePermissionLink,
         Bin, Customer, Equipment, Major, SubMajor, Supplier, Warehouse,
-        InboundOrder, InboundOrderItem, InventoryBatch, InventoryDetail, InventoryTransaction, Material, OutboundOrder, OutboundOrderItem,
+        DailyInventoryMovement, IdempotencyKey, InboundOrder, InboundOrderItem, InventoryBatch, InventoryDetail, InventorySnapshot, InventorySnapshotItem, InventoryTransaction, Material, NumberSequence, OutboundOrder, OutboundOrderItem, PeriodBalance, PeriodClosing, ReorderSuggestion, Stocktake, StocktakeItem,
         MaterialCodeLevel, SystemInit
     )
     from models.account.user_login_record import UserLoginRecord, UserLoginHistory
@@ -136,16 +130,52 @@ def init_db():
     for model in [
         Permission, Role, User, RolePermissionLink,
         Bin, Customer, Equipment, Major, SubMajor, Supplier, Warehouse,
-        InboundOrder, InboundOrderItem, InventoryBatch, InventoryDetail, InventoryTransaction, Material, OutboundOrder, OutboundOrderItem,
+        DailyInventoryMovement, IdempotencyKey, InboundOrder, InboundOrderItem, InventoryBatch, InventoryDetail, InventorySnapshot, InventorySnapshotItem, InventoryTransaction, Material, NumberSequence, OutboundOrder, OutboundOrderItem, PeriodBalance, PeriodClosing, ReorderSuggestion, Stocktake, StocktakeItem,
         MaterialCodeLevel, SystemInit, UserLoginRecord, UserLoginHistory
     ]:
         if hasattr(model, '__table__'):
             model.__table__.tometadata(business_metadata)
     
+    return business_metadata
+
+def init_db():
+    """初始化数据库，创建所有表"""
+    engine = get_engine()
+    print(f"[DEBUG] 开始创建数据库表...")
+    #删除所有表
+    SQLModel.metadata.drop_all(engine)
+    print(f"[DEBUG] 所有数据库表已删除")
+    
     # 只创建业务表
-    business_metadata.create_all(engine)
+    _get_business_metadata().create_all(engine)
     print(f"[DEBUG] 数据库表创建完成")
 
+def create_missing_tables():
+    """为已初始化的数据库补建新版本增加的业务表、可空字段和索引（不修改已有字段）"""
+    engine = get_engine()
+    business_metadata = _get_business_metadata()
+    business_metadata.create_all(engine, checkfirst=True)
+    # create_all不会为已存在的表补建字段和索引，逐表检查
+    inspector = inspect(engine)
+    with engine.connect() as connection:
+        for table in business_metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable:
+                    print(f"[WARNING] 表 {table.name} 缺少非空字段 {column.name}，需要手动迁移")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                )
+                print(f"[INFO] 已为表 {table.name} 补建字段 {column.name}")
+            connection.commit()
+    for table in business_metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
 def get_db() -> Generator[Session, None, None]:
     """依赖项：获取数据库会话"""
     engine = get_engine()
@@ -39,6 +39,9 @@ async def lifespan(app: FastAPI):
             db_gen = get_db()
             next(db_gen)  # 触发数据库连接测试
             print("✓ 数据库连接正常")
+            # 补建新版本增加的业务表
+            from database import create_missing_tables
+            create_missing_tables()
     except Exception as e:
         print(f"❌ 系统初始化检查失败: {e}")
         import traceback
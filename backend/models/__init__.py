@@ -18,14 +18,21 @@ from .base.major import Major
 from .base.sub_major import SubMajor
 from .base.supplier import Supplier
 from .base.warehouse import Warehouse
+from .material.daily_inventory_movement import DailyInventoryMovement
+from .material.idempotency_key import IdempotencyKey
 from .material.inbound_order import InboundOrder
 from .material.inbound_order_item import InboundOrderItem
 from .material.inventory_batch import InventoryBatch
 from .material.inventory_detail import InventoryDetail
+from .material.inventory_snapshot import InventorySnapshot, InventorySnapshotItem
 from .material.inventory_transaction import InventoryTransaction
 from .material.material import Material
+from .material.number_sequence import NumberSequence
 from .material.outbound_order import OutboundOrder
 from .material.outbound_order_item import OutboundOrderItem
+from .material.period_balance import PeriodBalance, PeriodClosing
+from .material.reorder_suggestion import ReorderSuggestion
+from .material.stocktake import Stocktake, StocktakeItem
 from .system.material_code_level import MaterialCodeLevel
 from .system.system_init import SystemInit
 
@@ -33,6 +40,6 @@ __all__ = [
     "SQLModelBase",
     "Permission", "Role", "User", "RolePermissionLink",
     "Bin", "Customer", "Equipment", "Major", "SubMajor", "Supplier", "Warehouse",
-    "InboundOrder", "InboundOrderItem", "InventoryBatch", "InventoryDetail", "InventoryTransaction", "Material", "OutboundOrder", "OutboundOrderItem",
+    "DailyInventoryMovement", "IdempotencyKey", "InboundOrder", "InboundOrderItem", "InventoryBatch", "InventoryDetail", "InventorySnapshot", "InventorySnapshotItem", "InventoryTransaction", "Material", "NumberSequence", "OutboundOrder", "OutboundOrderItem", "PeriodBalance", "PeriodClosing", "ReorderSuggestion", "Stocktake", "StocktakeItem",
     "MaterialCodeLevel", "SystemInit"
 ]
\ No newline at end of file
@@ -1,21 +1,38 @@
 # Material models package
 
+from .daily_inventory_movement import DailyInventoryMovement
+from .idempotency_key import IdempotencyKey
 from .inbound_order import InboundOrder
 from .inbound_order_item import InboundOrderItem
 from .inventory_batch import InventoryBatch
 from .inventory_detail import InventoryDetail
+from .inventory_snapshot import InventorySnapshot, InventorySnapshotItem
 from .inventory_transaction import InventoryTransaction
 from .material import Material
+from .number_sequence import NumberSequence
 from .outbound_order import OutboundOrder
 from .outbound_order_item import OutboundOrderItem
+from .period_balance import PeriodBalance, PeriodClosing
+from .reorder_suggestion import ReorderSuggestion
+from .stocktake import Stocktake, StocktakeItem
 
 __all__ = [
+    "DailyInventoryMovement",
+    "IdempotencyKey",
     "InboundOrder",
     "InboundOrderItem", 
     "InventoryBatch",
     "InventoryDetail",
+    "InventorySnapshot",
+    "InventorySnapshotItem",
     "InventoryTransaction",
     "Material",
+    "NumberSequence",
     "OutboundOrder",
-    "OutboundOrderItem"
+    "OutboundOrderItem",
+    "PeriodBalance",
+    "PeriodClosing",
+    "ReorderSuggestion",
+    "Stocktake",
+    "StocktakeItem"
 ]
\ No newline at end of file
@@ -0,0 +1,74 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import date, datetime
+from enum import Enum
+
+
+class MovementDirection(str, Enum):
+    """出入库方向枚举"""
+    IN = "IN"      # 入库
+    OUT = "OUT"    # 出库
+
+
+# 当日合计行使用的器材ID（按单据去重统计单数，不对应具体器材）
+ALL_MATERIALS_ID = 0
+
+
+class DailyInventoryMovement(SQLModel, table=True):
+    """每日出入库汇总表"""
+
+    __tablename__ = "daily_inventory_movement"
+
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="主键ID"
+    )
+
+    movement_date: date = Field(
+        nullable=False,
+        description="业务日期（出入库单创建日期）"
+    )
+
+    material_id: int = Field(
+        nullable=False,
+        description="器材ID，0表示当日所有器材合计"
+    )
+
+    direction: MovementDirection = Field(
+        nullable=False,
+        description="方向：IN(入库)、OUT(出库)"
+    )
+
+    order_count: int = Field(
+        default=0,
+        nullable=False,
+        description="单据数量（同一单据多条明细只计一次）"
+    )
+
+    quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="器材数量合计"
+    )
+
+    amount: float = Field(
+        default=0.0,
+        nullable=False,
+        description="金额合计（数量×单价）"
+    )
+
+    update_time: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        description="汇总更新时间"
+    )
+
+    __table_args__ = (
+        # 按器材+方向的日期区间查询（趋势、当日/昨日合计行均走此索引）
+        Index("ux_daily_movement_material_direction_date", "material_id", "direction", "movement_date", unique=True),
+        # 按日期区间查询所有器材（期间统计、排行）
+        Index("ix_daily_movement_date_direction", "movement_date", "direction"),
+        {"comment": "每日出入库汇总表，按日期×器材×方向汇总单数、数量和金额，由出入库写入路径维护"}
+    )
@@ -0,0 +1,68 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class IdempotencyStatus(str, Enum):
+    """幂等请求处理状态枚举"""
+    PROCESSING = "processing"  # 处理中
+    COMPLETED = "completed"    # 已完成
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """幂等键表"""
+
+    __tablename__ = "idempotency_keys"
+
+    idempotency_key: str = Field(
+        primary_key=True,
+        max_length=128,
+        description="客户端提供的幂等键（Idempotency-Key请求头）"
+    )
+
+    endpoint: str = Field(
+        nullable=False,
+        max_length=100,
+        description="接口标识"
+    )
+
+    request_hash: str = Field(
+        nullable=False,
+        max_length=64,
+        description="请求体SHA-256摘要，同一幂等键只能用于相同请求"
+    )
+
+    status: IdempotencyStatus = Field(
+        default=IdempotencyStatus.PROCESSING,
+        nullable=False,
+        description="处理状态：processing(处理中)、completed(已完成)"
+    )
+
+    status_code: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="已完成请求的响应状态码"
+    )
+
+    response_body: Optional[str] = Field(
+        default=None,
+        nullable=True,
+        description="已完成请求的响应内容（JSON）"
+    )
+
+    creator: str = Field(
+        nullable=False,
+        description="请求用户"
+    )
+
+    create_time: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        index=True,
+        description="首次请求时间"
+    )
+
+    __table_args__ = {
+        "comment": "幂等键表，记录创建单据请求的响应，客户端重试时直接返回首次结果"
+    }
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional
 from datetime import date
 
@@ -45,6 +46,8 @@ class InventoryDetail(SQLModel, table=True):
     material: Optional["Material"] = Relationship(back_populates="inventory_details")
     bin: Optional["Bin"] = Relationship(back_populates="inventory_details")
     
-    __table_args__ = {
-        "comment": "库存明细表，记录每个批次在不同货位的库存分布情况"
-    }
\ No newline at end of file
+    __table_args__ = (
+        # 按器材查询有库存的明细（出库批次自动分配）
+        Index("ix_inventory_details_material_quantity", "material_id", "quantity"),
+        {"comment": "库存明细表，记录每个批次在不同货位的库存分布情况"}
+    )
\ No newline at end of file
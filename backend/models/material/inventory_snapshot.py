@@ -0,0 +1,88 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import datetime
+
+
+class InventorySnapshot(SQLModel, table=True):
+    """库存快照表"""
+
+    __tablename__ = "inventory_snapshots"
+
+    snapshot_id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="快照ID，主键"
+    )
+
+    snapshot_time: datetime = Field(
+        nullable=False,
+        index=True,
+        description="快照时间（该时刻的库存明细状态）"
+    )
+
+    row_count: int = Field(
+        default=0,
+        nullable=False,
+        description="快照明细行数"
+    )
+
+    total_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="快照库存总数量"
+    )
+
+    creator: str = Field(
+        nullable=False,
+        description="创建人（定时任务为system）"
+    )
+
+    __table_args__ = {
+        "comment": "库存快照表，定期保存库存明细状态，用于历史时点库存重建"
+    }
+
+
+class InventorySnapshotItem(SQLModel, table=True):
+    """库存快照明细表"""
+
+    __tablename__ = "inventory_snapshot_items"
+
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="主键ID"
+    )
+
+    snapshot_id: int = Field(
+        foreign_key="inventory_snapshots.snapshot_id",
+        nullable=False,
+        description="快照ID，外键关联inventory_snapshots表"
+    )
+
+    batch_id: int = Field(
+        nullable=False,
+        description="批次ID"
+    )
+
+    material_id: int = Field(
+        nullable=False,
+        description="器材ID"
+    )
+
+    bin_id: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="货位ID"
+    )
+
+    quantity: int = Field(
+        nullable=False,
+        description="快照时该批次在该货位的数量"
+    )
+
+    __table_args__ = (
+        Index("ix_inventory_snapshot_items_snapshot_material", "snapshot_id", "material_id"),
+        Index("ix_inventory_snapshot_items_snapshot_bin", "snapshot_id", "bin_id"),
+        {"comment": "库存快照明细表，只保存数量不为0的批次货位"}
+    )
@@ -1,5 +1,6 @@
 from models import SQLModelBase
 from sqlmodel import Field, Relationship
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -17,6 +18,7 @@ class ReferenceType(str, Enum):
     INBOUND = "inbound"      # 入库单
     OUTBOUND = "outbound"    # 出库单
     STOCKTAKE = "stocktake"  # 盘点单
+    TRANSFER = "transfer"    # 移库
 
 
 class InventoryTransaction(SQLModelBase, table=True):
@@ -42,6 +44,13 @@ class InventoryTransaction(SQLModelBase, table=True):
         description="批次ID，外键关联inventory_batches表"
     )
     
+    bin_id: Optional[int] = Field(
+        default=None,
+        foreign_key="bins.id",
+        nullable=True,
+        description="货位ID，外键关联bins表（历史流水可能为空，按批次所在货位归属）"
+    )
+    
     change_type: ChangeType = Field(
         nullable=False,
         description="处理类型：IN(入库)、OUT(出库)、ADJUST(调整)"
@@ -64,7 +73,7 @@ class InventoryTransaction(SQLModelBase, table=True):
     
     reference_type: ReferenceType = Field(
         nullable=False,
-        description="关联单据类型：inbound(入库单)、outbound(出库单)、stocktake(盘点单)"
+        description="关联单据类型：inbound(入库单)、outbound(出库单)、stocktake(盘点单)、transfer(移库)"
     )
     
     reference_id: Optional[int] = Field(
@@ -88,6 +97,13 @@ class InventoryTransaction(SQLModelBase, table=True):
     material: Optional["Material"] = Relationship(back_populates="inventory_transactions")
     batch: Optional["InventoryBatch"] = Relationship(back_populates="inventory_transactions")
     
-    __table_args__ = {
-        "comment": "库存变更流水表，记录所有库存变动明细，用于审计和追溯"
-    }
\ No newline at end of file
+    __table_args__ = (
+        # 按时间区间统计、按器材/批次查询流水
+        Index("ix_inventory_transactions_time", "transaction_time"),
+        Index("ix_inventory_transactions_material_time", "material_id", "transaction_time"),
+        Index("ix_inventory_transactions_batch_time", "batch_id", "transaction_time"),
+        Index("ix_inventory_transactions_reference", "reference_type", "reference_id"),
+        # 按器材查询最近一次出库/入库时间（呆滞分析）
+        Index("ix_inventory_transactions_type_material_time", "change_type", "material_id", "transaction_time"),
+        {"comment": "库存变更流水表，记录所有库存变动明细，用于审计和追溯"}
+    )
\ No newline at end of file
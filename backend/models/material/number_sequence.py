@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class NumberSequence(SQLModel, table=True):
+    """单号流水序列表"""
+
+    __tablename__ = "sequences"
+
+    name: str = Field(
+        primary_key=True,
+        max_length=64,
+        description="序列名称（单号前缀，如CK20250101、RK20250101-）"
+    )
+
+    value: int = Field(
+        default=0,
+        nullable=False,
+        description="最近一次分配的流水号"
+    )
+
+    update_time: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        description="最近分配时间"
+    )
+
+    __table_args__ = {
+        "comment": "单号流水序列表，按前缀原子递增分配出入库单号和批次编码的流水号"
+    }
@@ -0,0 +1,126 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import date, datetime
+
+
+class PeriodClosing(SQLModel, table=True):
+    """月结记录表"""
+
+    __tablename__ = "period_closings"
+
+    period: str = Field(
+        primary_key=True,
+        max_length=7,
+        description="会计期间（YYYY-MM）"
+    )
+
+    period_start: date = Field(
+        nullable=False,
+        index=True,
+        description="期间开始日期（含）"
+    )
+
+    period_end: date = Field(
+        nullable=False,
+        index=True,
+        description="期间结束日期（不含，即下月第一天）"
+    )
+
+    row_count: int = Field(
+        default=0,
+        nullable=False,
+        description="期末余额行数"
+    )
+
+    closed_time: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        description="结账时间"
+    )
+
+    creator: str = Field(
+        nullable=False,
+        description="结账人（定时任务为system）"
+    )
+
+    __table_args__ = {
+        "comment": "月结记录表，记录已结账的会计期间"
+    }
+
+
+class PeriodBalance(SQLModel, table=True):
+    """期间余额表"""
+
+    __tablename__ = "period_balances"
+
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="主键ID"
+    )
+
+    period: str = Field(
+        foreign_key="period_closings.period",
+        nullable=False,
+        max_length=7,
+        description="会计期间（YYYY-MM）"
+    )
+
+    material_id: int = Field(
+        nullable=False,
+        description="器材ID"
+    )
+
+    batch_id: int = Field(
+        nullable=False,
+        description="批次ID"
+    )
+
+    unit_price: float = Field(
+        default=0.0,
+        nullable=False,
+        description="结账时的批次单价"
+    )
+
+    opening_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="期初数量"
+    )
+
+    opening_value: float = Field(
+        default=0.0,
+        nullable=False,
+        description="期初金额"
+    )
+
+    in_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="本期收入数量（正向变动合计）"
+    )
+
+    out_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="本期发出数量（负向变动合计，取正数）"
+    )
+
+    closing_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="期末数量"
+    )
+
+    closing_value: float = Field(
+        default=0.0,
+        nullable=False,
+        description="期末金额"
+    )
+
+    __table_args__ = (
+        Index("ux_period_balances_period_material_batch", "period", "material_id", "batch_id", unique=True),
+        Index("ix_period_balances_material_period", "material_id", "period"),
+        {"comment": "期间余额表，按器材、批次保存每月期初、收发和期末数量金额"}
+    )
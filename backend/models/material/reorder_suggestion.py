@@ -0,0 +1,82 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class ReorderSuggestion(SQLModel, table=True):
+    """补货建议表"""
+
+    __tablename__ = "reorder_suggestions"
+
+    material_id: int = Field(
+        primary_key=True,
+        description="器材ID"
+    )
+
+    rank: int = Field(
+        nullable=False,
+        index=True,
+        description="补货优先级排名（1最紧急）"
+    )
+
+    window_days: int = Field(
+        nullable=False,
+        description="消耗统计窗口天数"
+    )
+
+    consumed_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="窗口内出库数量"
+    )
+
+    average_daily_consumption: float = Field(
+        default=0.0,
+        nullable=False,
+        description="日均消耗量"
+    )
+
+    current_stock: int = Field(
+        default=0,
+        nullable=False,
+        description="当前库存"
+    )
+
+    safety_stock: int = Field(
+        default=0,
+        nullable=False,
+        description="安全库存"
+    )
+
+    reorder_point: float = Field(
+        default=0.0,
+        nullable=False,
+        description="再订货点（安全库存 + 日均消耗 × 补货周期）"
+    )
+
+    days_of_cover: Optional[float] = Field(
+        default=None,
+        nullable=True,
+        description="可用天数（当前库存 ÷ 日均消耗，无消耗时为空）"
+    )
+
+    needs_reorder: bool = Field(
+        default=False,
+        nullable=False,
+        description="是否需要补货（当前库存低于再订货点）"
+    )
+
+    suggested_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="建议补货数量"
+    )
+
+    refreshed_at: datetime = Field(
+        nullable=False,
+        description="计算时间"
+    )
+
+    __table_args__ = {
+        "comment": "补货建议表，由定时任务按出库消耗速度批量计算"
+    }
@@ -0,0 +1,169 @@
+from models import SQLModelBase
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class StocktakeStatus(str, Enum):
+    """盘点单状态枚举"""
+    COUNTING = "counting"    # 盘点中
+    POSTED = "posted"        # 已过账
+    CANCELLED = "cancelled"  # 已取消
+
+
+class Stocktake(SQLModelBase, table=True):
+    """盘点单表"""
+
+    __tablename__ = "stocktakes"
+
+    stocktake_id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="盘点单ID，主键"
+    )
+
+    stocktake_number: str = Field(
+        unique=True,
+        index=True,
+        nullable=False,
+        description="盘点单号"
+    )
+
+    warehouse_id: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="盘点范围：仓库ID（为空表示不限）"
+    )
+
+    bin_id: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="盘点范围：货位ID（为空表示不限）"
+    )
+
+    major_id: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="盘点范围：专业ID（为空表示不限）"
+    )
+
+    status: StocktakeStatus = Field(
+        default=StocktakeStatus.COUNTING,
+        nullable=False,
+        description="状态：counting(盘点中)、posted(已过账)、cancelled(已取消)"
+    )
+
+    snapshot_time: datetime = Field(
+        nullable=False,
+        description="账面数量冻结时间"
+    )
+
+    item_count: int = Field(
+        default=0,
+        nullable=False,
+        description="盘点明细行数"
+    )
+
+    expected_total: int = Field(
+        default=0,
+        nullable=False,
+        description="账面总数量"
+    )
+
+    variance_count: int = Field(
+        default=0,
+        nullable=False,
+        description="过账的差异行数"
+    )
+
+    variance_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="过账的差异数量合计（盘盈为正，盘亏为负）"
+    )
+
+    creator: str = Field(
+        nullable=False,
+        description="创建人"
+    )
+
+    poster: Optional[str] = Field(
+        default=None,
+        nullable=True,
+        description="过账人"
+    )
+
+    posted_time: Optional[datetime] = Field(
+        default=None,
+        nullable=True,
+        description="过账时间"
+    )
+
+    remark: Optional[str] = Field(
+        default=None,
+        nullable=True,
+        description="备注"
+    )
+
+    __table_args__ = {
+        "comment": "盘点单表，记录盘点范围、账面数量冻结时间和过账结果"
+    }
+
+
+class StocktakeItem(SQLModel, table=True):
+    """盘点明细表"""
+
+    __tablename__ = "stocktake_items"
+
+    item_id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        description="盘点明细ID，主键"
+    )
+
+    stocktake_id: int = Field(
+        foreign_key="stocktakes.stocktake_id",
+        nullable=False,
+        description="盘点单ID，外键关联stocktakes表"
+    )
+
+    batch_id: int = Field(
+        nullable=False,
+        description="批次ID"
+    )
+
+    material_id: int = Field(
+        nullable=False,
+        description="器材ID"
+    )
+
+    bin_id: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="货位ID"
+    )
+
+    expected_quantity: int = Field(
+        default=0,
+        nullable=False,
+        description="冻结时的账面数量（盘点中新发现的批次为0）"
+    )
+
+    counted_quantity: Optional[int] = Field(
+        default=None,
+        nullable=True,
+        description="实盘数量（为空表示未盘点）"
+    )
+
+    count_time: Optional[datetime] = Field(
+        default=None,
+        nullable=True,
+        description="最近一次录入实盘数量的时间"
+    )
+
+    __table_args__ = (
+        Index("ux_stocktake_items_stocktake_batch_bin", "stocktake_id", "batch_id", "bin_id", unique=True),
+        {"comment": "盘点明细表，每个批次货位一行，保存账面数量和实盘数量"}
+    )
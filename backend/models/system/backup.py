@@ -2,8 +2,12 @@
 备份相关模型定义
 包含手动备份功能的请求/响应模型
 """
+from typing import Optional
+
 from pydantic import BaseModel
 class BackupListResponse(BaseModel):
     """备份列表响应"""
     backups: list
-    total_count: int
\ No newline at end of file
+    total_count: int
+    page: Optional[int] = None
+    page_size: Optional[int] = None
\ No newline at end of file
@@ -40,6 +40,20 @@ from routes.material.outbound_order_routes import outbound_orders_router
 from routes.material.inventory_detail_routes import inventory_details_router
 # 导入器材分类账页生成路由
 from routes.material.material_ledger_routes import material_ledger_router
+# 导入库存快照与历史库存查询路由
+from routes.material.inventory_snapshot_routes import inventory_snapshots_router
+# 导入月结与期间余额路由
+from routes.material.period_balance_routes import period_balances_router
+# 导入库存计价路由
+from routes.material.inventory_valuation_routes import inventory_valuation_router
+# 导入库存账龄与呆滞分析路由
+from routes.material.inventory_aging_routes import inventory_aging_router
+# 导入补货建议路由
+from routes.material.reorder_suggestion_routes import reorder_suggestions_router
+# 导入移库路由
+from routes.material.stock_transfer_routes import stock_transfers_router
+# 导入盘点路由
+from routes.material.stocktake_routes import stocktakes_router
 # 导入系统状态管理路由
 from routes.system.system_status_routes import system_status_router
 
@@ -92,6 +106,20 @@ router.include_router(outbound_orders_router)
 router.include_router(inventory_details_router)
 # 包含器材分类账页生成路由
 router.include_router(material_ledger_router)
+# 包含库存快照与历史库存查询路由
+router.include_router(inventory_snapshots_router)
+# 包含月结与期间余额路由
+router.include_router(period_balances_router)
+# 包含库存计价路由
+router.include_router(inventory_valuation_router)
+# 包含库存账龄与呆滞分析路由
+router.include_router(inventory_aging_router)
+# 包含补货建议路由
+router.include_router(reorder_suggestions_router)
+# 包含移库路由
+router.include_router(stock_transfers_router)
+# 包含盘点路由
+router.include_router(stocktakes_router)
 # 包含系统状态管理路由
 router.include_router(system_status_router)
 
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Security, HTTPException, UploadFile, File, Query
+from fastapi.responses import FileResponse
 from sqlmodel import Session, select, func, and_, or_
 from typing import List
 import logging
+import os
+import tempfile
 from datetime import datetime
 import json
 
@@ -21,6 +24,14 @@ from core.security import get_current_active_user, get_required_scopes_for_route
 from database import get_db
 from utils.material_utils import generate_material_query_code, validate_material_code_unique
 from utils.template_utils import download_import_template
+from config.import_config import get_import_config
+from utils.import_utils import (
+    batch_import_transaction, validate_entity_data, batch_insert_entities,
+    read_import_file, get_import_file_extension, IMPORT_FILE_EXTENSIONS
+)
+from utils.error_file_handler import (
+    index_errors_by_row, generate_error_file_from_all_errors, ERROR_FILE_MEDIA_TYPE
+)
 
 material_router = APIRouter(tags=["器材管理"], prefix="/materials")
 
@@ -609,19 +620,91 @@ async def get_material_statistics(
         logger.error(f"获取器材统计信息失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取器材统计信息失败: {str(e)}")
 
-# 批量导入器材（占位实现）
+# 批量导入器材（文件上传）
 @material_router.post("/batch-import", response_model=MaterialBatchImportResult)
 async def batch_import_materials(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/materials"))
 ):
-    """批量导入器材"""
-    # 这里实现Excel导入逻辑，暂时返回占位响应
+    """批量导入器材（支持Excel和CSV/TSV），不合格数据导出到错误文件"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="器材:文件:请选择要上传的文件")
+    
+    # 检查文件扩展名（支持Excel和CSV/TSV文本文件）
+    file_extension = get_import_file_extension(file.filename)
+    if not file_extension:
+        raise HTTPException(
+            status_code=400,
+            detail=f"器材:文件:不支持的文件格式。请上传Excel或CSV文件（{', '.join(IMPORT_FILE_EXTENSIONS)}）"
+        )
+    
+    config = get_import_config('material')
+    if not config:
+        raise HTTPException(status_code=400, detail="器材:实体类型:不支持的实体类型: material")
+    
+    contents = await file.read()
+    if not contents:
+        raise HTTPException(status_code=400, detail="器材:文件:上传的文件为空")
+    if len(contents) > 10 * 1024 * 1024:
+        raise HTTPException(status_code=400, detail="器材:文件:文件过大，请确保文件小于10MB")
+    
+    # 读取文件数据行
+    try:
+        materials_data, original_rows = read_import_file(contents, file_extension, config)
+        logger.info(f"成功读取{file_extension}文件，共{len(materials_data)}行数据")
+    except Exception as e:
+        logger.error(f"器材导入文件读取失败: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"器材:文件:无法读取文件: {str(e)}")
+    
+    if not materials_data:
+        raise HTTPException(
+            status_code=400,
+            detail="器材:文件:文件中没有找到有效的数据行。请检查：\n1. 文件是否包含数据（除了标题行）\n2. 第一列（器材编码）是否填写"
+        )
+    
+    # 验证数据（包含输入重复和数据库重复检查）
+    all_errors = await validate_entity_data(
+        [data for _, data in materials_data],
+        config,
+        db,
+        row_indexes=[row_index for row_index, _ in materials_data]
+    )
+    
+    # 筛选出合格数据，未填写查询码的自动生成
+    errors_by_row = index_errors_by_row(all_errors)
+    valid_data = []
+    for row_index, entity_data in materials_data:
+        if row_index in errors_by_row:
+            continue
+        if not entity_data.get('material_query_code'):
+            entity_data['material_query_code'] = generate_material_query_code(
+                entity_data['material_name'], entity_data.get('material_specification')
+            )
+        valid_data.append((row_index, entity_data))
+    
+    # 批量插入合格数据（出错的行单独记录，其余行照常插入）
+    with batch_import_transaction(db):
+        success_count, insert_errors = await batch_insert_entities(
+            valid_data, config, db, current_user.username
+        )
+    all_errors.extend(insert_errors)
+    
+    # 生成错误文件（包含验证错误和插入错误）
+    error_file_name = None
+    if all_errors:
+        error_file_path = generate_error_file_from_all_errors(all_errors, original_rows, config, entity_key='material')
+        if error_file_path:
+            error_file_name = os.path.basename(error_file_path)
+    
     return MaterialBatchImportResult(
-        success_count=0,
-        error_count=0,
-        errors=["批量导入功能暂未实现"]
+        total_count=len(materials_data),
+        success_count=success_count,
+        error_count=len(all_errors),
+        errors=all_errors,
+        import_time=datetime.now(),
+        has_error_file=error_file_name is not None,
+        error_file_name=error_file_name
     )
 
 # 下载器材导入模板
@@ -635,11 +718,22 @@ async def download_material_import_template(
 # 下载错误文件
 @material_router.get("/download-error-file")
 async def download_material_error_file(
+    file_name: str = Query(..., description="错误文件名"),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/materials/download-error-file"))
 ):
-    """下载器材导入错误文件"""
-    # 这里实现错误文件下载逻辑，暂时返回占位响应
-    raise HTTPException(status_code=501, detail="错误文件下载功能暂未实现")
+    """下载器材导入错误文件（需要BASE-edit权限）"""
+    material_dir = os.path.join(tempfile.gettempdir(), 'material')
+    file_path = os.path.join(material_dir, os.path.basename(file_name))
+    
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        logger.error(f"错误文件不存在: {file_path}")
+        raise HTTPException(status_code=404, detail="错误文件不存在或已过期")
+    
+    return FileResponse(
+        path=file_path,
+        filename=os.path.basename(file_path),
+        media_type=ERROR_FILE_MEDIA_TYPE
+    )
 
 # 获取器材表中所有准专业的合集（不重复）
 @material_router.get("/major-options", response_model=MajorOptionsResponse)
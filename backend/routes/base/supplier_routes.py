@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, Security, HTTPException, UploadFile, Fil
 from fastapi.responses import Response
 from sqlmodel import Session, select, func
 from typing import List, Optional
-from io import BytesIO
 import os
 from datetime import datetime
 import logging
@@ -18,10 +17,11 @@ from core.security import get_current_active_user, get_required_scopes_for_route
 from database import get_db
 from config.import_config import get_import_config
 from utils.import_utils import (
-    batch_import_transaction, build_entity_data, validate_entity_data,
-    batch_insert_entities
+    batch_import_transaction, validate_entity_data,
+    batch_insert_entities, read_import_file, get_import_file_extension,
+    IMPORT_FILE_EXTENSIONS
 )
-from utils.error_file_handler import generate_universal_error_file
+from utils.error_file_handler import index_errors_by_row, index_rows_by_number, ERROR_FILE_MEDIA_TYPE
 from utils.template_utils import download_import_template
 
 supplier_router = APIRouter(tags=["供应商管理"], prefix="/suppliers")
@@ -350,21 +350,18 @@ async def batch_import_suppliers_data(
         all_errors = await validate_entity_data(formatted_data, config, db)
         
         # 筛选出合格数据
+        errors_by_row = index_errors_by_row(all_errors)
         valid_data = []
         error_data = []
         
         for i, supplier_data in enumerate(formatted_data):
             row_index = i + 2  # Excel行号
-            has_error = any(error.row_index == row_index for error in all_errors)
+            has_error = row_index in errors_by_row
             if not has_error:
                 valid_data.append((row_index, supplier_data))
             else:
                 error_data.append((row_index, supplier_data))
         
-        # 批量插入合格数据
-        success_count = 0
-        insert_errors = []
-        
         # 如果有错误数据，生成错误Excel文件
         error_file_path = None
         error_file_name = None
@@ -388,50 +385,11 @@ async def batch_import_suppliers_data(
                 username=current_user.username
             )
         
+        # 批量插入合格数据（出错的行单独记录，其余行照常插入）
         with batch_import_transaction(db):
-            for row_index, entity_data in valid_data:
-                try:
-                    # 插入前再次检查唯一性（防止并发导入时的重复）
-                    existing_supplier = db.exec(
-                        select(Supplier).where(
-                            Supplier.supplier_name == entity_data['supplier_name'].strip(),
-                            Supplier.is_delete != True
-                        )
-                    ).first()
-                    
-                    if existing_supplier:
-                        from schemas.common.import_schemas import ImportError
-                        insert_errors.append(ImportError(
-                            row_index=row_index,
-                            field='supplier_name',
-                            error_message=f'供应商:供应商名称:"{entity_data["supplier_name"]}"在导入过程中与现有数据冲突',
-                            raw_data=entity_data
-                        ))
-                        continue
-                    
-                    # 创建供应商记录
-                    supplier_data = {
-                        'supplier_name': entity_data.get('supplier_name', '').strip(),
-                        'supplier_city': entity_data.get('supplier_city', '').strip() or None,
-                        'supplier_address': entity_data.get('supplier_address', '').strip() or None,
-                        'supplier_manager': entity_data.get('supplier_manager', '').strip() or None,
-                        'supplier_contact': entity_data.get('supplier_contact', '').strip() or None,
-                        'supplier_level': entity_data.get('supplier_level') or None,
-                        'creator': current_user.username
-                    }
-                    
-                    db_supplier = Supplier(**supplier_data)
-                    db.add(db_supplier)
-                    success_count += 1
-                    
-                except Exception as e:
-                    from schemas.common.import_schemas import ImportError
-                    insert_errors.append(ImportError(
-                        row_index=row_index,
-                        field='database',
-                        error_message=f"供应商:数据库:插入数据库时出错: {str(e)}",
-                        raw_data=entity_data
-                    ))
+            success_count, insert_errors = await batch_insert_entities(
+                valid_data, config, db, current_user.username
+            )
         
         # 合并所有错误
         all_errors.extend(insert_errors)
@@ -487,24 +445,22 @@ async def batch_import_suppliers(
     if not file.filename:
         raise HTTPException(status_code=400, detail="供应商:文件:请选择要上传的文件")
     
-    # 检查文件扩展名
-    allowed_extensions = ['.xlsx', '.xls']
-    file_extension = None
-    for ext in allowed_extensions:
-        if file.filename.lower().endswith(ext):
-            file_extension = ext
-            break
+    # 检查文件扩展名（支持Excel和CSV/TSV文本文件）
+    file_extension = get_import_file_extension(file.filename)
     
     if not file_extension:
         raise HTTPException(
             status_code=400, 
-            detail=f"供应商:文件:不支持的文件格式。请上传Excel文件（{', '.join(allowed_extensions)}）"
+            detail=f"供应商:文件:不支持的文件格式。请上传Excel或CSV文件（{', '.join(IMPORT_FILE_EXTENSIONS)}）"
         )
     
     # 检查MIME类型
     allowed_mime_types = [
         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',  # .xlsx
-        'application/vnd.ms-excel',  # .xls
+        'application/vnd.ms-excel',  # .xls（部分浏览器上传.csv也使用此类型）
+        'text/csv',  # .csv
+        'text/tab-separated-values',  # .tsv
+        'text/plain',
         'application/octet-stream'  # 通用二进制格式
     ]
     
@@ -528,45 +484,13 @@ async def batch_import_suppliers(
         if len(contents) > 10 * 1024 * 1024:
             raise HTTPException(status_code=400, detail="供应商:文件:文件过大，请确保文件小于10MB")
         
-        # 读取Excel文件
-        suppliers_data = []
-        original_rows = []  # 保存原始行数据
-        
+        # 读取文件数据行（Excel或CSV/TSV）
         try:
-            if file_extension == '.xlsx':
-                # 使用openpyxl读取.xlsx文件
-                from openpyxl import load_workbook
-                workbook = load_workbook(BytesIO(contents))
-                sheet = workbook.active
-                
-                for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):  # type: ignore
-                    if row and row[0]:  # 第一个字段不为空
-                        entity_data = build_entity_data(row, config)
-                        suppliers_data.append((row_index, entity_data))
-                        original_rows.append((row_index, row))
-                
-                print(f"使用openpyxl成功读取.xlsx文件，共{len(suppliers_data)}行数据")
-                
-            elif file_extension == '.xls':
-                # 使用xlrd读取.xls文件
-                import xlrd
-                workbook = xlrd.open_workbook(file_contents=contents)
-                sheet = workbook.sheet_by_index(0)
-                
-                for row_index in range(1, sheet.nrows):  # 从第2行开始（跳过标题行）
-                    row = sheet.row_values(row_index)
-                    if row and row[0]:  # 第一个字段不为空
-                        entity_data = build_entity_data(row, config)
-                        suppliers_data.append((row_index + 1, entity_data))  # Excel行号从1开始
-                        original_rows.append((row_index + 1, row))
-                
-                print(f"使用xlrd成功读取.xls文件，共{len(suppliers_data)}行数据")
-            else:
-                raise HTTPException(status_code=400, detail=f"供应商:文件:不支持的文件格式: {file_extension}")
-            
+            suppliers_data, original_rows = read_import_file(contents, file_extension, config)
+            print(f"成功读取{file_extension}文件，共{len(suppliers_data)}行数据")
         except Exception as e:
-            print(f"Excel文件读取失败: {str(e)}")
-            raise HTTPException(status_code=400, detail=f"供应商:文件:无法读取Excel文件: {str(e)}")
+            print(f"文件读取失败: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"供应商:文件:无法读取文件: {str(e)}")
         
         # 如果没有读取到任何数据
         if not suppliers_data:
@@ -579,79 +503,29 @@ async def batch_import_suppliers(
         all_errors = await validate_entity_data(
             [data for _, data in suppliers_data], 
             config, 
-            db
+            db,
+            row_indexes=[row_index for row_index, _ in suppliers_data]
         )
         
-        # 筛选出合格数据
+        # 筛选出合格数据（错误和原始行先按行号索引）
+        errors_by_row = index_errors_by_row(all_errors)
+        rows_by_number = index_rows_by_number(original_rows)
         valid_data = []
         error_rows = []
         
         for row_index, entity_data in suppliers_data:
-            has_error = any(error.row_index == row_index for error in all_errors)
-            if not has_error:
+            row_errors = errors_by_row.get(row_index)
+            if not row_errors:
                 valid_data.append((row_index, entity_data))
-            else:
+            elif row_index in rows_by_number:
                 # 收集该行的所有错误
-                row_errors = [error for error in all_errors if error.row_index == row_index]
-                for orig_row_index, orig_row in original_rows:
-                    if orig_row_index == row_index:
-                        error_rows.append((row_index, orig_row, row_errors))
-                        break
-        
-        # 如果有验证错误，生成错误文件（临时变量，不直接返回）
-        temp_error_file_path = None
-        if error_rows:
-            temp_error_file_path = generate_universal_error_file(error_rows, all_errors, config, entity_key='supplier')
-        
-        # 批量插入合格数据
-        success_count = 0
-        insert_errors = []
+                error_rows.append((row_index, rows_by_number[row_index], row_errors))
         
+        # 批量插入合格数据（出错的行单独记录，其余行照常插入）
         with batch_import_transaction(db):
-            for row_index, entity_data in valid_data:
-                try:
-                    # 插入前再次检查唯一性（防止并发导入时的重复）
-                    existing_supplier = db.exec(
-                        select(Supplier).where(
-                            Supplier.supplier_name == entity_data['supplier_name'].strip(),
-                            Supplier.is_delete != True
-                        )
-                    ).first()
-                    
-                    if existing_supplier:
-                        from schemas.common.import_schemas import ImportError
-                        insert_errors.append(ImportError(
-                            row_index=row_index,
-                            field='supplier_name',
-                            error_message=f'供应商:文件:文件"{entity_data["supplier_name"]}"在导入过程中与现有数据冲突',
-                            raw_data=entity_data
-                        ))
-                        continue
-                    
-                    # 创建供应商记录
-                    # 确保所有必要字段都有值
-                    supplier_data = {
-                        'supplier_name': entity_data.get('supplier_name', '').strip(),
-                        'supplier_city': entity_data.get('supplier_city', '').strip() or None,
-                        'supplier_address': entity_data.get('supplier_address', '').strip() or None,
-                        'supplier_manager': entity_data.get('supplier_manager', '').strip() or None,
-                        'supplier_contact': entity_data.get('supplier_contact', '').strip() or None,
-                        'supplier_level': entity_data.get('supplier_level') or None,
-                        'creator': current_user.username
-                    }
-                    
-                    db_supplier = Supplier(**supplier_data)
-                    db.add(db_supplier)
-                    success_count += 1
-                    
-                except Exception as e:
-                    from schemas.common.import_schemas import ImportError
-                    insert_errors.append(ImportError(
-                        row_index=row_index,
-                        field='database',
-                        error_message=f"供应商:数据库:插入数据库时出错: {str(e)}",
-                        raw_data=entity_data
-                    ))
+            success_count, insert_errors = await batch_insert_entities(
+                valid_data, config, db, current_user.username
+            )
         
         # 如果有插入错误，更新错误文件
         if insert_errors:
@@ -756,7 +630,7 @@ async def download_supplier_error_file(
         # 直接返回响应内容
         return Response(
             content=file_content,
-            media_type="application/vnd.ms-excel",
+            media_type=ERROR_FILE_MEDIA_TYPE,
             headers={
                 "Content-Disposition": f"attachment; filename=\"{decoded_file_name}\"",
                 "Content-Length": str(file_size)
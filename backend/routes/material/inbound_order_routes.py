@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Security, Response
 from sqlmodel import Session, select, func, and_, or_, delete
 from typing import Optional
 from datetime import date, datetime
@@ -24,7 +24,21 @@ from models.base.bin import Bin
 from models.material.inventory_batch import InventoryBatch
 from models.material.inventory_detail import InventoryDetail
 from models.material.inventory_transaction import InventoryTransaction, ChangeType, ReferenceType
-from utils.inventory_transaction_utils import create_inbound_transaction, create_inventory_transaction
+from models.material.daily_inventory_movement import MovementDirection
+from utils.inventory_transaction_utils import (
+    create_inbound_transaction, create_inventory_transaction, get_earliest_transaction_time
+)
+from utils.period_balance_utils import reclose_periods_since
+from utils.inventory_snapshot_utils import discard_snapshots_since
+from utils.inventory_movement_utils import refresh_daily_movement, get_order_material_ids
+from utils.inventory_stock_utils import begin_write_transaction
+from utils.order_statistics_utils import build_order_date_filters, aggregate_orders_by
+from utils.idempotency_utils import (
+    IDEMPOTENCY_HEADER, claim_idempotency_key, complete_idempotency_key, release_idempotency_key
+)
+from utils.sequence_utils import (
+    BATCH_CODE_PATTERN, INBOUND_ORDER_PATTERN, next_inbound_order_number, sync_sequence_with_number
+)
 from utils.pdf_generator import generate_inbound_order_pdf
 
 # 创建入库单管理路由
@@ -265,9 +279,33 @@ async def get_inbound_order(
 @inbound_orders_router.post("", response_model=InboundOrderResponse)
 async def create_inbound_order(
     order_data: InboundOrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, description="幂等键，客户端重试时使用相同的值"),
     db: Session = Depends(get_db),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inbound-orders/"))
 ):
+    """
+    创建新入库单
+
+    请求头携带Idempotency-Key时，相同键的重试直接返回首次创建的结果，不会重复创建。
+    """
+    replay = claim_idempotency_key(db, idempotency_key, "POST /inbound-orders", order_data, current_user.username)
+    if replay is not None:
+        return replay
+    
+    try:
+        response = await _create_inbound_order(order_data, db, current_user)
+    except Exception:
+        release_idempotency_key(db, idempotency_key)
+        raise
+    complete_idempotency_key(db, idempotency_key, response)
+    return response
+
+
+async def _create_inbound_order(
+    order_data: InboundOrderCreate,
+    db: Session,
+    current_user: UserResponse
+) -> InboundOrderResponse:
     """创建新入库单"""
     
     # 验证入库单号唯一性
@@ -304,6 +342,9 @@ async def create_inbound_order(
     
     # 开始事务
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
         # 创建入库单
         new_order = InboundOrder(
             order_number=order_data.order_number,
@@ -335,6 +376,11 @@ async def create_inbound_order(
             )
             db.add(new_batch)
         
+        # 手工录入的单号、批次号符合生成格式时推进流水序列，避免之后生成重复编号
+        sync_sequence_with_number(db, new_order.order_number, INBOUND_ORDER_PATTERN)
+        for item in order_data.items:
+            sync_sequence_with_number(db, item.batch_number, BATCH_CODE_PATTERN)
+        
         # 使用db.flush()获取自增ID，但不提交事务
         db.flush()
         
@@ -387,6 +433,7 @@ async def create_inbound_order(
             transaction = InventoryTransaction(
                 material_id=item.material_id,
                 batch_id=batch.batch_id,
+                bin_id=item.bin_id,
                 change_type="IN",
                 quantity_change=item.quantity,
                 quantity_before=0,
@@ -398,6 +445,12 @@ async def create_inbound_order(
             )
             db.add(transaction)
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(
+            db, MovementDirection.IN, new_order.create_time,
+            {item.material_id for item in order_data.items}
+        )
+        
         # 一次性提交所有数据库操作，确保事务原子性
         db.commit()
         db.refresh(new_order)
@@ -483,12 +536,20 @@ async def delete_inbound_order(
     
     # 开始事务删除
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
+        # 记录汇总需要重算的日期和器材
+        movement_date = order.create_time
+        movement_material_ids = {item.material_id for item in items}
+        
         # 删除库存变更流水记录
-        from models.material.inventory_transaction import InventoryTransaction
-        db.exec(delete(InventoryTransaction).where(
+        transaction_filters = (
             InventoryTransaction.reference_id == order_id,
-            InventoryTransaction.reference_type == "inbound"
-        ))
+            InventoryTransaction.reference_type == ReferenceType.INBOUND
+        )
+        history_start = get_earliest_transaction_time(db, *transaction_filters)
+        db.exec(delete(InventoryTransaction).where(*transaction_filters))
         
         # 删除库存明细记录
         for batch_id in batch_ids:
@@ -504,6 +565,13 @@ async def delete_inbound_order(
         # 删除入库单
         db.delete(order)
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(db, MovementDirection.IN, movement_date, movement_material_ids)
+        
+        # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
+        
         db.commit()
         
         return {"message": "入库单删除成功"}
@@ -522,70 +590,32 @@ async def get_inbound_order_statistics(
 ):
     """获取入库单统计信息"""
     
-    # 构建基础查询
-    query = select(InboundOrder)
-    
     # 日期筛选
-    if start_date:
-        query = query.where(InboundOrder.create_time >= start_date)
-    if end_date:
-        query = query.where(InboundOrder.create_time <= end_date)
-    
-    # 获取所有入库单
-    orders = db.exec(query).all()
+    filters = build_order_date_filters(InboundOrder, start_date, end_date)
     
-    # 计算统计信息
-    total_orders = len(orders)
-    total_quantity = sum(order.total_quantity for order in orders)
-    
-    # 计算总金额（需要查询明细）
-    total_amount = 0
-    for order in orders:
-        items = db.exec(
-            select(InboundOrderItem).where(InboundOrderItem.order_id == order.order_id)
-        ).all()
-        total_amount += sum(item.quantity * item.unit_price for item in items)
-    
-    # 按供应商统计
-    supplier_stats = {}
-    for order in orders:
-        supplier_name = order.supplier_name
-        if supplier_name not in supplier_stats:
-            supplier_stats[supplier_name] = {"count": 0, "quantity": 0, "amount": 0}
-        
-        supplier_stats[supplier_name]["count"] += 1
-        supplier_stats[supplier_name]["quantity"] += order.total_quantity
-        
-        # 计算该供应商的金额
-        items = db.exec(
-            select(InboundOrderItem).where(InboundOrderItem.order_id == order.order_id)
-        ).all()
-        amount = sum(item.quantity * item.unit_price for item in items)
-        supplier_stats[supplier_name]["amount"] += amount
+    # 按供应商统计（单数、数量来自入库单，金额来自明细聚合）
+    supplier_rows = aggregate_orders_by(db, InboundOrder, InboundOrderItem, InboundOrder.supplier_name, filters)
     
     # 按日期统计
-    date_stats = {}
-    for order in orders:
-        date_key = order.create_time.date().isoformat()
-        if date_key not in date_stats:
-            date_stats[date_key] = {"count": 0, "quantity": 0, "amount": 0}
-        
-        date_stats[date_key]["count"] += 1
-        date_stats[date_key]["quantity"] += order.total_quantity
-        
-        # 计算该日期的金额
-        items = db.exec(
-            select(InboundOrderItem).where(InboundOrderItem.order_id == order.order_id)
-        ).all()
-        amount = sum(item.quantity * item.unit_price for item in items)
-        date_stats[date_key]["amount"] += amount
+    date_rows = aggregate_orders_by(db, InboundOrder, InboundOrderItem, func.date(InboundOrder.create_time), filters)
+    
+    # 总计由供应商分组结果汇总
+    total_orders = sum(row[1] for row in supplier_rows)
+    total_quantity = sum(row[2] for row in supplier_rows)
+    total_amount = sum(row[3] for row in supplier_rows)
     
     return InboundOrderStatistics(
         total_orders=total_orders,
         total_quantity=total_quantity,
         total_amount=total_amount,
-        supplier_stats=[{"supplier": k, **v} for k, v in supplier_stats.items()],
-        date_stats=[{"date": k, **v} for k, v in date_stats.items()]
+        supplier_stats=[
+            {"supplier": supplier_name, "count": count, "quantity": quantity, "amount": amount}
+            for supplier_name, count, quantity, amount in supplier_rows
+        ],
+        date_stats=[
+            {"date": date_key, "count": count, "quantity": quantity, "amount": amount}
+            for date_key, count, quantity, amount in date_rows
+        ]
     )
 
 
@@ -615,6 +645,7 @@ async def update_order_number(
     try:
         old_order_number = order.order_number
         order.order_number = update_data.order_number
+        sync_sequence_with_number(db, order.order_number, INBOUND_ORDER_PATTERN)
         
         # 更新库存变更流水表中相关记录
         from models.material.inventory_transaction import InventoryTransaction
@@ -714,8 +745,15 @@ async def update_create_time(
         raise HTTPException(status_code=404, detail="入库单不存在")
     
     # 更新创建时间
+    old_create_time = order.create_time
     order.create_time = update_data.create_time
     
+    # 单据日期变化时，原日期和新日期的汇总都需要重算
+    if old_create_time.date() != update_data.create_time.date():
+        material_ids = get_order_material_ids(db, MovementDirection.IN, order_id)
+        refresh_daily_movement(db, MovementDirection.IN, old_create_time, material_ids)
+        refresh_daily_movement(db, MovementDirection.IN, update_data.create_time, material_ids)
+    
     db.commit()
     
     return {"message": "创建时间修改成功", "updated_fields": {
@@ -758,6 +796,9 @@ async def add_inbound_order_item(
     
     # 开始事务
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
         # 创建库存批次
         current_time = datetime.now()
         new_batch = InventoryBatch(
@@ -772,6 +813,7 @@ async def add_inbound_order_item(
             update_time=current_time           # 修改时间设置为当前时间
         )
         db.add(new_batch)
+        sync_sequence_with_number(db, new_batch.batch_number, BATCH_CODE_PATTERN)
         
         # 使用db.flush()获取自增ID，但不提交事务
         db.flush()
@@ -811,12 +853,16 @@ async def add_inbound_order_item(
             quantity_before=0,
             quantity_after=item_data.quantity,
             reference_id=order_id,
-            creator=current_user.username
+            creator=current_user.username,
+            bin_id=item_data.bin_id
         )
         
         # 更新入库单总数量
         order.total_quantity += item_data.quantity
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(db, MovementDirection.IN, order.create_time, [item_data.material_id])
+        
         # 一次性提交所有数据库操作
         db.commit()
         
@@ -855,7 +901,15 @@ async def update_inbound_order_item(
     if outbound_items:
         raise HTTPException(status_code=400, detail="该批次已被出库单引用，无法修改")
     
+    # 记录修改前的器材ID，器材变化时原器材的汇总也需要重算
+    original_material_id = item.material_id
+    # 被修改的流水中最早的流水时间（修改前）
+    history_start = None
+    
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
         print("=== 开始更新字段 ===")
         
         if update_data.batch_number is not None:
@@ -873,6 +927,7 @@ async def update_inbound_order_item(
                     batch.batch_number = update_data.batch_number
                     batch.update_time = datetime.now()  # 更新修改时间
                     db.add(batch)  # 标记批次为脏数据
+                    sync_sequence_with_number(db, batch.batch_number, BATCH_CODE_PATTERN)
                     print(f"更新批次号: {update_data.batch_number}, 批次ID: {batch.batch_id}")
                 else:
                     print("批次号未变化，跳过更新")
@@ -919,6 +974,7 @@ async def update_inbound_order_item(
                 ).first()
                 print(f"找到库存变更记录: {transaction}")
                 if transaction:
+                    history_start = min(history_start or transaction.transaction_time, transaction.transaction_time)
                     transaction.material_id = update_data.material_id
                     db.add(transaction)
 
@@ -945,6 +1001,18 @@ async def update_inbound_order_item(
                     detail.last_updated = datetime.now()
                     db.add(detail)
                 
+                # 更新入库流水记录的货位
+                transaction = db.exec(
+                    select(InventoryTransaction).where(
+                        InventoryTransaction.batch_id == item.batch_id,
+                        InventoryTransaction.reference_type == ReferenceType.INBOUND,
+                        InventoryTransaction.reference_id == order_id
+                    )
+                ).first()
+                if transaction:
+                    transaction.bin_id = update_data.bin_id
+                    db.add(transaction)
+                
                 print(f"更新货位ID: {update_data.bin_id}")
             else:
                 print("货位ID未变化，跳过更新")
@@ -1008,6 +1076,7 @@ async def update_inbound_order_item(
                     ).first()
 
                     if transaction:
+                        history_start = min(history_start or transaction.transaction_time, transaction.transaction_time)
                         # 更新现有记录
                         transaction.quantity_after = update_data.quantity
                         transaction.quantity_change = update_data.quantity - transaction.quantity_before  # 计算本次变更的数量差
@@ -1050,6 +1119,18 @@ async def update_inbound_order_item(
             else:
                 print("单位未变化，跳过更新")
 
+        # 更新每日出入库汇总（数量、单价、器材变化都会影响汇总）
+        order = db.get(InboundOrder, order_id)
+        if order:
+            refresh_daily_movement(
+                db, MovementDirection.IN, order.create_time,
+                {original_material_id, item.material_id}
+            )
+
+        # 修改的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
+
         # 提交事务
         db.commit()
         print("事务提交成功")
@@ -1093,13 +1174,17 @@ async def delete_inbound_order_item(
     
     # 开始事务删除
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
         # 删除库存变更流水记录
-        from models.material.inventory_transaction import InventoryTransaction
-        db.exec(delete(InventoryTransaction).where(
+        transaction_filters = (
             InventoryTransaction.batch_id == item.batch_id,
             InventoryTransaction.reference_id == order_id,
-            InventoryTransaction.reference_type == "inbound"
-        ))
+            InventoryTransaction.reference_type == ReferenceType.INBOUND
+        )
+        history_start = get_earliest_transaction_time(db, *transaction_filters)
+        db.exec(delete(InventoryTransaction).where(*transaction_filters))
         
         # 删除库存明细记录
         db.exec(delete(InventoryDetail).where(InventoryDetail.batch_id == item.batch_id))
@@ -1116,6 +1201,13 @@ async def delete_inbound_order_item(
         order = db.get(InboundOrder, order_id)
         if order:
             order.total_quantity -= item.quantity
+            
+            # 更新每日出入库汇总
+            refresh_daily_movement(db, MovementDirection.IN, order.create_time, [item.material_id])
+        
+        # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
         
         db.commit()
         
@@ -1207,7 +1299,16 @@ async def batch_delete_inbound_order_items(
     
     # 开始事务删除
     try:
+        # 单据、明细、库存、流水和汇总的写入在同一个写事务中完成
+        begin_write_transaction(db)
+        
         # 删除库存变更流水记录
+        history_start = get_earliest_transaction_time(
+            db,
+            InventoryTransaction.reference_id == order_id,
+            InventoryTransaction.reference_type == ReferenceType.INBOUND,
+            InventoryTransaction.batch_id.in_(batch_ids)
+        )
         for item in items:
             db.exec(delete(InventoryTransaction).where(
                 InventoryTransaction.reference_id == item.order_id,
@@ -1236,6 +1337,16 @@ async def batch_delete_inbound_order_items(
                 ).all()
                 order.total_quantity = sum(item.quantity for item in remaining_items)
                 db.add(order)
+                
+                # 更新每日出入库汇总
+                refresh_daily_movement(
+                    db, MovementDirection.IN, order.create_time,
+                    {item.material_id for item in items}
+                )
+        
+        # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
         
         db.commit()
         
@@ -1252,7 +1363,7 @@ async def generate_inbound_order_number(
     db: Session = Depends(get_db),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inbound-orders/generate-order-number"))
 ):
-    """根据日期生成未被使用的最小流水号入库单号"""
+    """根据日期生成入库单号（按日期流水序列递增分配）"""
     
     # 验证日期格式为YYYYMMDD
     if len(date_str) != 8 or not date_str.isdigit():
@@ -1267,52 +1378,16 @@ async def generate_inbound_order_number(
         # 验证日期有效性
         if month < 1 or month > 12 or day < 1 or day > 31:
             raise ValueError("日期无效")
-            
-        # 构建入库单号前缀：RK + 日期
-        order_prefix = f"RK{date_str}-"
-        
-        # 查询系统中所有以该前缀开头的入库单号
-        existing_orders = db.exec(
-            select(InboundOrder.order_number)
-            .where(InboundOrder.order_number.like(f"{order_prefix}%"))
-        ).all()
-        
-        # 提取现有的流水号
-        used_serial_numbers = []
-        for order_number in existing_orders:
-            # 提取流水号部分（最后3位数字）
-            serial_part = order_number.replace(order_prefix, "")
-            if serial_part.isdigit() and len(serial_part) == 3:
-                used_serial_numbers.append(int(serial_part))
-        
-        # 找到最小的未被使用的流水号
-        if not used_serial_numbers:
-            # 如果没有现有订单，从001开始
-            next_serial = 1
-        else:
-            # 找到最小的未被使用的流水号
-            max_serial = max(used_serial_numbers)
-            
-            # 检查是否有空缺的流水号
-            all_possible_serials = set(range(1, max_serial + 2))  # +2确保包含下一个
-            used_set = set(used_serial_numbers)
-            available_serials = all_possible_serials - used_set
-            
-            if available_serials:
-                next_serial = min(available_serials)
-            else:
-                next_serial = max_serial + 1
-        
-        # 确保流水号不超过999
-        if next_serial > 999:
-            raise HTTPException(status_code=400, detail="当日入库单数量已达上限（999），无法生成新的入库单号")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"日期无效: {str(e)}")
+    
+    try:
+        # 按日期前缀的流水序列原子分配流水号，并发请求不会得到相同的单号
+        generated_order_number, next_serial = next_inbound_order_number(db, date_str)
         
         # 格式化流水号为3位数字
         serial_number = str(next_serial).zfill(3)
         
-        # 生成完整的入库单号
-        generated_order_number = f"{order_prefix}{serial_number}"
-        
         return {
             "order_number": generated_order_number,
             "date": date_str,
@@ -1320,7 +1395,7 @@ async def generate_inbound_order_number(
         }
         
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"日期无效: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成入库单号失败: {str(e)}")
 
@@ -0,0 +1,173 @@
+"""
+库存账龄与呆滞分析路由
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from typing import List, Optional
+from datetime import datetime
+from urllib.parse import quote
+import io
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.inventory_aging import InventoryAgingSummaryResponse, InventoryAgingListResponse
+from utils.inventory_aging_utils import (
+    AGING_BASIS_OPTIONS,
+    get_aging_items,
+    get_aging_summary,
+    iter_aging_items,
+    parse_age_bands
+)
+
+inventory_aging_router = APIRouter(prefix="/inventory-aging", tags=["库存账龄与呆滞分析"])
+
+
+def _validate_params(basis: str, bands: Optional[str]) -> List[int]:
+    """校验账龄依据并解析账龄区间"""
+    if basis not in AGING_BASIS_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"账龄依据只能是: {', '.join(AGING_BASIS_OPTIONS)}")
+    try:
+        return parse_age_bands(bands)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="账龄区间格式错误，应为严格递增的正整数天数，如30,90,180,365")
+
+
+@inventory_aging_router.get("/summary", response_model=InventoryAgingSummaryResponse, summary="库存账龄区间汇总")
+async def get_inventory_aging_summary(
+    basis: str = Query("inbound_date", description="账龄依据：inbound_date(入库日期)、production_date(生产日期)"),
+    bands: Optional[str] = Query(None, description="账龄区间上限天数，逗号分隔，默认30,90,180,365,730"),
+    slow_days: int = Query(180, ge=1, description="呆滞判定天数（超过该天数没有出库）"),
+    warehouse_id: Optional[int] = Query(None, description="仓库ID"),
+    material_id: Optional[int] = Query(None, description="器材ID"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-aging/summary"))
+):
+    """按账龄区间汇总结存数量和金额，并汇总呆滞器材"""
+    band_limits = _validate_params(basis, bands)
+    try:
+        return InventoryAgingSummaryResponse(**get_aging_summary(
+            db, basis, band_limits, slow_days, warehouse_id=warehouse_id, material_id=material_id
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取库存账龄汇总失败: {str(e)}")
+
+
+@inventory_aging_router.get("", response_model=InventoryAgingListResponse, summary="分页查询批次账龄明细")
+async def get_inventory_aging_items(
+    basis: str = Query("inbound_date", description="账龄依据：inbound_date(入库日期)、production_date(生产日期)"),
+    bands: Optional[str] = Query(None, description="账龄区间上限天数，逗号分隔，默认30,90,180,365,730"),
+    slow_days: int = Query(180, ge=1, description="呆滞判定天数（超过该天数没有出库）"),
+    only_slow: bool = Query(False, description="只查询呆滞器材的批次"),
+    band: Optional[int] = Query(None, ge=-1, description="只查询指定账龄区间（区间序号，-1为无日期）"),
+    warehouse_id: Optional[int] = Query(None, description="仓库ID"),
+    material_id: Optional[int] = Query(None, description="器材ID"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=1000, description="每页记录数"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-aging"))
+):
+    """按账龄从长到短分页返回有库存的批次，标记呆滞器材"""
+    band_limits = _validate_params(basis, bands)
+    try:
+        return InventoryAgingListResponse(**get_aging_items(
+            db, basis, band_limits, slow_days,
+            warehouse_id=warehouse_id,
+            material_id=material_id,
+            only_slow=only_slow,
+            band_filter=band,
+            page=page,
+            page_size=page_size
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取批次账龄明细失败: {str(e)}")
+
+
+@inventory_aging_router.get("/export-excel", summary="导出批次账龄明细到Excel文件")
+async def export_inventory_aging_to_excel(
+    basis: str = Query("inbound_date", description="账龄依据：inbound_date(入库日期)、production_date(生产日期)"),
+    bands: Optional[str] = Query(None, description="账龄区间上限天数，逗号分隔，默认30,90,180,365,730"),
+    slow_days: int = Query(180, ge=1, description="呆滞判定天数（超过该天数没有出库）"),
+    only_slow: bool = Query(False, description="只导出呆滞器材的批次"),
+    band: Optional[int] = Query(None, ge=-1, description="只导出指定账龄区间（区间序号，-1为无日期）"),
+    warehouse_id: Optional[int] = Query(None, description="仓库ID"),
+    material_id: Optional[int] = Query(None, description="器材ID"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-aging/export-excel"))
+):
+    """
+    导出批次账龄明细（含呆滞标记）
+
+    使用openpyxl只写模式逐行写入，导出全部数据不受分页限制
+    """
+    band_limits = _validate_params(basis, bands)
+    try:
+        workbook = Workbook(write_only=True)
+        workbook.add_named_style(NamedStyle(
+            name="aging_header",
+            font=Font(bold=True),
+            fill=PatternFill(fill_type="solid", fgColor="C0C0C0"),
+            alignment=Alignment(vertical="center", horizontal="center")
+        ))
+        worksheet = workbook.create_sheet("批次账龄明细")
+
+        headers = [
+            '器材编码', '器材名称', '器材规格型号', '批次编号', '单位', '单价',
+            '入库日期', '生产日期', '账龄天数', '账龄区间', '结存数量', '结存金额',
+            '最近出库时间', '距最近出库天数', '是否呆滞'
+        ]
+        for col in range(1, len(headers) + 1):
+            worksheet.column_dimensions[get_column_letter(col)].width = 15
+
+        def header_cell(value):
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.style = "aging_header"
+            return cell
+
+        worksheet.append([header_cell(header) for header in headers])
+
+        for item in iter_aging_items(
+            db, basis, band_limits, slow_days,
+            warehouse_id=warehouse_id,
+            material_id=material_id,
+            only_slow=only_slow,
+            band_filter=band
+        ):
+            worksheet.append([
+                item["material_code"],
+                item["material_name"],
+                item["material_specification"],
+                item["batch_number"],
+                item["unit"],
+                item["unit_price"],
+                item["inbound_date"].strftime('%Y-%m-%d') if item["inbound_date"] else '',
+                item["production_date"].strftime('%Y-%m-%d') if item["production_date"] else '',
+                item["age_days"] if item["age_days"] is not None else '',
+                item["age_band"],
+                item["quantity"],
+                item["value"],
+                item["last_out_time"].strftime('%Y-%m-%d %H:%M:%S') if item["last_out_time"] else '',
+                item["days_since_last_out"] if item["days_since_last_out"] is not None else '',
+                '是' if item["is_slow_moving"] else '否'
+            ])
+
+        file_stream = io.BytesIO()
+        workbook.save(file_stream)
+        file_stream.seek(0)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        encoded_filename = quote(f"批次账龄明细_{timestamp}.xlsx", safe='')
+        return StreamingResponse(
+            file_stream,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导出Excel文件失败: {str(e)}")
@@ -21,6 +21,7 @@ from models.base.major import Major
 from models.base.equipment import Equipment
 from models.base.supplier import Supplier
 from schemas.material.batch_code import BatchCodeGenerateRequest, BatchCodeGenerateResponse
+from utils.sequence_utils import next_batch_code
 import openpyxl
 from openpyxl.styles import Font, Alignment, Border, Side
 import io
@@ -529,60 +530,11 @@ async def generate_batch_code(
         if not material:
             raise HTTPException(status_code=404, detail="器材不存在")
         
-        # 获取器材编码（10位）
-        material_code = material.material_code
-        if len(material_code) > 10:
-            material_code = material_code[:10]  # 截取前10位
-        elif len(material_code) < 10:
-            material_code = material_code.ljust(10, '0')  # 不足10位补0
-        
-        # 格式化日期为YYYYMMDD
-        date_str = request.batch_date.strftime("%Y%m%d")
-        
-        # 构建批次编码前缀：器材编码 + "-" + 日期
-        batch_prefix = f"{material_code}-{date_str}"
-        
-        # 查询系统中所有以该前缀开头的批次编码
-        existing_batches = db.exec(
-            select(InventoryBatch.batch_number)
-            .where(InventoryBatch.batch_number.like(f"{batch_prefix}%"))
-        ).all()
-        
-        # 提取现有的流水号
-        used_serial_numbers = []
-        for batch_number in existing_batches:
-            # 提取流水号部分（最后3位数字）
-            serial_part = batch_number.replace(batch_prefix, "")
-            if serial_part.isdigit() and len(serial_part) == 3:
-                used_serial_numbers.append(int(serial_part))
-        
-        # 找到最小的未被使用的流水号
-        if not used_serial_numbers:
-            # 如果没有现有批次，从001开始
-            next_serial = 1
-        else:
-            # 找到最小的未被使用的流水号
-            max_serial = max(used_serial_numbers)
-            
-            # 检查是否有空缺的流水号
-            all_possible_serials = set(range(1, max_serial + 2))  # +2确保包含下一个
-            used_set = set(used_serial_numbers)
-            available_serials = all_possible_serials - used_set
-            
-            if available_serials:
-                next_serial = min(available_serials)
-            else:
-                next_serial = max_serial + 1
-        
-        # 确保流水号不超过999
-        if next_serial > 999:
-            raise HTTPException(status_code=400, detail="当日该器材批次数量已达上限（999），无法生成新的批次编码")
-        
-        # 格式化流水号为3位数字
-        serial_number = str(next_serial).zfill(3)
-        
-        # 生成完整的批次编码
-        batch_code = f"{batch_prefix}{serial_number}"
+        # 按器材编码+日期前缀的流水序列原子分配流水号，并发请求不会得到相同的批次编码
+        try:
+            batch_code, next_serial = next_batch_code(db, material.material_code, request.batch_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return BatchCodeGenerateResponse(
             batch_code=batch_code,
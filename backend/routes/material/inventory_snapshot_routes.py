@@ -0,0 +1,71 @@
+"""
+库存快照与历史时点库存查询路由
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from sqlmodel import Session, select
+from typing import List, Optional
+from datetime import date, datetime, time
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.inventory_snapshot import InventorySnapshotResponse, StockAsOfResponse
+from models.material.inventory_snapshot import InventorySnapshot
+from utils.inventory_snapshot_utils import create_inventory_snapshot, get_stock_as_of
+
+inventory_snapshots_router = APIRouter(prefix="/inventory-snapshots", tags=["库存快照与历史库存"])
+
+
+@inventory_snapshots_router.get("", response_model=List[InventorySnapshotResponse], summary="查询库存快照列表")
+async def get_inventory_snapshots(
+    limit: int = Query(24, ge=1, le=240, description="返回数量"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-snapshots"))
+):
+    """按快照时间倒序返回库存快照"""
+    snapshots = db.exec(
+        select(InventorySnapshot).order_by(InventorySnapshot.snapshot_time.desc()).limit(limit)
+    ).all()
+    return [InventorySnapshotResponse.model_validate(snapshot) for snapshot in snapshots]
+
+
+@inventory_snapshots_router.post("", response_model=InventorySnapshotResponse, summary="立即创建库存快照")
+async def create_snapshot(
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-snapshots/new"))
+):
+    """保存当前库存明细快照（定时任务每月自动创建，此接口用于手动补充）"""
+    try:
+        snapshot = create_inventory_snapshot(db, creator=current_user.username)
+        return InventorySnapshotResponse.model_validate(snapshot)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"创建库存快照失败: {str(e)}")
+
+
+@inventory_snapshots_router.get("/stock-as-of", response_model=StockAsOfResponse, summary="查询历史时点库存")
+async def get_stock_as_of_date(
+    as_of_date: date = Query(..., description="查询日期（返回当日结束时的库存）"),
+    as_of_time: Optional[time] = Query(None, description="查询时刻，不传则为当日结束"),
+    material_id: Optional[int] = Query(None, description="器材ID"),
+    bin_id: Optional[int] = Query(None, description="货位ID"),
+    batch_id: Optional[int] = Query(None, description="批次ID"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-snapshots/stock-as-of"))
+):
+    """
+    查询指定日期（时刻）的库存
+
+    以最接近查询时间的库存快照或当前库存为基准，回放两者之间的库存变更流水
+    """
+    as_of = datetime.combine(as_of_date, as_of_time or time.max)
+    try:
+        return StockAsOfResponse(**get_stock_as_of(
+            db,
+            as_of=as_of,
+            material_id=material_id,
+            bin_id=bin_id,
+            batch_id=batch_id
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询历史时点库存失败: {str(e)}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Security, HTTPException
+from fastapi import APIRouter, Depends, Security, HTTPException, Query
 from sqlmodel import Session, select, func, and_, or_
 from typing import List, Optional
 import logging
@@ -11,18 +11,39 @@ from models.material.material import Material
 from models.material.inventory_batch import InventoryBatch
 from models.material.inbound_order import InboundOrder
 from models.material.outbound_order import OutboundOrder
+from models.material.stocktake import Stocktake
 from schemas.material.inventory_transaction import (
     InventoryTransactionCreate, InventoryTransactionUpdate, InventoryTransactionResponse,
     InventoryTransactionQueryParams, InventoryTransactionPaginationResult,
     InventoryTransactionListResponse, InventoryTransactionStatistics,
-    InventoryTransactionDetailResponse
+    InventoryTransactionGroupBy, InventoryTransactionDetailResponse
 )
+from utils.inventory_transaction_utils import get_transaction_statistics
+from utils.inventory_stock_utils import IN_CHUNK_SIZE
 from schemas.account.user import UserResponse
 from core.security import get_current_active_user, get_required_scopes_for_route
 from database import get_db
 
 inventory_transactions_router = APIRouter(tags=["库存变更流水管理"], prefix="/inventory-transactions")
 
+
+def _load_material_batch_maps(db: Session, transactions):
+    """按流水涉及的器材ID、批次ID分块查询器材和批次（每块IN_CHUNK_SIZE个ID）"""
+    material_ids = list({t.material_id for t in transactions})
+    batch_ids = list({t.batch_id for t in transactions})
+    material_map = {}
+    batch_map = {}
+    for start in range(0, len(material_ids), IN_CHUNK_SIZE):
+        chunk = material_ids[start:start + IN_CHUNK_SIZE]
+        for material in db.exec(select(Material).where(Material.id.in_(chunk))).all():
+            material_map[material.id] = material
+    for start in range(0, len(batch_ids), IN_CHUNK_SIZE):
+        chunk = batch_ids[start:start + IN_CHUNK_SIZE]
+        for batch in db.exec(select(InventoryBatch).where(InventoryBatch.batch_id.in_(chunk))).all():
+            batch_map[batch.batch_id] = batch
+    return material_map, batch_map
+
+
 # 获取库存变更流水分页列表
 @inventory_transactions_router.get("", response_model=InventoryTransactionPaginationResult)
 def read_inventory_transactions(
@@ -118,19 +139,7 @@ def read_inventory_transactions(
     transactions = db.exec(query).all()
     
     # 获取器材和批次信息映射
-    material_map = {}
-    batch_map = {}
-    if transactions:
-        material_ids = [t.material_id for t in transactions]
-        batch_ids = [t.batch_id for t in transactions]
-        
-        if material_ids:
-            materials = db.exec(select(Material).where(Material.id.in_(material_ids))).all()
-            material_map = {material.id: material for material in materials}
-        
-        if batch_ids:
-            batches = db.exec(select(InventoryBatch).where(InventoryBatch.batch_id.in_(batch_ids))).all()
-            batch_map = {batch.batch_id: batch for batch in batches}
+    material_map, batch_map = _load_material_batch_maps(db, transactions)
     
     # 构建响应数据
     transaction_responses = []
@@ -149,8 +158,11 @@ def read_inventory_transactions(
             if outbound_order:
                 reference_number = outbound_order.order_number
         elif transaction.reference_type == ReferenceType.STOCKTAKE and transaction.reference_id:
-            # 盘点单号处理（如果需要）
-            reference_number = f"盘点单-{transaction.reference_id}"
+            stocktake = db.exec(select(Stocktake).where(Stocktake.stocktake_id == transaction.reference_id)).first()
+            if stocktake:
+                reference_number = stocktake.stocktake_number
+        elif transaction.reference_type == ReferenceType.TRANSFER and transaction.reference_id:
+            reference_number = f"移库-{transaction.reference_id}"
         
         transaction_dict = {
             "transaction_id": transaction.transaction_id,
@@ -269,19 +281,7 @@ def get_all_inventory_transactions(
     transactions = db.exec(query).all()
     
     # 获取器材和批次信息映射
-    material_map = {}
-    batch_map = {}
-    if transactions:
-        material_ids = [t.material_id for t in transactions]
-        batch_ids = [t.batch_id for t in transactions]
-        
-        if material_ids:
-            materials = db.exec(select(Material).where(Material.id.in_(material_ids))).all()
-            material_map = {material.id: material for material in materials}
-        
-        if batch_ids:
-            batches = db.exec(select(InventoryBatch).where(InventoryBatch.batch_id.in_(batch_ids))).all()
-            batch_map = {batch.batch_id: batch for batch in batches}
+    material_map, batch_map = _load_material_batch_maps(db, transactions)
     
     # 构建响应数据
     transaction_responses = []
@@ -300,8 +300,11 @@ def get_all_inventory_transactions(
             if outbound_order:
                 reference_number = outbound_order.order_number
         elif transaction.reference_type == ReferenceType.STOCKTAKE and transaction.reference_id:
-            # 盘点单号处理（如果需要）
-            reference_number = f"盘点单-{transaction.reference_id}"
+            stocktake = db.exec(select(Stocktake).where(Stocktake.stocktake_id == transaction.reference_id)).first()
+            if stocktake:
+                reference_number = stocktake.stocktake_number
+        elif transaction.reference_type == ReferenceType.TRANSFER and transaction.reference_id:
+            reference_number = f"移库-{transaction.reference_id}"
         
         transaction_dict = {
             "transaction_id": transaction.transaction_id,
@@ -356,8 +359,11 @@ def get_inventory_transaction_by_id(
         if outbound_order:
             reference_number = outbound_order.order_number
     elif transaction.reference_type == ReferenceType.STOCKTAKE and transaction.reference_id:
-        # 盘点单号处理（如果需要）
-        reference_number = f"盘点单-{transaction.reference_id}"
+        stocktake = db.exec(select(Stocktake).where(Stocktake.stocktake_id == transaction.reference_id)).first()
+        if stocktake:
+            reference_number = stocktake.stocktake_number
+    elif transaction.reference_type == ReferenceType.TRANSFER and transaction.reference_id:
+        reference_number = f"移库-{transaction.reference_id}"
     
     transaction_dict = {
         "transaction_id": transaction.transaction_id,
@@ -402,6 +408,7 @@ def create_inventory_transaction(
     transaction = InventoryTransaction(
         material_id=transaction_data.material_id,
         batch_id=transaction_data.batch_id,
+        bin_id=transaction_data.bin_id,
         change_type=transaction_data.change_type,
         quantity_change=transaction_data.quantity_change,
         quantity_before=transaction_data.quantity_before,
@@ -427,8 +434,11 @@ def create_inventory_transaction(
         if outbound_order:
             reference_number = outbound_order.order_number
     elif transaction.reference_type == ReferenceType.STOCKTAKE and transaction.reference_id:
-        # 盘点单号处理（如果需要）
-        reference_number = f"盘点单-{transaction.reference_id}"
+        stocktake = db.exec(select(Stocktake).where(Stocktake.stocktake_id == transaction.reference_id)).first()
+        if stocktake:
+            reference_number = stocktake.stocktake_number
+    elif transaction.reference_type == ReferenceType.TRANSFER and transaction.reference_id:
+        reference_number = f"移库-{transaction.reference_id}"
     
     # 构建响应数据
     transaction_dict = {
@@ -458,48 +468,27 @@ def get_inventory_transaction_statistics(
     batch_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    reference_type: Optional[ReferenceType] = None,
+    group_by: Optional[InventoryTransactionGroupBy] = None,
+    group_page: int = Query(1, ge=1, description="分组页码"),
+    group_page_size: int = Query(100, ge=1, le=IN_CHUNK_SIZE, description="每页分组数量"),
     db: Session = Depends(get_db),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-transactions"))
 ):
-    """获取库存变更统计信息（需要IO_read权限）"""
-    
-    # 构建查询条件
-    query = select(InventoryTransaction)
-    
-    if material_id:
-        query = query.where(InventoryTransaction.material_id == material_id)
-    
-    if batch_id:
-        query = query.where(InventoryTransaction.batch_id == batch_id)
-    
-    if start_date:
-        query = query.where(InventoryTransaction.transaction_time >= start_date)
-    
-    if end_date:
-        query = query.where(InventoryTransaction.transaction_time <= end_date)
-    
-    # 执行查询
-    transactions = db.exec(query).all()
-    
-    # 统计信息
-    total_in = 0
-    total_out = 0
-    total_adjust = 0
-    
-    for transaction in transactions:
-        if transaction.change_type == ChangeType.IN:
-            total_in += transaction.quantity_change
-        elif transaction.change_type == ChangeType.OUT:
-            total_out += abs(transaction.quantity_change)  # 出库数量取绝对值
-        elif transaction.change_type == ChangeType.ADJUST:
-            total_adjust += transaction.quantity_change
-    
-    net_change = total_in - total_out + total_adjust
+    """获取库存变更统计信息，可按器材、批次、日期或关联单据类型分组，分组结果分页返回（需要IO_read权限）"""
+    
+    stats = get_transaction_statistics(
+        db=db,
+        material_id=material_id,
+        batch_id=batch_id,
+        start_date=start_date,
+        end_date=end_date,
+        reference_type=reference_type,
+        group_by=group_by.value if group_by else None,
+        group_page=group_page,
+        group_page_size=group_page_size
+    )
     
     return InventoryTransactionStatistics(
-        total_in=total_in,
-        total_out=total_out,
-        total_adjust=total_adjust,
-        net_change=net_change,
-        transaction_count=len(transactions)
+        group_by=group_by, group_page=group_page, group_page_size=group_page_size, **stats
     )
\ No newline at end of file
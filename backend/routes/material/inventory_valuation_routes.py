@@ -0,0 +1,49 @@
+"""
+库存计价路由（加权平均 / 先进先出）
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from sqlmodel import Session
+from typing import Optional
+from datetime import date, datetime, time
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.inventory_valuation import InventoryValuationResponse
+from utils.inventory_valuation_utils import VALUATION_GROUP_BY_OPTIONS, get_inventory_valuation
+
+inventory_valuation_router = APIRouter(prefix="/inventory-valuation", tags=["库存计价"])
+
+
+@inventory_valuation_router.get("", response_model=InventoryValuationResponse, summary="查询库存计价")
+async def get_inventory_valuation_list(
+    as_of_date: Optional[date] = Query(None, description="计价日期（按当日结束时计价），不传则为当前时间"),
+    group_by: str = Query("material", description="分组方式：material(按器材)、warehouse(按器材+仓库)"),
+    material_id: Optional[int] = Query(None, description="器材ID"),
+    warehouse_id: Optional[int] = Query(None, description="仓库ID"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=1000, description="每页记录数"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/inventory-valuation"))
+):
+    """
+    按加权平均和先进先出计算指定日期的库存金额
+
+    同时返回按批次单价计算的批次成本金额，便于对比
+    """
+    if group_by not in VALUATION_GROUP_BY_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"分组方式只能是: {', '.join(VALUATION_GROUP_BY_OPTIONS)}")
+    # 不传日期时按当前库存计价（使用固定的缓存键，不按请求时间区分）
+    as_of = datetime.combine(as_of_date, time.max) if as_of_date else None
+    try:
+        return InventoryValuationResponse(**get_inventory_valuation(
+            db,
+            as_of=as_of,
+            group_by=group_by,
+            material_id=material_id,
+            warehouse_id=warehouse_id,
+            page=page,
+            page_size=page_size
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询库存计价失败: {str(e)}")
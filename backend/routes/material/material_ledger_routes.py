@@ -4,6 +4,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Security
 from sqlmodel import Session, select
 from typing import List, Dict, Any
+from datetime import date
 import tempfile
 import os
 from pathlib import Path
@@ -15,7 +16,9 @@ from models.material.inbound_order import InboundOrder
 from models.material.inbound_order_item import InboundOrderItem
 from models.material.material import Material
 from models.material.inventory_batch import InventoryBatch
+from schemas.material.period_balance import StockCardResponse
 from utils.pdf_generator import generate_material_ledger_pdf
+from utils.period_balance_utils import get_stock_card
 
 material_ledger_router = APIRouter(prefix="/material-ledger", tags=["器材分类账页"])
 
@@ -131,3 +134,27 @@ async def generate_material_ledger_pdf_by_order_number(
         if 'temp_path' in locals() and os.path.exists(temp_path):
             os.unlink(temp_path)
         raise HTTPException(status_code=500, detail=f"生成器材分类账页PDF失败: {str(e)}")
+
+
+@material_ledger_router.get("/stock-card/{material_id}", response_model=StockCardResponse, summary="器材收发卡片")
+async def get_material_stock_card(
+    material_id: int,
+    start_date: date = Query(..., description="开始日期"),
+    end_date: date = Query(..., description="结束日期"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/material-ledger/stock-card"))
+):
+    """
+    查询器材在指定区间的收发卡片
+
+    返回期初结存、区间内逐笔收发及结存，期初取最近一次月结的期末余额
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    try:
+        stock_card = get_stock_card(db, material_id, start_date, end_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询器材收发卡片失败: {str(e)}")
+    if stock_card is None:
+        raise HTTPException(status_code=404, detail=f"器材ID {material_id} 不存在")
+    return StockCardResponse(**stock_card)
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Security, Response
-from sqlmodel import Session, select, func, and_, or_
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Security, Response
+from sqlmodel import Session, select, func, and_, or_, delete, update
 from typing import Optional
 from datetime import date, datetime
 import os
@@ -22,11 +22,29 @@ from models.base.bin import Bin
 from models.material.inventory_batch import InventoryBatch
 from models.material.inventory_detail import InventoryDetail
 from models.material.inventory_transaction import InventoryTransaction, ReferenceType
+from models.material.daily_inventory_movement import MovementDirection
 from utils import create_outbound_transaction
+from utils.inventory_movement_utils import refresh_daily_movement, get_order_material_ids
+from utils.sequence_utils import OUTBOUND_ORDER_PATTERN, next_outbound_order_number, sync_sequence_with_number
+from utils.inventory_stock_utils import (
+    adjust_stock, begin_write_transaction, decrease_stock, find_stock_detail, get_return_detail, increase_stock,
+    restore_outbound_items_stock
+)
+from utils.order_statistics_utils import build_order_date_filters, aggregate_orders_by
+from utils.idempotency_utils import (
+    IDEMPOTENCY_HEADER, claim_idempotency_key, complete_idempotency_key, release_idempotency_key
+)
 from utils.inventory_transaction_utils import (
-    delete_inventory_transaction, get_inventory_transactions_by_criteria, update_inventory_transaction
+    delete_inventory_transaction, get_earliest_transaction_time, get_inventory_transactions_by_criteria,
+    update_inventory_transaction
 )
+from utils.period_balance_utils import reclose_periods_since
+from utils.inventory_snapshot_utils import discard_snapshots_since
 from utils.pdf_generator import generate_outbound_order_pdf
+from utils.stock_allocation_utils import (
+    ALLOCATION_STRATEGIES, DEFAULT_ALLOCATION_STRATEGY, allocate_stock, deduct_allocated_stock
+)
+from schemas.material.stock_allocation import StockAllocationResponse
 
 # 创建出库单管理路由
 outbound_orders_router = APIRouter(tags=["出库单管理"], prefix="/outbound-orders")
@@ -243,12 +261,60 @@ async def get_outbound_order(
     )
 
 
+@outbound_orders_router.get("/allocation", response_model=StockAllocationResponse, summary="预览出库批次自动分配")
+async def preview_stock_allocation(
+    material_id: int = Query(..., description="器材ID"),
+    quantity: int = Query(..., ge=1, description="出库数量"),
+    strategy: str = Query(DEFAULT_ALLOCATION_STRATEGY, description="分配策略：fifo(先入库先出)、fefo(先生产先出)"),
+    warehouse_id: Optional[int] = Query(None, description="只从该仓库分配"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/outbound-orders/allocation"))
+):
+    """
+    按先进先出或先到期先出计算出库数量在各批次货位上的分配
+
+    只计算不扣减库存；可用库存不足时返回能分配的部分和缺口数量。
+    """
+    if not db.get(Material, material_id):
+        raise HTTPException(status_code=404, detail="器材不存在")
+    try:
+        return allocate_stock(db, material_id, quantity, strategy=strategy, warehouse_id=warehouse_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @outbound_orders_router.post("", response_model=OutboundOrderResponse)
 async def create_outbound_order(
     order_data: OutboundOrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, description="幂等键，客户端重试时使用相同的值"),
     db: Session = Depends(get_db),
     current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/outbound-orders/"))
 ):
+    """
+    创建新出库单
+
+    items按指定批次出库；material_items按器材出库，由系统按allocation_strategy
+    （fifo先入库先出/fefo先生产先出）自动分配批次货位，与其他明细在同一次创建中扣减。
+    请求头携带Idempotency-Key时，相同键的重试直接返回首次创建的结果，不会重复创建。
+    """
+    replay = claim_idempotency_key(db, idempotency_key, "POST /outbound-orders", order_data, current_user.username)
+    if replay is not None:
+        return replay
+    
+    try:
+        response = await _create_outbound_order(order_data, db, current_user)
+    except Exception:
+        release_idempotency_key(db, idempotency_key)
+        raise
+    complete_idempotency_key(db, idempotency_key, response)
+    return response
+
+
+async def _create_outbound_order(
+    order_data: OutboundOrderCreate,
+    db: Session,
+    current_user: UserResponse
+) -> OutboundOrderResponse:
     """创建新出库单"""
     
     # 验证出库单号唯一性
@@ -262,9 +328,19 @@ async def create_outbound_order(
         raise HTTPException(status_code=400, detail="客户不存在")
     
     # 验证是否有明细项
-    if not order_data.items or len(order_data.items) == 0:
+    if not order_data.items and not order_data.material_items:
         raise HTTPException(status_code=400, detail="出库单至少需要包含一个明细项")
     
+    # 验证按器材出库的明细（批次在扣减库存时按分配策略自动分配）
+    if order_data.material_items and order_data.allocation_strategy not in ALLOCATION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"不支持的分配策略: {order_data.allocation_strategy}")
+    material_lines = []
+    for material_item in order_data.material_items:
+        material = db.get(Material, material_item.material_id)
+        if not material:
+            raise HTTPException(status_code=400, detail=f"器材ID {material_item.material_id} 不存在")
+        material_lines.append((material, material_item.quantity))
+    
     # 预验证所有明细数据，但不进行实际修改
     validated_items = []
     total_quantity = 0
@@ -298,8 +374,39 @@ async def create_outbound_order(
         
         total_quantity += item_data.quantity
     
+    total_quantity += sum(quantity for _, quantity in material_lines)
+    
     # 开始事务，只有当所有明细都验证通过后才创建出库单
     try:
+        # 库存扣减、出库单、明细、流水在同一个写事务中提交，失败时整体回滚
+        begin_write_transaction(db)
+        
+        # 逐条条件扣减库存，库存已被其他出库单占用时扣减失败
+        for validated in validated_items:
+            quantity_after = decrease_stock(db, validated['inventory_detail'], validated['item_data'].quantity)
+            if quantity_after is None:
+                raise HTTPException(status_code=400, detail=f"器材 {validated['material'].material_name} 库存不足")
+            validated['quantity_after'] = quantity_after
+        
+        # 按器材出库的明细：在写事务中按分配策略分配批次货位并扣减，每个批次货位生成一条出库明细
+        for material, quantity in material_lines:
+            try:
+                allocated = deduct_allocated_stock(
+                    db, material.id, quantity,
+                    strategy=order_data.allocation_strategy,
+                    warehouse_id=order_data.warehouse_id
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"器材 {material.material_name} {str(e)}")
+            for inventory_detail, allocated_quantity, quantity_after in allocated:
+                validated_items.append({
+                    'item_data': OutboundOrderItemCreate(batch_id=inventory_detail.batch_id, quantity=allocated_quantity),
+                    'batch': db.get(InventoryBatch, inventory_detail.batch_id),
+                    'material': material,
+                    'inventory_detail': inventory_detail,
+                    'quantity_after': quantity_after
+                })
+        
         # 创建出库单记录
         new_order = OutboundOrder(
             order_number=order_data.order_number,
@@ -314,6 +421,9 @@ async def create_outbound_order(
         # 刷新以获取自动生成的order_id，但不提交事务
         db.flush()
         
+        # 手工录入的单号符合生成格式时推进流水序列，避免之后生成重复单号
+        sync_sequence_with_number(db, new_order.order_number, OUTBOUND_ORDER_PATTERN)
+        
         # 处理已验证的明细记录
         for validated in validated_items:
             item_data = validated['item_data']
@@ -336,24 +446,26 @@ async def create_outbound_order(
             )
             db.add(new_item)
             
-            # 更新库存明细数量
-            inventory_detail.quantity -= item_data.quantity
-            inventory_detail.last_updated = datetime.now().date()
-            db.add(inventory_detail)
-            
             # 记录库存变更流水
             transaction = create_outbound_transaction(
                 db=db,
                 material_id=batch.material_id,
                 batch_id=item_data.batch_id,
                 quantity_change=-item_data.quantity,  # 出库数量为负数
-                quantity_before=inventory_detail.quantity + item_data.quantity,  # 出库前数量
-                quantity_after=inventory_detail.quantity,  # 出库后数量
+                quantity_before=validated['quantity_after'] + item_data.quantity,  # 出库前数量
+                quantity_after=validated['quantity_after'],  # 出库后数量
                 reference_id=new_order.order_id,
-                creator=current_user.username
+                creator=current_user.username,
+                bin_id=inventory_detail.bin_id
             )
             db.add(transaction)
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(
+            db, MovementDirection.OUT, new_order.create_time,
+            {validated['batch'].material_id for validated in validated_items}
+        )
+        
         db.commit()
         db.refresh(new_order)
         
@@ -368,6 +480,9 @@ async def create_outbound_order(
             create_time=new_order.create_time
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         # 提供更详细的错误信息
@@ -389,40 +504,37 @@ async def delete_outbound_order(
     
     # 开始事务
     try:
-        # 查询出库单明细
-        items_query = select(OutboundOrderItem).where(OutboundOrderItem.order_id == order_id)
-        items = db.exec(items_query).all()
-        
-        # 恢复库存数量
-        for item in items:
-            # 查询库存明细（批次号已确定器材信息，只需根据batch_id和bin_id确定唯一记录）
-            inventory_detail = db.exec(select(InventoryDetail).where(
-                InventoryDetail.batch_id == item.batch_id
-            )).first()
-            
-            if inventory_detail:
-                inventory_detail.quantity += item.quantity
-                db.add(inventory_detail)
-            else:
-                # 如果找不到对应的库存明细，记录警告信息
-                print(f"警告：找不到对应的库存明细记录，batch_id={item.batch_id}, bin_id={item.bin_id}")
-            
-        # 删除库存变更流水（使用工具函数）
-        transactions = get_inventory_transactions_by_criteria(
-            db=db,
-            reference_id=order.order_id,
-            reference_type=ReferenceType.OUTBOUND
+        # 受影响的器材（用于更新每日出入库汇总）
+        material_ids = set(db.exec(
+            select(OutboundOrderItem.material_id).where(OutboundOrderItem.order_id == order_id).distinct()
+        ).all())
+        movement_date = order.create_time
+        
+        # 库存退回、流水和明细删除在同一个写事务中完成，均为按出库单的集合操作
+        begin_write_transaction(db)
+        
+        # 按批次汇总退回库存数量
+        restore_outbound_items_stock(db, OutboundOrderItem.order_id == order_id)
+        
+        # 删除该出库单的全部库存变更流水
+        transaction_filters = (
+            InventoryTransaction.reference_type == ReferenceType.OUTBOUND,
+            InventoryTransaction.reference_id == order_id
         )
-        print(f"删除前库存变更流水数量: {len(transactions)}")
-        for transaction in transactions:
-            delete_inventory_transaction(db=db, transaction_id=transaction.transaction_id)
+        history_start = get_earliest_transaction_time(db, *transaction_filters)
+        db.exec(delete(InventoryTransaction).where(*transaction_filters))
         
-        # 删除出库单明细
-        for item in items:
-            db.delete(item)
+        # 删除出库单明细和出库单
+        db.exec(delete(OutboundOrderItem).where(OutboundOrderItem.order_id == order_id))
+        db.exec(delete(OutboundOrder).where(OutboundOrder.order_id == order_id))
+        db.expunge(order)
+        
+        # 更新每日出入库汇总
+        refresh_daily_movement(db, MovementDirection.OUT, movement_date, material_ids)
         
-        # 删除出库单
-        db.delete(order)
+        # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
         
         db.commit()
         
@@ -447,8 +559,16 @@ async def update_outbound_create_time(
         raise HTTPException(status_code=404, detail="出库单不存在")
     
     # 更新创建时间
+    old_create_time = order.create_time
     order.create_time = update_data.create_time
     db.add(order)
+    
+    # 单据日期变化时，原日期和新日期的汇总都需要重算
+    if old_create_time.date() != update_data.create_time.date():
+        material_ids = get_order_material_ids(db, MovementDirection.OUT, order_id)
+        refresh_daily_movement(db, MovementDirection.OUT, old_create_time, material_ids)
+        refresh_daily_movement(db, MovementDirection.OUT, update_data.create_time, material_ids)
+    
     db.commit()
     
     return {"message": "出库单创建时间修改成功", "updated_fields": {
@@ -465,65 +585,42 @@ async def get_outbound_order_statistics(
 ):
     """获取出库单统计信息"""
     
-    # 构建查询条件
-    query = select(OutboundOrder)
-    
     # 日期筛选
-    if start_date:
-        query = query.where(OutboundOrder.create_time >= start_date)
-    if end_date:
-        query = query.where(OutboundOrder.create_time <= end_date)
+    filters = build_order_date_filters(OutboundOrder, start_date, end_date)
     
-    # 执行查询
-    orders = db.exec(query).all()
-    
-    # 统计信息
-    total_orders = len(orders)
-    total_quantity = sum(order.total_quantity for order in orders)
-    total_amount = sum(
-        sum(item.quantity * item.unit_price for item in order.items) 
-        for order in orders
-    )
-    
-    # 按客户统计
-    customer_stats = {}
-    for order in orders:
-        if order.customer_name not in customer_stats:
-            customer_stats[order.customer_name] = {
-                "customer_name": order.customer_name,
-                "order_count": 0,
-                "total_quantity": 0,
-                "total_amount": 0
-            }
-        customer_stats[order.customer_name]["order_count"] += 1
-        customer_stats[order.customer_name]["total_quantity"] += order.total_quantity
-        customer_stats[order.customer_name]["total_amount"] += sum(
-            item.quantity * item.unit_price for item in order.items
-        )
+    # 按客户统计（单数、数量来自出库单，金额来自明细聚合）
+    customer_rows = aggregate_orders_by(db, OutboundOrder, OutboundOrderItem, OutboundOrder.customer_name, filters)
     
     # 按日期统计
-    date_stats = {}
-    for order in orders:
-        date_str = order.create_time.date().isoformat()
-        if date_str not in date_stats:
-            date_stats[date_str] = {
-                "date": date_str,
-                "order_count": 0,
-                "total_quantity": 0,
-                "total_amount": 0
-            }
-        date_stats[date_str]["order_count"] += 1
-        date_stats[date_str]["total_quantity"] += order.total_quantity
-        date_stats[date_str]["total_amount"] += sum(
-            item.quantity * item.unit_price for item in order.items
-        )
+    date_rows = aggregate_orders_by(db, OutboundOrder, OutboundOrderItem, func.date(OutboundOrder.create_time), filters)
+    
+    # 总计由客户分组结果汇总
+    total_orders = sum(row[1] for row in customer_rows)
+    total_quantity = sum(row[2] for row in customer_rows)
+    total_amount = sum(row[3] for row in customer_rows)
     
     return OutboundOrderStatistics(
         total_orders=total_orders,
         total_quantity=total_quantity,
         total_amount=total_amount,
-        customer_stats=list(customer_stats.values()),
-        date_stats=list(date_stats.values())
+        customer_stats=[
+            {
+                "customer_name": customer_name,
+                "order_count": order_count,
+                "total_quantity": quantity,
+                "total_amount": amount
+            }
+            for customer_name, order_count, quantity, amount in customer_rows
+        ],
+        date_stats=[
+            {
+                "date": date_str,
+                "order_count": order_count,
+                "total_quantity": quantity,
+                "total_amount": amount
+            }
+            for date_str, order_count, quantity, amount in date_rows
+        ]
     )
 
 
@@ -548,37 +645,8 @@ async def generate_outbound_order_number(
     except ValueError:
         raise HTTPException(status_code=400, detail="无效的日期")
     
-    # 构建前缀：CK + 日期
-    prefix = f"CK{date_str}"
-    
-    # 查询系统中包含该前缀的所有出库单号
-    existing_orders = db.exec(
-        select(OutboundOrder.order_number)
-        .where(OutboundOrder.order_number.like(f"{prefix}%"))
-    ).all()
-    
-    # 提取现有的流水号
-    existing_sequence_numbers = []
-    for order_number in existing_orders:
-        if len(order_number) > len(prefix) + 1 and order_number[len(prefix)] == "-":
-            try:
-                sequence = int(order_number[len(prefix) + 1:])
-                existing_sequence_numbers.append(sequence)
-            except ValueError:
-                continue
-    
-    # 计算最小未使用的流水号
-    if existing_sequence_numbers:
-        max_sequence = max(existing_sequence_numbers)
-        next_sequence = max_sequence + 1
-    else:
-        next_sequence = 1
-    
-    # 格式化流水号为3位数字
-    sequence_str = f"{next_sequence:03d}"
-    
-    # 生成完整的出库单号
-    order_number = f"{prefix}-{sequence_str}"
+    # 按日期前缀的流水序列原子分配流水号，并发请求不会得到相同的单号
+    order_number, next_sequence = next_outbound_order_number(db, date_str)
     
     return {
         "order_number": order_number,
@@ -802,6 +870,7 @@ async def update_outbound_order_number(
     try:
         order.order_number = update_data.order_number
         db.add(order)
+        sync_sequence_with_number(db, order.order_number, OUTBOUND_ORDER_PATTERN)
         
         # 注意：出库单号更新不会影响库存变更流水表中的reference_id
         # reference_id对应的是出库单ID，不是出库单号，因此不需要更新库存变更流水记录
@@ -917,16 +986,22 @@ async def add_outbound_order_item(
     if not material:
         raise HTTPException(status_code=400, detail=f"批次对应的器材不存在")
     
-    # 验证库存数量是否足够
-    inventory_detail = db.exec(select(InventoryDetail).where(
-        InventoryDetail.batch_id == item_data.batch_id
-    )).first()
+    # 验证库存数量是否足够（批次分布在多个货位时优先取库存足够的货位）
+    inventory_detail = find_stock_detail(db, item_data.batch_id, quantity=item_data.quantity)
     
     if not inventory_detail or inventory_detail.quantity < item_data.quantity:
         raise HTTPException(status_code=400, detail=f"器材 {material.material_name} 库存不足")
     
     # 开始事务
     try:
+        # 库存扣减、明细和流水在同一个写事务中提交，失败时整体回滚
+        begin_write_transaction(db)
+        
+        # 条件扣减库存，库存已被其他出库单占用时扣减失败
+        quantity_after = decrease_stock(db, inventory_detail, item_data.quantity)
+        if quantity_after is None:
+            raise HTTPException(status_code=400, detail=f"器材 {material.material_name} 库存不足")
+        
         # 创建出库明细记录
         new_item = OutboundOrderItem(
             order_id=order_id,
@@ -942,10 +1017,6 @@ async def add_outbound_order_item(
         )
         db.add(new_item)
         
-        # 更新库存明细数量
-        inventory_detail.quantity -= item_data.quantity
-        db.add(inventory_detail)
-        
         # 更新出库单总数量
         order.total_quantity += item_data.quantity
         db.add(order)
@@ -956,13 +1027,17 @@ async def add_outbound_order_item(
             material_id=batch.material_id,
             batch_id=item_data.batch_id,
             quantity_change=-item_data.quantity,
-            quantity_before=inventory_detail.quantity + item_data.quantity,
-            quantity_after=inventory_detail.quantity,
+            quantity_before=quantity_after + item_data.quantity,
+            quantity_after=quantity_after,
             reference_id=order.order_id,
-            creator=current_user.username
+            creator=current_user.username,
+            bin_id=inventory_detail.bin_id
         )
         db.add(transaction)
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(db, MovementDirection.OUT, order.create_time, [batch.material_id])
+        
         db.commit()
         db.refresh(new_item)
         
@@ -982,6 +1057,9 @@ async def add_outbound_order_item(
             equipment_name=material.equipment_name if material else None
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"添加出库明细失败: {str(e)}")
@@ -1004,10 +1082,16 @@ async def update_outbound_order_item(
     
     # 开始事务
     try:
+        # 库存调整、明细和流水在同一个写事务中提交，失败时整体回滚
+        begin_write_transaction(db)
+        
         # 保存更新前的数据
         old_quantity = item.quantity
         old_batch_id = item.batch_id
         old_material_id = item.material_id
+        old_bin_id = item.bin_id
+        # 被删除或修改的流水中最早的流水时间
+        history_start = None
         
         # 标记是否有变化
         has_changes = False
@@ -1018,10 +1102,10 @@ async def update_outbound_order_item(
             if not batch:
                 raise HTTPException(status_code=400, detail="批次不存在")
  
-            # 查询新批次对应的库存明细记录
-            inventory_detail = db.exec(select(InventoryDetail).where(
-                InventoryDetail.batch_id == update_data.batch_id
-            )).first()
+            # 查询新批次对应的库存明细记录（批次分布在多个货位时优先取库存足够的货位）
+            inventory_detail = find_stock_detail(
+                db, update_data.batch_id, quantity=update_data.quantity or old_quantity
+            )
             
             if not inventory_detail:
                 raise HTTPException(status_code=400, detail="该批次没有库存明细记录")
@@ -1043,30 +1127,32 @@ async def update_outbound_order_item(
             
             print(f"[DEBUG] 批次号变更: 旧批次={old_batch_id}, 新批次={update_data.batch_id}, 旧器材ID={old_material_id}, 新器材ID={inventory_detail.material_id}")
         
-        if update_data.quantity is not None:
-            # 验证库存数量是否足够
-            # 使用当前批次号和器材ID进行验证
-            current_batch_id = item.batch_id if update_data.batch_id is None else update_data.batch_id
-            current_material_id = item.material_id
-            
-            inventory_detail = db.exec(select(InventoryDetail).where(
-                    InventoryDetail.batch_id == current_batch_id
-            )).first()
-            
-            if not inventory_detail or inventory_detail.quantity + old_quantity < update_data.quantity:
-                raise HTTPException(status_code=400, detail="库存不足")
-            
-            # 保存修改前批次ID对应器材的数量（用于流水变更前数量计算）
-            old_batch_inventory_quantity = inventory_detail.quantity
-            
+        if update_data.quantity is not None and update_data.quantity != old_quantity:
             item.quantity = update_data.quantity
-            
-            # 更新库存明细数量
-            inventory_detail.quantity = inventory_detail.quantity + old_quantity - update_data.quantity
-            db.add(inventory_detail)
             has_changes = True
+        
+        # 条件调整库存：批次变化时退回原批次、从新批次扣减，否则按数量差调整
+        # 库存调整成功前不写入明细修改，避免库存不足时明细已被自动刷新写入
+        with db.no_autoflush:
+            if item.batch_id != old_batch_id:
+                new_detail = inventory_detail
+                if decrease_stock(db, new_detail, item.quantity) is None:
+                    raise HTTPException(status_code=400, detail="库存不足")
             
-            print(f"[DEBUG] 库存明细更新: 当前批次={current_batch_id}, 器材ID={current_material_id}, 旧批次库存数量={old_batch_inventory_quantity}, 旧出库数量={old_quantity}, 新出库数量={update_data.quantity}, 更新后库存数量={inventory_detail.quantity}")
+                # 退回到原批次的出库货位
+                old_detail = get_return_detail(db, old_batch_id, old_material_id, old_bin_id)
+                if old_detail:
+                    increase_stock(db, old_detail, old_quantity)
+            elif item.quantity != old_quantity:
+                # 按出库货位调整：减少出库数量时退回该货位，增加时从该货位扣减
+                if item.quantity < old_quantity:
+                    inventory_detail = get_return_detail(db, item.batch_id, item.material_id, item.bin_id)
+                else:
+                    inventory_detail = find_stock_detail(db, item.batch_id, item.bin_id)
+                if not inventory_detail or adjust_stock(db, inventory_detail, old_quantity - item.quantity) is None:
+                    raise HTTPException(status_code=400, detail="库存不足")
+            
+                print(f"[DEBUG] 库存明细更新: 当前批次={item.batch_id}, 器材ID={item.material_id}, 旧出库数量={old_quantity}, 新出库数量={item.quantity}, 更新后库存数量={inventory_detail.quantity}")
         
         db.add(item)
         
@@ -1091,7 +1177,12 @@ async def update_outbound_order_item(
             print(f"[DEBUG] 查询到的交易记录数量: {len(transactions)}")
             
             if transactions:
-                transaction = transactions[0]  # 取第一条记录
+                # 同一批次按货位分配为多条明细时，取出库货位、修改前数量都对应的流水
+                transaction = next(
+                    (row for row in transactions if row.bin_id == old_bin_id and row.quantity_change == -old_quantity),
+                    next((row for row in transactions if row.bin_id == old_bin_id), transactions[0])
+                )
+                history_start = transaction.transaction_time
                 print(f"[DEBUG] 找到交易记录: transaction_id={transaction.transaction_id}, quantity_change={transaction.quantity_change}")
                 
                 # 检查批次是否发生变化
@@ -1103,9 +1194,7 @@ async def update_outbound_order_item(
                     delete_inventory_transaction(db=db, transaction_id=transaction.transaction_id)
                     
                     # 查询新批次的库存明细
-                    new_inventory_detail = db.exec(select(InventoryDetail).where(
-                        InventoryDetail.batch_id == item.batch_id
-                    )).first()
+                    new_inventory_detail = find_stock_detail(db, item.batch_id, item.bin_id)
                     
                     if new_inventory_detail:
                         # 创建新的库存变更流水
@@ -1117,7 +1206,8 @@ async def update_outbound_order_item(
                             quantity_before=new_inventory_detail.quantity + item.quantity,  # 出库前数量
                             quantity_after=new_inventory_detail.quantity,  # 出库后数量
                             reference_id=order.order_id,
-                            creator=current_user.username
+                            creator=current_user.username,
+                            bin_id=new_inventory_detail.bin_id
                         )
                         db.add(new_transaction)
                         print(f"[DEBUG] 新交易记录创建完成")
@@ -1126,9 +1216,7 @@ async def update_outbound_order_item(
                     print(f"[DEBUG] 批次未变化，只更新数量")
                     
                     # 查询当前批次的库存明细
-                    current_inventory_detail = db.exec(select(InventoryDetail).where(
-                        InventoryDetail.batch_id == item.batch_id
-                    )).first()
+                    current_inventory_detail = find_stock_detail(db, item.batch_id, item.bin_id)
                     
                     if current_inventory_detail:
                         # 正确的逻辑：数量变化就是修改后的器材出库数量
@@ -1156,6 +1244,17 @@ async def update_outbound_order_item(
         else:
             print(f"[DEBUG] 没有变化，跳过库存变更流水更新")
         
+        # 更新每日出入库汇总（批次变化时原器材和新器材都需要重算）
+        if has_changes:
+            refresh_daily_movement(
+                db, MovementDirection.OUT, order.create_time,
+                {old_material_id, item.material_id}
+            )
+        
+        # 修改的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+        reclose_periods_since(db, history_start, current_user.username)
+        discard_snapshots_since(db, history_start)
+        
         db.commit()
         db.refresh(item)
         
@@ -1175,6 +1274,9 @@ async def update_outbound_order_item(
             equipment_name=item.material.equipment_name if item.material else None
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"修改出库明细失败: {str(e)}")
@@ -1199,17 +1301,11 @@ async def delete_outbound_order_item(
         # 查询出库单
         order = db.get(OutboundOrder, order_id)
         
-        # 恢复库存明细数量
-        inventory_detail = db.exec(select(InventoryDetail).where(
-            and_(
-                InventoryDetail.batch_id == item.batch_id,
-                InventoryDetail.material_id == item.material_id
-            )
-        )).first()
+        # 库存退回、流水和明细删除在同一个写事务中完成
+        begin_write_transaction(db)
         
-        if inventory_detail:
-            inventory_detail.quantity += item.quantity
-            db.add(inventory_detail)
+        # 按出库货位退回库存数量
+        restore_outbound_items_stock(db, OutboundOrderItem.item_id == item_id)
         
         # 更新出库单总数量
         order.total_quantity -= item.quantity
@@ -1224,12 +1320,23 @@ async def delete_outbound_order_item(
             material_id=item.material_id
         )
         if transactions:
-            transaction = transactions[0]  # 取第一条记录
+            # 同一批次按货位分配为多条明细时，取出库货位、数量都对应的流水
+            transaction = next(
+                (row for row in transactions if row.bin_id == item.bin_id and row.quantity_change == -item.quantity),
+                next((row for row in transactions if row.bin_id == item.bin_id), transactions[0])
+            )
             delete_inventory_transaction(db=db, transaction_id=transaction.transaction_id)
+            
+            # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+            reclose_periods_since(db, transaction.transaction_time, current_user.username)
+            discard_snapshots_since(db, transaction.transaction_time)
         
         # 删除出库明细
         db.delete(item)
         
+        # 更新每日出入库汇总
+        refresh_daily_movement(db, MovementDirection.OUT, order.create_time, [item.material_id])
+        
         db.commit()
         
         return {"message": "出库明细删除成功"}
@@ -1253,55 +1360,111 @@ async def batch_delete_outbound_order_items(
     if not order:
         raise HTTPException(status_code=404, detail="出库单不存在")
     
+    # 待删除的明细（不属于该出库单或不存在的明细项跳过）
+    item_filters = [
+        OutboundOrderItem.order_id == order_id,
+        OutboundOrderItem.item_id.in_(list(set(delete_data.item_ids)))
+    ]
+    
     # 开始事务 - 确保整个批量操作在一个事务中完成
     try:
-        deleted_count = 0
-        total_quantity_reduction = 0
-        
-        # 批量处理每个明细项
-        for item_id in delete_data.item_ids:
-            # 查询出库明细
-            item = db.get(OutboundOrderItem, item_id)
-            if not item or item.order_id != order_id:
-                continue  # 跳过不存在的明细项
-            
-            # 恢复库存明细数量
-            inventory_detail = db.exec(select(InventoryDetail).where(
-                and_(
-                    InventoryDetail.batch_id == item.batch_id,
-                    InventoryDetail.material_id == item.material_id
-                )
-            )).first()
+        # 按批次汇总待删除明细：条数、数量
+        groups = db.exec(
+            select(
+                OutboundOrderItem.batch_id,
+                OutboundOrderItem.material_id,
+                func.count().label("item_count"),
+                func.sum(OutboundOrderItem.quantity).label("quantity")
+            )
+            .where(*item_filters)
+            .group_by(OutboundOrderItem.batch_id, OutboundOrderItem.material_id)
+        ).all()
+        deleted_count = sum(group.item_count for group in groups)
+        total_quantity_reduction = sum(group.quantity for group in groups)
+        deleted_material_ids = {group.material_id for group in groups}
+        
+        if deleted_count:
+            begin_write_transaction(db)
             
-            if inventory_detail:
-                inventory_detail.quantity += item.quantity
-                db.add(inventory_detail)
+            # 按批次汇总退回库存数量
+            restore_outbound_items_stock(db, *item_filters)
             
-            # 累加总数量减少
-            total_quantity_reduction += item.quantity
+            history_start = get_earliest_transaction_time(
+                db,
+                InventoryTransaction.reference_type == ReferenceType.OUTBOUND,
+                InventoryTransaction.reference_id == order_id
+            )
             
-            # 删除库存变更流水（使用工具函数）
-            transactions = get_inventory_transactions_by_criteria(
-                db=db,
-                reference_id=order.order_id,
-                reference_type=ReferenceType.OUTBOUND,
-                batch_id=item.batch_id,
-                material_id=item.material_id
+            # 删除库存变更流水：每条明细对应同一批次、同一出库货位、数量相同的一条出库流水，
+            # 按(批次, 器材, 货位, 数量)删除与待删除明细条数相同的最近流水
+            deleted_counts = (
+                select(
+                    OutboundOrderItem.batch_id,
+                    OutboundOrderItem.material_id,
+                    OutboundOrderItem.bin_id,
+                    OutboundOrderItem.quantity,
+                    func.count().label("item_count")
+                )
+                .where(*item_filters)
+                .group_by(
+                    OutboundOrderItem.batch_id, OutboundOrderItem.material_id,
+                    OutboundOrderItem.bin_id, OutboundOrderItem.quantity
+                )
+                .subquery("deleted_counts")
             )
-            if transactions:
-                transaction = transactions[0]  # 取第一条记录
-                delete_inventory_transaction(db=db, transaction_id=transaction.transaction_id)
+            ranked_transactions = (
+                select(
+                    InventoryTransaction.transaction_id,
+                    InventoryTransaction.batch_id,
+                    InventoryTransaction.material_id,
+                    InventoryTransaction.bin_id,
+                    InventoryTransaction.quantity_change,
+                    func.row_number().over(
+                        partition_by=[
+                            InventoryTransaction.batch_id, InventoryTransaction.material_id,
+                            InventoryTransaction.bin_id, InventoryTransaction.quantity_change
+                        ],
+                        order_by=[InventoryTransaction.transaction_time.desc(), InventoryTransaction.transaction_id.desc()]
+                    ).label("recent_rank")
+                )
+                .where(
+                    InventoryTransaction.reference_type == ReferenceType.OUTBOUND,
+                    InventoryTransaction.reference_id == order_id
+                )
+                .subquery("ranked_transactions")
+            )
+            db.exec(delete(InventoryTransaction).where(InventoryTransaction.transaction_id.in_(
+                select(ranked_transactions.c.transaction_id)
+                .join(deleted_counts, and_(
+                    deleted_counts.c.batch_id == ranked_transactions.c.batch_id,
+                    deleted_counts.c.material_id == ranked_transactions.c.material_id,
+                    # 未记录货位的旧明细与未记录货位的流水对应
+                    deleted_counts.c.bin_id.is_not_distinct_from(ranked_transactions.c.bin_id),
+                    ranked_transactions.c.quantity_change == -deleted_counts.c.quantity
+                ))
+                .where(ranked_transactions.c.recent_rank <= deleted_counts.c.item_count)
+            )))
             
             # 删除出库明细
-            db.delete(item)
-            deleted_count += 1
-        
-        # 更新出库单总数量
-        order.total_quantity -= total_quantity_reduction
-        db.add(order)
-        
-        # 在整个批量操作完成后一次性提交事务
-        db.commit()
+            db.exec(delete(OutboundOrderItem).where(*item_filters), execution_options={"synchronize_session": False})
+            
+            # 更新出库单总数量（用UPDATE语句更新，不级联写入会话中已加载的明细）
+            db.exec(
+                update(OutboundOrder)
+                .where(OutboundOrder.order_id == order_id)
+                .values(total_quantity=OutboundOrder.total_quantity - total_quantity_reduction),
+                execution_options={"synchronize_session": False}
+            )
+            
+            # 更新每日出入库汇总
+            refresh_daily_movement(db, MovementDirection.OUT, order.create_time, deleted_material_ids)
+            
+            # 删除的流水在已结账期间内时重新结账，并删除包含这些流水的快照
+            reclose_periods_since(db, history_start, current_user.username)
+            discard_snapshots_since(db, history_start)
+            
+            # 在整个批量操作完成后一次性提交事务
+            db.commit()
         
         return BatchDeleteResponse(
             success=True,
@@ -0,0 +1,55 @@
+"""
+月结与期间余额路由
+"""
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from sqlmodel import Session, select
+from typing import List, Optional
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.period_balance import PeriodClosingResponse, PeriodCloseResult
+from models.material.period_balance import PeriodClosing
+from utils.period_balance_utils import close_pending_periods, reclose_periods_from
+
+period_balances_router = APIRouter(prefix="/period-balances", tags=["月结与期间余额"])
+
+
+@period_balances_router.get("/closings", response_model=List[PeriodClosingResponse], summary="查询月结记录")
+async def get_period_closings(
+    limit: int = Query(24, ge=1, le=240, description="返回数量"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/period-balances/closings"))
+):
+    """按会计期间倒序返回月结记录"""
+    closings = db.exec(
+        select(PeriodClosing).order_by(PeriodClosing.period.desc()).limit(limit)
+    ).all()
+    return [PeriodClosingResponse.model_validate(closing) for closing in closings]
+
+
+@period_balances_router.post("/close", response_model=PeriodCloseResult, summary="执行月结")
+async def close_periods(
+    period: Optional[str] = Query(None, description="重新结账的会计期间（YYYY-MM），不传则结账所有未结账的已结束期间"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/period-balances/close"))
+):
+    """
+    执行月结
+
+    定时任务每天自动补结已结束的期间；已结账期间的流水被修改后，
+    可指定期间重新结账，其后已结账的期间会依次重算。
+    """
+    if period is not None and not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", period):
+        raise HTTPException(status_code=400, detail="会计期间格式应为YYYY-MM")
+    try:
+        if period is None:
+            periods = close_pending_periods(db, creator=current_user.username)
+        else:
+            periods = reclose_periods_from(db, period, creator=current_user.username)
+        return PeriodCloseResult(periods=periods)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"月结失败: {str(e)}")
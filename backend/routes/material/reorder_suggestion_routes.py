@@ -0,0 +1,58 @@
+"""
+补货建议路由
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from sqlmodel import Session
+from typing import Optional
+from datetime import datetime
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.reorder_suggestion import ReorderSuggestionListResponse, ReorderRefreshResult
+from utils.reorder_utils import (
+    DEFAULT_COVER_DAYS,
+    DEFAULT_LEAD_TIME_DAYS,
+    DEFAULT_WINDOW_DAYS,
+    get_reorder_suggestions,
+    refresh_reorder_suggestions
+)
+
+reorder_suggestions_router = APIRouter(prefix="/reorder-suggestions", tags=["补货建议"])
+
+
+@reorder_suggestions_router.get("", response_model=ReorderSuggestionListResponse, summary="查询补货建议")
+async def get_reorder_suggestion_list(
+    only_needed: bool = Query(True, description="只返回需要补货的器材"),
+    keyword: Optional[str] = Query(None, description="器材编码、名称或查询编码关键词"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=500, description="每页数量"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/reorder-suggestions"))
+):
+    """
+    按补货优先级分页返回补货建议
+
+    结果由定时任务每天按出库消耗速度计算后写入缓存表，接口只读取缓存表。
+    """
+    try:
+        return get_reorder_suggestions(db, only_needed=only_needed, keyword=keyword, page=page, page_size=page_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询补货建议失败: {str(e)}")
+
+
+@reorder_suggestions_router.post("/refresh", response_model=ReorderRefreshResult, summary="重新计算补货建议")
+async def refresh_reorder_suggestion_list(
+    window_days: int = Query(DEFAULT_WINDOW_DAYS, ge=1, le=730, description="消耗统计窗口天数"),
+    lead_time_days: int = Query(DEFAULT_LEAD_TIME_DAYS, ge=0, le=365, description="补货周期天数"),
+    cover_days: int = Query(DEFAULT_COVER_DAYS, ge=0, le=730, description="补货后需覆盖的天数"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/reorder-suggestions/refresh"))
+):
+    """立即按指定参数重新计算全部器材的补货建议"""
+    try:
+        count = refresh_reorder_suggestions(db, window_days, lead_time_days, cover_days)
+        return ReorderRefreshResult(count=count, refreshed_at=datetime.now())
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"计算补货建议失败: {str(e)}")
@@ -0,0 +1,34 @@
+"""
+移库路由
+"""
+from fastapi import APIRouter, Depends, HTTPException, Security
+from sqlmodel import Session
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.stock_transfer import StockTransferRequest, StockTransferResult
+from utils.stock_transfer_utils import TransferMove, transfer_stock
+
+stock_transfers_router = APIRouter(prefix="/stock-transfers", tags=["移库管理"])
+
+
+@stock_transfers_router.post("", response_model=StockTransferResult, summary="批量移库")
+async def create_stock_transfer(
+    request: StockTransferRequest,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stock-transfers"))
+):
+    """
+    将库存从源货位批量移到目标货位
+
+    全部移动在一个事务中执行，任一条失败时全部不生效。
+    每条移动写入源货位减少、目标货位增加两条调整流水，并更新涉及货位的空货位标记。
+    """
+    moves = [TransferMove(**move.model_dump()) for move in request.moves]
+    try:
+        return transfer_stock(db, moves, current_user.username)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"移库失败: {str(e)}")
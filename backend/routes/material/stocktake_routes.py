@@ -0,0 +1,242 @@
+"""
+盘点路由
+"""
+import math
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Security, UploadFile
+from sqlmodel import Session, select, func
+from typing import List, Optional
+
+from database import get_db
+from core.security import get_current_active_user, get_required_scopes_for_route
+from schemas.account.user import UserResponse
+from schemas.material.stocktake import (
+    StocktakeCountRequest,
+    StocktakeCountResult,
+    StocktakeCreate,
+    StocktakeDetailResponse,
+    StocktakeItemListResponse,
+    StocktakeListResponse,
+    StocktakeResponse,
+    StocktakeSummary
+)
+from models.material.stocktake import Stocktake, StocktakeStatus
+from utils.import_utils import IMPORT_FILE_EXTENSIONS, get_import_file_extension, iter_import_file_rows
+from utils.stocktake_utils import (
+    CountEntry,
+    cancel_stocktake,
+    create_stocktake,
+    get_stocktake_items,
+    get_stocktake_summary,
+    post_stocktake,
+    record_counts
+)
+
+stocktakes_router = APIRouter(prefix="/stocktakes", tags=["盘点管理"])
+
+# 扫码文件大小上限
+MAX_SCAN_FILE_SIZE = 20 * 1024 * 1024
+
+
+@stocktakes_router.get("", response_model=StocktakeListResponse, summary="分页查询盘点单")
+async def get_stocktakes(
+    status: Optional[StocktakeStatus] = Query(None, description="状态筛选"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes"))
+):
+    """按创建时间倒序返回盘点单"""
+    filters = [Stocktake.is_delete == False]
+    if status:
+        filters.append(Stocktake.status == status)
+    total = db.exec(select(func.count(Stocktake.stocktake_id)).where(*filters)).one()
+    stocktakes = db.exec(
+        select(Stocktake)
+        .where(*filters)
+        .order_by(Stocktake.stocktake_id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+    return StocktakeListResponse(
+        total=total,
+        page=page,
+        page_size=page_size,
+        total_pages=math.ceil(total / page_size) if total else 0,
+        data=[StocktakeResponse.model_validate(stocktake) for stocktake in stocktakes]
+    )
+
+
+@stocktakes_router.post("", response_model=StocktakeResponse, summary="创建盘点单")
+async def create_stocktake_session(
+    stocktake_data: StocktakeCreate,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes/new"))
+):
+    """创建盘点单，冻结范围内各批次货位的账面数量"""
+    try:
+        stocktake = create_stocktake(
+            db,
+            creator=current_user.username,
+            warehouse_id=stocktake_data.warehouse_id,
+            bin_id=stocktake_data.bin_id,
+            major_id=stocktake_data.major_id,
+            remark=stocktake_data.remark
+        )
+        return StocktakeResponse.model_validate(stocktake)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"创建盘点单失败: {str(e)}")
+
+
+@stocktakes_router.get("/{stocktake_id}", response_model=StocktakeDetailResponse, summary="查询盘点单详情")
+async def get_stocktake_detail(
+    stocktake_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes"))
+):
+    """返回盘点单和盘点进度、差异汇总"""
+    stocktake = db.get(Stocktake, stocktake_id)
+    if not stocktake or stocktake.is_delete:
+        raise HTTPException(status_code=404, detail="盘点单不存在")
+    return StocktakeDetailResponse(
+        stocktake=StocktakeResponse.model_validate(stocktake),
+        summary=StocktakeSummary(**get_stocktake_summary(db, stocktake_id))
+    )
+
+
+@stocktakes_router.get("/{stocktake_id}/items", response_model=StocktakeItemListResponse, summary="查询盘点明细和差异")
+async def get_stocktake_item_list(
+    stocktake_id: int,
+    only_variance: bool = Query(False, description="只返回有差异的明细"),
+    only_uncounted: bool = Query(False, description="只返回未盘点的明细"),
+    keyword: Optional[str] = Query(None, description="器材编码、名称、批次编号或货位名称关键词"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=500, description="每页数量"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes"))
+):
+    """分页返回盘点明细，差异 = 实盘数量 - 账面数量"""
+    try:
+        return get_stocktake_items(
+            db, stocktake_id,
+            only_variance=only_variance,
+            only_uncounted=only_uncounted,
+            keyword=keyword,
+            page=page,
+            page_size=page_size
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@stocktakes_router.post("/{stocktake_id}/counts", response_model=StocktakeCountResult, summary="批量录入实盘数量")
+async def record_stocktake_counts(
+    stocktake_id: int,
+    count_data: StocktakeCountRequest,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes/counts"))
+):
+    """
+    批量录入实盘数量
+
+    账面上没有的批次货位按新发现的明细录入（账面数量为0），任一条有误时全部不录入。
+    """
+    entries = [CountEntry(**entry.model_dump()) for entry in count_data.entries]
+    try:
+        return record_counts(db, stocktake_id, entries, accumulate=count_data.accumulate)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"录入实盘数量失败: {str(e)}")
+
+
+@stocktakes_router.post("/{stocktake_id}/scans", response_model=StocktakeCountResult, summary="上传扫码文件")
+async def upload_stocktake_scans(
+    stocktake_id: int,
+    file: UploadFile = File(...),
+    accumulate: bool = Query(True, description="累加到已录入的数量（扫码逐件计数），False时覆盖"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes/counts"))
+):
+    """
+    上传扫码枪导出的文件（Excel或CSV，第一行为标题）
+
+    列顺序：货位码（或货位名称）、批次编号、数量（为空时按1件计）。
+    同一批次货位的多行合并计数。
+    """
+    file_extension = get_import_file_extension(file.filename or "")
+    if not file_extension:
+        raise HTTPException(status_code=400, detail=f"不支持的文件格式，请上传Excel或CSV文件（{', '.join(IMPORT_FILE_EXTENSIONS)}）")
+    contents = await file.read()
+    if not contents:
+        raise HTTPException(status_code=400, detail="上传的文件为空")
+    if len(contents) > MAX_SCAN_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="文件过大，请确保文件小于20MB")
+
+    entries: List[CountEntry] = []
+    try:
+        for row_index, row in iter_import_file_rows(contents, file_extension):
+            if not row or not any(str(value).strip() for value in row if value is not None):
+                continue
+            bin_code = str(row[0]).strip() if row[0] is not None else ""
+            batch_number = str(row[1]).strip() if len(row) > 1 and row[1] is not None else ""
+            if not bin_code or not batch_number:
+                raise HTTPException(status_code=400, detail=f"第{row_index}行：货位码和批次编号不能为空")
+            raw_quantity = row[2] if len(row) > 2 else None
+            try:
+                quantity = int(float(raw_quantity)) if raw_quantity not in (None, "") else 1
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"第{row_index}行：数量格式错误")
+            entries.append(CountEntry(quantity=quantity, batch_number=batch_number, bin_code=bin_code, row=row_index))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"无法读取文件: {str(e)}")
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="文件中没有找到有效的数据行")
+    try:
+        return record_counts(db, stocktake_id, entries, accumulate=accumulate)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"录入扫码数据失败: {str(e)}")
+
+
+@stocktakes_router.post("/{stocktake_id}/post", response_model=StocktakeResponse, summary="盘点过账")
+async def post_stocktake_variances(
+    stocktake_id: int,
+    uncounted_as_zero: bool = Query(False, description="未盘点的明细按实盘数量0过账（默认不调整未盘点的明细）"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes/post"))
+):
+    """按差异写入调整流水并调整库存明细，冻结后发生的出入库不受影响"""
+    try:
+        stocktake = post_stocktake(db, stocktake_id, current_user.username, uncounted_as_zero=uncounted_as_zero)
+        return StocktakeResponse.model_validate(stocktake)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"盘点过账失败: {str(e)}")
+
+
+@stocktakes_router.post("/{stocktake_id}/cancel", response_model=StocktakeResponse, summary="取消盘点单")
+async def cancel_stocktake_session(
+    stocktake_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Security(get_current_active_user, scopes=get_required_scopes_for_route("/stocktakes/post"))
+):
+    """取消盘点中的盘点单，不调整库存"""
+    try:
+        return StocktakeResponse.model_validate(cancel_stocktake(db, stocktake_id))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
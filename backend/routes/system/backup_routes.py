@@ -4,10 +4,11 @@
 该模块提供备份相关的API接口
 """
 
+import asyncio
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, Depends, Security
+from fastapi import APIRouter, HTTPException, Depends, Query, Security
 import logging
 
 from backup.backup_manager import get_backup_manager
@@ -31,23 +32,86 @@ async def create_backup(
     """
     创建手动备份（固定使用user_full类型）
     
+    备份在后台线程中分步执行，不阻塞请求和业务读写，
+    通过 /api/backup/status/{task_id} 查询进度和预计剩余时间。
+    
     Returns:
-        备份创建结果
+        备份任务状态
     """
     try:
-        # 直接执行备份操作
         backup_manager = get_backup_manager()
-        result = backup_manager.create_backup("user_full")
+        task = backup_manager.start_backup_task("user_full")
         
-        return {"message": "备份创建成功", "result": result}
+        return {"message": "备份已开始", "task": task}
         
-    except HTTPException:
-        raise
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"创建备份失败: {e}")
         raise HTTPException(status_code=500, detail=f"创建备份失败: {str(e)}")
 
 
+@backup_router.get("/status")
+async def get_latest_backup_status(
+    _: User = Security(get_current_user, scopes=get_required_scopes_for_route("/api/backup/status"))
+):
+    """
+    查询最近一个后台备份任务的状态
+    
+    Returns:
+        任务状态（进度百分比、已复制页数、预计剩余秒数、完成后的备份结果），没有任务时为null
+    """
+    return {"task": get_backup_manager().get_backup_task()}
+
+
+@backup_router.get("/status/{task_id}")
+async def get_backup_status(
+    task_id: str,
+    _: User = Security(get_current_user, scopes=get_required_scopes_for_route("/api/backup/status"))
+):
+    """
+    查询后台备份任务的状态
+    
+    Args:
+        task_id: 备份任务ID
+        
+    Returns:
+        任务状态（进度百分比、已复制页数、预计剩余秒数、完成后的备份结果）
+    """
+    task = get_backup_manager().get_backup_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"未找到备份任务: {task_id}")
+    return {"task": task}
+
+
+
+@backup_router.post("/verify/{filename}")
+async def verify_backup(
+    filename: str,
+    mode: str = "fast",
+    _: User = Security(get_current_user, scopes=get_required_scopes_for_route("/api/backup/verify"))
+):
+    """
+    校验指定的备份文件
+    
+    Args:
+        filename: 备份文件名
+        mode: 校验方式（fast：按清单检查并执行quick_check；deep：校验SHA-256、执行integrity_check并核对各表行数）
+        
+    Returns:
+        校验结果（是否通过、发现的问题、耗时），同时记录到备份清单
+    """
+    try:
+        result = await asyncio.to_thread(get_backup_manager().verify_backup_by_filename, filename, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"校验备份失败: {e}")
+        raise HTTPException(status_code=500, detail=f"校验备份失败: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"未找到备份文件: {filename}")
+    return {"result": result}
+
 
 @backup_router.get("/list", response_model=BackupListResponse)
 async def get_backup_list(
@@ -56,53 +120,49 @@ async def get_backup_list(
     sort_by: str = "timestamp",
     sort_order: str = "desc",
     days_back: int = None,
+    start_date: date = None,
+    end_date: date = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(None, ge=1, le=500),
     _: User = Security(get_current_user, scopes=get_required_scopes_for_route("/api/backup/list"))
 ):
     """
-    获取备份列表（支持搜索、筛选和排序）
+    获取备份列表（支持搜索、筛选、排序和分页，从备份目录查询）
     
     Args:
-        keyword: 文件名关键词搜索
+        keyword: 文件名关键词搜索（多个关键词以空格分隔）
         backup_type: 备份类型筛选（daily, monthly, user_full, all）
         sort_by: 排序字段（timestamp, filename, type, size）
         sort_order: 排序顺序（asc, desc）
         days_back: 回溯天数
+        start_date: 开始日期
+        end_date: 结束日期（含当天）
+        page: 页码
+        page_size: 每页数量，为空时返回全部
         
     Returns:
-        备份列表信息
+        备份列表信息，total_count为符合条件的总数
     """
     try:
         backup_manager = get_backup_manager()
         
         # 计算时间范围
-        start_date = None
-        end_date = None
+        start_time = datetime.combine(start_date, datetime.min.time()) if start_date else None
+        end_time = datetime.combine(end_date, datetime.max.time()) if end_date else None
         if days_back is not None:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
+            days_back_start = datetime.now() - timedelta(days=days_back)
+            start_time = max(start_time, days_back_start) if start_time else days_back_start
         
-        # 获取备份列表
-        backups = backup_manager.get_backup_list(
-            backup_type=backup_type,
-            start_date=start_date,
-            end_date=end_date
+        backups, total_count = await asyncio.to_thread(
+            backup_manager.query_backups,
+            backup_type, start_time, end_time, keyword, sort_by, sort_order, page, page_size
         )
         
-        # 文件名多关键词搜索（AND关系）
-        if keyword:
-            keywords = [k.strip().lower() for k in keyword.split() if k.strip()]
-            if keywords:
-                backups = [backup for backup in backups 
-                          if all(k in backup["filename"].lower() for k in keywords)]
-        
-        # 排序处理
-        if sort_by in ["timestamp", "filename", "type", "size"]:
-            reverse = sort_order.lower() == "desc"
-            backups.sort(key=lambda x: x[sort_by], reverse=reverse)
-        
         return BackupListResponse(
             backups=backups,
-            total_count=len(backups)
+            total_count=total_count,
+            page=page,
+            page_size=page_size
         )
         
     except ValueError as e:
@@ -111,6 +171,24 @@ async def get_backup_list(
         logger.error(f"获取备份列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取备份列表失败: {str(e)}")
 
+
+@backup_router.post("/catalog/reconcile")
+async def reconcile_backup_catalog(
+    _: User = Security(get_current_user, scopes=get_required_scopes_for_route("/api/backup/catalog"))
+):
+    """
+    按磁盘上的备份文件修复备份目录（手动复制或删除备份文件后使用）
+    
+    Returns:
+        修复结果统计：新增、更新、删除的记录数
+    """
+    try:
+        stats = await asyncio.to_thread(get_backup_manager().reconcile_catalog)
+        return {"message": "备份目录已修复", "stats": stats}
+    except Exception as e:
+        logger.error(f"修复备份目录失败: {e}")
+        raise HTTPException(status_code=500, detail=f"修复备份目录失败: {str(e)}")
+
 @backup_router.post("/recover/{filename}")
 async def recover_backup(
     filename: str,
@@ -259,6 +337,8 @@ async def delete_backup(
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"删除备份失败: {e}")
         raise HTTPException(status_code=500, detail=f"删除备份失败: {str(e)}")
@@ -13,7 +13,10 @@ from models.material.outbound_order import OutboundOrder
 from models.material.inventory_detail import InventoryDetail
 from models.material.inventory_transaction import InventoryTransaction, ChangeType
 from models.material.inventory_batch import InventoryBatch
+from models.material.daily_inventory_movement import MovementDirection
+from utils.inventory_movement_utils import get_daily_totals, get_period_summary
 from core.security import get_current_user
+from core.response_cache import get_response_cache
 
 dashboard_router = APIRouter(tags=["主页仪表板"])
 
@@ -32,66 +35,37 @@ async def get_dashboard_statistics(
     - total_inventory: 当前库存总量（数量、品类数、总价值）
     - warning_count: 库存预警数量（缺货、库存紧张）
     """
+    return get_response_cache().get_or_compute("statistics", (), lambda: _build_dashboard_statistics(db))
+
+
+def _build_dashboard_statistics(db: Session):
+    """计算主页核心统计数据"""
     try:
         # 获取今天和昨天的日期
         today = date.today()
         yesterday = today - timedelta(days=1)
         
-        # ===== 今日入库统计 =====
-        # 今日入库单数量
-        today_inbound_count = db.exec(
-            select(func.count(InboundOrder.order_id))
-            .where(func.date(InboundOrder.create_time) == today)
-        ).one()
+        # 今日、昨日出入库合计（每日汇总表单次索引范围查询）
+        daily_totals = get_daily_totals(db, yesterday, today)
         
-        # 今日入库器材总数量
-        today_inbound_quantity = db.exec(
-            select(func.sum(InboundOrder.total_quantity))
-            .where(func.date(InboundOrder.create_time) == today)
-        ).one() or 0
+        def _total(day: date, direction: MovementDirection):
+            row = daily_totals.get((day, direction))
+            return (row.order_count, row.quantity) if row else (0, 0)
         
-        # 昨日入库单数量（用于计算环比）
-        yesterday_inbound_count = db.exec(
-            select(func.count(InboundOrder.order_id))
-            .where(func.date(InboundOrder.create_time) == yesterday)
-        ).one()
+        def _change_percent(today_count: int, yesterday_count: int) -> float:
+            if yesterday_count > 0:
+                return round(((today_count - yesterday_count) / yesterday_count) * 100, 1)
+            return 100 if today_count > 0 else 0
         
-        # 计算入库环比
-        if yesterday_inbound_count > 0:
-            inbound_change_percent = round(
-                ((today_inbound_count - yesterday_inbound_count) / yesterday_inbound_count) * 100, 
-                1
-            )
-        else:
-            inbound_change_percent = 100 if today_inbound_count > 0 else 0
+        # ===== 今日入库统计 =====
+        today_inbound_count, today_inbound_quantity = _total(today, MovementDirection.IN)
+        yesterday_inbound_count, _ = _total(yesterday, MovementDirection.IN)
+        inbound_change_percent = _change_percent(today_inbound_count, yesterday_inbound_count)
         
         # ===== 今日出库统计 =====
-        # 今日出库单数量
-        today_outbound_count = db.exec(
-            select(func.count(OutboundOrder.order_id))
-            .where(func.date(OutboundOrder.create_time) == today)
-        ).one()
-        
-        # 今日出库器材总数量
-        today_outbound_quantity = db.exec(
-            select(func.sum(OutboundOrder.total_quantity))
-            .where(func.date(OutboundOrder.create_time) == today)
-        ).one() or 0
-        
-        # 昨日出库单数量（用于计算环比）
-        yesterday_outbound_count = db.exec(
-            select(func.count(OutboundOrder.order_id))
-            .where(func.date(OutboundOrder.create_time) == yesterday)
-        ).one()
-        
-        # 计算出库环比
-        if yesterday_outbound_count > 0:
-            outbound_change_percent = round(
-                ((today_outbound_count - yesterday_outbound_count) / yesterday_outbound_count) * 100,
-                1
-            )
-        else:
-            outbound_change_percent = 100 if today_outbound_count > 0 else 0
+        today_outbound_count, today_outbound_quantity = _total(today, MovementDirection.OUT)
+        yesterday_outbound_count, _ = _total(yesterday, MovementDirection.OUT)
+        outbound_change_percent = _change_percent(today_outbound_count, yesterday_outbound_count)
         
         # ===== 库存总量统计 =====
         # 当前库存总数量
@@ -197,6 +171,11 @@ async def get_monthly_trend(
     - query_year: 查询的年份
     - query_month: 查询的月份
     """
+    return get_response_cache().get_or_compute("monthly-trend", (year, month), lambda: _build_monthly_trend(db, year, month))
+
+
+def _build_monthly_trend(db: Session, year: Optional[int], month: Optional[int]):
+    """计算指定月份的出入库趋势数据"""
     try:
         # 获取当前日期
         today = date.today()
@@ -220,6 +199,9 @@ async def get_monthly_trend(
         is_current_month = (query_year == today.year and query_month == today.month)
         end_day = min(last_day, today) if is_current_month else last_day
         
+        # 一次读取整月的每日合计行
+        daily_totals = get_daily_totals(db, first_day, end_day)
+        
         # 初始化每日数据
         daily_data = []
         current_day = first_day
@@ -228,17 +210,10 @@ async def get_monthly_trend(
         total_outbound = 0
         
         while current_day <= end_day:
-            # 查询当天入库数量
-            day_inbound = db.exec(
-                select(func.sum(InboundOrder.total_quantity))
-                .where(func.date(InboundOrder.create_time) == current_day)
-            ).one() or 0
-            
-            # 查询当天出库数量
-            day_outbound = db.exec(
-                select(func.sum(OutboundOrder.total_quantity))
-                .where(func.date(OutboundOrder.create_time) == current_day)
-            ).one() or 0
+            inbound_row = daily_totals.get((current_day, MovementDirection.IN))
+            outbound_row = daily_totals.get((current_day, MovementDirection.OUT))
+            day_inbound = inbound_row.quantity if inbound_row else 0
+            day_outbound = outbound_row.quantity if outbound_row else 0
             
             daily_data.append({
                 "date": current_day.strftime("%Y-%m-%d"),
@@ -265,6 +240,45 @@ async def get_monthly_trend(
         raise HTTPException(status_code=500, detail=f"获取当月趋势数据失败: {str(e)}")
 
 
+@dashboard_router.get("/api/dashboard/period-statistics")
+async def get_period_statistics(
+    start_date: date,
+    end_date: date,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取指定日期区间的出入库统计
+    
+    参数：
+    - start_date: 开始日期（含）
+    - end_date: 结束日期（含）
+    
+    返回数据：
+    - inbound: 区间入库统计（单数、器材数量、金额）
+    - outbound: 区间出库统计（单数、器材数量、金额）
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    
+    return get_response_cache().get_or_compute("period-statistics", (start_date, end_date), lambda: _build_period_statistics(db, start_date, end_date))
+
+
+def _build_period_statistics(db: Session, start_date: date, end_date: date):
+    """计算指定日期区间的出入库统计"""
+    try:
+        summary = get_period_summary(db, start_date, end_date)
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "inbound": summary[MovementDirection.IN],
+            "outbound": summary[MovementDirection.OUT]
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取区间出入库统计失败: {str(e)}")
+
+
 @dashboard_router.get("/api/dashboard/recent-transactions")
 async def get_recent_transactions(
     limit: int = 10,
@@ -280,6 +294,11 @@ async def get_recent_transactions(
     返回数据：
     - transactions: 最近的流水记录列表
     """
+    return get_response_cache().get_or_compute("recent-transactions", (limit,), lambda: _build_recent_transactions(db, limit))
+
+
+def _build_recent_transactions(db: Session, limit: int):
+    """查询最近的出入库记录"""
     try:
         # 查询最近的库存变更流水
         statement = (
@@ -352,6 +371,11 @@ async def get_inventory_warnings(
     - low_stock: 库存紧张预警列表（0 < 库存 < 安全库存）
     - summary: 预警汇总统计
     """
+    return get_response_cache().get_or_compute("inventory-warnings", (), lambda: _build_inventory_warnings(db))
+
+
+def _build_inventory_warnings(db: Session):
+    """计算库存预警信息"""
     try:
         # ===== 缺货预警查询 =====
         out_of_stock_materials = db.exec(
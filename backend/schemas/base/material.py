@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from schemas.common.base import PaginationResult
+from schemas.common.import_schemas import BatchImportResult
 
 # 器材创建模式
 class MaterialCreate(BaseModel):
@@ -103,10 +104,8 @@ class BatchMaterialDelete(BaseModel):
     ids: List[int]
 
 # 批量导入结果
-class MaterialBatchImportResult(BaseModel):
-    success_count: int
-    error_count: int
-    errors: List[str]
+class MaterialBatchImportResult(BatchImportResult):
+    pass  # 继承通用导入结果的所有字段
 
 # 准专业选项响应模型
 class MajorOption(BaseModel):
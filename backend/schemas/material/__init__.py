@@ -9,6 +9,8 @@ from .inventory_transaction import (
     InventoryTransactionPaginationResult,
     InventoryTransactionListResponse,
     InventoryTransactionStatistics,
+    InventoryTransactionGroupBy,
+    InventoryTransactionStatisticsGroup,
     InventoryTransactionDetailResponse
 )
 
@@ -33,6 +35,7 @@ from .inbound_order import (
 
 from .outbound_order import (
     OutboundOrderItemCreate,
+    OutboundOrderMaterialItemCreate,
     OutboundOrderCreate,
     OutboundOrderItemResponse,
     OutboundOrderResponse,
@@ -66,6 +69,8 @@ __all__ = [
     "InventoryTransactionPaginationResult",
     "InventoryTransactionListResponse",
     "InventoryTransactionStatistics",
+    "InventoryTransactionGroupBy",
+    "InventoryTransactionStatisticsGroup",
     "InventoryTransactionDetailResponse",
     "InboundOrderItemCreate",
     "InboundOrderCreate",
@@ -84,6 +89,7 @@ __all__ = [
     "InboundCreateTimeUpdate",
     "InboundOrderItemUpdate",
     "OutboundOrderItemCreate",
+    "OutboundOrderMaterialItemCreate",
     "OutboundOrderCreate",
     "OutboundOrderItemResponse",
     "OutboundOrderResponse",
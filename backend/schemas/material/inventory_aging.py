@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, datetime
+
+
+class AgingBandSummary(BaseModel):
+    """账龄区间汇总"""
+    band: int = Field(..., description="区间序号（-1表示无日期）")
+    label: str = Field(..., description="区间名称")
+    batch_count: int = Field(..., description="批次数")
+    quantity: int = Field(..., description="结存数量")
+    value: float = Field(..., description="结存金额")
+
+
+class SlowMovingSummary(BaseModel):
+    """呆滞器材汇总"""
+    material_count: int = Field(..., description="呆滞器材数")
+    quantity: int = Field(..., description="呆滞结存数量")
+    value: float = Field(..., description="呆滞结存金额")
+
+
+class InventoryAgingSummaryResponse(BaseModel):
+    """库存账龄汇总响应模型"""
+    as_of: date = Field(..., description="计算日期")
+    basis: str = Field(..., description="账龄依据：inbound_date(入库日期)、production_date(生产日期)")
+    slow_days: int = Field(..., description="呆滞判定天数（超过该天数没有出库）")
+    bands: List[AgingBandSummary] = Field(..., description="账龄区间汇总")
+    slow_moving: SlowMovingSummary = Field(..., description="呆滞器材汇总")
+
+
+class InventoryAgingItem(BaseModel):
+    """批次账龄明细"""
+    material_id: int = Field(..., description="器材ID")
+    material_code: str = Field(..., description="器材编码")
+    material_name: str = Field(..., description="器材名称")
+    material_specification: str = Field(..., description="器材规格型号")
+    batch_id: int = Field(..., description="批次ID")
+    batch_number: str = Field(..., description="批次编号")
+    unit: str = Field(..., description="计量单位")
+    unit_price: float = Field(..., description="单价")
+    inbound_date: Optional[date] = Field(None, description="入库日期")
+    production_date: Optional[date] = Field(None, description="生产日期")
+    age_days: Optional[int] = Field(None, description="账龄天数")
+    age_band: str = Field(..., description="账龄区间")
+    quantity: int = Field(..., description="结存数量")
+    value: float = Field(..., description="结存金额")
+    last_out_time: Optional[datetime] = Field(None, description="器材最近一次出库时间")
+    days_since_last_out: Optional[int] = Field(None, description="距最近一次出库天数")
+    is_slow_moving: bool = Field(..., description="是否呆滞")
+
+
+class InventoryAgingListResponse(BaseModel):
+    """批次账龄分页响应模型"""
+    total: int = Field(..., description="总记录数")
+    page: int = Field(..., description="当前页码")
+    page_size: int = Field(..., description="每页记录数")
+    total_pages: int = Field(..., description="总页数")
+    items: List[InventoryAgingItem] = Field(..., description="批次账龄明细")
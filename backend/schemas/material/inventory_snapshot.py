@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class InventorySnapshotResponse(BaseModel):
+    """库存快照响应模型"""
+    snapshot_id: int = Field(..., description="快照ID")
+    snapshot_time: datetime = Field(..., description="快照时间")
+    row_count: int = Field(..., description="快照明细行数")
+    total_quantity: int = Field(..., description="快照库存总数量")
+    creator: str = Field(..., description="创建人")
+
+    class Config:
+        from_attributes = True
+
+
+class StockAsOfItem(BaseModel):
+    """历史时点库存明细"""
+    material_id: int = Field(..., description="器材ID")
+    material_code: Optional[str] = Field(None, description="器材编码")
+    material_name: Optional[str] = Field(None, description="器材名称")
+    material_specification: Optional[str] = Field(None, description="器材规格型号")
+    batch_id: int = Field(..., description="批次ID")
+    batch_number: Optional[str] = Field(None, description="批次编号")
+    bin_id: Optional[int] = Field(None, description="货位ID")
+    bin_name: Optional[str] = Field(None, description="货位名称")
+    quantity: int = Field(..., description="库存数量")
+
+
+class StockAsOfResponse(BaseModel):
+    """历史时点库存响应模型"""
+    as_of: datetime = Field(..., description="查询时间点")
+    base: str = Field(..., description="基准状态：snapshot(库存快照)、current(当前库存)")
+    base_snapshot_id: Optional[int] = Field(None, description="基准快照ID")
+    base_time: datetime = Field(..., description="基准时间")
+    replayed_transactions: int = Field(..., description="回放的库存流水条数")
+    total_quantity: int = Field(..., description="库存总数量")
+    items: List[StockAsOfItem] = Field(..., description="库存明细列表")
@@ -16,12 +16,14 @@ class ReferenceType(str, Enum):
     INBOUND = "inbound"      # 入库单
     OUTBOUND = "outbound"    # 出库单
     STOCKTAKE = "stocktake"  # 盘点单
+    TRANSFER = "transfer"    # 移库
 
 
 class InventoryTransactionCreate(BaseModel):
     """创建库存变更流水记录"""
     material_id: int
     batch_id: int
+    bin_id: Optional[int] = None
     change_type: ChangeType
     quantity_change: int
     quantity_before: int
@@ -94,6 +96,25 @@ class InventoryTransactionListResponse(BaseModel):
     data: List[InventoryTransactionResponse]
 
 
+class InventoryTransactionGroupBy(str, Enum):
+    """库存变更统计分组维度"""
+    MATERIAL = "material"              # 按器材
+    BATCH = "batch"                    # 按批次
+    DAY = "day"                        # 按日期
+    REFERENCE_TYPE = "reference_type"  # 按关联单据类型
+
+
+class InventoryTransactionStatisticsGroup(BaseModel):
+    """库存变更分组统计项"""
+    key: str
+    label: Optional[str] = None
+    total_in: int = 0
+    total_out: int = 0
+    total_adjust: int = 0
+    net_change: int = 0
+    transaction_count: int = 0
+
+
 class InventoryTransactionStatistics(BaseModel):
     """库存变更统计信息"""
     total_in: int = 0
@@ -101,6 +122,11 @@ class InventoryTransactionStatistics(BaseModel):
     total_adjust: int = 0
     net_change: int = 0
     transaction_count: int = 0
+    group_by: Optional[InventoryTransactionGroupBy] = None
+    group_total: int = 0                # 分组总数
+    group_page: int = 1                 # 分组页码
+    group_page_size: int = 100          # 每页分组数量
+    groups: List[InventoryTransactionStatisticsGroup] = []
 
 
 class InventoryTransactionDetailResponse(BaseModel):
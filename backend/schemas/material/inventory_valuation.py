@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class InventoryValuationItem(BaseModel):
+    """库存计价明细"""
+    material_id: int = Field(..., description="器材ID")
+    material_code: Optional[str] = Field(None, description="器材编码")
+    material_name: Optional[str] = Field(None, description="器材名称")
+    material_specification: Optional[str] = Field(None, description="器材规格型号")
+    warehouse_id: Optional[int] = Field(None, description="仓库ID（按器材分组时为空）")
+    warehouse_name: Optional[str] = Field(None, description="仓库名称")
+    quantity: int = Field(..., description="结存数量")
+    batch_value: float = Field(..., description="批次成本金额")
+    average_unit_price: float = Field(..., description="加权平均单价")
+    weighted_average_value: float = Field(..., description="加权平均金额")
+    fifo_value: float = Field(..., description="先进先出金额")
+
+
+class InventoryValuationResponse(BaseModel):
+    """库存计价响应模型"""
+    as_of: datetime = Field(..., description="计价时间点")
+    group_by: str = Field(..., description="分组方式：material(按器材)、warehouse(按器材+仓库)")
+    total_quantity: int = Field(..., description="结存总数量")
+    total_batch_value: float = Field(..., description="批次成本总金额")
+    total_weighted_average_value: float = Field(..., description="加权平均总金额")
+    total_fifo_value: float = Field(..., description="先进先出总金额")
+    total: int = Field(..., description="总记录数")
+    page: int = Field(..., description="当前页码")
+    page_size: int = Field(..., description="每页记录数")
+    total_pages: int = Field(..., description="总页数")
+    items: List[InventoryValuationItem] = Field(..., description="计价明细列表")
@@ -9,12 +9,21 @@ class OutboundOrderItemCreate(BaseModel):
     quantity: int = Field(..., ge=1, description="数量")
 
 
+class OutboundOrderMaterialItemCreate(BaseModel):
+    """按器材出库的明细（由系统按分配策略自动分配批次和货位）"""
+    material_id: int = Field(..., description="器材ID")
+    quantity: int = Field(..., ge=1, description="数量")
+
+
 class OutboundOrderCreate(BaseModel):
     """出库单创建模型"""
     order_number: str = Field(..., description="出库单号")
     requisition_reference: Optional[str] = Field(None, description="调拨单号")
     customer_id: int = Field(..., description="客户ID")
-    items: List[OutboundOrderItemCreate] = Field(..., description="出库明细列表")
+    items: List[OutboundOrderItemCreate] = Field(default_factory=list, description="出库明细列表（指定批次）")
+    material_items: List[OutboundOrderMaterialItemCreate] = Field(default_factory=list, description="按器材出库的明细列表（自动分配批次）")
+    allocation_strategy: str = Field("fifo", description="自动分配策略：fifo(先入库先出)、fefo(先生产先出)")
+    warehouse_id: Optional[int] = Field(None, description="自动分配时只从该仓库出库")
 
 
 class OutboundOrderItemResponse(BaseModel):
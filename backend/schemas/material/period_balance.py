@@ -0,0 +1,59 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, datetime
+
+from schemas.material.inventory_transaction import ChangeType, ReferenceType
+
+
+class PeriodClosingResponse(BaseModel):
+    """月结记录响应模型"""
+    period: str = Field(..., description="会计期间（YYYY-MM）")
+    period_start: date = Field(..., description="期间开始日期")
+    period_end: date = Field(..., description="期间结束日期（不含）")
+    row_count: int = Field(..., description="期末余额行数")
+    closed_time: datetime = Field(..., description="结账时间")
+    creator: str = Field(..., description="结账人")
+
+    class Config:
+        from_attributes = True
+
+
+class PeriodCloseResult(BaseModel):
+    """结账结果"""
+    periods: List[str] = Field(..., description="本次结账的会计期间")
+
+
+class StockCardMovement(BaseModel):
+    """器材收发卡片明细"""
+    transaction_id: int = Field(..., description="流水ID")
+    transaction_time: datetime = Field(..., description="操作时间")
+    change_type: ChangeType = Field(..., description="变更类型")
+    reference_type: ReferenceType = Field(..., description="关联单据类型")
+    reference_id: Optional[int] = Field(None, description="关联单据ID")
+    reference_number: Optional[str] = Field(None, description="关联单据编号")
+    batch_id: int = Field(..., description="批次ID")
+    batch_number: Optional[str] = Field(None, description="批次编号")
+    unit_price: float = Field(..., description="批次单价")
+    in_quantity: int = Field(..., description="收入数量")
+    out_quantity: int = Field(..., description="发出数量")
+    amount: float = Field(..., description="变动金额")
+    balance_quantity: int = Field(..., description="结存数量")
+    balance_value: float = Field(..., description="结存金额")
+
+
+class StockCardResponse(BaseModel):
+    """器材收发卡片响应模型"""
+    material_id: int = Field(..., description="器材ID")
+    material_code: str = Field(..., description="器材编码")
+    material_name: str = Field(..., description="器材名称")
+    material_specification: str = Field(..., description="器材规格型号")
+    start_date: date = Field(..., description="开始日期")
+    end_date: date = Field(..., description="结束日期")
+    base_period: Optional[str] = Field(None, description="期初所依据的结账期间，为空表示从全部流水汇总")
+    opening_quantity: int = Field(..., description="期初数量")
+    opening_value: float = Field(..., description="期初金额")
+    total_in_quantity: int = Field(..., description="本期收入数量")
+    total_out_quantity: int = Field(..., description="本期发出数量")
+    closing_quantity: int = Field(..., description="期末数量")
+    closing_value: float = Field(..., description="期末金额")
+    movements: List[StockCardMovement] = Field(..., description="收发明细")
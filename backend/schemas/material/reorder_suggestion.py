@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class ReorderSuggestionItem(BaseModel):
+    """补货建议明细"""
+    rank: int = Field(..., description="补货优先级排名（1最紧急）")
+    material_id: int = Field(..., description="器材ID")
+    material_code: str = Field(..., description="器材编码")
+    material_name: str = Field(..., description="器材名称")
+    material_specification: str = Field(..., description="器材规格型号")
+    major_name: str = Field(..., description="专业名称")
+    equipment_name: str = Field(..., description="装备名称")
+    window_days: int = Field(..., description="消耗统计窗口天数")
+    consumed_quantity: int = Field(..., description="窗口内出库数量")
+    average_daily_consumption: float = Field(..., description="日均消耗量")
+    current_stock: int = Field(..., description="当前库存")
+    safety_stock: int = Field(..., description="安全库存")
+    reorder_point: float = Field(..., description="再订货点")
+    days_of_cover: Optional[float] = Field(None, description="可用天数（无消耗时为空）")
+    needs_reorder: bool = Field(..., description="是否需要补货")
+    suggested_quantity: int = Field(..., description="建议补货数量")
+
+
+class ReorderSuggestionListResponse(BaseModel):
+    """补货建议列表响应模型"""
+    refreshed_at: Optional[datetime] = Field(None, description="计算时间")
+    total: int = Field(..., description="总数量")
+    page: int = Field(..., description="当前页码")
+    page_size: int = Field(..., description="每页数量")
+    total_pages: int = Field(..., description="总页数")
+    items: List[ReorderSuggestionItem] = Field(..., description="补货建议列表（按排名）")
+
+
+class ReorderRefreshResult(BaseModel):
+    """补货建议刷新结果"""
+    count: int = Field(..., description="计算的器材数量")
+    refreshed_at: datetime = Field(..., description="计算时间")
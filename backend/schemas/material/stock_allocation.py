@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date
+
+
+class StockAllocationItem(BaseModel):
+    """分配到的批次货位"""
+    detail_id: int = Field(..., description="库存明细ID")
+    batch_id: int = Field(..., description="批次ID")
+    batch_number: str = Field(..., description="批次编号")
+    bin_id: Optional[int] = Field(None, description="货位ID")
+    bin_name: Optional[str] = Field(None, description="货位名称")
+    warehouse_id: Optional[int] = Field(None, description="仓库ID")
+    inbound_date: Optional[date] = Field(None, description="入库日期")
+    production_date: Optional[date] = Field(None, description="生产日期")
+    available_quantity: int = Field(..., description="该明细可用数量")
+    quantity: int = Field(..., description="分配数量")
+
+
+class StockAllocationResponse(BaseModel):
+    """出库批次自动分配结果"""
+    material_id: int = Field(..., description="器材ID")
+    strategy: str = Field(..., description="分配策略")
+    requested_quantity: int = Field(..., description="需求数量")
+    allocated_quantity: int = Field(..., description="已分配数量")
+    shortage: int = Field(..., description="缺口数量（可用库存不足时大于0）")
+    allocations: List[StockAllocationItem] = Field(..., description="分配明细（按出库先后排序）")
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class StockTransferMoveItem(BaseModel):
+    """移库明细：按库存明细ID或按批次ID+源货位指定移出的库存"""
+    detail_id: Optional[int] = Field(None, description="库存明细ID")
+    batch_id: Optional[int] = Field(None, description="批次ID（未指定明细ID时必须同时指定源货位）")
+    from_bin_id: Optional[int] = Field(None, description="源货位ID（按明细ID移库时可省略）")
+    to_bin_id: int = Field(..., description="目标货位ID")
+    quantity: int = Field(..., gt=0, description="移库数量")
+
+
+class StockTransferRequest(BaseModel):
+    """批量移库请求"""
+    moves: List[StockTransferMoveItem] = Field(..., min_length=1, description="移库明细列表（按顺序执行）")
+
+
+class StockTransferResult(BaseModel):
+    """批量移库结果"""
+    transfer_id: int = Field(..., description="移库编号（流水的关联单据ID）")
+    move_count: int = Field(..., description="移动条数")
+    transaction_count: int = Field(..., description="写入的调整流水条数")
+    updated_detail_count: int = Field(..., description="更新的库存明细条数")
+    created_detail_count: int = Field(..., description="拆分新增的库存明细条数")
+    deleted_detail_count: int = Field(..., description="移空删除的库存明细条数")
+    bin_count: int = Field(..., description="涉及的货位数量")
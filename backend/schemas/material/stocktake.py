@@ -0,0 +1,110 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+from models.material.stocktake import StocktakeStatus
+
+
+class StocktakeCreate(BaseModel):
+    """创建盘点单（范围条件都为空时盘点全部库存）"""
+    warehouse_id: Optional[int] = Field(None, description="仓库ID")
+    bin_id: Optional[int] = Field(None, description="货位ID")
+    major_id: Optional[int] = Field(None, description="专业ID")
+    remark: Optional[str] = Field(None, description="备注")
+
+
+class StocktakeResponse(BaseModel):
+    """盘点单响应模型"""
+    stocktake_id: int = Field(..., description="盘点单ID")
+    stocktake_number: str = Field(..., description="盘点单号")
+    warehouse_id: Optional[int] = Field(None, description="仓库ID范围")
+    bin_id: Optional[int] = Field(None, description="货位ID范围")
+    major_id: Optional[int] = Field(None, description="专业ID范围")
+    status: StocktakeStatus = Field(..., description="状态")
+    snapshot_time: datetime = Field(..., description="账面数量冻结时间")
+    item_count: int = Field(..., description="盘点明细行数")
+    expected_total: int = Field(..., description="账面总数量")
+    variance_count: int = Field(..., description="过账的差异行数")
+    variance_quantity: int = Field(..., description="过账的差异数量合计")
+    creator: str = Field(..., description="创建人")
+    poster: Optional[str] = Field(None, description="过账人")
+    posted_time: Optional[datetime] = Field(None, description="过账时间")
+    remark: Optional[str] = Field(None, description="备注")
+    create_time: datetime = Field(..., description="创建时间")
+
+    class Config:
+        from_attributes = True
+
+
+class StocktakeListResponse(BaseModel):
+    """盘点单分页列表响应模型"""
+    total: int = Field(..., description="总数量")
+    page: int = Field(..., description="当前页码")
+    page_size: int = Field(..., description="每页数量")
+    total_pages: int = Field(..., description="总页数")
+    data: List[StocktakeResponse] = Field(..., description="盘点单列表")
+
+
+class StocktakeSummary(BaseModel):
+    """盘点进度和差异汇总"""
+    item_count: int = Field(..., description="盘点明细行数")
+    counted_count: int = Field(..., description="已盘点行数")
+    uncounted_count: int = Field(..., description="未盘点行数")
+    variance_count: int = Field(..., description="有差异的行数（不含未盘点）")
+    gain_quantity: int = Field(..., description="盘盈数量合计")
+    loss_quantity: int = Field(..., description="盘亏数量合计")
+
+
+class StocktakeDetailResponse(BaseModel):
+    """盘点单详情（含进度汇总）"""
+    stocktake: StocktakeResponse = Field(..., description="盘点单")
+    summary: StocktakeSummary = Field(..., description="进度和差异汇总")
+
+
+class StocktakeItemResponse(BaseModel):
+    """盘点明细响应模型"""
+    item_id: int = Field(..., description="盘点明细ID")
+    batch_id: int = Field(..., description="批次ID")
+    material_id: int = Field(..., description="器材ID")
+    bin_id: Optional[int] = Field(None, description="货位ID")
+    material_code: str = Field(..., description="器材编码")
+    material_name: str = Field(..., description="器材名称")
+    material_specification: Optional[str] = Field(None, description="器材规格型号")
+    batch_number: str = Field(..., description="批次编号")
+    bin_name: Optional[str] = Field(None, description="货位名称")
+    bar_code: Optional[str] = Field(None, description="货位码")
+    expected_quantity: int = Field(..., description="账面数量")
+    counted_quantity: Optional[int] = Field(None, description="实盘数量（为空表示未盘点）")
+    variance: Optional[int] = Field(None, description="差异（实盘-账面，未盘点为空）")
+    count_time: Optional[datetime] = Field(None, description="录入时间")
+
+
+class StocktakeItemListResponse(BaseModel):
+    """盘点明细分页列表响应模型"""
+    total: int = Field(..., description="总数量")
+    page: int = Field(..., description="当前页码")
+    page_size: int = Field(..., description="每页数量")
+    total_pages: int = Field(..., description="总页数")
+    items: List[StocktakeItemResponse] = Field(..., description="盘点明细列表")
+
+
+class StocktakeCountEntry(BaseModel):
+    """实盘数量：按盘点明细ID、批次ID+货位ID或批次编号+货位码定位"""
+    item_id: Optional[int] = Field(None, description="盘点明细ID")
+    batch_id: Optional[int] = Field(None, description="批次ID")
+    bin_id: Optional[int] = Field(None, description="货位ID")
+    batch_number: Optional[str] = Field(None, description="批次编号")
+    bin_code: Optional[str] = Field(None, description="货位码或货位名称")
+    quantity: int = Field(..., ge=0, description="实盘数量")
+
+
+class StocktakeCountRequest(BaseModel):
+    """批量录入实盘数量"""
+    entries: List[StocktakeCountEntry] = Field(..., min_length=1, description="实盘数量列表")
+    accumulate: bool = Field(False, description="累加到已录入的数量（默认覆盖）")
+
+
+class StocktakeCountResult(BaseModel):
+    """实盘数量录入结果"""
+    recorded_count: int = Field(..., description="录入的明细行数（同一明细多次出现合并为一行）")
+    new_item_count: int = Field(..., description="新发现的批次货位行数")
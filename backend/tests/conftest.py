@@ -0,0 +1,61 @@
+"""
+测试公共夹具
+
+每个测试使用临时目录中的独立SQLite数据库，引擎配置（WAL、自动提交、锁等待超时）与正式环境相同。
+
+运行方式（在backend目录下）：
+    python -m pytest tests
+"""
+
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from sqlmodel import Session
+
+from database.main_database import create_missing_tables, get_database_url, get_engine, set_database_url
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """临时数据库引擎（已创建全部业务表）"""
+    original_url = get_database_url()
+    set_database_url(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    create_missing_tables()
+    engine = get_engine()
+    yield engine
+    engine.dispose()
+    set_database_url(original_url)
+
+
+@pytest.fixture
+def stock_detail(engine):
+    """一个器材批次在一个货位上的库存明细（数量100），返回明细ID"""
+    from models.base.bin import Bin
+    from models.material.inventory_batch import InventoryBatch
+    from models.material.inventory_detail import InventoryDetail
+    from models.material.material import Material
+
+    with Session(engine) as db:
+        material = Material(material_code="M001", material_name="测试器材", creator="test",
+                            create_time=datetime.now(), update_time=datetime.now())
+        bin_ = Bin(bin_name="A-01", warehouse_id=1, warehouse_name="1号仓库", creator="test")
+        db.add(material)
+        db.add(bin_)
+        db.flush()
+        batch = InventoryBatch(batch_number="M001000000-20260101001", material_id=material.id, unit_price=2.0,
+                               inbound_date=date.today(), creator="test",
+                               create_time=datetime.now(), update_time=datetime.now())
+        db.add(batch)
+        db.flush()
+        detail = InventoryDetail(batch_id=batch.batch_id, material_id=material.id, bin_id=bin_.id,
+                                 quantity=100, last_updated=date.today())
+        db.add(detail)
+        db.commit()
+        return detail.detail_id
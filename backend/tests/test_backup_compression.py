@@ -0,0 +1,113 @@
+"""
+备份文件压缩测试：BackupFileWriter/BackupFileReader 流式压缩解压的往返、压缩后文件的SHA-256，
+以及写入出错时删除临时文件
+"""
+
+import gzip
+import hashlib
+import lzma
+import random
+
+import pytest
+
+from backup.compression import (
+    DECOMPRESSION_ERRORS, DEFAULT_COMPRESSION_LEVELS, BackupFileReader, BackupFileWriter
+)
+
+SUFFIXES = {"none": "", "gzip": ".gz", "lzma": ".xz"}
+DECOMPRESS = {"none": lambda data: data, "gzip": gzip.decompress, "lzma": lzma.decompress}
+
+
+def sample_chunks():
+    """可压缩的文本和不可压缩的随机字节交替，共约3MB"""
+    rows = "".join(f"{index},B2025{index % 99991:05d},A-{index % 40:02d},入库\n" for index in range(20000))
+    noise = random.Random(47).randbytes(512 * 1024)
+    return [rows.encode(), noise] * 2 + [b"", b"end"]
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "lzma"])
+def test_round_trip(tmp_path, compression):
+    path = tmp_path / f"backup.db{SUFFIXES[compression]}"
+    chunks = sample_chunks()
+    with BackupFileWriter(path, compression) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    assert writer.level == DEFAULT_COMPRESSION_LEVELS.get(compression)
+    assert not writer.temp_path.exists()
+    on_disk = path.read_bytes()
+    # file_size、file_sha256 为写入磁盘的（压缩后）字节
+    assert writer.file_size == len(on_disk)
+    assert writer.file_sha256 == hashlib.sha256(on_disk).hexdigest()
+    assert DECOMPRESS[compression](on_disk) == b"".join(chunks)
+    if compression != "none":
+        assert len(on_disk) < len(b"".join(chunks))
+
+    with BackupFileReader(path) as reader:
+        assert reader.compression == compression
+        head = reader.read_exactly(100000)
+        rest = reader.read()
+        assert reader.read_exactly(10) == b""
+    assert head + rest == b"".join(chunks)
+    assert len(head) == 100000
+    assert reader.file_sha256 == writer.file_sha256
+
+
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_drain_covers_whole_file(tmp_path, compression):
+    path = tmp_path / f"backup.db{SUFFIXES[compression]}"
+    with BackupFileWriter(path, compression, level=1) as writer:
+        for chunk in sample_chunks():
+            writer.write(chunk)
+
+    with BackupFileReader(path) as reader:
+        reader.read_exactly(1024)
+        reader.drain()
+        assert reader.file_sha256 == writer.file_sha256 == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_corrupted_or_truncated_file_fails_to_read(tmp_path, compression):
+    path = tmp_path / f"backup.db{SUFFIXES[compression]}"
+    with BackupFileWriter(path, compression) as writer:
+        for chunk in sample_chunks():
+            writer.write(chunk)
+    original = path.read_bytes()
+
+    # 损坏位置不同，抛出的异常类型不同（CRC错误、压缩数据错误），都应在 DECOMPRESSION_ERRORS 中
+    for position in range(20, len(original) - 20, len(original) // 200):
+        data = bytearray(original)
+        data[position] ^= 0xFF
+        path.write_bytes(bytes(data))
+        with pytest.raises(DECOMPRESSION_ERRORS):
+            with BackupFileReader(path) as reader:
+                reader.drain()
+
+    path.write_bytes(original[:len(original) // 2])
+    with pytest.raises(DECOMPRESSION_ERRORS):
+        with BackupFileReader(path) as reader:
+            reader.drain()
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "lzma"])
+def test_error_removes_temp_file(tmp_path, compression):
+    path = tmp_path / f"backup.db{SUFFIXES[compression]}"
+    path.write_bytes(b"previous backup")
+
+    with pytest.raises(RuntimeError):
+        with BackupFileWriter(path, compression) as writer:
+            writer.write(b"partial" * 1000)
+            assert writer.temp_path.exists()
+            raise RuntimeError("磁盘已满")
+
+    assert not writer.temp_path.exists()
+    # 出错时不替换已有的同名文件
+    assert path.read_bytes() == b"previous backup"
+    assert list(tmp_path.iterdir()) == [path]
+    assert writer.file_sha256 == ""
+
+
+def test_invalid_level_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="gzip 压缩级别应在 1-9 之间"):
+        BackupFileWriter(tmp_path / "backup.db.gz", "gzip", level=0)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,71 @@
+"""
+导入错误文件生成测试：5万条校验错误加插入错误时按行合并错误并完整写出xlsx
+"""
+
+import tempfile
+import time
+
+from openpyxl import load_workbook
+
+from config.import_config import get_supplier_import_config
+from schemas.common.import_schemas import ImportError
+from utils.error_file_handler import add_insert_errors_to_error_list, generate_error_file_from_all_errors
+
+ROW_COUNT = 70000
+ERROR_ROW_COUNT = 50000
+INSERT_ERROR_COUNT = 25000
+# 错误行按行号索引后为线性复杂度，逐行查找原始行的旧实现在该规模下需要数分钟
+TIME_LIMIT_SECONDS = 60
+
+
+def test_export_50k_errors_with_insert_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    config = get_supplier_import_config()
+
+    # 第2行开始为数据行，前5万行名称为空（校验错误）
+    original_rows = [
+        (row_index, ("" if row_index < ERROR_ROW_COUNT + 2 else f"供应商{row_index}", "北京", "", "", "", "1"))
+        for row_index in range(2, ROW_COUNT + 2)
+    ]
+    all_errors = [
+        ImportError(row_index=row_index, field="supplier_name",
+                    error_message="供应商:供应商名称:不能为空", raw_data={})
+        for row_index in range(2, ERROR_ROW_COUNT + 2)
+    ]
+    # 插入错误：一半落在已有错误行，一半落在校验通过的行
+    insert_errors = [
+        {"row_index": row_index, "field": "supplier_city",
+         "error_message": "供应商:所在城市:插入失败", "raw_data": {}}
+        for row_index in range(ERROR_ROW_COUNT + 2 - INSERT_ERROR_COUNT // 2,
+                               ERROR_ROW_COUNT + 2 + INSERT_ERROR_COUNT // 2)
+    ]
+
+    started = time.monotonic()
+    error_rows = []
+    add_insert_errors_to_error_list(insert_errors, all_errors, original_rows, error_rows)
+    error_file_path = generate_error_file_from_all_errors(all_errors, original_rows, config, entity_key="supplier")
+    elapsed = time.monotonic() - started
+
+    assert elapsed < TIME_LIMIT_SECONDS
+    assert error_file_path.endswith(".xlsx")
+    assert error_file_path.startswith(str(tmp_path))
+
+    workbook = load_workbook(error_file_path, read_only=True)
+    rows = list(workbook.active.iter_rows(values_only=True))
+    expected_rows = ERROR_ROW_COUNT + INSERT_ERROR_COUNT // 2
+    assert len(rows) == 1 + expected_rows
+    assert rows[0][-1] == "错误原因"
+    assert [field.label for field in config.template_fields] == list(rows[0][:-1])
+
+    # 同一行的校验错误和插入错误合并在一条错误原因中
+    overlap_row = rows[1 + ERROR_ROW_COUNT - 1]
+    assert overlap_row[-1] == "供应商:供应商名称:不能为空; 供应商:所在城市:插入失败"
+    last_row = rows[-1]
+    assert last_row[0] == f"供应商{ERROR_ROW_COUNT + 1 + INSERT_ERROR_COUNT // 2}"
+    assert last_row[-1] == "供应商:所在城市:插入失败"
+
+    # 出错字段标红，其他字段保持默认字体
+    first_row = next(workbook.active.iter_rows(min_row=2, max_row=2))
+    assert first_row[0].font.color.rgb == "00FF0000"
+    assert first_row[1].font.color.type != "rgb"
+    workbook.close()
@@ -0,0 +1,73 @@
+"""
+导入文件读取测试：CSV/TSV按编码（UTF-8 BOM、UTF-8、GBK）读取，与xlsx读出的实体数据相同
+"""
+
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from config.import_config import get_supplier_import_config
+from utils.import_utils import _ENCODING_SAMPLE_SIZE, detect_text_encoding, read_import_file
+
+HEADER = "供应商名称,所在城市,详细地址,负责人,联系方式,供应商等级"
+ROWS = [
+    "北京科技有限公司,北京,朝阳区某街道,张三,13800138000,1",
+    ",空名称行跳过,,,,",
+    "\"上海贸易,有限公司\",上海,,李四,,",
+]
+EXPECTED = [
+    (2, {"supplier_name": "北京科技有限公司", "supplier_city": "北京", "supplier_address": "朝阳区某街道",
+         "supplier_manager": "张三", "supplier_contact": "13800138000", "supplier_level": 1}),
+    (4, {"supplier_name": "上海贸易,有限公司", "supplier_city": "上海", "supplier_address": "",
+         "supplier_manager": "李四", "supplier_contact": "", "supplier_level": None}),
+]
+
+
+def csv_text():
+    return "\r\n".join([HEADER] + ROWS) + "\r\n"
+
+
+@pytest.mark.parametrize("encoding, detected", [
+    ("utf-8-sig", "utf-8-sig"),
+    ("utf-8", "utf-8"),
+    ("gbk", "gb18030"),
+])
+def test_csv_encodings(encoding, detected):
+    contents = csv_text().encode(encoding)
+    assert detect_text_encoding(contents) == detected
+
+    entities_data, original_rows = read_import_file(contents, ".csv", get_supplier_import_config())
+    assert entities_data == EXPECTED
+    assert [row_index for row_index, _ in original_rows] == [2, 4]
+
+
+def test_tsv():
+    contents = "\n".join(line.replace(",", "\t") for line in [HEADER, ROWS[0]]).encode("utf-8")
+    entities_data, _ = read_import_file(contents, ".tsv", get_supplier_import_config())
+    assert entities_data == EXPECTED[:1]
+
+
+def test_gbk_after_utf8_sample_is_reread():
+    """采样部分是ASCII（能按UTF-8解码），之后才出现GBK中文时按GBK重新读取"""
+    padding = [f"supplier{index},Beijing,,,," for index in range(_ENCODING_SAMPLE_SIZE // 20)]
+    contents = "\n".join(["name,city,address,manager,contact,level"] + padding + [ROWS[0]]).encode("gbk")
+    assert detect_text_encoding(contents) == "utf-8"
+
+    entities_data, _ = read_import_file(contents, ".csv", get_supplier_import_config())
+    assert len(entities_data) == len(padding) + 1
+    assert entities_data[-1] == (len(padding) + 2, EXPECTED[0][1])
+
+
+def test_xlsx_matches_csv():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER.split(","))
+    sheet.append(["北京科技有限公司", "北京", "朝阳区某街道", "张三", "13800138000", 1])
+    sheet.append([None, "空名称行跳过"])
+    sheet.append(["上海贸易,有限公司", "上海", None, "李四", None, None])
+    contents = io.BytesIO()
+    workbook.save(contents)
+
+    entities_data, _ = read_import_file(contents.getvalue(), ".xlsx", get_supplier_import_config())
+    assert entities_data == EXPECTED
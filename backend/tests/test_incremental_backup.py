@@ -0,0 +1,126 @@
+"""
+增量备份测试：全量基准备份加多个增量备份重组（materialize_backup）后与备份时的数据库逐字节一致，
+备份链、截断和校验都生效
+"""
+
+import hashlib
+import sqlite3
+
+import pytest
+
+from backup.incremental_backup import (
+    create_full_backup, create_incremental_backup, load_manifest, materialize_backup
+)
+
+
+def file_sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def snapshot_sha256(connection, path):
+    """把WAL检查点回数据库文件后的文件摘要，即备份读取到的快照内容"""
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return file_sha256(path)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """WAL模式的数据库，一张2万行的表（一百多页）"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, quantity INTEGER)")
+    connection.executemany("INSERT INTO items (name, quantity) VALUES (?, ?)",
+                           ((f"器材{index:06d}", index) for index in range(20000)))
+    yield path, connection
+    connection.close()
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "lzma"])
+def test_base_and_deltas_round_trip(tmp_path, database, compression):
+    path, connection = database
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    suffix = {"none": "", "gzip": ".gz", "lzma": ".xz"}[compression]
+    expected = {}
+
+    base = backup_dir / f"base.db{suffix}"
+    create_full_backup(path, base, "daily", compression)
+    expected[base] = snapshot_sha256(connection, path)
+
+    # 增量1：修改少量行；增量2：追加行使数据库变大；增量3：删除后VACUUM使数据库变小
+    changes = [
+        "UPDATE items SET quantity = quantity + 1 WHERE id <= 300",
+        "INSERT INTO items (name, quantity) SELECT name || '-新', quantity FROM items WHERE id <= 10000",
+        "DELETE FROM items WHERE id > 5000",
+    ]
+    parent = base
+    for index, statement in enumerate(changes, 1):
+        connection.execute(statement)
+        if statement.startswith("DELETE"):
+            connection.execute("VACUUM")
+        delta = backup_dir / f"delta{index}.delta{suffix}"
+        manifest = create_incremental_backup(path, parent, delta, "daily", compression)
+        expected[delta] = snapshot_sha256(connection, path)
+        assert manifest["base"] == base.name
+        assert manifest["parent"] == parent.name
+        assert manifest["chain"] == [base.name] + [f"delta{i}.delta{suffix}" for i in range(1, index)]
+        parent = delta
+
+    sizes = [load_manifest(backup)["page_count"] for backup in expected]
+    assert sizes[2] > sizes[1] and sizes[3] < sizes[2]
+    # 只修改少量行的增量只保存变化的页
+    first_delta = load_manifest(backup_dir / f"delta1.delta{suffix}")
+    assert 0 < first_delta["changed_pages"] < first_delta["page_count"] // 10
+
+    for backup, sha256 in expected.items():
+        target = tmp_path / f"restored-{backup.name}.db"
+        manifest = load_manifest(backup)
+        result = materialize_backup(backup, target)
+        assert result == {"applied_deltas": len(manifest["chain"]), "page_count": manifest["page_count"]}
+        # 数据库变小后重组结果截断到清单记录的页数
+        assert target.stat().st_size == manifest["page_count"] * manifest["page_size"]
+        assert file_sha256(target) == sha256 == manifest["database_sha256"]
+
+    restored = sqlite3.connect(tmp_path / f"restored-delta3.delta{suffix}.db")
+    assert restored.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert restored.execute("SELECT count(*), sum(quantity) FROM items").fetchone() == \
+        connection.execute("SELECT count(*), sum(quantity) FROM items").fetchone()
+    restored.close()
+
+
+def _backup_chain(tmp_path, database):
+    path, connection = database
+    base, delta = tmp_path / "base.db", tmp_path / "change.delta"
+    create_full_backup(path, base, "daily")
+    connection.execute("UPDATE items SET quantity = -1 WHERE id <= 100")
+    create_incremental_backup(path, base, delta, "daily")
+    return base, delta
+
+
+def test_corrupted_delta_is_rejected(tmp_path, database):
+    _, delta = _backup_chain(tmp_path, database)
+    data = bytearray(delta.read_bytes())
+    data[-100] ^= 0xFF
+    delta.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="增量备份校验失败"):
+        materialize_backup(delta, tmp_path / "restored.db")
+
+
+def test_corrupted_base_is_rejected(tmp_path, database):
+    base, delta = _backup_chain(tmp_path, database)
+    data = bytearray(base.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    base.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="基准备份校验失败"):
+        materialize_backup(delta, tmp_path / "restored.db")
+
+
+def test_missing_chain_file_is_rejected(tmp_path, database):
+    base, delta = _backup_chain(tmp_path, database)
+    base.unlink()
+
+    with pytest.raises(ValueError, match="备份链上的文件缺失: base.db"):
+        materialize_backup(delta, tmp_path / "restored.db")
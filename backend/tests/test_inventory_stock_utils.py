@@ -0,0 +1,95 @@
+"""
+库存条件扣减的并发测试：多线程同时扣减同一条库存明细时不超扣、不丢失更新，
+失败的单据回滚写事务后扣减随之撤销，库存与流水一致
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from sqlmodel import Session, select, func
+
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction, ReferenceType
+from utils.inventory_stock_utils import begin_write_transaction, decrease_stock
+
+THREADS = 16
+ATTEMPTS = 12
+
+
+def _run_workers(engine, worker):
+    barrier = Barrier(THREADS)
+
+    def run(index):
+        with Session(engine) as db:
+            barrier.wait()
+            return worker(db, index)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(run, range(THREADS)))
+
+
+def test_concurrent_deductions_never_oversell(engine, stock_detail):
+    def worker(db, index):
+        detail = db.get(InventoryDetail, stock_detail)
+        deducted = 0
+        for attempt in range(ATTEMPTS):
+            quantity = 1 + (index + attempt) % 3
+            begin_write_transaction(db)
+            if decrease_stock(db, detail, quantity) is not None:
+                deducted += quantity
+            db.commit()
+        return deducted
+
+    deducted = sum(_run_workers(engine, worker))
+
+    with Session(engine) as db:
+        remaining = db.get(InventoryDetail, stock_detail).quantity
+    # 共请求约384件，只有100件库存：不超扣，且每次成功的扣减都反映在剩余数量中
+    assert 0 <= remaining < 3
+    assert deducted + remaining == 100
+
+
+def test_failed_orders_roll_back_deducted_stock(engine, stock_detail):
+    """在写事务中扣减并写流水，每3单模拟一次失败并回滚"""
+    def worker(db, index):
+        detail = db.get(InventoryDetail, stock_detail)
+        committed = 0
+        for attempt in range(ATTEMPTS):
+            try:
+                begin_write_transaction(db)
+                quantity_after = decrease_stock(db, detail, 1)
+                if quantity_after is None:
+                    db.rollback()
+                    continue
+                db.add(InventoryTransaction(
+                    material_id=detail.material_id,
+                    batch_id=detail.batch_id,
+                    bin_id=detail.bin_id,
+                    change_type=ChangeType.OUT,
+                    quantity_change=-1,
+                    quantity_before=quantity_after + 1,
+                    quantity_after=quantity_after,
+                    reference_type=ReferenceType.OUTBOUND,
+                    reference_id=index * ATTEMPTS + attempt,
+                    creator="test"
+                ))
+                db.flush()
+                if (index + attempt) % 3 == 0:
+                    raise RuntimeError("模拟单据写入失败")
+                db.commit()
+                committed += 1
+            except RuntimeError:
+                db.rollback()
+        return committed
+
+    committed = sum(_run_workers(engine, worker))
+
+    with Session(engine) as db:
+        remaining = db.get(InventoryDetail, stock_detail).quantity
+        transaction_count, total_change = db.exec(
+            select(func.count(), func.coalesce(func.sum(InventoryTransaction.quantity_change), 0))
+        ).one()
+    assert committed > 0
+    assert transaction_count == committed
+    assert remaining == 100 + total_change == 100 - committed
+    assert remaining >= 0
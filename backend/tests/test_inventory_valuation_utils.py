@@ -0,0 +1,196 @@
+"""
+库存计价测试：计价结果与逐条计算的参考实现一致，缓存在数量合计不变的修改后失效
+"""
+
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+from sqlmodel import Session
+
+from models.base.bin import Bin
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_transaction import ChangeType, InventoryTransaction, ReferenceType
+from models.material.material import Material
+from utils.inventory_valuation_utils import clear_valuation_cache, compute_inventory_valuation
+
+
+def reference_valuation(transactions, prices, warehouse_of=None):
+    """
+    逐条计算的参考实现（与inventory_valuation_utils的口径一致）
+
+    Args:
+        transactions: (流水ID, 时间, 器材ID, 批次ID, 货位ID, 数量变化, 关联单据类型, 关联单据ID) 列表
+        prices: 批次ID -> 单价
+        warehouse_of: 货位ID -> 仓库ID，为空时按器材分组；货位为空或不在映射中的流水归入仓库None
+
+    Returns:
+        dict: (器材ID, 仓库ID) -> (结存数量, 批次成本, 加权平均金额, 先进先出金额)
+    """
+    groups = {}
+    for row in sorted(transactions, key=lambda row: (row[1], row[0])):
+        warehouse_id = warehouse_of.get(row[4]) if warehouse_of else None
+        groups.setdefault((row[2], warehouse_id), []).append(row)
+
+    result = {}
+    for key, rows in groups.items():
+        quantity = sum(row[5] for row in rows)
+        if quantity == 0:
+            continue
+        batch_value = sum(row[5] * prices[row[3]] for row in rows)
+        # 收入层：非移库的正向流水；移库按(单据, 批次)合并后净移入的数量
+        layers = [(row[1], row[0], row[5], prices[row[3]]) for row in rows
+                  if row[5] > 0 and row[6] != ReferenceType.TRANSFER]
+        transfers = {}
+        for row in rows:
+            if row[6] == ReferenceType.TRANSFER:
+                merged = transfers.setdefault((row[7], row[3]), [row[1], row[0], 0, prices[row[3]]])
+                merged[0], merged[1] = max(merged[0], row[1]), max(merged[1], row[0])
+                merged[2] += row[5]
+        layers += [tuple(merged) for merged in transfers.values() if merged[2] > 0]
+        layers.sort()
+
+        receipt_quantity = sum(layer[2] for layer in layers)
+        receipt_value = sum(layer[2] * layer[3] for layer in layers)
+        average_price = receipt_value / receipt_quantity if receipt_quantity else 0.0
+        if quantity > 0:
+            remaining, fifo_value = quantity, 0.0
+            for _, _, layer_quantity, price in reversed(layers):
+                taken = min(layer_quantity, remaining)
+                fifo_value += taken * price
+                remaining -= taken
+                if remaining == 0:
+                    break
+            fifo_value += remaining * average_price
+        else:
+            fifo_value = quantity * average_price
+        result[key] = (quantity, round(batch_value, 2), round(quantity * average_price, 2), round(fifo_value, 2))
+    return result
+
+
+def as_result_map(rows):
+    return {
+        (row["material_id"], row["warehouse_id"]):
+            (row["quantity"], row["batch_value"], row["weighted_average_value"], row["fifo_value"])
+        for row in rows
+    }
+
+
+@pytest.fixture
+def valuation_data(engine):
+    """一个器材、两个批次（单价1和10）：批次1入库10，批次2入库10，批次1出库5"""
+    clear_valuation_cache()
+    with Session(engine) as db:
+        material = Material(material_code="M001", material_name="测试器材", creator="test",
+                            create_time=datetime.now(), update_time=datetime.now())
+        bin_ = Bin(bin_name="A-01", warehouse_id=1, warehouse_name="1号仓库", creator="test")
+        db.add(material)
+        db.add(bin_)
+        db.flush()
+        batches = [
+            InventoryBatch(batch_number=f"M001000000-2026010100{index}", material_id=material.id, unit_price=price,
+                           inbound_date=date.today(), creator="test", create_time=datetime.now(), update_time=datetime.now())
+            for index, price in ((1, 1.0), (2, 10.0))
+        ]
+        db.add_all(batches)
+        db.flush()
+        transactions = [
+            InventoryTransaction(
+                material_id=material.id, batch_id=batch.batch_id, bin_id=bin_.id,
+                change_type=ChangeType.IN if quantity > 0 else ChangeType.OUT,
+                quantity_change=quantity, quantity_before=0, quantity_after=0,
+                reference_type=ReferenceType.INBOUND if quantity > 0 else ReferenceType.OUTBOUND,
+                reference_id=1, creator="test", transaction_time=datetime(2026, 1, day)
+            )
+            for batch, quantity, day in ((batches[0], 10, 1), (batches[1], 10, 2), (batches[0], -5, 3))
+        ]
+        db.add_all(transactions)
+        db.commit()
+        yield [row.transaction_id for row in transactions], [batch.batch_id for batch in batches]
+    clear_valuation_cache()
+
+
+def _fifo_value(engine):
+    with Session(engine) as db:
+        return compute_inventory_valuation(db)[0]["fifo_value"]
+
+
+def _raw_connection(engine):
+    """不经过ORM会话的连接（模拟其他进程或手工修改数据库）"""
+    return sqlite3.connect(engine.url.database, isolation_level=None)
+
+
+def test_unchanged_data_is_served_from_cache(engine, valuation_data):
+    with Session(engine) as db:
+        first = compute_inventory_valuation(db)
+        assert compute_inventory_valuation(db) is first
+    # 结存15：最近的收入层批次2全部10件 + 批次1剩余5件
+    assert first[0]["fifo_value"] == 105.0
+    assert first[0]["weighted_average_value"] == 82.5
+
+
+def test_swapping_quantities_invalidates_cache(engine, valuation_data):
+    (first_id, _, last_id), _ = valuation_data
+    assert _fifo_value(engine) == 105.0
+
+    # 互换两条流水的数量：条数、最大ID和数量合计都不变
+    with _raw_connection(engine) as connection:
+        connection.execute("UPDATE inventory_transactions SET quantity_change = -5 WHERE transaction_id = ?", (first_id,))
+        connection.execute("UPDATE inventory_transactions SET quantity_change = 10 WHERE transaction_id = ?", (last_id,))
+
+    # 收入层变为批次2的10件（1月2日）、批次1的10件（1月3日）
+    assert _fifo_value(engine) == 60.0
+
+
+def test_swapping_batch_prices_invalidates_cache(engine, valuation_data):
+    _, (first_batch, second_batch) = valuation_data
+    assert _fifo_value(engine) == 105.0
+
+    with _raw_connection(engine) as connection:
+        connection.execute("UPDATE inventory_batches SET unit_price = 10.0 WHERE batch_id = ?", (first_batch,))
+        connection.execute("UPDATE inventory_batches SET unit_price = 1.0 WHERE batch_id = ?", (second_batch,))
+
+    assert _fifo_value(engine) == 60.0
+
+
+def test_committed_time_change_invalidates_cache(engine, valuation_data):
+    (first_id, _, _), _ = valuation_data
+    assert _fifo_value(engine) == 105.0
+
+    # 只修改流水时间：数量、器材、批次都不变，由提交后的数据版本号使缓存失效
+    with Session(engine) as db:
+        transaction = db.get(InventoryTransaction, first_id)
+        transaction.transaction_time = datetime(2026, 1, 2, 12)
+        db.add(transaction)
+        db.commit()
+
+    assert _fifo_value(engine) == 60.0
+
+
+def test_matches_reference_with_transfers(engine, valuation_data):
+    (first_id, _, _), (first_batch, second_batch) = valuation_data
+    with Session(engine) as db:
+        source = db.get(InventoryTransaction, first_id)
+        other_bin = Bin(bin_name="B-01", warehouse_id=2, warehouse_name="2号仓库", creator="test")
+        db.add(other_bin)
+        db.flush()
+        # 批次2移库4件到2号仓库
+        for bin_id, quantity in ((source.bin_id, -4), (other_bin.id, 4)):
+            db.add(InventoryTransaction(
+                material_id=source.material_id, batch_id=second_batch, bin_id=bin_id,
+                change_type=ChangeType.ADJUST, quantity_change=quantity, quantity_before=0, quantity_after=0,
+                reference_type=ReferenceType.TRANSFER, reference_id=1, creator="test",
+                transaction_time=datetime(2026, 1, 4)
+            ))
+        db.commit()
+        rows = [
+            (row.transaction_id, row.transaction_time, row.material_id, row.batch_id, row.bin_id,
+             row.quantity_change, row.reference_type, row.reference_id)
+            for row in db.query(InventoryTransaction).all()
+        ]
+        prices = {first_batch: 1.0, second_batch: 10.0}
+        warehouse_of = {bin_.id: bin_.warehouse_id for bin_ in db.query(Bin).all()}
+
+        assert as_result_map(compute_inventory_valuation(db)) == reference_valuation(rows, prices)
+        assert as_result_map(compute_inventory_valuation(db, group_by="warehouse")) == \
+            reference_valuation(rows, prices, warehouse_of)
@@ -0,0 +1,52 @@
+"""
+单号、批次编码序列的并发分配测试：多线程同时分配时不重复、不跳号
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from threading import Barrier
+
+from sqlmodel import Session
+
+from models.material.inventory_batch import InventoryBatch
+from utils.sequence_utils import next_batch_code, next_outbound_order_number
+
+THREADS = 8
+PER_THREAD = 40
+
+
+def _allocate_concurrently(engine, allocate):
+    """每个线程使用独立会话分配PER_THREAD次，返回全部分配结果"""
+    barrier = Barrier(THREADS)
+
+    def worker(_):
+        with Session(engine) as db:
+            barrier.wait()
+            return [allocate(db) for _ in range(PER_THREAD)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return [result for results in executor.map(worker, range(THREADS)) for result in results]
+
+
+def test_outbound_order_numbers_are_unique_under_concurrency(engine):
+    results = _allocate_concurrently(engine, lambda db: next_outbound_order_number(db, "20260101"))
+
+    numbers = [number for number, _ in results]
+    assert len(set(numbers)) == len(numbers)
+    assert sorted(serial for _, serial in results) == list(range(1, THREADS * PER_THREAD + 1))
+
+
+def test_batch_codes_continue_after_existing_codes_under_concurrency(engine):
+    batch_date = date(2026, 1, 1)
+    with Session(engine) as db:
+        # 升级前已使用的批次编码：序列从已用的最大流水号之后开始
+        db.add(InventoryBatch(batch_number="M001000000-20260101005", material_id=1, unit_price=1.0,
+                              create_time=datetime.now(), update_time=datetime.now()))
+        db.commit()
+
+    results = _allocate_concurrently(engine, lambda db: next_batch_code(db, "M001", batch_date))
+
+    codes = [code for code, _ in results]
+    assert len(set(codes)) == len(codes)
+    assert "M001000000-20260101005" not in codes
+    assert sorted(serial for _, serial in results) == list(range(6, 6 + THREADS * PER_THREAD))
@@ -0,0 +1,69 @@
+"""
+盘点过账测试：同一(批次, 货位)有多条库存明细时，盘亏分摊到各条明细，不会把某一条扣成负数
+"""
+
+from datetime import date
+
+from sqlmodel import Session, select
+
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import InventoryTransaction
+from utils.stocktake_utils import CountEntry, create_stocktake, post_stocktake, record_counts
+
+
+def _split_detail(engine, detail_id, quantities):
+    """把库存明细拆成同一批次、同一货位上的多条明细，返回各条明细ID"""
+    with Session(engine) as db:
+        detail = db.get(InventoryDetail, detail_id)
+        detail.quantity = quantities[0]
+        extra = [
+            InventoryDetail(batch_id=detail.batch_id, material_id=detail.material_id, bin_id=detail.bin_id,
+                            quantity=quantity, last_updated=date.today())
+            for quantity in quantities[1:]
+        ]
+        db.add(detail)
+        db.add_all(extra)
+        db.commit()
+        return [detail.detail_id] + [row.detail_id for row in extra], detail.batch_id, detail.bin_id
+
+
+def _post_count(engine, batch_id, bin_id, counted):
+    with Session(engine) as db:
+        stocktake = create_stocktake(db, creator="test")
+        record_counts(db, stocktake.stocktake_id, [CountEntry(quantity=counted, batch_id=batch_id, bin_id=bin_id)])
+        post_stocktake(db, stocktake.stocktake_id, poster="test")
+
+
+def _quantities(engine, detail_ids):
+    with Session(engine) as db:
+        return [db.get(InventoryDetail, detail_id).quantity for detail_id in detail_ids]
+
+
+def test_loss_is_spread_across_details_of_one_bin(engine, stock_detail):
+    # 明细ID最小的一条只有2件，盘亏7件
+    detail_ids, batch_id, bin_id = _split_detail(engine, stock_detail, [2, 8])
+
+    _post_count(engine, batch_id, bin_id, counted=3)
+
+    quantities = _quantities(engine, detail_ids)
+    assert sum(quantities) == 3
+    assert min(quantities) >= 0
+    with Session(engine) as db:
+        transaction = db.exec(select(InventoryTransaction)).one()
+    assert (transaction.quantity_change, transaction.quantity_before, transaction.quantity_after) == (-7, 10, 3)
+
+
+def test_loss_of_whole_bin_empties_every_detail(engine, stock_detail):
+    detail_ids, batch_id, bin_id = _split_detail(engine, stock_detail, [4, 0, 6])
+
+    _post_count(engine, batch_id, bin_id, counted=0)
+
+    assert _quantities(engine, detail_ids) == [0, 0, 0]
+
+
+def test_gain_is_added_to_one_detail(engine, stock_detail):
+    detail_ids, batch_id, bin_id = _split_detail(engine, stock_detail, [2, 8])
+
+    _post_count(engine, batch_id, bin_id, counted=15)
+
+    assert _quantities(engine, detail_ids) == [7, 8]
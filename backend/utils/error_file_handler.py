@@ -5,15 +5,69 @@
 本模块整合了错误Excel文件生成功能，避免代码重复
 """
 
-from typing import List, Dict, Any, Tuple, Optional
-from pydantic import conset
-import xlwt
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
 import tempfile
 import os
 import time
 from schemas.common.import_schemas import ImportError, ImportConfig
 
 
+# 错误文件MIME类型（.xlsx）
+ERROR_FILE_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+
+def _create_error_file_styles(workbook: Workbook) -> None:
+    """注册错误文件用到的命名样式（每个单元格只引用样式名，避免逐格构建样式）"""
+    workbook.add_named_style(NamedStyle(
+        name="error_header",
+        font=Font(bold=True),
+        fill=PatternFill(fill_type="solid", fgColor="C0C0C0"),
+        alignment=Alignment(vertical="center", horizontal="center")
+    ))
+    workbook.add_named_style(NamedStyle(
+        name="error_highlight",
+        font=Font(color="FF0000"),
+        alignment=Alignment(vertical="center")
+    ))
+
+
+def index_errors_by_row(errors: Iterable[ImportError]) -> Dict[int, List[ImportError]]:
+    """按行号分组错误（保持错误首次出现的行顺序）"""
+    errors_by_row: Dict[int, List[ImportError]] = {}
+    for error in errors:
+        errors_by_row.setdefault(error.row_index, []).append(error)
+    return errors_by_row
+
+
+def index_rows_by_number(original_rows: Iterable[Tuple[int, tuple]]) -> Dict[int, tuple]:
+    """按行号索引原始行数据（行号重复时保留第一次出现的行）"""
+    rows_by_number: Dict[int, tuple] = {}
+    for row_index, row_data in original_rows:
+        rows_by_number.setdefault(row_index, row_data)
+    return rows_by_number
+
+
+def _extract_error_fields(error_message: str, label_to_key: Dict[str, str]) -> set:
+    """从错误消息中提取出错字段键
+
+    错误消息格式：{entity_name}:{字段标签}:..., 多条消息以"; "分隔
+    """
+    error_fields = set()
+    for error_part in error_message.split("; "):
+        if ":" in error_part:
+            parts = error_part.split(":", 2)
+            if len(parts) >= 2:
+                field_key = label_to_key.get(parts[1].strip())
+                if field_key:
+                    error_fields.add(field_key)
+    return error_fields
+
+
 def generate_error_excel_file(
     error_data_list: List[Dict[str, Any]], 
     error_details: List[Dict[str, str]], 
@@ -21,7 +75,9 @@ def generate_error_excel_file(
     filename_prefix: Optional[str] = None,
     entity_key: Optional[str] = None
 ) -> str:
-    """生成错误数据Excel文件（与下载模板格式一致）
+    """生成错误数据Excel文件（与下载模板格式一致，XLSX格式）
+    
+    使用openpyxl只写模式逐行流式写入，内存占用与错误行数无关
     
     Args:
         error_data_list: 错误数据列表，每个元素包含原始数据
@@ -33,72 +89,49 @@ def generate_error_excel_file(
     Returns:
         str: 生成的错误文件路径
     """
-    error_workbook = xlwt.Workbook(encoding='utf-8')
-    error_sheet = error_workbook.add_sheet(f"{config.entity_name}导入错误")
+    error_workbook = Workbook(write_only=True)
+    _create_error_file_styles(error_workbook)
+    error_sheet = error_workbook.create_sheet(f"{config.entity_name}导入错误")
     
-    # 创建样式
-    header_style = xlwt.easyxf(
-        'font: bold on; align: vertical center, horizontal center; pattern: pattern solid, fore_color gray25;'
-    )
-    normal_style = xlwt.easyxf('align: vertical center;')
-    error_style = xlwt.easyxf('align: vertical center; font: color red;')
+    template_fields = config.template_fields
+    label_to_key = {field.label: field.key for field in template_fields}
     
-    # 根据配置动态生成标题行（与模板一致）
-    headers = [field.label for field in config.template_fields]
-    headers.append('错误原因')  # 添加错误原因列
-    
-    # 添加标题行
-    for col_num, header in enumerate(headers):
-        error_sheet.write(0, col_num, header, header_style)
-        # 设置列宽
-        if col_num < len(config.template_fields):
-            # 根据字段类型设置列宽
-            field = config.template_fields[col_num]
-            if field.type == "string" and hasattr(field, 'max_length') and field.max_length:
-                width = min(max(field.max_length + 2, 10), 30)
-            else:
-                width = 15
-            error_sheet.col(col_num).width = 256 * width
+    # 设置列宽（只写模式下需在写入数据前设置）
+    for col_num, field in enumerate(template_fields, 1):
+        # 根据字段类型设置列宽
+        if field.type == "string" and field.max_length:
+            width = min(max(field.max_length + 2, 10), 30)
         else:
-            # 错误原因列设置更宽
-            error_sheet.col(col_num).width = 256 * 25
+            width = 15
+        error_sheet.column_dimensions[get_column_letter(col_num)].width = width
+    # 错误原因列设置更宽
+    error_sheet.column_dimensions[get_column_letter(len(template_fields) + 1)].width = 25
+    
+    def make_cell(value: Any, style: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(error_sheet, value=value)
+        cell.style = style
+        return cell
+    
+    # 根据配置动态生成标题行（与模板一致），添加错误原因列
+    headers = [field.label for field in template_fields] + ['错误原因']
+    error_sheet.append([make_cell(header, "error_header") for header in headers])
     
     # 添加错误数据
-    for row_num, (error_data, error_detail) in enumerate(zip(error_data_list, error_details), 1):
-        # 获取该行的错误字段列表
-        error_fields = []
-        if error_detail.get('error_message'):
-            # 从错误详情中提取有错误的字段
-            error_message = error_detail.get('error_message', '')
-            # 从错误消息中提取字段名：按分号分割，然后按冒号分割提取字段标签
-            error_field_labels = []
-            for error_part in error_message.split("; "):
-                if ":" in error_part:
-                    # 新的格式：{entity_name}:{字段标签}:"{值}"在...
-                    # 提取第二个冒号前的字段标签
-                    parts = error_part.split(":", 2)
-                    if len(parts) >= 2:
-                        field_label = parts[1].strip()
-                        error_field_labels.append(field_label)
-            
-            # 将字段标签转换为字段键
-            error_fields = []
-            for field in config.template_fields:
-                if field.label in error_field_labels:
-                    error_fields.append(field.key)
+    for error_data, error_detail in zip(error_data_list, error_details):
+        error_message = error_detail.get('error_message') or ''
+        # 有错误的字段标红
+        error_fields = _extract_error_fields(error_message, label_to_key) if error_message else set()
         
-        # 写入原始数据（按模板字段顺序）
-        for col_num, field in enumerate(config.template_fields):
+        # 写入原始数据（按模板字段顺序），普通单元格直接写值，只有出错字段构建样式单元格
+        row_cells = []
+        for field in template_fields:
             value = error_data.get(field.key, '')
-            # 检查该字段是否有错误
-            style = error_style if field.key in error_fields else normal_style
-            #调试最终颜色
-            # print("写入数据，区分颜色",field.key,error_fields,style.font.colour_index);
-            error_sheet.write(row_num, col_num, str(value) if value else '', style)
+            value = str(value) if value else ''
+            row_cells.append(make_cell(value, "error_highlight") if field.key in error_fields else value)
         
         # 写入错误原因（红色显示）
-        error_message = error_detail.get('error_message', '未知错误')
-        error_sheet.write(row_num, len(config.template_fields), error_message, error_style)
+        row_cells.append(make_cell(error_message or '未知错误', "error_highlight"))
+        error_sheet.append(row_cells)
     
     # 保存文件到实体对应的专用目录
     temp_dir = tempfile.gettempdir()
@@ -108,7 +141,7 @@ def generate_error_excel_file(
     os.makedirs(entity_dir, exist_ok=True)
     
     prefix = filename_prefix or config.entity_key
-    error_file_name = f"{prefix}_import_errors_{int(time.time())}.xls"
+    error_file_name = f"{prefix}_import_errors_{int(time.time())}.xlsx"
     error_file_path = os.path.join(entity_dir, error_file_name)
     
     error_workbook.save(error_file_path)
@@ -121,7 +154,7 @@ def generate_universal_error_file(
     config: ImportConfig,
     entity_key: Optional[str] = None
 ) -> str:
-    """通用错误数据文件生成（XLS格式）- 保持向后兼容"""
+    """通用错误数据文件生成（XLSX格式）- 保持向后兼容"""
     # 转换为新格式
     error_data_list = []
     error_details = []
@@ -144,6 +177,41 @@ def generate_universal_error_file(
     return generate_error_excel_file(error_data_list, error_details, config, entity_key=entity_key)
 
 
+def build_error_rows(
+    all_errors: List[ImportError],
+    original_rows: List[Tuple[int, tuple]],
+    config: ImportConfig
+) -> List[Tuple[int, tuple, List[ImportError]]]:
+    """
+    按行号分组错误并关联原始行数据
+    
+    错误与原始行均先按行号建立索引，整体为线性复杂度
+    
+    Returns:
+        List[Tuple[row_index, row_data, errors]]: 错误行列表
+    """
+    rows_by_number = index_rows_by_number(original_rows)
+    error_rows = []
+    
+    # 为每个有错误的行构建错误行数据
+    for row_index, errors in index_errors_by_row(all_errors).items():
+        orig_row = rows_by_number.get(row_index)
+        
+        # 如果找不到原始行，从错误数据中构造
+        if orig_row is None:
+            # 尝试从第一个错误的raw_data构造行数据
+            first_error = errors[0]
+            if first_error.raw_data:
+                orig_row = tuple(str(first_error.raw_data.get(field.key, '')) for field in config.template_fields)
+            else:
+                # 创建空行数据
+                orig_row = tuple('' for _ in config.template_fields)
+        
+        error_rows.append((row_index, orig_row, errors))
+    
+    return error_rows
+
+
 def process_import_errors_and_generate_file(
     all_errors: List[ImportError],
     original_rows: List[Tuple[int, tuple]],
@@ -167,36 +235,8 @@ def process_import_errors_and_generate_file(
     if not all_errors:
         return None, None
     
-    # 构建错误行数据
-    error_rows = []
-    
-    # 按行分组错误
-    errors_by_row = {}
-    for error in all_errors:
-        if error.row_index not in errors_by_row:
-            errors_by_row[error.row_index] = []
-        errors_by_row[error.row_index].append(error)
-    
-    # 为每个有错误的行构建错误行数据
-    for row_index, errors in errors_by_row.items():
-        # 找到对应的原始行数据
-        orig_row = None
-        for orig_row_index, orig_row_data in original_rows:
-            if orig_row_index == row_index:
-                orig_row = orig_row_data
-                break
-        
-        # 如果找不到原始行，从错误数据中构造
-        if orig_row is None:
-            # 尝试从第一个错误的raw_data构造行数据
-            first_error = errors[0]
-            if hasattr(first_error, 'raw_data') and first_error.raw_data:
-                orig_row = tuple(str(first_error.raw_data.get(field.key, '')) for field in config.template_fields)
-            else:
-                # 创建空行数据
-                orig_row = tuple('' for _ in config.template_fields)
-        
-        error_rows.append((row_index, orig_row, errors))
+    # 按行号索引错误和原始行，一次遍历构建错误行数据
+    error_rows = build_error_rows(all_errors, original_rows, config)
     
     # 生成错误文件
     if error_rows:
@@ -227,35 +267,30 @@ def add_insert_errors_to_error_list(
     if not insert_errors:
         return
     
-    # 转换为ImportError对象
-    import_errors = [ImportError(**error) for error in insert_errors]
-    all_errors.extend(import_errors)
+    # 按行号索引原始行和已有错误行，避免对每个错误线性查找
+    rows_by_number = index_rows_by_number(original_rows)
+    error_rows_by_number = {err_row[0]: err_row for err_row in error_rows}
     
-    # 将插入错误添加到错误行中
     for error in insert_errors:
-        # 找到对应的原始行数据
-        orig_row = None
-        for orig_row_index, orig_row_data in original_rows:
-            if orig_row_index == error['row_index']:
-                orig_row = orig_row_data
-                break
+        import_error = ImportError(**error)
+        all_errors.append(import_error)
         
-        if orig_row is None:
+        row_index = error['row_index']
+        existing_error_row = error_rows_by_number.get(row_index)
+        if existing_error_row:
+            # 添加到现有错误行
+            existing_error_row[2].append(import_error)
             continue
         
-        # 检查是否已经存在该行的错误记录
-        existing_error_row = None
-        for err_row in error_rows:
-            if err_row[0] == error['row_index']:
-                existing_error_row = err_row
-                break
+        # 找到对应的原始行数据
+        orig_row = rows_by_number.get(row_index)
+        if orig_row is None:
+            continue
         
-        if existing_error_row:
-            # 添加到现有错误行
-            existing_error_row[2].append(ImportError(**error))
-        else:
-            # 创建新的错误行
-            error_rows.append((error['row_index'], orig_row, [ImportError(**error)]))
+        # 创建新的错误行
+        new_error_row = (row_index, orig_row, [import_error])
+        error_rows.append(new_error_row)
+        error_rows_by_number[row_index] = new_error_row
 
 
 def generate_error_file_from_all_errors(
@@ -279,35 +314,8 @@ def generate_error_file_from_all_errors(
     if not all_errors:
         return None
     
-    error_rows = []
-    
-    # 按行分组错误
-    errors_by_row = {}
-    for error in all_errors:
-        if error.row_index not in errors_by_row:
-            errors_by_row[error.row_index] = []
-        errors_by_row[error.row_index].append(error)
-    
-    # 为每个有错误的行构建错误行数据
-    for row_index, errors in errors_by_row.items():
-        # 找到对应的原始行数据
-        orig_row = None
-        for orig_row_index, orig_row_data in original_rows:
-            if orig_row_index == row_index:
-                orig_row = orig_row_data
-                break
-        
-        # 如果找不到原始行，从错误数据中构造
-        if orig_row is None:
-            # 尝试从第一个错误的raw_data构造行数据
-            first_error = errors[0]
-            if hasattr(first_error, 'raw_data') and first_error.raw_data:
-                orig_row = tuple(str(first_error.raw_data.get(field.key, '')) for field in config.template_fields)
-            else:
-                # 创建空行数据
-                orig_row = tuple('' for _ in config.template_fields)
-        
-        error_rows.append((row_index, orig_row, errors))
+    # 按行号索引错误和原始行，一次遍历构建错误行数据
+    error_rows = build_error_rows(all_errors, original_rows, config)
     
     # 生成错误文件
     if error_rows:
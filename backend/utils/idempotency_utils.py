@@ -0,0 +1,186 @@
+"""
+幂等键工具 - 创建单据接口的客户端重试去重
+
+客户端在请求头Idempotency-Key中携带唯一键，重试时使用相同的键：
+1. 接口开始处理前用一条 INSERT ... ON CONFLICT DO NOTHING 占用该键
+2. 占用成功则正常处理，成功后保存响应；处理失败则释放该键，允许重试
+3. 占用失败说明该键已使用，按主键读取记录：
+   - 已完成：直接返回首次的响应，不再执行任何校验和写入
+   - 处理中：返回409，客户端稍后重试
+   - 请求内容或接口不同：返回422
+处理中的键超过PROCESSING_TIMEOUT仍未完成（如服务中途重启）时允许重新占用。
+记录保留RETENTION，过期记录在占用新键时按小时清理。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session
+
+from models.material.idempotency_key import IdempotencyKey, IdempotencyStatus
+
+logger = logging.getLogger(__name__)
+
+# 请求头名称
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 幂等键最大长度
+MAX_KEY_LENGTH = 128
+# 处理中的键超过该时间未完成视为已中断
+PROCESSING_TIMEOUT = timedelta(minutes=5)
+# 记录保留时间
+RETENTION = timedelta(hours=24)
+
+_PURGE_INTERVAL = timedelta(hours=1)
+_last_purge = datetime.min
+_purge_lock = threading.Lock()
+
+
+def _request_hash(payload: Any) -> str:
+    content = json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _purge_expired(db: Session):
+    """按小时清理过期的幂等记录"""
+    global _last_purge
+    now = datetime.now()
+    with _purge_lock:
+        if now - _last_purge < _PURGE_INTERVAL:
+            return
+        _last_purge = now
+    result = db.exec(delete(IdempotencyKey).where(IdempotencyKey.create_time < now - RETENTION))
+    if result.rowcount:
+        logger.info(f"已清理过期幂等记录 {result.rowcount} 条")
+
+
+def claim_idempotency_key(
+    db: Session,
+    key: Optional[str],
+    endpoint: str,
+    payload: Any,
+    creator: str
+) -> Optional[JSONResponse]:
+    """
+    占用幂等键（在接口做任何校验和写入之前调用）
+
+    Args:
+        db: 数据库会话
+        key: 请求头中的幂等键，为空时不做幂等处理
+        endpoint: 接口标识
+        payload: 请求体
+        creator: 请求用户
+
+    Returns:
+        Optional[JSONResponse]: 该键已完成时返回首次的响应，占用成功或未提供键时返回None
+
+    Raises:
+        HTTPException: 幂等键格式错误(400)、相同请求处理中(409)、键已用于其他请求(422)
+    """
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER}不能为空且不能超过{MAX_KEY_LENGTH}个字符")
+
+    _purge_expired(db)
+    request_hash = _request_hash(payload)
+    now = datetime.now()
+
+    claimed = db.exec(
+        insert(IdempotencyKey)
+        .values(
+            idempotency_key=key,
+            endpoint=endpoint,
+            request_hash=request_hash,
+            status=IdempotencyStatus.PROCESSING,
+            creator=creator,
+            create_time=now
+        )
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.idempotency_key])
+    ).rowcount
+    db.commit()
+    if claimed:
+        return None
+
+    record = db.get(IdempotencyKey, key, populate_existing=True)
+    if record is None:
+        # 记录恰好被清理或释放，按新请求重新占用
+        return claim_idempotency_key(db, key, endpoint, payload, creator)
+    if record.endpoint != endpoint or record.request_hash != request_hash or record.creator != creator:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER}已用于其他请求，请使用新的幂等键")
+
+    if record.status == IdempotencyStatus.COMPLETED:
+        return JSONResponse(
+            status_code=record.status_code,
+            content=json.loads(record.response_body),
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    # 处理中：超时未完成的键（服务中断）允许重新占用
+    reclaimed = db.exec(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.idempotency_key == key,
+            IdempotencyKey.status == IdempotencyStatus.PROCESSING,
+            IdempotencyKey.create_time < now - PROCESSING_TIMEOUT
+        )
+        .values(create_time=now),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    if reclaimed:
+        return None
+    raise HTTPException(status_code=409, detail="相同请求正在处理中，请稍后重试")
+
+
+def complete_idempotency_key(db: Session, key: Optional[str], response: Any, status_code: int = 200):
+    """
+    保存已完成请求的响应，之后使用相同幂等键的重试直接返回该响应
+
+    Args:
+        db: 数据库会话
+        key: 请求头中的幂等键
+        response: 响应内容
+        status_code: 响应状态码
+    """
+    if key is None:
+        return
+    try:
+        db.exec(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.idempotency_key == key.strip())
+            .values(
+                status=IdempotencyStatus.COMPLETED,
+                status_code=status_code,
+                response_body=json.dumps(jsonable_encoder(response), ensure_ascii=False)
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+    except Exception as e:
+        # 单据已创建成功，保存幂等记录失败不影响本次响应
+        logger.error(f"保存幂等记录失败: {key}, {e}")
+
+
+def release_idempotency_key(db: Session, key: Optional[str]):
+    """释放处理失败的幂等键，客户端可以使用相同的键重试"""
+    if key is None:
+        return
+    try:
+        db.rollback()
+        db.exec(delete(IdempotencyKey).where(
+            IdempotencyKey.idempotency_key == key.strip(),
+            IdempotencyKey.status == IdempotencyStatus.PROCESSING
+        ))
+        db.commit()
+    except Exception as e:
+        logger.error(f"释放幂等键失败: {key}, {e}")
@@ -1,13 +1,19 @@
 import tempfile
 import os
 import time
+import csv
+import codecs
+from io import BytesIO, TextIOWrapper
 from contextlib import contextmanager
-from typing import List, Dict, Any, Set, Tuple
+from datetime import datetime
+from typing import List, Dict, Any, Set, Tuple, Iterator
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session, select
 import xlwt
 
 from schemas.common.import_schemas import ImportConfig, ImportError
-from models.base.supplier import Supplier
+from utils.import_validator import compile_import_config
 
 
 @contextmanager
@@ -40,210 +46,298 @@ def build_entity_data(row: tuple, config: ImportConfig) -> Dict[str, Any]:
     return entity_data
 
 
-async def get_existing_values(config: ImportConfig, fields: List[str], db: Session) -> Dict[str, Set[str]]:
-    """根据配置获取数据库中指定字段的现有值"""
-    existing_values = {}
+# 批量导入支持的文件扩展名
+IMPORT_FILE_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.tsv']
+
+# 文本文件编码检测时采样的字节数
+_ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def get_import_file_extension(filename: str) -> str | None:
+    """获取导入文件扩展名，不支持的格式返回None"""
+    lower_name = filename.lower()
+    for ext in IMPORT_FILE_EXTENSIONS:
+        if lower_name.endswith(ext):
+            return ext
+    return None
+
+
+def detect_text_encoding(contents: bytes) -> str:
+    """
+    检测CSV/TSV文本编码
+    
+    - 带BOM的UTF-8返回utf-8-sig（读取时自动去掉BOM）
+    - 采样部分能按UTF-8解码返回utf-8
+    - 否则按GBK处理（使用其超集gb18030）
+    """
+    if contents.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        # final=False：采样末尾被截断的多字节字符不视为错误
+        decoder.decode(contents[:_ENCODING_SAMPLE_SIZE], final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def iter_import_file_rows(contents: bytes, file_extension: str, encoding: str | None = None) -> Iterator[Tuple[int, tuple]]:
+    """
+    逐行读取导入文件的数据行（跳过标题行）
+    
+    Args:
+        contents: 文件内容
+        file_extension: 文件扩展名（.xlsx/.xls/.csv/.tsv）
+        encoding: CSV/TSV文本编码，默认自动检测
+    
+    Yields:
+        Tuple[int, tuple]: (Excel行号, 行数据)，行号从标题行之后的第2行开始
+    """
+    if file_extension in ('.csv', '.tsv'):
+        # 使用csv模块流式解析，不经过Excel解析
+        delimiter = '\t' if file_extension == '.tsv' else ','
+        text_stream = TextIOWrapper(BytesIO(contents), encoding=encoding or detect_text_encoding(contents), newline='')
+        reader = csv.reader(text_stream, delimiter=delimiter)
+        next(reader, None)  # 跳过标题行
+        for row_index, row in enumerate(reader, start=2):
+            yield row_index, tuple(row)
     
-    # 根据实体类型动态导入对应的模型
-    if config.entity_key == 'supplier':
+    elif file_extension == '.xlsx':
+        # 使用openpyxl只读模式读取.xlsx文件
+        from openpyxl import load_workbook
+        workbook = load_workbook(BytesIO(contents), read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):  # type: ignore
+                yield row_index, row
+        finally:
+            workbook.close()
+    
+    elif file_extension == '.xls':
+        # 使用xlrd读取.xls文件
+        import xlrd
+        workbook = xlrd.open_workbook(file_contents=contents)
+        sheet = workbook.sheet_by_index(0)
+        for row_index in range(1, sheet.nrows):  # 从第2行开始（跳过标题行）
+            yield row_index + 1, tuple(sheet.row_values(row_index))  # Excel行号从1开始
+    
+    else:
+        raise ValueError(f"不支持的文件格式: {file_extension}")
+
+
+def read_import_file(
+    contents: bytes,
+    file_extension: str,
+    config: ImportConfig
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, tuple]]]:
+    """
+    读取导入文件并按配置构建实体数据（第一个字段为空的行跳过）
+    
+    Returns:
+        Tuple[entities_data, original_rows]:
+            entities_data: [(行号, 实体数据), ...]
+            original_rows: [(行号, 原始行数据), ...]
+    """
+    encoding = None
+    if file_extension in ('.csv', '.tsv'):
+        encoding = detect_text_encoding(contents)
+    
+    while True:
+        entities_data = []
+        original_rows = []
+        try:
+            for row_index, row in iter_import_file_rows(contents, file_extension, encoding):
+                if row and row[0]:  # 第一个字段不为空
+                    entities_data.append((row_index, build_entity_data(row, config)))
+                    original_rows.append((row_index, row))
+            return entities_data, original_rows
+        except UnicodeDecodeError:
+            # 采样部分是UTF-8但后续内容不是，按GBK重新读取
+            if encoding != 'utf-8':
+                raise
+            encoding = 'gb18030'
+
+
+def get_import_entity_model(entity_key: str):
+    """根据实体类型获取对应的数据模型，不支持时返回None"""
+    if entity_key == 'supplier':
         from models.base.supplier import Supplier
-        entities = db.exec(
-            select(Supplier).where(Supplier.is_delete != True)
-        ).all()
-        
-        for field in fields:
-            if hasattr(Supplier, field):
-                existing_values[field] = {
-                    getattr(entity, field).strip().lower() 
-                    for entity in entities 
-                    if getattr(entity, field)
-                }
-    
-    elif config.entity_key == 'customer':
+        return Supplier
+    if entity_key == 'customer':
         from models.base.customer import Customer
-        entities = db.exec(
-            select(Customer).where(Customer.is_delete != True)
-        ).all()
-        
-        for field in fields:
-            if hasattr(Customer, field):
-                existing_values[field] = {
-                    getattr(entity, field).strip().lower() 
-                    for entity in entities 
-                    if getattr(entity, field)
-                }
-    elif config.entity_key == 'warehouse':
+        return Customer
+    if entity_key == 'warehouse':
         from models.base.warehouse import Warehouse
-        entities = db.exec(
-            select(Warehouse).where(Warehouse.is_delete != True)
+        return Warehouse
+    if entity_key == 'material':
+        from models.material.material import Material
+        return Material
+    return None
+
+
+async def get_existing_values(config: ImportConfig, fields: List[str], db: Session) -> Dict[str, Set[str]]:
+    """根据配置获取数据库中指定字段的现有值（只查询需要的列）"""
+    existing_values = {}
+    
+    model = get_import_entity_model(config.entity_key)
+    if model is None:
+        return existing_values
+    
+    for field in fields:
+        if not hasattr(model, field):
+            continue
+        column = getattr(model, field)
+        values = db.exec(
+            select(column).where(model.is_delete != True, column.is_not(None))
         ).all()
-        
-        for field in fields:
-            if hasattr(Warehouse, field):
-                existing_values[field] = {
-                    getattr(entity, field).strip().lower() 
-                    for entity in entities 
-                    if getattr(entity, field)
-                }
+        existing_values[field] = {
+            value.strip().lower() for value in values if value and isinstance(value, str)
+        }
     
     return existing_values
 
 
 def get_field_label(field_key: str, config: ImportConfig) -> str:
     """根据字段键获取显示标签"""
-    for field in config.template_fields:
-        if field.key == field_key:
-            return field.label
-    return field_key
+    return compile_import_config(config).get_field_label(field_key)
 
 
 async def validate_entity_data(
     entity_data: List[Dict[str, Any]], 
     config: ImportConfig, 
-    db: Session
+    db: Session,
+    row_indexes: List[int] | None = None
 ) -> List[ImportError]:
     """
     通用验证实体数据，包括两步重复性检查：
     1. 检查输入数据内部的重复
     2. 检查与数据库现有数据的重复
+    
+    验证规则预编译为按字段组织的流水线（见utils.import_validator），
+    所有数据行单次遍历完成验证
+    
+    row_indexes为每行在文件中的实际行号，不提供时按第2行起连续编号
     """
-    errors = []
-    entity_name = config.entity_name
-    unique_fields = config.unique_fields or ['name']
-    
-    # 第一步：检查输入数据内部的重复
-    for unique_field in unique_fields:
-        field_values = [data.get(unique_field, '').strip() for data in entity_data]
-        value_count = {}
-        
-        for i, value in enumerate(field_values):
-            if value:  # 非空值才检查重复
-                if value in value_count:
-                    value_count[value].append(i)
-                else:
-                    value_count[value] = [i]
-        
-        # 找出重复的值
-        for value, indices in value_count.items():
-            if len(indices) > 1:
-                for index in indices:
-                    errors.append(ImportError(
-                        row_index=index + 2,  # Excel行号（从第2行开始）
-                        field=unique_field,
-                        error_message=f'{entity_name}:{get_field_label(unique_field, config)}:"{value}"在输入数据中重复出现',
-                        raw_data=entity_data[index]
-                    ))
-    
-    # 第二步：检查与数据库现有数据的重复
-    existing_values = await get_existing_values(config, unique_fields, db)
-    
-    for i, data in enumerate(entity_data):
-        row_index = i + 2
+    compiled = compile_import_config(config)
+    existing_values = await get_existing_values(config, compiled.db_unique_fields, db)
+    return compiled.validate_rows(entity_data, existing_values, row_indexes=row_indexes)
+
+
+# 批量插入时每个SAVEPOINT包含的行数
+INSERT_CHUNK_SIZE = 500
+
+
+def _build_insert_record(entity_data: Dict[str, Any], columns: Set[str], creator: str, now: datetime) -> Dict[str, Any]:
+    """将实体数据转换为表插入记录（只保留表中存在的列，空字符串视为NULL）"""
+    record = {}
+    for key, value in entity_data.items():
+        if key not in columns:
+            continue
+        if isinstance(value, str):
+            value = value.strip() or None
+        record[key] = value
+    
+    # Core插入不会触发模型的default_factory，这里补齐通用字段
+    defaults = {'creator': creator, 'is_delete': False, 'create_time': now, 'update_time': now}
+    for key, value in defaults.items():
+        if key in columns and record.get(key) is None:
+            record[key] = value
+    return record
+
+
+def _insert_chunk(
+    db: Session,
+    table,
+    chunk: List[Tuple[int, Dict[str, Any], Dict[str, Any]]],
+    config: ImportConfig,
+    insert_errors: List[ImportError]
+) -> int:
+    """
+    在SAVEPOINT中使用executemany插入一批记录
+    
+    插入失败时回滚到SAVEPOINT并二分重试，直到定位出具体的错误行，
+    错误行记录到insert_errors，其余行正常插入
+    """
+    try:
+        with db.begin_nested():
+            db.execute(insert(table), [record for _, record, _ in chunk])
+        return len(chunk)
+    except SQLAlchemyError as e:
+        if len(chunk) == 1:
+            row_index, _, entity_data = chunk[0]
+            reason = getattr(e, 'orig', None) or e
+            insert_errors.append(ImportError(
+                row_index=row_index,
+                field='database',
+                error_message=f"{config.entity_name}:数据库:插入数据库时出错: {reason}",
+                raw_data=entity_data
+            ))
+            return 0
         
-        # 验证每个字段
-        for rule in config.validation_rules:
-            field_value = data.get(rule.field, '').strip() if isinstance(data.get(rule.field), str) else data.get(rule.field)
-            
-            # 基本验证
-            if rule.type == 'required' and not field_value:
-                errors.append(ImportError(
-                    row_index=row_index,
-                    field=rule.field,
-                    error_message=rule.message,
-                    raw_data=data
-                ))
-                continue
-                
-            if rule.type == 'max_length' and field_value and rule.value and len(str(field_value)) > rule.value:
-                errors.append(ImportError(
-                    row_index=row_index,
-                    field=rule.field,
-                    error_message=rule.message,
-                    raw_data=data
-                ))
-                continue
-            
-            # 整数范围验证
-            if rule.type == 'range' and field_value:
-                # 检查是否为空值（None、空字符串、0等）
-                if not field_value or str(field_value).strip() == '':
-                    # 空值跳过验证（可选字段允许为空）
-                    continue
-                
-                try:
-                    int_value = int(field_value)
-                    if int_value < 1 or int_value > (rule.value or 5):
-                        errors.append(ImportError(
-                            row_index=row_index,
-                            field=rule.field,
-                            error_message=rule.message,
-                            raw_data=data
-                        ))
-                        continue
-                except (ValueError, TypeError):
-                    # 非整数值报错
-                    errors.append(ImportError(
-                        row_index=row_index,
-                        field=rule.field,
-                        error_message=f"{entity_name}:{get_field_label(rule.field, config)}:必须是整数",
-                        raw_data=data
-                    ))
-                    continue
-            # 检查是否与数据库现有数据重复（跳过已经在输入数据中重复的）
-            if (rule.type == 'unique' and field_value and 
-                field_value.lower() in existing_values.get(rule.field, set())):
-                # 检查这个值是否已经在输入数据重复错误中报告过
-                already_reported = any(
-                    error.row_index == row_index and 
-                    error.field == rule.field and 
-                    '输入数据中重复' in error.error_message
-                    for error in errors
-                )
-                
-                if not already_reported:
-                    errors.append(ImportError(
-                        row_index=row_index,
-                        field=rule.field,
-                        error_message=f'{entity_name}:{get_field_label(rule.field, config)}:"{field_value}"在系统中已存在',
-                        raw_data=data
-                    ))
-    
-    return errors
+        middle = len(chunk) // 2
+        return (_insert_chunk(db, table, chunk[:middle], config, insert_errors) +
+                _insert_chunk(db, table, chunk[middle:], config, insert_errors))
 
 
 async def batch_insert_entities(
     valid_data: List[Tuple[int, Dict[str, Any]]], 
     config: ImportConfig, 
     db: Session, 
-    creator: str
-) -> int:
-    """根据配置批量插入实体数据"""
-    success_count = 0
-    entity_key = config.entity_key
+    creator: str,
+    chunk_size: int = INSERT_CHUNK_SIZE
+) -> Tuple[int, List[ImportError]]:
+    """
+    根据配置批量插入实体数据
     
-    # 根据实体类型动态导入对应的模型
-    if entity_key == 'supplier':
-        from models.base.supplier import Supplier
-        for row_index, entity_data in valid_data:
-            db_entity = Supplier(**entity_data, creator=creator)
-            db.add(db_entity)
-            success_count += 1
+    使用Core层executemany按块插入，每块一个SAVEPOINT：
+    - 插入前统一再次检查唯一性（防止并发导入时的重复）
+    - 某块插入失败时二分定位错误行，错误行记录下来，其余行照常插入
     
-    elif entity_key == 'customer':
-        from models.base.customer import Customer
-        for row_index, entity_data in valid_data:
-            db_entity = Customer(**entity_data, creator=creator)
-            db.add(db_entity)
-            success_count += 1
+    调用方负责提交事务（通常包在batch_import_transaction中）
     
-    elif entity_key == 'warehouse':
-        from models.base.warehouse import Warehouse
-        for row_index, entity_data in valid_data:
-            db_entity = Warehouse(**entity_data, creator=creator)
-            db.add(db_entity)
-            success_count += 1
+    Returns:
+        Tuple[int, List[ImportError]]: 成功插入数、插入错误列表
+    """
+    insert_errors: List[ImportError] = []
+    model = get_import_entity_model(config.entity_key)
+    if model is None or not valid_data:
+        return 0, insert_errors
+    
+    table = model.__table__
+    columns = set(table.c.keys())
+    compiled = compile_import_config(config)
+    
+    # 插入前再次检查唯一性（一次查询取回现有值，防止并发导入时的重复）
+    existing_values = await get_existing_values(config, compiled.db_unique_fields, db)
+    
+    now = datetime.now()
+    records = []
+    for row_index, entity_data in valid_data:
+        conflict_field = None
+        for field in compiled.db_unique_fields:
+            value = entity_data.get(field)
+            if isinstance(value, str) and value.strip().lower() in existing_values.get(field, ()):
+                conflict_field = field
+                break
+        
+        if conflict_field:
+            insert_errors.append(ImportError(
+                row_index=row_index,
+                field=conflict_field,
+                error_message=f'{config.entity_name}:{compiled.get_field_label(conflict_field)}:"{entity_data[conflict_field]}"在导入过程中与现有数据冲突',
+                raw_data=entity_data
+            ))
+            continue
+        
+        records.append((row_index, _build_insert_record(entity_data, columns, creator, now), entity_data))
+    
+    success_count = 0
+    for start in range(0, len(records), chunk_size):
+        success_count += _insert_chunk(db, table, records[start:start + chunk_size], config, insert_errors)
     
-    return success_count
+    insert_errors.sort(key=lambda error: error.row_index)
+    return success_count, insert_errors
 
 
 def generate_error_excel_file(
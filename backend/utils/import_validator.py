@@ -0,0 +1,244 @@
+"""
+导入数据验证引擎
+将ImportConfig预编译为按字段组织的验证流水线，批量验证数据行
+
+预编译内容：
+- 字段键 -> 显示标签映射（替代逐条线性查找）
+- 按字段分组的验证函数列表（规则只解析一次）
+- 正则表达式规则（pattern）预编译
+- 唯一性检查字段列表（只加载需要的列）
+"""
+
+import re
+from typing import List, Dict, Any, Set, Callable, Optional, Tuple
+
+from schemas.common.import_schemas import ImportConfig, ImportError, ValidationRule
+
+
+# 单个字段验证函数：接收字段值，返回错误消息（None表示通过）
+FieldCheck = Callable[[Any], Optional[str]]
+
+
+def _unique_check(value: Any) -> Optional[str]:
+    """数据库唯一性检查占位（需要现有值和行号，由validate_rows直接处理）"""
+    return None
+
+
+def _normalize_value(value: Any) -> Any:
+    """字符串去除首尾空格，其他类型原样返回"""
+    return value.strip() if isinstance(value, str) else value
+
+
+def _build_required_check(rule: ValidationRule) -> FieldCheck:
+    message = rule.message
+
+    def check(value: Any) -> Optional[str]:
+        return message if not value else None
+    return check
+
+
+def _build_max_length_check(rule: ValidationRule) -> Optional[FieldCheck]:
+    if not rule.value:
+        return None
+    limit = int(rule.value)
+    message = rule.message
+
+    def check(value: Any) -> Optional[str]:
+        if value and len(str(value)) > limit:
+            return message
+        return None
+    return check
+
+
+def _build_range_check(rule: ValidationRule, not_integer_message: str) -> FieldCheck:
+    upper = rule.value or 5
+    message = rule.message
+
+    def check(value: Any) -> Optional[str]:
+        # 空值跳过验证（可选字段允许为空）
+        if not value or str(value).strip() == '':
+            return None
+        try:
+            int_value = int(value)
+        except (ValueError, TypeError):
+            return not_integer_message
+        if int_value < 1 or int_value > upper:
+            return message
+        return None
+    return check
+
+
+def _build_min_check(rule: ValidationRule, not_integer_message: str) -> FieldCheck:
+    lower = rule.value if rule.value is not None else 0
+    message = rule.message
+
+    def check(value: Any) -> Optional[str]:
+        if value is None or str(value).strip() == '':
+            return None
+        try:
+            int_value = int(value)
+        except (ValueError, TypeError):
+            return not_integer_message
+        return message if int_value < lower else None
+    return check
+
+
+def _build_pattern_check(rule: ValidationRule) -> Optional[FieldCheck]:
+    if not rule.value:
+        return None
+    pattern = re.compile(str(rule.value))
+    message = rule.message
+
+    def check(value: Any) -> Optional[str]:
+        if value and not pattern.fullmatch(str(value)):
+            return message
+        return None
+    return check
+
+
+class CompiledImportConfig:
+    """预编译后的导入配置，验证时不再重复解析validation_rules"""
+
+    def __init__(self, config: ImportConfig):
+        self.source = config
+        self.entity_name = config.entity_name
+        self.entity_key = config.entity_key
+        self.unique_fields: List[str] = list(config.unique_fields or ['name'])
+        self.field_labels: Dict[str, str] = {
+            field.key: field.label for field in config.template_fields
+        }
+
+        # 按字段分组的验证流水线，保持规则在配置中首次出现的字段顺序
+        self.field_checks: List[Tuple[str, List[FieldCheck]]] = []
+        # 需要与数据库比对唯一性的字段（unique规则）
+        self.db_unique_fields: List[str] = []
+
+        checks_by_field: Dict[str, List[FieldCheck]] = {}
+        for rule in config.validation_rules:
+            checks = checks_by_field.get(rule.field)
+            if checks is None:
+                checks = []
+                checks_by_field[rule.field] = checks
+                self.field_checks.append((rule.field, checks))
+
+            check = self._build_check(rule)
+            if check is not None:
+                checks.append(check)
+
+            if rule.type == 'unique':
+                checks.append(_unique_check)
+                if rule.field not in self.db_unique_fields:
+                    self.db_unique_fields.append(rule.field)
+
+    def get_field_label(self, field_key: str) -> str:
+        """根据字段键获取显示标签"""
+        return self.field_labels.get(field_key, field_key)
+
+    def _build_check(self, rule: ValidationRule) -> Optional[FieldCheck]:
+        not_integer_message = f"{self.entity_name}:{self.get_field_label(rule.field)}:必须是整数"
+        if rule.type == 'required':
+            return _build_required_check(rule)
+        if rule.type == 'max_length':
+            return _build_max_length_check(rule)
+        if rule.type == 'range':
+            return _build_range_check(rule, not_integer_message)
+        if rule.type == 'min':
+            return _build_min_check(rule, not_integer_message)
+        if rule.type == 'pattern':
+            return _build_pattern_check(rule)
+        # unique规则由_unique_check占位，在validate_rows中结合数据库现有值处理
+        return None
+
+    def find_input_duplicates(
+        self,
+        rows: List[Dict[str, Any]],
+        start_row_index: int = 2,
+        row_indexes: Optional[List[int]] = None
+    ) -> List[ImportError]:
+        """检查输入数据内部唯一字段的重复"""
+        errors = []
+        for unique_field in self.unique_fields:
+            value_rows: Dict[str, List[int]] = {}
+            for i, data in enumerate(rows):
+                value = _normalize_value(data.get(unique_field)) or ''
+                if value:  # 非空值才检查重复
+                    value_rows.setdefault(str(value), []).append(i)
+
+            label = self.get_field_label(unique_field)
+            for value, indices in value_rows.items():
+                if len(indices) > 1:
+                    for index in indices:
+                        errors.append(ImportError(
+                            row_index=row_indexes[index] if row_indexes else index + start_row_index,
+                            field=unique_field,
+                            error_message=f'{self.entity_name}:{label}:"{value}"在输入数据中重复出现',
+                            raw_data=rows[index]
+                        ))
+        return errors
+
+    def validate_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        existing_values: Optional[Dict[str, Set[str]]] = None,
+        start_row_index: int = 2,
+        row_indexes: Optional[List[int]] = None
+    ) -> List[ImportError]:
+        """
+        单次遍历验证一批数据行
+
+        Args:
+            rows: 实体数据列表
+            existing_values: 数据库现有值（字段 -> 小写值集合）
+            start_row_index: 第一行对应的Excel行号（默认第2行，第1行为标题）
+            row_indexes: 每行对应的实际行号（跳过空行时使用），提供时忽略start_row_index
+
+        Returns:
+            List[ImportError]: 输入重复错误在前，逐行字段错误在后
+        """
+        errors = self.find_input_duplicates(rows, start_row_index, row_indexes)
+        # 已报告输入重复的(行号, 字段)，与数据库重复不再重复报告
+        reported_duplicates = {(error.row_index, error.field) for error in errors}
+        existing_values = existing_values or {}
+
+        for i, data in enumerate(rows):
+            row_index = row_indexes[i] if row_indexes else i + start_row_index
+
+            for field, checks in self.field_checks:
+                value = _normalize_value(data.get(field, ''))
+                for check in checks:
+                    if check is _unique_check:
+                        # 检查是否与数据库现有数据重复（跳过已经在输入数据中重复的）
+                        if (value and isinstance(value, str)
+                                and value.lower() in existing_values.get(field, ())
+                                and (row_index, field) not in reported_duplicates):
+                            errors.append(ImportError(
+                                row_index=row_index,
+                                field=field,
+                                error_message=f'{self.entity_name}:{self.get_field_label(field)}:"{value}"在系统中已存在',
+                                raw_data=data
+                            ))
+                        continue
+
+                    message = check(value)
+                    if message is not None:
+                        errors.append(ImportError(
+                            row_index=row_index,
+                            field=field,
+                            error_message=message,
+                            raw_data=data
+                        ))
+
+        return errors
+
+
+# 编译结果缓存：entity_key -> CompiledImportConfig
+_compiled_configs: Dict[str, CompiledImportConfig] = {}
+
+
+def compile_import_config(config: ImportConfig) -> CompiledImportConfig:
+    """获取预编译的导入配置（按entity_key缓存，配置变化时重新编译）"""
+    compiled = _compiled_configs.get(config.entity_key)
+    if compiled is None or (compiled.source is not config and compiled.source != config):
+        compiled = CompiledImportConfig(config)
+        _compiled_configs[config.entity_key] = compiled
+    return compiled
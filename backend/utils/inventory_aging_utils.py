@@ -0,0 +1,311 @@
+"""
+库存账龄与呆滞分析工具
+
+- 账龄：按批次入库日期或生产日期计算在库天数，按账龄区间汇总结存数量和金额
+- 呆滞：有库存但最近N天没有出库（OUT）流水的器材
+
+全部使用聚合SQL计算：结存取自inventory_details按批次汇总，
+最近出库时间通过(change_type, material_id, transaction_time)索引逐器材取最大值，
+最近N天有出库的器材通过流水时间索引范围查询得到。
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import Integer, case, cast
+from sqlmodel import Session, select, func
+
+from models.base.bin import Bin
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction
+from models.material.material import Material
+
+# 账龄计算依据
+AGING_BASIS_OPTIONS = ("inbound_date", "production_date")
+
+# 默认账龄区间上限（天）
+DEFAULT_AGE_BANDS = (30, 90, 180, 365, 730)
+
+# 没有入库日期/生产日期的批次所在区间
+UNKNOWN_BAND = -1
+
+
+def parse_age_bands(bands: Optional[str]) -> List[int]:
+    """
+    解析账龄区间上限，如"30,90,180,365"
+
+    Raises:
+        ValueError: 格式错误或不是严格递增的正整数
+    """
+    if not bands:
+        return list(DEFAULT_AGE_BANDS)
+    values = [int(value) for value in bands.split(",") if value.strip()]
+    if not values or values[0] <= 0 or any(b <= a for a, b in zip(values, values[1:])):
+        raise ValueError("账龄区间必须是严格递增的正整数")
+    return values
+
+
+def band_label(band: int, bands: Sequence[int]) -> str:
+    """账龄区间名称"""
+    if band == UNKNOWN_BAND:
+        return "无日期"
+    if band >= len(bands):
+        return f"{bands[-1]}天以上"
+    lower = bands[band - 1] + 1 if band > 0 else 0
+    return f"{lower}-{bands[band]}天"
+
+
+def _aging_query(
+    basis: str,
+    bands: Sequence[int],
+    as_of: date,
+    warehouse_id: Optional[int] = None,
+    material_id: Optional[int] = None
+):
+    """有库存批次的账龄查询：返回子查询及账龄天数、区间表达式"""
+    on_hand = select(
+        InventoryDetail.batch_id,
+        func.sum(InventoryDetail.quantity).label("quantity")
+    )
+    if warehouse_id:
+        on_hand = on_hand.join(Bin, InventoryDetail.bin_id == Bin.id).where(Bin.warehouse_id == warehouse_id)
+    if material_id:
+        on_hand = on_hand.where(InventoryDetail.material_id == material_id)
+    on_hand = (
+        on_hand.group_by(InventoryDetail.batch_id)
+        .having(func.sum(InventoryDetail.quantity) > 0)
+        .subquery("aging_on_hand")
+    )
+
+    basis_column = getattr(InventoryBatch, basis)
+    age_days = cast(func.julianday(as_of.isoformat()) - func.julianday(basis_column), Integer)
+    band = case(
+        (basis_column.is_(None), UNKNOWN_BAND),
+        *[(age_days <= upper, index) for index, upper in enumerate(bands)],
+        else_=len(bands)
+    )
+    return on_hand, age_days, band
+
+
+def _recent_out_materials(cutoff: datetime):
+    """最近有出库流水的器材（流水时间索引范围查询）"""
+    return (
+        select(InventoryTransaction.material_id)
+        .where(
+            InventoryTransaction.change_type == ChangeType.OUT,
+            InventoryTransaction.transaction_time >= cutoff
+        )
+        .distinct()
+    )
+
+
+def _last_out_time(material_column):
+    """器材最近一次出库时间（相关子查询，走change_type+material_id+transaction_time索引）"""
+    return (
+        select(func.max(InventoryTransaction.transaction_time))
+        .where(
+            InventoryTransaction.change_type == ChangeType.OUT,
+            InventoryTransaction.material_id == material_column
+        )
+        .scalar_subquery()
+    )
+
+
+def get_aging_summary(
+    db: Session,
+    basis: str,
+    bands: Sequence[int],
+    slow_days: int,
+    as_of: Optional[date] = None,
+    warehouse_id: Optional[int] = None,
+    material_id: Optional[int] = None
+) -> dict:
+    """
+    账龄区间汇总及呆滞器材汇总
+
+    Returns:
+        dict: 各账龄区间的批次数、数量、金额，呆滞器材数量、数量、金额
+    """
+    as_of = as_of or date.today()
+    on_hand, _, band = _aging_query(basis, bands, as_of, warehouse_id, material_id)
+    value = on_hand.c.quantity * InventoryBatch.unit_price
+
+    band_rows = db.exec(
+        select(band, func.count(), func.sum(on_hand.c.quantity), func.sum(value))
+        .select_from(on_hand)
+        .join(InventoryBatch, InventoryBatch.batch_id == on_hand.c.batch_id)
+        .group_by(band)
+    ).all()
+    totals = {row[0]: row for row in band_rows}
+    band_summary = []
+    for band_index in [*range(len(bands) + 1), UNKNOWN_BAND]:
+        _, batch_count, quantity, band_value = totals.get(band_index, (band_index, 0, 0, 0.0))
+        band_summary.append({
+            "band": band_index,
+            "label": band_label(band_index, bands),
+            "batch_count": batch_count,
+            "quantity": int(quantity or 0),
+            "value": round(float(band_value or 0), 2)
+        })
+
+    cutoff = datetime.combine(as_of - timedelta(days=slow_days), datetime.min.time())
+    slow_count, slow_quantity, slow_value = db.exec(
+        select(
+            func.count(func.distinct(InventoryBatch.material_id)),
+            func.sum(on_hand.c.quantity),
+            func.sum(value)
+        )
+        .select_from(on_hand)
+        .join(InventoryBatch, InventoryBatch.batch_id == on_hand.c.batch_id)
+        .where(InventoryBatch.material_id.not_in(_recent_out_materials(cutoff)))
+    ).one()
+
+    return {
+        "as_of": as_of,
+        "basis": basis,
+        "slow_days": slow_days,
+        "bands": band_summary,
+        "slow_moving": {
+            "material_count": slow_count or 0,
+            "quantity": int(slow_quantity or 0),
+            "value": round(float(slow_value or 0), 2)
+        }
+    }
+
+
+def _aging_items_query(
+    basis: str,
+    bands: Sequence[int],
+    slow_days: int,
+    as_of: date,
+    warehouse_id: Optional[int],
+    material_id: Optional[int],
+    only_slow: bool,
+    band_filter: Optional[int]
+):
+    """账龄明细查询（按批次）及总数查询"""
+    on_hand, age_days, band = _aging_query(basis, bands, as_of, warehouse_id, material_id)
+    cutoff = datetime.combine(as_of - timedelta(days=slow_days), datetime.min.time())
+
+    filters = []
+    if only_slow:
+        filters.append(InventoryBatch.material_id.not_in(_recent_out_materials(cutoff)))
+    if band_filter is not None:
+        filters.append(band == band_filter)
+
+    count_query = (
+        select(func.count())
+        .select_from(on_hand)
+        .join(InventoryBatch, InventoryBatch.batch_id == on_hand.c.batch_id)
+        .where(*filters)
+    )
+    items_query = (
+        select(
+            InventoryBatch.material_id,
+            Material.material_code,
+            Material.material_name,
+            Material.material_specification,
+            InventoryBatch.batch_id,
+            InventoryBatch.batch_number,
+            InventoryBatch.unit,
+            InventoryBatch.unit_price,
+            InventoryBatch.inbound_date,
+            InventoryBatch.production_date,
+            age_days.label("age_days"),
+            band.label("band"),
+            on_hand.c.quantity,
+            (on_hand.c.quantity * InventoryBatch.unit_price).label("value"),
+            _last_out_time(InventoryBatch.material_id).label("last_out_time")
+        )
+        .select_from(on_hand)
+        .join(InventoryBatch, InventoryBatch.batch_id == on_hand.c.batch_id)
+        .join(Material, Material.id == InventoryBatch.material_id)
+        .where(*filters)
+        .order_by(
+            # 无日期的批次排在最后，其余按账龄从长到短
+            case((getattr(InventoryBatch, basis).is_(None), 1), else_=0),
+            age_days.desc(),
+            InventoryBatch.batch_id
+        )
+    )
+    return count_query, items_query, cutoff
+
+
+def _format_item(row, bands: Sequence[int], as_of: date, cutoff: datetime) -> dict:
+    last_out_time = row.last_out_time
+    if isinstance(last_out_time, str):
+        last_out_time = datetime.fromisoformat(last_out_time)
+    return {
+        "material_id": row.material_id,
+        "material_code": row.material_code,
+        "material_name": row.material_name,
+        "material_specification": row.material_specification or "",
+        "batch_id": row.batch_id,
+        "batch_number": row.batch_number,
+        "unit": row.unit,
+        "unit_price": float(row.unit_price or 0),
+        "inbound_date": row.inbound_date,
+        "production_date": row.production_date,
+        "age_days": row.age_days,
+        "age_band": band_label(row.band, bands),
+        "quantity": int(row.quantity),
+        "value": round(float(row.value or 0), 2),
+        "last_out_time": last_out_time,
+        "days_since_last_out": (as_of - last_out_time.date()).days if last_out_time else None,
+        "is_slow_moving": last_out_time is None or last_out_time < cutoff
+    }
+
+
+def get_aging_items(
+    db: Session,
+    basis: str,
+    bands: Sequence[int],
+    slow_days: int,
+    as_of: Optional[date] = None,
+    warehouse_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    only_slow: bool = False,
+    band_filter: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    分页查询批次账龄明细（按账龄从长到短）
+
+    Returns:
+        dict: 分页信息及批次账龄明细
+    """
+    as_of = as_of or date.today()
+    count_query, items_query, cutoff = _aging_items_query(
+        basis, bands, slow_days, as_of, warehouse_id, material_id, only_slow, band_filter
+    )
+    total = db.exec(count_query).one()
+    rows = db.exec(items_query.offset((page - 1) * page_size).limit(page_size)).all()
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size,
+        "items": [_format_item(row, bands, as_of, cutoff) for row in rows]
+    }
+
+
+def iter_aging_items(
+    db: Session,
+    basis: str,
+    bands: Sequence[int],
+    slow_days: int,
+    as_of: Optional[date] = None,
+    warehouse_id: Optional[int] = None,
+    material_id: Optional[int] = None,
+    only_slow: bool = False,
+    band_filter: Optional[int] = None
+) -> Iterator[dict]:
+    """逐行返回全部批次账龄明细（导出用）"""
+    as_of = as_of or date.today()
+    _, items_query, cutoff = _aging_items_query(
+        basis, bands, slow_days, as_of, warehouse_id, material_id, only_slow, band_filter
+    )
+    for row in db.exec(items_query):
+        yield _format_item(row, bands, as_of, cutoff)
@@ -0,0 +1,319 @@
+"""
+每日出入库汇总维护工具
+维护daily_inventory_movement汇总表（日期×器材×方向），供仪表板趋势和期间统计使用
+
+维护方式：
+- 出入库单写入路径在提交前调用refresh_daily_movement，按受影响的(日期, 器材)重算汇总单元格
+- 每个日期另有一行material_id=0的合计行，单数按单据去重
+- backfill_daily_movement从出入库单全量重建汇总（首次部署或数据修复时执行）
+
+命令行回填：
+    python -m utils.inventory_movement_utils [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select, func, delete
+
+from models.material.daily_inventory_movement import (
+    DailyInventoryMovement, MovementDirection, ALL_MATERIALS_ID
+)
+from models.material.inbound_order import InboundOrder
+from models.material.inbound_order_item import InboundOrderItem
+from models.material.outbound_order import OutboundOrder
+from models.material.outbound_order_item import OutboundOrderItem
+from utils.inventory_stock_utils import begin_write_transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _get_order_models(direction: MovementDirection):
+    """根据方向获取(单据模型, 明细模型)"""
+    if direction == MovementDirection.IN:
+        return InboundOrder, InboundOrderItem
+    return OutboundOrder, OutboundOrderItem
+
+
+def _day_range(movement_date: date) -> Tuple[datetime, datetime]:
+    """日期对应的[当天0点, 次日0点)区间，用于命中create_time上的范围比较"""
+    start = datetime.combine(movement_date, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def _to_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def refresh_daily_movement(
+    db: Session,
+    direction: MovementDirection,
+    movement_date,
+    material_ids: Optional[Iterable[int]] = None
+) -> None:
+    """
+    重算指定日期、方向下受影响器材的汇总行及当日合计行
+
+    在写入路径中调用：开启写事务（调用方尚未开启时）后flush待写入的单据/明细，再按源数据重算，
+    不提交事务，由外层统一提交，删除旧汇总行和写入新汇总行随单据一起提交或回滚。
+
+    Args:
+        db: 数据库会话
+        direction: 出入库方向
+        movement_date: 业务日期（date或datetime）
+        material_ids: 受影响的器材ID，None表示重算该日期下所有器材
+    """
+    movement_date = _to_date(movement_date)
+    order_model, item_model = _get_order_models(direction)
+    start, end = _day_range(movement_date)
+    begin_write_transaction(db)
+    db.flush()
+
+    material_filter = None
+    if material_ids is not None:
+        material_filter = {material_id for material_id in material_ids if material_id is not None}
+
+    # 删除旧的汇总行（受影响器材 + 合计行）
+    stale_rows = delete(DailyInventoryMovement).where(
+        DailyInventoryMovement.movement_date == movement_date,
+        DailyInventoryMovement.direction == direction
+    )
+    if material_filter is not None:
+        stale_rows = stale_rows.where(
+            DailyInventoryMovement.material_id.in_(material_filter | {ALL_MATERIALS_ID})
+        )
+    db.exec(stale_rows)
+
+    # 按器材重算
+    material_query = (
+        select(
+            item_model.material_id,
+            func.count(func.distinct(item_model.order_id)),
+            func.coalesce(func.sum(item_model.quantity), 0),
+            func.coalesce(func.sum(item_model.quantity * item_model.unit_price), 0.0)
+        )
+        .join(order_model, item_model.order_id == order_model.order_id)
+        .where(order_model.create_time >= start, order_model.create_time < end)
+        .group_by(item_model.material_id)
+    )
+    if material_filter is not None:
+        if not material_filter:
+            material_query = None
+        else:
+            material_query = material_query.where(item_model.material_id.in_(material_filter))
+
+    now = datetime.now()
+    records = []
+    if material_query is not None:
+        for material_id, order_count, quantity, amount in db.exec(material_query).all():
+            records.append({
+                "movement_date": movement_date,
+                "material_id": material_id,
+                "direction": direction.value,
+                "order_count": order_count,
+                "quantity": int(quantity),
+                "amount": float(amount),
+                "update_time": now
+            })
+
+    # 当日合计行：单数、数量取自单据表（与单据total_quantity口径一致），金额取自明细
+    order_count, total_quantity = db.exec(
+        select(func.count(order_model.order_id), func.coalesce(func.sum(order_model.total_quantity), 0))
+        .where(order_model.create_time >= start, order_model.create_time < end)
+    ).one()
+    if order_count:
+        total_amount = db.exec(
+            select(func.coalesce(func.sum(item_model.quantity * item_model.unit_price), 0.0))
+            .join(order_model, item_model.order_id == order_model.order_id)
+            .where(order_model.create_time >= start, order_model.create_time < end)
+        ).one()
+        records.append({
+            "movement_date": movement_date,
+            "material_id": ALL_MATERIALS_ID,
+            "direction": direction.value,
+            "order_count": order_count,
+            "quantity": int(total_quantity),
+            "amount": float(total_amount),
+            "update_time": now
+        })
+
+    # 与回填相同使用Core executemany，一张单据涉及多少器材都只执行一条INSERT
+    if records:
+        db.execute(DailyInventoryMovement.__table__.insert(), records)
+
+
+def get_order_material_ids(db: Session, direction: MovementDirection, order_id: int) -> List[int]:
+    """获取单据明细涉及的器材ID（删除单据或修改单据日期前调用）"""
+    _, item_model = _get_order_models(direction)
+    return list(db.exec(
+        select(item_model.material_id).where(item_model.order_id == order_id).distinct()
+    ).all())
+
+
+def backfill_daily_movement(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """
+    从出入库单全量重建每日汇总（每个方向两条聚合查询）
+
+    Args:
+        db: 数据库会话
+        start_date: 开始日期（含），None表示不限
+        end_date: 结束日期（含），None表示不限
+
+    Returns:
+        int: 写入的汇总行数
+    """
+    delete_query = delete(DailyInventoryMovement)
+    if start_date:
+        delete_query = delete_query.where(DailyInventoryMovement.movement_date >= start_date)
+    if end_date:
+        delete_query = delete_query.where(DailyInventoryMovement.movement_date <= end_date)
+    # 删除和重建在一个写事务中完成，失败时保留原汇总
+    begin_write_transaction(db)
+    db.exec(delete_query)
+
+    now = datetime.now()
+    total_rows = 0
+    for direction in MovementDirection:
+        order_model, item_model = _get_order_models(direction)
+        day_column = func.date(order_model.create_time)
+
+        range_filters = []
+        if start_date:
+            range_filters.append(order_model.create_time >= _day_range(start_date)[0])
+        if end_date:
+            range_filters.append(order_model.create_time < _day_range(end_date)[1])
+
+        material_rows = db.exec(
+            select(
+                day_column,
+                item_model.material_id,
+                func.count(func.distinct(item_model.order_id)),
+                func.coalesce(func.sum(item_model.quantity), 0),
+                func.coalesce(func.sum(item_model.quantity * item_model.unit_price), 0.0)
+            )
+            .join(order_model, item_model.order_id == order_model.order_id)
+            .where(*range_filters)
+            .group_by(day_column, item_model.material_id)
+        ).all()
+
+        # 合计行金额按日期累加明细金额
+        day_amounts: Dict[str, float] = {}
+        records = []
+        for day, material_id, order_count, quantity, amount in material_rows:
+            day_amounts[day] = day_amounts.get(day, 0.0) + float(amount)
+            records.append({
+                "movement_date": date.fromisoformat(day),
+                "material_id": material_id,
+                "direction": direction.value,
+                "order_count": order_count,
+                "quantity": int(quantity),
+                "amount": float(amount),
+                "update_time": now
+            })
+
+        day_totals = db.exec(
+            select(day_column, func.count(order_model.order_id), func.coalesce(func.sum(order_model.total_quantity), 0))
+            .where(*range_filters)
+            .group_by(day_column)
+        ).all()
+        for day, order_count, quantity in day_totals:
+            records.append({
+                "movement_date": date.fromisoformat(day),
+                "material_id": ALL_MATERIALS_ID,
+                "direction": direction.value,
+                "order_count": order_count,
+                "quantity": int(quantity),
+                "amount": day_amounts.get(day, 0.0),
+                "update_time": now
+            })
+
+        if records:
+            db.execute(DailyInventoryMovement.__table__.insert(), records)
+        total_rows += len(records)
+
+    db.commit()
+    logger.info(f"每日出入库汇总回填完成，共写入 {total_rows} 行")
+    return total_rows
+
+
+def get_daily_totals(
+    db: Session,
+    start_date: date,
+    end_date: date
+) -> Dict[Tuple[date, MovementDirection], DailyInventoryMovement]:
+    """
+    读取日期区间内每日合计行（单次索引范围查询）
+
+    Returns:
+        Dict: (日期, 方向) -> 合计行
+    """
+    rows = db.exec(
+        select(DailyInventoryMovement).where(
+            DailyInventoryMovement.material_id == ALL_MATERIALS_ID,
+            DailyInventoryMovement.direction.in_([direction.value for direction in MovementDirection]),
+            DailyInventoryMovement.movement_date >= start_date,
+            DailyInventoryMovement.movement_date <= end_date
+        )
+    ).all()
+    return {(row.movement_date, row.direction): row for row in rows}
+
+
+def get_period_summary(
+    db: Session,
+    start_date: date,
+    end_date: date
+) -> Dict[MovementDirection, Dict[str, float]]:
+    """
+    汇总日期区间内出入库单数、数量和金额（按合计行聚合，单次索引范围查询）
+
+    Returns:
+        Dict: 方向 -> {order_count, quantity, amount}
+    """
+    summary = {
+        direction: {"order_count": 0, "quantity": 0, "amount": 0.0}
+        for direction in MovementDirection
+    }
+    rows = db.exec(
+        select(
+            DailyInventoryMovement.direction,
+            func.sum(DailyInventoryMovement.order_count),
+            func.sum(DailyInventoryMovement.quantity),
+            func.sum(DailyInventoryMovement.amount)
+        )
+        .where(
+            DailyInventoryMovement.material_id == ALL_MATERIALS_ID,
+            DailyInventoryMovement.direction.in_([direction.value for direction in MovementDirection]),
+            DailyInventoryMovement.movement_date >= start_date,
+            DailyInventoryMovement.movement_date <= end_date
+        )
+        .group_by(DailyInventoryMovement.direction)
+    ).all()
+    for direction, order_count, quantity, amount in rows:
+        summary[MovementDirection(direction)] = {
+            "order_count": int(order_count or 0),
+            "quantity": int(quantity or 0),
+            "amount": float(amount or 0.0)
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    from core.config import settings
+    from database import set_database_url, get_session, create_missing_tables
+
+    parser = argparse.ArgumentParser(description="重建每日出入库汇总表")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="开始日期（YYYY-MM-DD）")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="结束日期（YYYY-MM-DD）")
+    args = parser.parse_args()
+
+    set_database_url(settings.DATABASE_URL)
+    create_missing_tables()
+    with get_session() as session:
+        count = backfill_daily_movement(session, args.start, args.end)
+    print(f"每日出入库汇总回填完成，共写入 {count} 行")
@@ -0,0 +1,315 @@
+"""
+库存快照与历史时点库存重建工具
+
+历史时点库存 = 最近的基准状态 ± 基准时间与查询时间之间的库存流水
+- 基准状态可以是库存快照（inventory_snapshots，按月生成），也可以是当前库存明细
+- 选择与查询时间最接近的基准，查询耗时与区间内流水数量成正比，而不是全部历史
+- 查询时间早于基准时减去区间流水，晚于基准时加上区间流水
+
+历史流水可能没有记录货位（bin_id为空），此时按该批次在基准状态中的货位归属，
+基准状态中没有该批次时按当前库存明细的货位归属。
+
+快照包含快照时间之前的全部流水的结果，删除或修改单据流水的接口在同一事务中调用 discard_snapshots_since，
+删除流水时间之后的快照（之后的查询改用更早的快照或当前库存，本月快照由定时任务补建）。
+"""
+
+import logging
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, literal, or_
+from sqlmodel import Session, select, func
+
+from models.base.bin import Bin
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_snapshot import InventorySnapshot, InventorySnapshotItem
+from models.material.inventory_transaction import InventoryTransaction
+from models.material.material import Material
+
+logger = logging.getLogger(__name__)
+
+# 库存键：(批次ID, 器材ID, 货位ID)
+StockKey = Tuple[int, int, Optional[int]]
+
+
+def create_inventory_snapshot(db: Session, creator: str = "system") -> InventorySnapshot:
+    """
+    保存当前库存明细快照（单条INSERT ... SELECT，只保存数量不为0的批次货位）
+
+    Args:
+        db: 数据库会话
+        creator: 创建人
+
+    Returns:
+        InventorySnapshot: 新建的快照
+    """
+    snapshot = InventorySnapshot(snapshot_time=datetime.now(), creator=creator)
+    db.add(snapshot)
+    db.flush()
+
+    quantity_sum = func.sum(InventoryDetail.quantity)
+    source = (
+        select(
+            literal(snapshot.snapshot_id),
+            InventoryDetail.batch_id,
+            InventoryDetail.material_id,
+            InventoryDetail.bin_id,
+            quantity_sum
+        )
+        .group_by(InventoryDetail.batch_id, InventoryDetail.material_id, InventoryDetail.bin_id)
+        .having(quantity_sum != 0)
+    )
+    db.exec(insert(InventorySnapshotItem).from_select(
+        ["snapshot_id", "batch_id", "material_id", "bin_id", "quantity"], source
+    ))
+
+    row_count, total_quantity = db.exec(
+        select(func.count(), func.coalesce(func.sum(InventorySnapshotItem.quantity), 0))
+        .where(InventorySnapshotItem.snapshot_id == snapshot.snapshot_id)
+    ).one()
+    snapshot.row_count = row_count
+    snapshot.total_quantity = int(total_quantity)
+    db.add(snapshot)
+    db.commit()
+    db.refresh(snapshot)
+
+    logger.info(f"库存快照创建成功，快照ID: {snapshot.snapshot_id}，明细 {row_count} 行")
+    return snapshot
+
+
+def ensure_monthly_snapshot(db: Session) -> Optional[InventorySnapshot]:
+    """本月还没有快照时创建一个（定时任务调用，停机错过执行时间后可自动补建）"""
+    month_start = datetime.combine(date.today().replace(day=1), time.min)
+    existing = db.exec(
+        select(InventorySnapshot.snapshot_id).where(InventorySnapshot.snapshot_time >= month_start)
+    ).first()
+    if existing:
+        return None
+    return create_inventory_snapshot(db)
+
+
+def discard_snapshots_since(db: Session, since: Optional[datetime]) -> int:
+    """
+    单据流水被删除或修改后，在调用方的事务中删除包含该流水的快照（不提交）
+
+    Args:
+        db: 数据库会话
+        since: 被删除或修改的流水中最早的流水时间，为空时不处理
+
+    Returns:
+        int: 删除的快照数量
+    """
+    if since is None:
+        return 0
+    snapshot_ids = db.exec(
+        select(InventorySnapshot.snapshot_id).where(InventorySnapshot.snapshot_time >= since)
+    ).all()
+    if not snapshot_ids:
+        return 0
+    db.exec(delete(InventorySnapshotItem).where(InventorySnapshotItem.snapshot_id.in_(snapshot_ids)))
+    db.exec(delete(InventorySnapshot).where(InventorySnapshot.snapshot_id.in_(snapshot_ids)))
+    logger.info(f"流水修改涉及已有快照，已删除 {len(snapshot_ids)} 个快照（快照时间不早于 {since}）")
+    return len(snapshot_ids)
+
+
+def _choose_base(db: Session, as_of: datetime) -> Tuple[Optional[InventorySnapshot], datetime]:
+    """选择与查询时间最接近的基准：前后最近的快照或当前库存（返回None表示当前库存）"""
+    now = datetime.now()
+    candidates: List[Tuple[float, Optional[InventorySnapshot], datetime]] = [
+        (abs((now - as_of).total_seconds()), None, now)
+    ]
+    before = db.exec(
+        select(InventorySnapshot)
+        .where(InventorySnapshot.snapshot_time <= as_of)
+        .order_by(InventorySnapshot.snapshot_time.desc())
+        .limit(1)
+    ).first()
+    after = db.exec(
+        select(InventorySnapshot)
+        .where(InventorySnapshot.snapshot_time > as_of)
+        .order_by(InventorySnapshot.snapshot_time)
+        .limit(1)
+    ).first()
+    for snapshot in (before, after):
+        if snapshot:
+            candidates.append((abs((snapshot.snapshot_time - as_of).total_seconds()), snapshot, snapshot.snapshot_time))
+    _, snapshot, base_time = min(candidates, key=lambda candidate: candidate[0])
+    return snapshot, base_time
+
+
+def _base_rows_query(snapshot: Optional[InventorySnapshot]):
+    """基准状态查询：快照明细或当前库存明细，列为(批次ID, 器材ID, 货位ID, 数量)"""
+    if snapshot is not None:
+        return select(
+            InventorySnapshotItem.batch_id,
+            InventorySnapshotItem.material_id,
+            InventorySnapshotItem.bin_id,
+            InventorySnapshotItem.quantity
+        ).where(InventorySnapshotItem.snapshot_id == snapshot.snapshot_id), InventorySnapshotItem
+    return select(
+        InventoryDetail.batch_id,
+        InventoryDetail.material_id,
+        InventoryDetail.bin_id,
+        InventoryDetail.quantity
+    ), InventoryDetail
+
+
+def _resolve_batch_bins(
+    db: Session,
+    snapshot: Optional[InventorySnapshot],
+    batch_ids: List[int]
+) -> Dict[int, Optional[int]]:
+    """为没有记录货位的流水确定批次所在货位（取数量最多的货位）"""
+    batch_bins: Dict[int, Optional[int]] = {}
+    if not batch_ids:
+        return batch_bins
+
+    def _collect(query):
+        best: Dict[int, int] = {}
+        for batch_id, bin_id, quantity in db.exec(query).all():
+            if batch_id not in batch_bins or quantity > best[batch_id]:
+                batch_bins[batch_id] = bin_id
+                best[batch_id] = quantity
+
+    if snapshot is not None:
+        _collect(
+            select(InventorySnapshotItem.batch_id, InventorySnapshotItem.bin_id, InventorySnapshotItem.quantity)
+            .where(
+                InventorySnapshotItem.snapshot_id == snapshot.snapshot_id,
+                InventorySnapshotItem.batch_id.in_(batch_ids)
+            )
+        )
+    missing = [batch_id for batch_id in batch_ids if batch_id not in batch_bins]
+    if missing:
+        _collect(
+            select(InventoryDetail.batch_id, InventoryDetail.bin_id, InventoryDetail.quantity)
+            .where(InventoryDetail.batch_id.in_(missing))
+        )
+    return batch_bins
+
+
+def get_stock_as_of(
+    db: Session,
+    as_of: datetime,
+    material_id: Optional[int] = None,
+    bin_id: Optional[int] = None,
+    batch_id: Optional[int] = None
+) -> dict:
+    """
+    重建指定时间点的库存（按批次、货位）
+
+    Args:
+        db: 数据库会话
+        as_of: 查询时间点
+        material_id: 器材ID筛选
+        bin_id: 货位ID筛选
+        batch_id: 批次ID筛选
+
+    Returns:
+        dict: 基准信息、回放流水条数及库存明细列表
+    """
+    snapshot, base_time = _choose_base(db, as_of)
+
+    # 1. 读取基准状态
+    base_query, base_model = _base_rows_query(snapshot)
+    if material_id:
+        base_query = base_query.where(base_model.material_id == material_id)
+    if batch_id:
+        base_query = base_query.where(base_model.batch_id == batch_id)
+    if bin_id:
+        base_query = base_query.where(base_model.bin_id == bin_id)
+
+    stock: Dict[StockKey, int] = {}
+    for row_batch_id, row_material_id, row_bin_id, quantity in db.exec(base_query).all():
+        key = (row_batch_id, row_material_id, row_bin_id)
+        stock[key] = stock.get(key, 0) + quantity
+
+    # 2. 回放基准时间与查询时间之间的流水
+    if base_time <= as_of:
+        sign, range_start, range_end = 1, base_time, as_of
+    else:
+        sign, range_start, range_end = -1, as_of, base_time
+
+    delta_query = (
+        select(
+            InventoryTransaction.batch_id,
+            InventoryTransaction.material_id,
+            InventoryTransaction.bin_id,
+            func.sum(InventoryTransaction.quantity_change),
+            func.count()
+        )
+        .where(
+            InventoryTransaction.transaction_time > range_start,
+            InventoryTransaction.transaction_time <= range_end
+        )
+        .group_by(InventoryTransaction.batch_id, InventoryTransaction.material_id, InventoryTransaction.bin_id)
+    )
+    if material_id:
+        delta_query = delta_query.where(InventoryTransaction.material_id == material_id)
+    if batch_id:
+        delta_query = delta_query.where(InventoryTransaction.batch_id == batch_id)
+    if bin_id:
+        # 未记录货位的流水需要按批次货位归属后再筛选
+        delta_query = delta_query.where(or_(
+            InventoryTransaction.bin_id == bin_id,
+            InventoryTransaction.bin_id.is_(None)
+        ))
+
+    delta_rows = db.exec(delta_query).all()
+    replayed_transactions = sum(row[4] for row in delta_rows)
+    batch_bins = _resolve_batch_bins(
+        db, snapshot, sorted({row[0] for row in delta_rows if row[2] is None})
+    )
+
+    for row_batch_id, row_material_id, row_bin_id, quantity_change, _ in delta_rows:
+        if row_bin_id is None:
+            row_bin_id = batch_bins.get(row_batch_id)
+        if bin_id and row_bin_id != bin_id:
+            continue
+        key = (row_batch_id, row_material_id, row_bin_id)
+        stock[key] = stock.get(key, 0) + sign * int(quantity_change or 0)
+
+    # 3. 补充器材、批次、货位显示信息
+    stock = {key: quantity for key, quantity in stock.items() if quantity != 0}
+    material_ids = {key[1] for key in stock}
+    batch_ids = {key[0] for key in stock}
+    bin_ids = {key[2] for key in stock if key[2] is not None}
+
+    materials = {
+        row[0]: row for row in db.exec(
+            select(Material.id, Material.material_code, Material.material_name, Material.material_specification)
+            .where(Material.id.in_(material_ids))
+        ).all()
+    } if material_ids else {}
+    batch_numbers = dict(db.exec(
+        select(InventoryBatch.batch_id, InventoryBatch.batch_number).where(InventoryBatch.batch_id.in_(batch_ids))
+    ).all()) if batch_ids else {}
+    bin_names = dict(db.exec(
+        select(Bin.id, Bin.bin_name).where(Bin.id.in_(bin_ids))
+    ).all()) if bin_ids else {}
+
+    items = []
+    for (row_batch_id, row_material_id, row_bin_id), quantity in sorted(stock.items(), key=lambda entry: (entry[0][1], entry[0][0])):
+        material = materials.get(row_material_id)
+        items.append({
+            "material_id": row_material_id,
+            "material_code": material.material_code if material else None,
+            "material_name": material.material_name if material else None,
+            "material_specification": (material.material_specification or "") if material else None,
+            "batch_id": row_batch_id,
+            "batch_number": batch_numbers.get(row_batch_id),
+            "bin_id": row_bin_id,
+            "bin_name": bin_names.get(row_bin_id),
+            "quantity": quantity
+        })
+
+    return {
+        "as_of": as_of,
+        "base": "snapshot" if snapshot is not None else "current",
+        "base_snapshot_id": snapshot.snapshot_id if snapshot is not None else None,
+        "base_time": base_time,
+        "replayed_transactions": replayed_transactions,
+        "total_quantity": sum(item["quantity"] for item in items),
+        "items": items
+    }
@@ -0,0 +1,263 @@
+"""
+库存数量原子更新工具
+
+出库扣减库存使用条件UPDATE在数据库中一次完成"检查并扣减"：
+    UPDATE inventory_details SET quantity = quantity - :n
+    WHERE detail_id = :id AND quantity >= :n
+    RETURNING quantity
+影响行数为0表示库存不足；RETURNING返回扣减后的数量，用于记录流水。
+扣减在调用方先开启的写事务（BEGIN IMMEDIATE）中执行，与单据、明细、流水一起提交，
+失败时db.rollback()整体撤销，进程中途退出也不会留下没有流水的扣减。
+数据库被其他连接短暂锁定时按退避时间有限次重试。
+"""
+
+import logging
+import time
+from datetime import date
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import and_, exists, insert, literal, or_, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, select, func
+
+from models.base.bin import Bin
+from models.material.inventory_detail import InventoryDetail
+from models.material.outbound_order_item import OutboundOrderItem
+
+logger = logging.getLogger(__name__)
+
+# 数据库锁定时的最大重试次数
+MAX_RETRIES = 5
+# 首次重试等待秒数（之后每次翻倍）
+RETRY_BASE_DELAY = 0.05
+# IN条件每块的参数数量（低于SQLite参数上限）
+IN_CHUNK_SIZE = 500
+
+
+def _is_locked_error(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+def _execute_with_retry(execute: Callable[[], Any], describe: Callable[[], str]):
+    """执行写入操作，数据库锁定时有限次重试"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return execute()
+        except OperationalError as e:
+            if attempt == MAX_RETRIES or not _is_locked_error(e):
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** attempt)
+            logger.warning(f"{describe()}时数据库被锁定，{delay:.2f}秒后第{attempt + 1}次重试")
+            time.sleep(delay)
+
+
+def _execute_update(db: Session, statement, describe: Callable[[], str]):
+    return _execute_with_retry(
+        lambda: db.exec(statement, execution_options={"synchronize_session": False}),
+        describe
+    )
+
+
+def begin_write_transaction(db: Session):
+    """
+    在自动提交连接上显式开启写事务（BEGIN IMMEDIATE）
+
+    在扣减库存之前调用，库存扣减和单据、明细、流水等写入在该事务中由db.commit()一次提交，
+    出错时由db.rollback()整体回滚。
+    """
+    connection = db.connection()
+    if connection.connection.dbapi_connection.in_transaction:
+        return
+    _execute_with_retry(lambda: connection.exec_driver_sql("BEGIN IMMEDIATE"), lambda: "开启写事务")
+
+
+def decrease_stock(db: Session, detail: InventoryDetail, quantity: int) -> Optional[int]:
+    """
+    原子扣减库存明细数量（库存不足时不扣减）
+
+    Args:
+        db: 数据库会话
+        detail: 库存明细
+        quantity: 扣减数量
+
+    Returns:
+        Optional[int]: 扣减后的数量，库存不足时返回None
+    """
+    statement = (
+        update(InventoryDetail)
+        .where(InventoryDetail.detail_id == detail.detail_id, InventoryDetail.quantity >= quantity)
+        .values(quantity=InventoryDetail.quantity - quantity, last_updated=date.today())
+        .returning(InventoryDetail.quantity)
+    )
+    quantity_after = _execute_update(
+        db, statement, lambda: f"扣减库存明细 {detail.detail_id}"
+    ).scalar_one_or_none()
+    if quantity_after is not None:
+        # 同步会话中已加载对象的数量，且不标记为待写入
+        set_committed_value(detail, "quantity", quantity_after)
+    return quantity_after
+
+
+def increase_stock(db: Session, detail: InventoryDetail, quantity: int) -> int:
+    """
+    原子增加库存明细数量（退回出库数量）
+
+    Args:
+        db: 数据库会话
+        detail: 库存明细
+        quantity: 增加数量
+
+    Returns:
+        int: 增加后的数量
+    """
+    statement = (
+        update(InventoryDetail)
+        .where(InventoryDetail.detail_id == detail.detail_id)
+        .values(quantity=InventoryDetail.quantity + quantity, last_updated=date.today())
+        .returning(InventoryDetail.quantity)
+    )
+    quantity_after = _execute_update(
+        db, statement, lambda: f"增加库存明细 {detail.detail_id}"
+    ).scalar_one()
+    set_committed_value(detail, "quantity", quantity_after)
+    return quantity_after
+
+
+def adjust_stock(db: Session, detail: InventoryDetail, delta: int) -> Optional[int]:
+    """
+    按变化量原子调整库存明细数量（delta为负数时按扣减处理，不会扣成负数）
+
+    Returns:
+        Optional[int]: 调整后的数量，扣减时库存不足返回None
+    """
+    if delta < 0:
+        return decrease_stock(db, detail, -delta)
+    return increase_stock(db, detail, delta)
+
+
+def find_stock_detail(db: Session, batch_id: int, bin_id: Optional[int] = None,
+                      quantity: int = 0) -> Optional[InventoryDetail]:
+    """
+    查找批次在货位上的库存明细（同一批次移库或按批次分配后可能分布在多个货位）
+
+    Args:
+        db: 数据库会话
+        batch_id: 批次ID
+        bin_id: 货位ID，指定时只匹配该货位上的库存明细
+        quantity: 未指定货位时优先返回库存不少于该数量的明细，其次按明细ID取第一条
+
+    Returns:
+        Optional[InventoryDetail]: 库存明细，不存在时返回None
+    """
+    statement = select(InventoryDetail).where(InventoryDetail.batch_id == batch_id)
+    if bin_id is not None:
+        return db.exec(statement.where(InventoryDetail.bin_id == bin_id).order_by(InventoryDetail.detail_id)).first()
+    return db.exec(
+        statement.order_by((InventoryDetail.quantity >= quantity).desc(), InventoryDetail.detail_id)
+    ).first()
+
+
+def get_return_detail(db: Session, batch_id: int, material_id: int,
+                      bin_id: Optional[int]) -> Optional[InventoryDetail]:
+    """
+    获取退回出库数量的库存明细：出库货位上的明细，已被移库删除时在该货位新建数量为0的明细
+
+    出库明细没有货位（旧数据）时退回到该批次的第一条库存明细。
+    """
+    detail = find_stock_detail(db, batch_id, bin_id)
+    if detail is None and bin_id is not None:
+        # 直接插入，不刷新会话中尚未确认的其他修改
+        detail_id = db.exec(insert(InventoryDetail).values(
+            batch_id=batch_id, material_id=material_id, bin_id=bin_id, quantity=0, last_updated=date.today()
+        ).returning(InventoryDetail.detail_id)).scalar_one()
+        detail = db.get(InventoryDetail, detail_id)
+    return detail
+
+
+def restore_outbound_items_stock(db: Session, *item_filters) -> int:
+    """
+    按出库明细批量退回库存（删除出库明细或出库单时调用）
+
+    按 (批次, 货位) 汇总待删除明细的出库数量，用一条 UPDATE ... FROM 加回到该批次在出库货位上的库存明细；
+    出库明细没有货位（旧数据）时加回到该批次的第一条库存明细。
+    出库货位上的库存明细已被移库删除时，用一条 INSERT ... SELECT 在原货位新建库存明细。
+    最后按是否有库存重新设置涉及货位的空货位标记。
+
+    Args:
+        db: 数据库会话
+        item_filters: 待删除出库明细的筛选条件
+
+    Returns:
+        int: 更新和新建的库存明细条数
+    """
+    same_batch = and_(
+        InventoryDetail.batch_id == OutboundOrderItem.batch_id,
+        InventoryDetail.material_id == OutboundOrderItem.material_id
+    )
+    matching_detail_id = (
+        select(func.min(InventoryDetail.detail_id))
+        .where(
+            same_batch,
+            or_(OutboundOrderItem.bin_id.is_(None), InventoryDetail.bin_id == OutboundOrderItem.bin_id)
+        )
+        .correlate(OutboundOrderItem)
+        .scalar_subquery()
+    )
+    returned = (
+        select(
+            matching_detail_id.label("detail_id"),
+            func.sum(OutboundOrderItem.quantity).label("quantity")
+        )
+        .where(*item_filters)
+        .group_by(matching_detail_id)
+        .subquery("returned_stock")
+    )
+    updated = db.exec(
+        update(InventoryDetail)
+        .where(InventoryDetail.detail_id == returned.c.detail_id)
+        .values(quantity=InventoryDetail.quantity + returned.c.quantity, last_updated=date.today()),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+
+    missing = (
+        select(
+            OutboundOrderItem.batch_id,
+            OutboundOrderItem.material_id,
+            OutboundOrderItem.bin_id,
+            func.sum(OutboundOrderItem.quantity),
+            literal(date.today())
+        )
+        .where(
+            *item_filters,
+            OutboundOrderItem.bin_id.is_not(None),
+            ~exists().where(same_batch, InventoryDetail.bin_id == OutboundOrderItem.bin_id)
+        )
+        .group_by(OutboundOrderItem.batch_id, OutboundOrderItem.material_id, OutboundOrderItem.bin_id)
+    )
+    inserted = db.exec(
+        insert(InventoryDetail).from_select(
+            ["batch_id", "material_id", "bin_id", "quantity", "last_updated"], missing
+        )
+    ).rowcount
+
+    refresh_bin_empty_labels(db, db.exec(
+        select(OutboundOrderItem.bin_id).where(*item_filters).distinct()
+    ).all())
+    return updated + inserted
+
+
+def refresh_bin_empty_labels(db: Session, bin_ids: Iterable[Optional[int]]):
+    """
+    按是否还有库存重新设置货位的空货位标记（每块一条UPDATE ... NOT EXISTS）
+
+    不提交事务，由外层统一提交。
+    """
+    bin_ids = sorted({bin_id for bin_id in bin_ids if bin_id is not None})
+    has_stock = exists().where(InventoryDetail.bin_id == Bin.id, InventoryDetail.quantity > 0)
+    for start in range(0, len(bin_ids), IN_CHUNK_SIZE):
+        db.exec(
+            update(Bin).where(Bin.id.in_(bin_ids[start:start + IN_CHUNK_SIZE])).values(empty_label=~has_stock),
+            execution_options={"synchronize_session": False}
+        )
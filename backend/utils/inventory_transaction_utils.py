@@ -1,10 +1,11 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 from typing import Optional, List
 from datetime import datetime
 from models.material.inventory_transaction import InventoryTransaction, ChangeType, ReferenceType
 from models.material.material import Material
 from models.material.inventory_batch import InventoryBatch
 from schemas.material.inventory_transaction import InventoryTransactionCreate
+from utils.inventory_stock_utils import IN_CHUNK_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,8 @@ def create_inventory_transaction(
     quantity_after: int,
     reference_type: ReferenceType,
     reference_id: Optional[int],
-    creator: str
+    creator: str,
+    bin_id: Optional[int] = None
 ) -> InventoryTransaction:
     """
     创建库存变更流水记录
@@ -36,6 +38,7 @@ def create_inventory_transaction(
         reference_type: 关联单据类型（inbound/outbound/stocktake）
         reference_id: 关联单据ID
         creator: 操作人
+        bin_id: 货位ID
         
     Returns:
         InventoryTransaction: 创建的库存变更流水记录
@@ -82,6 +85,7 @@ def create_inventory_transaction(
     transaction = InventoryTransaction(
         material_id=material_id,
         batch_id=batch_id,
+        bin_id=bin_id,
         change_type=change_type,
         quantity_change=quantity_change,
         quantity_before=quantity_before,
@@ -192,6 +196,20 @@ def delete_inventory_transaction(
     return True
 
 
+def get_earliest_transaction_time(db: Session, *filters) -> Optional[datetime]:
+    """
+    查询符合条件的库存变更流水中最早的流水时间（删除或修改流水前调用，用于重算月结余额和快照）
+    
+    Args:
+        db: 数据库会话
+        filters: 流水筛选条件
+        
+    Returns:
+        Optional[datetime]: 最早的流水时间，没有符合条件的流水时返回None
+    """
+    return db.exec(select(func.min(InventoryTransaction.transaction_time)).where(*filters)).one()
+
+
 def get_inventory_transactions_by_criteria(
     db: Session,
     material_id: Optional[int] = None,
@@ -257,68 +275,175 @@ def get_inventory_transactions_by_criteria(
     return transactions
 
 
+def _build_statistics_filters(
+    material_id: Optional[int] = None,
+    batch_id: Optional[int] = None,
+    reference_type: Optional[ReferenceType] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> list:
+    """构建库存变更统计的筛选条件"""
+    filters = []
+    if material_id:
+        filters.append(InventoryTransaction.material_id == material_id)
+    if batch_id:
+        filters.append(InventoryTransaction.batch_id == batch_id)
+    if reference_type:
+        filters.append(InventoryTransaction.reference_type == reference_type)
+    if start_date:
+        filters.append(InventoryTransaction.transaction_time >= start_date)
+    if end_date:
+        filters.append(InventoryTransaction.transaction_time <= end_date)
+    return filters
+
+
+def _new_statistics() -> dict:
+    return {
+        'total_in': 0,
+        'total_out': 0,
+        'total_adjust': 0,
+        'net_change': 0,
+        'transaction_count': 0
+    }
+
+
+def _accumulate_statistics(stats: dict, change_type, quantity_sum, abs_quantity_sum, count) -> None:
+    """将一条按change_type聚合的结果累加到统计字典"""
+    if change_type == ChangeType.IN:
+        stats['total_in'] += int(quantity_sum or 0)
+    elif change_type == ChangeType.OUT:
+        stats['total_out'] += int(abs_quantity_sum or 0)  # 出库数量取绝对值
+    elif change_type == ChangeType.ADJUST:
+        stats['total_adjust'] += int(quantity_sum or 0)
+    stats['transaction_count'] += count
+    stats['net_change'] = stats['total_in'] - stats['total_out'] + stats['total_adjust']
+
+
+# 支持的统计分组维度
+TRANSACTION_GROUP_BY_OPTIONS = ('material', 'batch', 'day', 'reference_type')
+
+
+def _load_group_labels(db: Session, group_by: str, keys: list) -> dict:
+    """器材、批次分组的显示标签（按IN_CHUNK_SIZE分块查询）"""
+    labels = {}
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CHUNK_SIZE]
+        if group_by == 'material':
+            labels.update({
+                material_id: f"{material_code} {material_name}"
+                for material_id, material_code, material_name in db.exec(
+                    select(Material.id, Material.material_code, Material.material_name)
+                    .where(Material.id.in_(chunk))
+                ).all()
+            })
+        elif group_by == 'batch':
+            labels.update(db.exec(
+                select(InventoryBatch.batch_id, InventoryBatch.batch_number)
+                .where(InventoryBatch.batch_id.in_(chunk))
+            ).all())
+    return labels
+
+
 def get_transaction_statistics(
     db: Session,
     material_id: Optional[int] = None,
     batch_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    reference_type: Optional[ReferenceType] = None,
+    group_by: Optional[str] = None,
+    group_page: int = 1,
+    group_page_size: int = 100
 ) -> dict:
     """
     获取库存变更统计信息
     
+    使用GROUP BY change_type（及可选的分组维度）在数据库中聚合，
+    不加载流水记录对象。分组结果按分组键排序分页，只聚合当前页的分组。
+    
     Args:
         db: 数据库会话
         material_id: 器材ID
         batch_id: 批次ID
         start_date: 开始时间
         end_date: 结束时间
+        reference_type: 关联单据类型
+        group_by: 分组维度（material/batch/day/reference_type），None表示不分组
+        group_page: 分组页码
+        group_page_size: 每页分组数量
         
     Returns:
-        dict: 统计信息字典
+        dict: 统计信息字典，分组时额外包含groups列表（key、label及各项统计）和分组总数group_total
     """
-    # 构建查询条件
-    query = select(InventoryTransaction)
-    
-    if material_id:
-        query = query.where(InventoryTransaction.material_id == material_id)
-    
-    if batch_id:
-        query = query.where(InventoryTransaction.batch_id == batch_id)
-    
-    if start_date:
-        query = query.where(InventoryTransaction.transaction_time >= start_date)
-    
-    if end_date:
-        query = query.where(InventoryTransaction.transaction_time <= end_date)
-    
-    # 执行查询
-    transactions = db.exec(query).all()
-    
-    # 根据条件查询入库、出库、调整数量
-    total_in = 0
-    total_out = 0
-    total_adjust = 0
-    
-    for transaction in transactions:
-        if transaction.change_type == ChangeType.IN:
-            total_in += transaction.quantity_change
-        elif transaction.change_type == ChangeType.OUT:
-            total_out += abs(transaction.quantity_change)  # 出库数量取绝对值
-        elif transaction.change_type == ChangeType.ADJUST:
-            total_adjust += transaction.quantity_change
-    
-    # 计算总变更数量
-    net_change = total_in - total_out + total_adjust
+    if group_by is not None and group_by not in TRANSACTION_GROUP_BY_OPTIONS:
+        raise ValueError(f"不支持的分组维度: {group_by}")
+    
+    filters = _build_statistics_filters(material_id, batch_id, reference_type, start_date, end_date)
+    aggregates = [
+        InventoryTransaction.change_type,
+        func.sum(InventoryTransaction.quantity_change),
+        func.sum(func.abs(InventoryTransaction.quantity_change)),
+        func.count()
+    ]
     
-    # 返回统计结果
-    return {
-        'total_in': total_in,
-        'total_out': total_out,
-        'total_adjust': total_adjust,
-        'net_change': net_change,
-        'transaction_count': len(transactions)
-    }
+    # 总计：单条GROUP BY change_type查询
+    stats = _new_statistics()
+    rows = db.exec(
+        select(*aggregates).where(*filters).group_by(InventoryTransaction.change_type)
+    ).all()
+    for row in rows:
+        _accumulate_statistics(stats, *row)
+    if group_by is None:
+        return stats
+    
+    # 分组：GROUP BY 分组键, change_type
+    if group_by == 'material':
+        group_column = InventoryTransaction.material_id
+    elif group_by == 'batch':
+        group_column = InventoryTransaction.batch_id
+    elif group_by == 'day':
+        group_column = func.date(InventoryTransaction.transaction_time)
+    else:
+        group_column = InventoryTransaction.reference_type
+    
+    stats['group_total'] = db.exec(
+        select(func.count(func.distinct(group_column))).where(*filters)
+    ).one()
+    
+    # 当前页的分组键作为子查询，不把键列表传回数据库
+    page_keys = (
+        select(group_column)
+        .where(*filters)
+        .group_by(group_column)
+        .order_by(group_column)
+        .offset((group_page - 1) * group_page_size)
+        .limit(group_page_size)
+    )
+    rows = db.exec(
+        select(group_column, *aggregates)
+        .where(*filters, group_column.in_(page_keys.scalar_subquery()))
+        .group_by(group_column, InventoryTransaction.change_type)
+        .order_by(group_column)
+    ).all()
+    
+    groups = {}
+    for key, *aggregate_row in rows:
+        group = groups.get(key)
+        if group is None:
+            group = _new_statistics()
+            groups[key] = group
+        _accumulate_statistics(group, *aggregate_row)
+    
+    labels = _load_group_labels(db, group_by, list(groups))
+    
+    stats['groups'] = []
+    for key, group in groups.items():
+        if isinstance(key, ReferenceType):
+            key = key.value
+        group['key'] = str(key)
+        group['label'] = labels.get(key, str(key))
+        stats['groups'].append(group)
+    return stats
 
 
 def create_inbound_transaction(
@@ -329,7 +454,8 @@ def create_inbound_transaction(
     quantity_before: int,
     quantity_after: int,
     reference_id: Optional[int],
-    creator: str
+    creator: str,
+    bin_id: Optional[int] = None
 ) -> InventoryTransaction:
     """
     创建入库流水记录（专用函数）
@@ -343,6 +469,7 @@ def create_inbound_transaction(
         quantity_after: 入库后数量
         reference_id: 入库单ID
         creator: 操作人
+        bin_id: 货位ID
         
     Returns:
         InventoryTransaction: 创建的入库流水记录
@@ -357,7 +484,8 @@ def create_inbound_transaction(
         quantity_after=quantity_after,
         reference_type=ReferenceType.INBOUND,
         reference_id=reference_id,
-        creator=creator
+        creator=creator,
+        bin_id=bin_id
     )
 
 
@@ -369,7 +497,8 @@ def create_outbound_transaction(
     quantity_before: int,
     quantity_after: int,
     reference_id: Optional[int],
-    creator: str
+    creator: str,
+    bin_id: Optional[int] = None
 ) -> InventoryTransaction:
     """
     创建出库流水记录（专用函数）
@@ -383,6 +512,7 @@ def create_outbound_transaction(
         quantity_after: 出库后数量
         reference_id: 出库单ID
         creator: 操作人
+        bin_id: 货位ID
         
     Returns:
         InventoryTransaction: 创建的出库流水记录
@@ -397,7 +527,8 @@ def create_outbound_transaction(
         quantity_after=quantity_after,
         reference_type=ReferenceType.OUTBOUND,
         reference_id=reference_id,
-        creator=creator
+        creator=creator,
+        bin_id=bin_id
     )
 
 
@@ -409,7 +540,8 @@ def create_stock_adjust_transaction(
     quantity_before: int,
     quantity_after: int,
     reference_id: Optional[int],
-    creator: str
+    creator: str,
+    bin_id: Optional[int] = None
 ) -> InventoryTransaction:
     """
     创建库存调整流水记录（专用函数）
@@ -423,6 +555,7 @@ def create_stock_adjust_transaction(
         quantity_after: 调整后数量
         reference_id: 盘点单ID
         creator: 操作人
+        bin_id: 货位ID
         
     Returns:
         InventoryTransaction: 创建的库存调整流水记录
@@ -437,5 +570,6 @@ def create_stock_adjust_transaction(
         quantity_after=quantity_after,
         reference_type=ReferenceType.STOCKTAKE,
         reference_id=reference_id,
-        creator=creator
+        creator=creator,
+        bin_id=bin_id
     )
\ No newline at end of file
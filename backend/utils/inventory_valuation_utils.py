@@ -0,0 +1,366 @@
+"""
+库存计价工具（加权平均 / 先进先出）
+
+按器材或器材+仓库分组，计算指定时间点的结存数量及三种金额：
+- 批次成本：结存按各批次采购单价计价（与仪表板库存总值口径一致）
+- 加权平均：截至时间点的全部收入（正向变动）按批次单价加权得到平均单价，乘以结存数量
+- 先进先出：发出时先消耗最早的收入，结存由最近的收入构成，按最近的收入层从新到旧累计到结存数量
+
+全部器材在一条SQL中用窗口函数整体计算（按分组累计收入层），不逐器材查询。
+结存超过收入合计的部分（如历史调整）按加权平均单价计价，结存为负时两种方法均按加权平均单价计价。
+
+移库流水（成对的ADJUST，关联单据类型为transfer）不是收入：同一次移库的流水按批次和分组合并，
+同一分组内的移出移入相互抵消，只有跨仓库移入的净数量作为目标仓库的收入层。
+
+流水没有记录货位时按批次当前数量最多的货位归属仓库。
+计算结果按(时间点, 分组方式)缓存（当前库存使用固定的缓存键），流水或批次单价变化后自动失效；
+按器材或仓库筛选时直接在SQL中筛选流水，不使用缓存。
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, literal, union_all
+from sqlmodel import Session, select, func
+
+from core.response_cache import get_response_cache
+from models.base.bin import Bin
+from models.base.warehouse import Warehouse
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import InventoryTransaction, ReferenceType
+from models.material.material import Material
+
+# 分组方式
+VALUATION_GROUP_BY_OPTIONS = ("material", "warehouse")
+
+# 无法确定仓库（按器材分组或流水、批次均无货位）时使用的仓库ID
+UNKNOWN_WAREHOUSE_ID = 0
+
+# 计价结果缓存：(时间点, 分组方式) -> (数据指纹, 结果行)，当前库存的时间点为None
+_CACHE_SIZE = 16
+_valuation_cache: "OrderedDict[Tuple[Optional[datetime], str], Tuple[tuple, List[dict]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _data_fingerprint(db: Session, as_of: Optional[datetime]) -> tuple:
+    """
+    截至时间点（为空时为全部）的流水及批次单价指纹，用于判断缓存是否失效
+
+    除条数、最大ID和数量合计外，按ID加权累计数量、器材、批次、货位和单价，
+    数量合计不变的修改（如两条流水互换数量、两个批次互换单价）也会改变指纹；
+    另外带上响应缓存的数据版本号，本进程提交的其他修改（如流水时间）同样使缓存失效。
+    """
+    transaction_id = InventoryTransaction.transaction_id
+    query = select(
+        func.count(),
+        func.max(transaction_id),
+        func.total(InventoryTransaction.quantity_change),
+        func.sum(transaction_id * InventoryTransaction.quantity_change),
+        func.sum(transaction_id * InventoryTransaction.material_id),
+        func.sum(transaction_id * InventoryTransaction.batch_id),
+        func.sum(transaction_id * func.coalesce(InventoryTransaction.bin_id, 0))
+    )
+    if as_of is not None:
+        query = query.where(InventoryTransaction.transaction_time <= as_of)
+    transactions = db.exec(query).one()
+    batches = db.exec(
+        select(
+            func.count(),
+            func.total(InventoryBatch.unit_price),
+            func.total(InventoryBatch.batch_id * InventoryBatch.unit_price)
+        )
+    ).one()
+    return tuple(transactions) + tuple(batches) + (get_response_cache().data_version,)
+
+
+def _transactions_cte(as_of: Optional[datetime], group_by: str,
+                      material_id: Optional[int] = None, warehouse_id: Optional[int] = None):
+    """截至时间点（为空时为全部）的流水，附带批次单价和分组仓库，可按器材和仓库筛选"""
+    columns = [
+        InventoryTransaction.transaction_id,
+        InventoryTransaction.transaction_time,
+        InventoryTransaction.material_id,
+        InventoryTransaction.batch_id,
+        InventoryTransaction.quantity_change,
+        InventoryTransaction.reference_type,
+        InventoryTransaction.reference_id,
+        func.coalesce(InventoryBatch.unit_price, 0.0).label("unit_price")
+    ]
+    query = (
+        select(*columns)
+        .select_from(InventoryTransaction)
+        .join(InventoryBatch, InventoryBatch.batch_id == InventoryTransaction.batch_id, isouter=True)
+    )
+    if as_of is not None:
+        query = query.where(InventoryTransaction.transaction_time <= as_of)
+    if material_id is not None:
+        query = query.where(InventoryTransaction.material_id == material_id)
+
+    if group_by == "warehouse" or warehouse_id is not None:
+        # 未记录货位的流水按批次当前数量最多的货位归属
+        batch_bins = select(
+            InventoryDetail.batch_id,
+            InventoryDetail.bin_id,
+            func.row_number().over(
+                partition_by=InventoryDetail.batch_id,
+                order_by=InventoryDetail.quantity.desc()
+            ).label("rank")
+        )
+        if material_id is not None:
+            batch_bins = batch_bins.where(InventoryDetail.material_id == material_id)
+        batch_bins = batch_bins.subquery("batch_bins")
+        transaction_warehouse = func.coalesce(Bin.warehouse_id, UNKNOWN_WAREHOUSE_ID)
+        query = (
+            query.join(batch_bins, and_(
+                batch_bins.c.batch_id == InventoryTransaction.batch_id,
+                batch_bins.c.rank == 1
+            ), isouter=True)
+            .join(Bin, Bin.id == func.coalesce(InventoryTransaction.bin_id, batch_bins.c.bin_id), isouter=True)
+        )
+        if warehouse_id is not None:
+            query = query.where(transaction_warehouse == warehouse_id)
+    if group_by == "warehouse":
+        query = query.add_columns(transaction_warehouse.label("warehouse_id"))
+    else:
+        query = query.add_columns(literal(UNKNOWN_WAREHOUSE_ID).label("warehouse_id"))
+
+    return query.cte("valuation_transactions")
+
+
+def _compute_valuation(db: Session, as_of: Optional[datetime], group_by: str,
+                       material_id: Optional[int] = None, warehouse_id: Optional[int] = None) -> List[dict]:
+    """整体计算全部分组（或筛选出的器材、仓库）的结存数量和金额"""
+    transactions = _transactions_cte(as_of, group_by, material_id, warehouse_id)
+    keys = [transactions.c.material_id, transactions.c.warehouse_id]
+
+    # 结存数量与批次成本
+    holdings = (
+        select(
+            *keys,
+            func.sum(transactions.c.quantity_change).label("quantity"),
+            func.sum(transactions.c.quantity_change * transactions.c.unit_price).label("batch_value")
+        )
+        .group_by(*keys)
+        .cte("valuation_holdings")
+    )
+
+    # 收入来源：非移库的正向流水，以及同一次移库按批次和分组合并后净移入的数量
+    is_transfer = transactions.c.reference_type == ReferenceType.TRANSFER
+    transfer_quantity = func.sum(transactions.c.quantity_change)
+    receipt_rows = union_all(
+        select(
+            *keys,
+            transactions.c.transaction_time,
+            transactions.c.transaction_id,
+            transactions.c.quantity_change.label("quantity"),
+            transactions.c.unit_price
+        ).where(transactions.c.quantity_change > 0, ~is_transfer),
+        select(
+            *keys,
+            func.max(transactions.c.transaction_time),
+            func.max(transactions.c.transaction_id),
+            transfer_quantity,
+            func.max(transactions.c.unit_price)
+        )
+        .where(is_transfer)
+        .group_by(transactions.c.reference_id, transactions.c.batch_id, *keys)
+        .having(transfer_quantity > 0)
+    ).cte("valuation_receipt_rows")
+
+    # 收入层：按分组从新到旧累计收入数量
+    row_keys = [receipt_rows.c.material_id, receipt_rows.c.warehouse_id]
+    receipts = (
+        select(
+            *row_keys,
+            receipt_rows.c.quantity,
+            receipt_rows.c.unit_price,
+            func.sum(receipt_rows.c.quantity).over(
+                partition_by=row_keys,
+                order_by=[receipt_rows.c.transaction_time.desc(), receipt_rows.c.transaction_id.desc()]
+            ).label("cumulative_quantity")
+        )
+        .cte("valuation_receipts")
+    )
+
+    receipt_keys = [receipts.c.material_id, receipts.c.warehouse_id]
+    receipt_totals = (
+        select(
+            *receipt_keys,
+            func.sum(receipts.c.quantity).label("receipt_quantity"),
+            func.sum(receipts.c.quantity * receipts.c.unit_price).label("receipt_value"),
+        )
+        .group_by(*receipt_keys)
+        .subquery("valuation_receipt_totals")
+    )
+
+    # 先进先出：结存由最近的收入层构成，边界收入层只取剩余部分
+    same_holding = and_(
+        holdings.c.material_id == receipts.c.material_id,
+        holdings.c.warehouse_id == receipts.c.warehouse_id
+    )
+    layer_quantity = func.min(
+        receipts.c.quantity,
+        holdings.c.quantity - (receipts.c.cumulative_quantity - receipts.c.quantity)
+    )
+    fifo_layers = (
+        select(
+            *receipt_keys,
+            func.sum(layer_quantity * receipts.c.unit_price).label("fifo_value")
+        )
+        .select_from(receipts)
+        .join(holdings, same_holding)
+        .where(receipts.c.cumulative_quantity - receipts.c.quantity < holdings.c.quantity)
+        .group_by(*receipt_keys)
+        .subquery("valuation_fifo_layers")
+    )
+
+    query = (
+        select(
+            holdings.c.material_id,
+            holdings.c.warehouse_id,
+            holdings.c.quantity,
+            holdings.c.batch_value,
+            func.coalesce(receipt_totals.c.receipt_quantity, 0),
+            func.coalesce(receipt_totals.c.receipt_value, 0.0),
+            func.coalesce(fifo_layers.c.fifo_value, 0.0)
+        )
+        .select_from(holdings)
+        .join(receipt_totals, and_(
+            receipt_totals.c.material_id == holdings.c.material_id,
+            receipt_totals.c.warehouse_id == holdings.c.warehouse_id
+        ), isouter=True)
+        .join(fifo_layers, and_(
+            fifo_layers.c.material_id == holdings.c.material_id,
+            fifo_layers.c.warehouse_id == holdings.c.warehouse_id
+        ), isouter=True)
+        .where(holdings.c.quantity != 0)
+        .order_by(holdings.c.material_id, holdings.c.warehouse_id)
+    )
+
+    rows = []
+    for material_id, warehouse_id, quantity, batch_value, receipt_quantity, receipt_value, fifo_value in db.exec(query).all():
+        average_price = receipt_value / receipt_quantity if receipt_quantity else 0.0
+        if quantity > 0:
+            fifo_value += max(quantity - receipt_quantity, 0) * average_price
+        else:
+            fifo_value = quantity * average_price
+        rows.append({
+            "material_id": material_id,
+            "warehouse_id": warehouse_id if warehouse_id != UNKNOWN_WAREHOUSE_ID else None,
+            "quantity": int(quantity),
+            "batch_value": round(batch_value or 0.0, 2),
+            "average_unit_price": round(average_price, 4),
+            "weighted_average_value": round(quantity * average_price, 2),
+            "fifo_value": round(fifo_value, 2)
+        })
+    return rows
+
+
+def compute_inventory_valuation(db: Session, as_of: Optional[datetime] = None, group_by: str = "material",
+                                material_id: Optional[int] = None,
+                                warehouse_id: Optional[int] = None) -> List[dict]:
+    """
+    计算指定时间点全部器材（或器材+仓库）的计价结果
+
+    不筛选时结果按(时间点, 分组方式)缓存，当前库存（时间点为空）使用固定的缓存键，数据指纹不变时直接返回；
+    按器材或仓库筛选时在SQL中只计算筛选出的流水，不读写缓存。
+
+    Args:
+        db: 数据库会话
+        as_of: 计价时间点，为空时按当前库存（全部流水）计价
+        group_by: 分组方式，material(按器材)、warehouse(按器材+仓库)
+        material_id: 器材ID
+        warehouse_id: 仓库ID，只计算归属该仓库的流水
+
+    Returns:
+        List[dict]: 计价结果行（不含显示信息）
+    """
+    if group_by not in VALUATION_GROUP_BY_OPTIONS:
+        raise ValueError(f"不支持的分组方式: {group_by}")
+    if material_id is not None or warehouse_id is not None:
+        return _compute_valuation(db, as_of, group_by, material_id, warehouse_id)
+
+    cache_key = (as_of, group_by)
+    fingerprint = _data_fingerprint(db, as_of)
+    with _cache_lock:
+        cached = _valuation_cache.get(cache_key)
+        if cached and cached[0] == fingerprint:
+            _valuation_cache.move_to_end(cache_key)
+            return cached[1]
+
+    rows = _compute_valuation(db, as_of, group_by)
+
+    with _cache_lock:
+        _valuation_cache[cache_key] = (fingerprint, rows)
+        _valuation_cache.move_to_end(cache_key)
+        while len(_valuation_cache) > _CACHE_SIZE:
+            _valuation_cache.popitem(last=False)
+    return rows
+
+
+def clear_valuation_cache():
+    """清空计价结果缓存"""
+    with _cache_lock:
+        _valuation_cache.clear()
+
+
+def get_inventory_valuation(
+    db: Session,
+    as_of: Optional[datetime] = None,
+    group_by: str = "material",
+    material_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    查询库存计价（筛选、合计、分页并补充器材和仓库名称）
+
+    Returns:
+        dict: 合计金额及分页后的计价明细，计价时间点为空时返回查询时间
+    """
+    queried_at = as_of or datetime.now()
+    rows = compute_inventory_valuation(db, as_of, group_by, material_id, warehouse_id)
+
+    total = len(rows)
+    page_rows = rows[(page - 1) * page_size: page * page_size]
+
+    material_ids = {row["material_id"] for row in page_rows}
+    warehouse_ids = {row["warehouse_id"] for row in page_rows if row["warehouse_id"] is not None}
+    materials: Dict[int, tuple] = {
+        row[0]: row for row in db.exec(
+            select(Material.id, Material.material_code, Material.material_name, Material.material_specification)
+            .where(Material.id.in_(material_ids))
+        ).all()
+    } if material_ids else {}
+    warehouse_names = dict(db.exec(
+        select(Warehouse.id, Warehouse.warehouse_name).where(Warehouse.id.in_(warehouse_ids))
+    ).all()) if warehouse_ids else {}
+
+    items = []
+    for row in page_rows:
+        material = materials.get(row["material_id"])
+        items.append({
+            **row,
+            "material_code": material.material_code if material else None,
+            "material_name": material.material_name if material else None,
+            "material_specification": (material.material_specification or "") if material else None,
+            "warehouse_name": warehouse_names.get(row["warehouse_id"])
+        })
+
+    return {
+        "as_of": queried_at,
+        "group_by": group_by,
+        "total_quantity": sum(row["quantity"] for row in rows),
+        "total_batch_value": round(sum(row["batch_value"] for row in rows), 2),
+        "total_weighted_average_value": round(sum(row["weighted_average_value"] for row in rows), 2),
+        "total_fifo_value": round(sum(row["fifo_value"] for row in rows), 2),
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size,
+        "items": items
+    }
@@ -0,0 +1,71 @@
+"""
+出入库单统计工具
+使用GROUP BY聚合单据和明细，避免逐单加载明细计算金额
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select, func
+
+
+def build_order_date_filters(order_model, start_date: Optional[date], end_date: Optional[date]) -> list:
+    """构建单据创建时间筛选条件"""
+    filters = []
+    if start_date:
+        filters.append(order_model.create_time >= start_date)
+    if end_date:
+        filters.append(order_model.create_time <= end_date)
+    return filters
+
+
+def aggregate_orders_by(
+    db: Session,
+    order_model,
+    item_model,
+    group_column,
+    filters: list
+) -> List[Tuple[Any, int, int, float]]:
+    """
+    按指定列分组汇总单据数、数量和金额
+
+    单数、数量取自单据表（total_quantity），金额取自明细（数量×单价），
+    两条聚合查询后按分组键合并。
+
+    Args:
+        db: 数据库会话
+        order_model: 单据模型（InboundOrder/OutboundOrder）
+        item_model: 明细模型（InboundOrderItem/OutboundOrderItem）
+        group_column: 分组列（单据表上的列或表达式）
+        filters: 单据筛选条件
+
+    Returns:
+        List[Tuple]: (分组键, 单数, 数量, 金额)，按分组键排序
+    """
+    order_rows = db.exec(
+        select(
+            group_column,
+            func.count(order_model.order_id),
+            func.coalesce(func.sum(order_model.total_quantity), 0)
+        )
+        .where(*filters)
+        .group_by(group_column)
+        .order_by(group_column)
+    ).all()
+
+    amount_rows = db.exec(
+        select(
+            group_column,
+            func.coalesce(func.sum(item_model.quantity * item_model.unit_price), 0.0)
+        )
+        .select_from(item_model)
+        .join(order_model, item_model.order_id == order_model.order_id)
+        .where(*filters)
+        .group_by(group_column)
+    ).all()
+    amounts: Dict[Any, float] = {key: float(amount) for key, amount in amount_rows}
+
+    return [
+        (key, order_count, int(quantity), amounts.get(key, 0.0))
+        for key, order_count, quantity in order_rows
+    ]
@@ -0,0 +1,411 @@
+"""
+月结与器材收发卡片工具
+
+月末结账把每个器材批次的期初、本期收发和期末数量金额写入period_balances，
+下一期的期初直接取上一期的期末，查询任意区间的器材收发卡片时：
+- 期初 = 查询开始日期之前最近一次月结的期末 + 月结之后到开始日期之间的流水
+- 本期 = 查询区间内的流水，逐笔累计结存
+查询耗时与区间内的流水数量成正比，不再从最早的流水开始累计。
+
+金额按批次单价（InventoryBatch.unit_price）计算。移库流水（关联单据类型为transfer）只改变批次所在的货位，
+同一批次的移出和移入数量相等，不计入收入和发出，也不列入收发卡片。
+
+已结账期间的流水被修改后，需要从该期间开始重新结账（reclose_periods_from），之后已结账的期间会依次重算；
+删除或修改单据流水的接口在同一事务中调用 reclose_periods_since，按被删除或修改的最早流水时间重算已结账的期间。
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, insert
+from sqlmodel import Session, select, func
+
+from models.material.inbound_order import InboundOrder
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_transaction import InventoryTransaction, ReferenceType
+from models.material.material import Material
+from models.material.outbound_order import OutboundOrder
+from models.material.period_balance import PeriodBalance, PeriodClosing
+
+logger = logging.getLogger(__name__)
+
+# 余额键：(器材ID, 批次ID)
+BalanceKey = Tuple[int, int]
+
+
+def period_of(day: date) -> str:
+    """日期所属的会计期间（YYYY-MM）"""
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def period_bounds(period: str) -> Tuple[date, date]:
+    """会计期间的开始日期（含）和结束日期（不含）"""
+    year, month = (int(part) for part in period.split("-"))
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def _previous_period(period: str) -> str:
+    start, _ = period_bounds(period)
+    return period_of(start - timedelta(days=1))
+
+
+def _next_period(period: str) -> str:
+    _, end = period_bounds(period)
+    return period_of(end)
+
+
+def _sum_transactions(
+    db: Session,
+    start: Optional[datetime],
+    end: datetime,
+    material_id: Optional[int] = None
+) -> Dict[BalanceKey, Tuple[int, int]]:
+    """按器材批次汇总[start, end)内的流水（不含移库），返回(收入数量, 发出数量)"""
+    quantity_in = func.sum(case((InventoryTransaction.quantity_change > 0, InventoryTransaction.quantity_change), else_=0))
+    quantity_out = func.sum(case((InventoryTransaction.quantity_change < 0, -InventoryTransaction.quantity_change), else_=0))
+    query = (
+        select(InventoryTransaction.material_id, InventoryTransaction.batch_id, quantity_in, quantity_out)
+        .where(
+            InventoryTransaction.transaction_time < end,
+            InventoryTransaction.reference_type != ReferenceType.TRANSFER
+        )
+        .group_by(InventoryTransaction.material_id, InventoryTransaction.batch_id)
+    )
+    if start is not None:
+        query = query.where(InventoryTransaction.transaction_time >= start)
+    if material_id is not None:
+        query = query.where(InventoryTransaction.material_id == material_id)
+    return {
+        (row_material_id, row_batch_id): (int(total_in or 0), int(total_out or 0))
+        for row_material_id, row_batch_id, total_in, total_out in db.exec(query).all()
+    }
+
+
+def _batch_prices(db: Session, batch_ids=None) -> Dict[int, float]:
+    """批次单价"""
+    query = select(InventoryBatch.batch_id, InventoryBatch.unit_price)
+    if batch_ids is not None:
+        if not batch_ids:
+            return {}
+        query = query.where(InventoryBatch.batch_id.in_(batch_ids))
+    return {batch_id: float(unit_price or 0) for batch_id, unit_price in db.exec(query).all()}
+
+
+def close_period(db: Session, period: str, creator: str = "system", commit: bool = True) -> PeriodClosing:
+    """
+    结账指定会计期间（重复结账会覆盖该期间原有余额）
+
+    上一期间已结账时以其期末为期初，否则从全部历史流水汇总期初。
+
+    Args:
+        db: 数据库会话
+        period: 会计期间（YYYY-MM）
+        creator: 结账人
+        commit: 是否提交，为False时在调用方的事务中写入，由调用方提交
+
+    Returns:
+        PeriodClosing: 月结记录
+    """
+    period_start, period_end = period_bounds(period)
+    start = datetime.combine(period_start, time.min)
+    end = datetime.combine(period_end, time.min)
+
+    # 1. 期初：上一期期末，或期间开始前的全部流水
+    openings: Dict[BalanceKey, Tuple[int, Optional[float]]] = {}
+    previous = db.get(PeriodClosing, _previous_period(period))
+    if previous is not None:
+        for row_material_id, row_batch_id, quantity, value in db.exec(
+            select(
+                PeriodBalance.material_id,
+                PeriodBalance.batch_id,
+                PeriodBalance.closing_quantity,
+                PeriodBalance.closing_value
+            ).where(
+                PeriodBalance.period == previous.period,
+                PeriodBalance.closing_quantity != 0
+            )
+        ).all():
+            openings[(row_material_id, row_batch_id)] = (quantity, value)
+    else:
+        for key, (total_in, total_out) in _sum_transactions(db, None, start).items():
+            if total_in != total_out:
+                openings[key] = (total_in - total_out, None)
+
+    # 2. 本期收发
+    movements = _sum_transactions(db, start, end)
+
+    # 3. 计算期末并写入
+    prices = _batch_prices(db)
+    rows = []
+    for key in openings.keys() | movements.keys():
+        row_material_id, row_batch_id = key
+        unit_price = prices.get(row_batch_id, 0.0)
+        opening_quantity, opening_value = openings.get(key, (0, None))
+        if opening_value is None:
+            opening_value = opening_quantity * unit_price
+        in_quantity, out_quantity = movements.get(key, (0, 0))
+        closing_quantity = opening_quantity + in_quantity - out_quantity
+        if not (opening_quantity or in_quantity or out_quantity or closing_quantity):
+            continue
+        rows.append({
+            "period": period,
+            "material_id": row_material_id,
+            "batch_id": row_batch_id,
+            "unit_price": unit_price,
+            "opening_quantity": opening_quantity,
+            "opening_value": round(opening_value, 2),
+            "in_quantity": in_quantity,
+            "out_quantity": out_quantity,
+            "closing_quantity": closing_quantity,
+            "closing_value": round(closing_quantity * unit_price, 2)
+        })
+
+    closing = db.get(PeriodClosing, period)
+    if closing is None:
+        closing = PeriodClosing(period=period, period_start=period_start, period_end=period_end, creator=creator)
+    closing.row_count = len(rows)
+    closing.closed_time = datetime.now()
+    closing.creator = creator
+    db.add(closing)
+    db.flush()
+
+    db.exec(delete(PeriodBalance).where(PeriodBalance.period == period))
+    if rows:
+        db.exec(insert(PeriodBalance), params=rows)
+    if commit:
+        db.commit()
+        db.refresh(closing)
+
+    logger.info(f"会计期间 {period} 结账完成，余额 {len(rows)} 行")
+    return closing
+
+
+def close_pending_periods(db: Session, creator: str = "system") -> List[str]:
+    """
+    结账所有已结束但尚未结账的会计期间（定时任务调用，停机错过后可自动补结）
+
+    从最近一次结账的下一期开始，没有结账记录时从最早流水所在的期间开始，
+    到上个月为止。
+
+    Returns:
+        List[str]: 本次结账的会计期间
+    """
+    last_period = period_of(date.today().replace(day=1) - timedelta(days=1))
+    latest_closed = db.exec(select(func.max(PeriodClosing.period))).one()
+    if latest_closed:
+        period = _next_period(latest_closed)
+    else:
+        first_time = db.exec(select(func.min(InventoryTransaction.transaction_time))).one()
+        if first_time is None:
+            return []
+        period = period_of(first_time.date())
+
+    closed = []
+    while period <= last_period:
+        close_period(db, period, creator=creator)
+        closed.append(period)
+        period = _next_period(period)
+    return closed
+
+
+def reclose_periods_from(db: Session, period: str, creator: str = "system") -> List[str]:
+    """
+    重新结账指定期间，并依次重算其后已结账的期间（已结账期间的流水被修改后调用）
+
+    Returns:
+        List[str]: 重新结账的会计期间
+    """
+    later_periods = db.exec(
+        select(PeriodClosing.period).where(PeriodClosing.period > period).order_by(PeriodClosing.period)
+    ).all()
+    closed = []
+    for target in [period, *later_periods]:
+        close_period(db, target, creator=creator)
+        closed.append(target)
+    return closed
+
+
+def reclose_periods_since(db: Session, since: Optional[datetime], creator: str = "system") -> List[str]:
+    """
+    单据流水被删除或修改后，在调用方的事务中重新结账since所在期间及之后已结账的期间（不提交）
+
+    在删除或修改流水之后、提交之前调用，结账余额与流水的修改一起提交或回滚。
+
+    Args:
+        db: 数据库会话
+        since: 被删除或修改的流水中最早的流水时间，为空时不处理
+        creator: 结账人
+
+    Returns:
+        List[str]: 重新结账的会计期间
+    """
+    if since is None:
+        return []
+    periods = db.exec(
+        select(PeriodClosing.period)
+        .where(PeriodClosing.period >= period_of(since.date()))
+        .order_by(PeriodClosing.period)
+    ).all()
+    for period in periods:
+        close_period(db, period, creator=creator, commit=False)
+    if periods:
+        logger.info(f"流水修改涉及已结账期间，已重新结账: {', '.join(periods)}")
+    return list(periods)
+
+
+def get_opening_balances(
+    db: Session,
+    material_id: int,
+    as_of: datetime
+) -> Tuple[Dict[int, Tuple[int, float]], Optional[str]]:
+    """
+    器材在指定时间点之前的各批次结存
+
+    Args:
+        db: 数据库会话
+        material_id: 器材ID
+        as_of: 时间点（不含）
+
+    Returns:
+        Tuple: ({批次ID: (数量, 金额)}, 作为基准的结账期间)
+    """
+    closing = db.exec(
+        select(PeriodClosing)
+        .where(PeriodClosing.period_end <= as_of.date())
+        .order_by(PeriodClosing.period_end.desc())
+        .limit(1)
+    ).first()
+
+    balances: Dict[int, Tuple[int, float]] = {}
+    gap_start = None
+    if closing is not None:
+        for row_batch_id, quantity, value in db.exec(
+            select(PeriodBalance.batch_id, PeriodBalance.closing_quantity, PeriodBalance.closing_value)
+            .where(
+                PeriodBalance.period == closing.period,
+                PeriodBalance.material_id == material_id
+            )
+        ).all():
+            balances[row_batch_id] = (quantity, value)
+        gap_start = datetime.combine(closing.period_end, time.min)
+
+    # 月结之后到查询时间点之间的流水
+    gap = _sum_transactions(db, gap_start, as_of, material_id=material_id)
+    prices = _batch_prices(db, [batch_id for _, batch_id in gap])
+    for (_, row_batch_id), (total_in, total_out) in gap.items():
+        net = total_in - total_out
+        quantity, value = balances.get(row_batch_id, (0, 0.0))
+        balances[row_batch_id] = (quantity + net, value + net * prices.get(row_batch_id, 0.0))
+
+    return balances, closing.period if closing is not None else None
+
+
+def get_stock_card(db: Session, material_id: int, start_date: date, end_date: date) -> Optional[dict]:
+    """
+    器材收发卡片：期初结存 + 区间内逐笔收发及结存
+
+    Args:
+        db: 数据库会话
+        material_id: 器材ID
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+
+    Returns:
+        dict: 卡片数据，器材不存在时返回None
+    """
+    material = db.get(Material, material_id)
+    if not material:
+        return None
+
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date + timedelta(days=1), time.min)
+
+    openings, base_period = get_opening_balances(db, material_id, start)
+    opening_quantity = sum(quantity for quantity, _ in openings.values())
+    opening_value = sum(value for _, value in openings.values())
+
+    transactions = db.exec(
+        select(InventoryTransaction)
+        .where(
+            InventoryTransaction.material_id == material_id,
+            InventoryTransaction.transaction_time >= start,
+            InventoryTransaction.transaction_time < end,
+            InventoryTransaction.reference_type != ReferenceType.TRANSFER
+        )
+        .order_by(InventoryTransaction.transaction_time, InventoryTransaction.transaction_id)
+    ).all()
+
+    # 批量查询批次和单据编号
+    batch_ids = {transaction.batch_id for transaction in transactions}
+    batches = {
+        batch_id: (batch_number, float(unit_price or 0))
+        for batch_id, batch_number, unit_price in db.exec(
+            select(InventoryBatch.batch_id, InventoryBatch.batch_number, InventoryBatch.unit_price)
+            .where(InventoryBatch.batch_id.in_(batch_ids))
+        ).all()
+    } if batch_ids else {}
+    order_numbers: Dict[Tuple[ReferenceType, int], str] = {}
+    for reference_type, order_model in (
+        (ReferenceType.INBOUND, InboundOrder),
+        (ReferenceType.OUTBOUND, OutboundOrder)
+    ):
+        order_ids = {
+            transaction.reference_id for transaction in transactions
+            if transaction.reference_type == reference_type and transaction.reference_id
+        }
+        if order_ids:
+            for order_id, order_number in db.exec(
+                select(order_model.order_id, order_model.order_number).where(order_model.order_id.in_(order_ids))
+            ).all():
+                order_numbers[(reference_type, order_id)] = order_number
+
+    balance_quantity = opening_quantity
+    balance_value = opening_value
+    total_in = total_out = 0
+    movements = []
+    for transaction in transactions:
+        batch_number, unit_price = batches.get(transaction.batch_id, (None, 0.0))
+        change = transaction.quantity_change
+        amount = change * unit_price
+        balance_quantity += change
+        balance_value += amount
+        if change > 0:
+            total_in += change
+        else:
+            total_out -= change
+        movements.append({
+            "transaction_id": transaction.transaction_id,
+            "transaction_time": transaction.transaction_time,
+            "change_type": transaction.change_type,
+            "reference_type": transaction.reference_type,
+            "reference_id": transaction.reference_id,
+            "reference_number": order_numbers.get((transaction.reference_type, transaction.reference_id)),
+            "batch_id": transaction.batch_id,
+            "batch_number": batch_number,
+            "unit_price": unit_price,
+            "in_quantity": change if change > 0 else 0,
+            "out_quantity": -change if change < 0 else 0,
+            "amount": round(amount, 2),
+            "balance_quantity": balance_quantity,
+            "balance_value": round(balance_value, 2)
+        })
+
+    return {
+        "material_id": material.id,
+        "material_code": material.material_code,
+        "material_name": material.material_name,
+        "material_specification": material.material_specification or "",
+        "start_date": start_date,
+        "end_date": end_date,
+        "base_period": base_period,
+        "opening_quantity": opening_quantity,
+        "opening_value": round(opening_value, 2),
+        "total_in_quantity": total_in,
+        "total_out_quantity": total_out,
+        "closing_quantity": balance_quantity,
+        "closing_value": round(balance_value, 2),
+        "movements": movements
+    }
@@ -0,0 +1,186 @@
+"""
+补货建议计算工具
+
+按出库消耗速度计算每个器材的补货建议，结果写入reorder_suggestions缓存表，
+由定时任务每天刷新，查询接口只读缓存表：
+- 日均消耗 = 最近window_days天出库（OUT）数量 ÷ window_days
+- 可用天数 = 当前库存 ÷ 日均消耗
+- 再订货点 = 安全库存 + 日均消耗 × 补货周期（lead_time_days）
+- 当前库存低于再订货点时需要补货，建议补到 再订货点 + 日均消耗 × 覆盖天数（cover_days）
+
+出库数量、当前库存各用一条GROUP BY查询批量汇总，不逐器材查询。
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, insert, or_
+from sqlmodel import Session, select, func
+
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction
+from models.material.material import Material
+from models.material.reorder_suggestion import ReorderSuggestion
+from utils.inventory_stock_utils import begin_write_transaction
+
+logger = logging.getLogger(__name__)
+
+# 消耗统计窗口天数
+DEFAULT_WINDOW_DAYS = 90
+# 补货周期（从下单到入库）天数
+DEFAULT_LEAD_TIME_DAYS = 30
+# 补货后需覆盖的天数
+DEFAULT_COVER_DAYS = 60
+
+
+def refresh_reorder_suggestions(
+    db: Session,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+    cover_days: int = DEFAULT_COVER_DAYS
+) -> int:
+    """
+    重新计算全部器材的补货建议并写入缓存表
+
+    只保存窗口内有出库或设置了安全库存的器材。
+
+    Args:
+        db: 数据库会话
+        window_days: 消耗统计窗口天数
+        lead_time_days: 补货周期天数
+        cover_days: 补货后需覆盖的天数
+
+    Returns:
+        int: 写入的补货建议条数
+    """
+    now = datetime.now()
+    window_start = now - timedelta(days=window_days)
+
+    # 1. 窗口内各器材出库数量（一次分组汇总）
+    consumption = dict(db.exec(
+        select(InventoryTransaction.material_id, -func.sum(InventoryTransaction.quantity_change))
+        .where(
+            InventoryTransaction.change_type == ChangeType.OUT,
+            InventoryTransaction.transaction_time >= window_start
+        )
+        .group_by(InventoryTransaction.material_id)
+    ).all())
+
+    # 2. 各器材当前库存
+    stock = dict(db.exec(
+        select(InventoryDetail.material_id, func.sum(InventoryDetail.quantity))
+        .group_by(InventoryDetail.material_id)
+    ).all())
+
+    rows = []
+    materials = db.exec(select(Material.id, Material.safety_stock).where(Material.is_delete == False)).all()
+    for material_id, safety_stock in materials:
+        safety_stock = safety_stock or 0
+        consumed = int(consumption.get(material_id) or 0)
+        # 只计算窗口内有出库或设置了安全库存的器材
+        if consumed <= 0 and safety_stock <= 0:
+            continue
+        current_stock = int(stock.get(material_id) or 0)
+        daily = consumed / window_days
+        reorder_point = safety_stock + daily * lead_time_days
+        days_of_cover = current_stock / daily if daily > 0 else None
+        needs_reorder = current_stock < reorder_point
+        suggested = math.ceil(reorder_point + daily * cover_days - current_stock) if needs_reorder else 0
+        rows.append({
+            "material_id": material_id,
+            "window_days": window_days,
+            "consumed_quantity": consumed,
+            "average_daily_consumption": round(daily, 4),
+            "current_stock": current_stock,
+            "safety_stock": safety_stock,
+            "reorder_point": round(reorder_point, 2),
+            "days_of_cover": round(days_of_cover, 1) if days_of_cover is not None else None,
+            "needs_reorder": needs_reorder,
+            "suggested_quantity": max(suggested, 0),
+            "refreshed_at": now
+        })
+
+    # 排名：需要补货的在前，按可用天数从少到多，无消耗的按低于安全库存的缺口从大到小
+    rows.sort(key=lambda row: (
+        not row["needs_reorder"],
+        row["days_of_cover"] if row["days_of_cover"] is not None else math.inf,
+        row["current_stock"] - row["safety_stock"],
+        row["material_id"]
+    ))
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+
+    # 整表替换在一个写事务中完成，读取方不会看到清空后尚未写入的缓存表
+    begin_write_transaction(db)
+    try:
+        db.exec(delete(ReorderSuggestion))
+        if rows:
+            db.exec(insert(ReorderSuggestion), params=rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"补货建议已刷新，共 {len(rows)} 个器材，需要补货 {sum(row['needs_reorder'] for row in rows)} 个")
+    return len(rows)
+
+
+def get_reorder_suggestions(
+    db: Session,
+    only_needed: bool = True,
+    keyword: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    按排名分页读取补货建议缓存表（缓存表为空时先计算一次）
+
+    Returns:
+        dict: 计算时间、分页信息及补货建议列表
+    """
+    if db.exec(select(ReorderSuggestion.material_id).limit(1)).first() is None:
+        refresh_reorder_suggestions(db)
+
+    query = select(ReorderSuggestion, Material).join(Material, Material.id == ReorderSuggestion.material_id)
+    count_query = select(func.count()).select_from(ReorderSuggestion).join(Material, Material.id == ReorderSuggestion.material_id)
+    filters = []
+    if only_needed:
+        filters.append(ReorderSuggestion.needs_reorder == True)
+    if keyword and keyword.strip():
+        pattern = f"%{keyword.strip()}%"
+        filters.append(or_(
+            Material.material_code.ilike(pattern),
+            Material.material_name.ilike(pattern),
+            Material.material_query_code.ilike(pattern)
+        ))
+
+    total = db.exec(count_query.where(*filters)).one()
+    results = db.exec(
+        query.where(*filters)
+        .order_by(ReorderSuggestion.rank)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+    refreshed_at = db.exec(select(func.max(ReorderSuggestion.refreshed_at))).one()
+
+    items = []
+    for suggestion, material in results:
+        items.append({
+            **suggestion.model_dump(exclude={"refreshed_at"}),
+            "material_code": material.material_code,
+            "material_name": material.material_name,
+            "material_specification": material.material_specification or "",
+            "major_name": material.major_name or "",
+            "equipment_name": material.equipment_name or ""
+        })
+
+    return {
+        "refreshed_at": refreshed_at,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size,
+        "items": items
+    }
@@ -0,0 +1,157 @@
+"""
+单号流水序列工具
+
+出库单号、入库单号、盘点单号和批次编码的流水号由sequences表按前缀分配，
+每次分配是一条原子的 INSERT ... ON CONFLICT DO UPDATE ... RETURNING：
+    INSERT INTO sequences (name, value) VALUES (:prefix, :start)
+    ON CONFLICT (name) DO UPDATE SET value = max(value + 1, :start)
+    RETURNING value
+并发请求得到的流水号互不相同，且不需要读取已有单号。
+
+某个前缀第一次分配时（如升级前已有单号），按已有单号的最大流水号起始；
+手工录入的单号在创建时同步推进序列，避免之后生成重复的单号。
+"""
+
+import re
+from datetime import date, datetime
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select, func
+
+from models.material.inbound_order import InboundOrder
+from models.material.inventory_batch import InventoryBatch
+from models.material.number_sequence import NumberSequence
+from models.material.outbound_order import OutboundOrder
+
+# 单号格式：前缀（序列名称）+ 流水号
+OUTBOUND_ORDER_PATTERN = re.compile(r"^(CK\d{8}-)(\d+)$")
+INBOUND_ORDER_PATTERN = re.compile(r"^(RK\d{8}-)(\d{3})$")
+BATCH_CODE_PATTERN = re.compile(r"^(.{10}-\d{8})(\d{3})$")
+
+# 3位流水号的上限
+MAX_SERIAL = 999
+
+
+def _max_existing_serial(db: Session, column, prefix: str, pattern: re.Pattern) -> int:
+    """已有单号中该前缀的最大流水号（序列第一次使用时调用）"""
+    max_serial = 0
+    for number in db.exec(select(column).where(column.like(f"{prefix}%"))).all():
+        match = pattern.match(number)
+        if match and match.group(1) == prefix:
+            max_serial = max(max_serial, int(match.group(2)))
+    return max_serial
+
+
+def next_sequence_value(db: Session, name: str, initial: Optional[Callable[[], int]] = None) -> int:
+    """
+    原子递增并返回序列的下一个值（分配后立即提交，流水号不会重复分配）
+
+    Args:
+        db: 数据库会话
+        name: 序列名称
+        initial: 序列不存在时返回起始值（已使用的最大流水号）的函数
+
+    Returns:
+        int: 分配的流水号
+    """
+    start = 1
+    if initial is not None and db.get(NumberSequence, name) is None:
+        start = initial() + 1
+
+    statement = insert(NumberSequence).values(name=name, value=start, update_time=datetime.now())
+    statement = statement.on_conflict_do_update(
+        index_elements=[NumberSequence.name],
+        set_={
+            "value": func.max(NumberSequence.value + 1, statement.excluded.value),
+            "update_time": statement.excluded.update_time
+        }
+    ).returning(NumberSequence.value)
+    value = db.exec(statement).scalar_one()
+    db.commit()
+    return value
+
+
+def advance_sequence(db: Session, name: str, value: int):
+    """
+    将序列推进到不小于指定值（手工录入的单号已占用该流水号）
+
+    Args:
+        db: 数据库会话
+        name: 序列名称
+        value: 已占用的流水号
+    """
+    statement = insert(NumberSequence).values(name=name, value=value, update_time=datetime.now())
+    statement = statement.on_conflict_do_update(
+        index_elements=[NumberSequence.name],
+        set_={"value": func.max(NumberSequence.value, statement.excluded.value)}
+    )
+    db.exec(statement)
+
+
+def next_outbound_order_number(db: Session, date_str: str) -> Tuple[str, int]:
+    """分配出库单号：CK + 日期 + "-" + 3位流水号"""
+    prefix = f"CK{date_str}-"
+    serial = next_sequence_value(
+        db, prefix,
+        lambda: _max_existing_serial(db, OutboundOrder.order_number, prefix, OUTBOUND_ORDER_PATTERN)
+    )
+    return f"{prefix}{serial:03d}", serial
+
+
+def next_inbound_order_number(db: Session, date_str: str) -> Tuple[str, int]:
+    """
+    分配入库单号：RK + 日期 + "-" + 3位流水号
+
+    Raises:
+        ValueError: 当日流水号已达上限
+    """
+    prefix = f"RK{date_str}-"
+    serial = next_sequence_value(
+        db, prefix,
+        lambda: _max_existing_serial(db, InboundOrder.order_number, prefix, INBOUND_ORDER_PATTERN)
+    )
+    if serial > MAX_SERIAL:
+        raise ValueError(f"当日入库单数量已达上限（{MAX_SERIAL}），无法生成新的入库单号")
+    return f"{prefix}{serial:03d}", serial
+
+
+def next_stocktake_number(db: Session, date_str: str) -> str:
+    """分配盘点单号：PD + 日期 + "-" + 3位流水号"""
+    prefix = f"PD{date_str}-"
+    serial = next_sequence_value(db, prefix)
+    return f"{prefix}{serial:03d}"
+
+
+def batch_code_prefix(material_code: str, batch_date: date) -> str:
+    """批次编码前缀：10位器材编码（截取或补0）+ "-" + 日期"""
+    material_code = material_code[:10].ljust(10, '0')
+    return f"{material_code}-{batch_date.strftime('%Y%m%d')}"
+
+
+def next_batch_code(db: Session, material_code: str, batch_date: date) -> Tuple[str, int]:
+    """
+    分配批次编码：10位器材编码 + "-" + 日期 + 3位流水号
+
+    Raises:
+        ValueError: 当日该器材流水号已达上限
+    """
+    prefix = batch_code_prefix(material_code, batch_date)
+    serial = next_sequence_value(
+        db, prefix,
+        lambda: _max_existing_serial(db, InventoryBatch.batch_number, prefix, BATCH_CODE_PATTERN)
+    )
+    if serial > MAX_SERIAL:
+        raise ValueError(f"当日该器材批次数量已达上限（{MAX_SERIAL}），无法生成新的批次编码")
+    return f"{prefix}{serial:03d}", serial
+
+
+def sync_sequence_with_number(db: Session, number: Optional[str], pattern: re.Pattern):
+    """
+    手工录入或修改的单号符合生成格式时，将对应序列推进到该流水号
+
+    不提交事务，由外层统一提交。
+    """
+    match = pattern.match(number or "")
+    if match:
+        advance_sequence(db, match.group(1), int(match.group(2)))
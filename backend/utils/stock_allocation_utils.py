@@ -0,0 +1,161 @@
+"""
+出库批次自动分配工具（先进先出 / 先到期先出）
+
+按器材查询有库存的明细，按批次日期排序并用窗口函数计算累计数量，
+外层只保留累计数量达到需求之前的明细，一条查询得到分配结果：
+    SELECT * FROM (
+        SELECT ..., sum(quantity) OVER (ORDER BY 日期, batch_id, detail_id) AS running
+        FROM inventory_details JOIN inventory_batches ...
+        WHERE material_id = :m AND quantity > 0
+    ) WHERE running - quantity < :需求数量
+查询通过(material_id, quantity)索引定位器材的库存明细。
+
+- fifo：按入库日期，先入库的先出
+- fefo：按生产日期，先生产（先到期）的先出
+日期为空的批次排在最后。
+
+出库扣减时在出库单的写事务（BEGIN IMMEDIATE）中分配并扣减，分配结果不会被其他出库单占用。
+"""
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import literal
+from sqlmodel import Session, select, func
+
+from models.base.bin import Bin
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from utils.inventory_stock_utils import decrease_stock
+
+# 分配策略及排序依据的批次日期
+ALLOCATION_STRATEGIES = {
+    "fifo": InventoryBatch.inbound_date,
+    "fefo": InventoryBatch.production_date,
+}
+DEFAULT_ALLOCATION_STRATEGY = "fifo"
+
+
+def allocate_stock(
+    db: Session,
+    material_id: int,
+    quantity: int,
+    strategy: str = DEFAULT_ALLOCATION_STRATEGY,
+    warehouse_id: Optional[int] = None
+) -> dict:
+    """
+    计算器材出库数量在各批次货位上的分配（不扣减库存）
+
+    Args:
+        db: 数据库会话
+        material_id: 器材ID
+        quantity: 需求数量
+        strategy: 分配策略（fifo/fefo）
+        warehouse_id: 只从该仓库的货位分配
+
+    Returns:
+        dict: 需求数量、已分配数量、缺口数量和分配明细（按出库先后排序）
+
+    Raises:
+        ValueError: 分配策略不支持或数量不大于0
+    """
+    if strategy not in ALLOCATION_STRATEGIES:
+        raise ValueError(f"不支持的分配策略: {strategy}，可选值: {', '.join(ALLOCATION_STRATEGIES)}")
+    if quantity <= 0:
+        raise ValueError("需求数量必须大于0")
+
+    batch_date = ALLOCATION_STRATEGIES[strategy]
+    ordering = (batch_date.is_(None), batch_date, InventoryDetail.batch_id, InventoryDetail.detail_id)
+    candidates = (
+        select(
+            InventoryDetail.detail_id,
+            InventoryDetail.batch_id,
+            InventoryDetail.bin_id,
+            InventoryDetail.quantity,
+            InventoryBatch.batch_number,
+            InventoryBatch.inbound_date,
+            InventoryBatch.production_date,
+            Bin.bin_name,
+            Bin.warehouse_id,
+            func.sum(InventoryDetail.quantity).over(order_by=ordering, rows=(None, 0)).label("running")
+        )
+        .join(InventoryBatch, InventoryDetail.batch_id == InventoryBatch.batch_id)
+        .join(Bin, InventoryDetail.bin_id == Bin.id, isouter=warehouse_id is None)
+        .where(
+            InventoryDetail.material_id == material_id,
+            InventoryDetail.quantity > 0,
+            InventoryBatch.is_delete == False
+        )
+    )
+    if warehouse_id is not None:
+        candidates = candidates.where(Bin.warehouse_id == warehouse_id)
+    candidates = candidates.subquery("candidates")
+
+    rows = db.exec(
+        select(*candidates.c)
+        .where(candidates.c.running - candidates.c.quantity < literal(quantity))
+        .order_by(candidates.c.running)
+    ).all()
+
+    allocations = []
+    for row in rows:
+        allocated = min(row.quantity, quantity - (row.running - row.quantity))
+        allocations.append({
+            "detail_id": row.detail_id,
+            "batch_id": row.batch_id,
+            "batch_number": row.batch_number,
+            "bin_id": row.bin_id,
+            "bin_name": row.bin_name,
+            "warehouse_id": row.warehouse_id,
+            "inbound_date": row.inbound_date,
+            "production_date": row.production_date,
+            "available_quantity": row.quantity,
+            "quantity": allocated
+        })
+    allocated_total = sum(allocation["quantity"] for allocation in allocations)
+    return {
+        "material_id": material_id,
+        "strategy": strategy,
+        "requested_quantity": quantity,
+        "allocated_quantity": allocated_total,
+        "shortage": quantity - allocated_total,
+        "allocations": allocations
+    }
+
+
+def deduct_allocated_stock(
+    db: Session,
+    material_id: int,
+    quantity: int,
+    strategy: str = DEFAULT_ALLOCATION_STRATEGY,
+    warehouse_id: Optional[int] = None
+) -> List[Tuple[InventoryDetail, int, int]]:
+    """
+    按分配结果逐条扣减库存
+
+    调用方须已开启写事务（begin_write_transaction），分配和扣减在持有写锁时完成，
+    扣减随出库单一起提交，失败时由调用方db.rollback()整体回滚。
+
+    Args:
+        db: 数据库会话
+        material_id: 器材ID
+        quantity: 出库数量
+        strategy: 分配策略（fifo/fefo）
+        warehouse_id: 只从该仓库的货位分配
+
+    Returns:
+        List[Tuple[InventoryDetail, int, int]]: (库存明细, 扣减数量, 扣减后数量) 列表
+
+    Raises:
+        ValueError: 可用库存不足或分配参数错误
+    """
+    allocation = allocate_stock(db, material_id, quantity, strategy, warehouse_id)
+    if allocation["shortage"] > 0:
+        raise ValueError(f"可用库存不足，缺少 {allocation['shortage']}")
+    deducted: List[Tuple[InventoryDetail, int, int]] = []
+    for row in allocation["allocations"]:
+        detail = db.get(InventoryDetail, row["detail_id"])
+        quantity_after = decrease_stock(db, detail, row["quantity"]) if detail else None
+        if quantity_after is None:
+            raise ValueError(f"可用库存不足，批次 {row['batch_number']} 库存已变化")
+        deducted.append((detail, row["quantity"], quantity_after))
+    return deducted
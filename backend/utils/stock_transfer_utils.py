@@ -0,0 +1,271 @@
+"""
+移库工具 - 批量将库存明细从一个货位移到另一个货位
+
+一次移库请求中的全部移动在一个写事务（BEGIN IMMEDIATE）中完成：
+1. 按明细ID和批次ID分块查询涉及的全部库存明细，在内存中按请求顺序依次模拟移动
+   - 整条明细移到目标货位且目标货位没有该批次时，直接修改明细的货位
+   - 部分移动时拆分明细，目标货位已有该批次的明细时合并到该明细
+   - 移空的明细删除
+2. 按主键批量更新明细数量和货位，批量插入新明细，批量删除移空的明细
+3. 每次移动写入一对ADJUST流水（源货位减少、目标货位增加），关联单据类型为transfer，
+   同一次移库的流水使用同一个移库编号
+4. 按是否还有库存重新设置涉及货位的empty_label
+
+语句数量只与涉及的明细和货位数量的分块数有关，不随移动条数逐条增加。
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from models.base.bin import Bin
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction, ReferenceType
+from utils.inventory_stock_utils import IN_CHUNK_SIZE, begin_write_transaction, refresh_bin_empty_labels
+from utils.sequence_utils import next_sequence_value
+
+logger = logging.getLogger(__name__)
+
+# 移库编号序列名称
+TRANSFER_SEQUENCE = "stock_transfer"
+# 单次移库的最大移动条数
+MAX_TRANSFER_MOVES = 20000
+
+
+@dataclass
+class TransferMove:
+    """一条移动：按明细ID或按批次ID+源货位指定源明细"""
+    from_bin_id: Optional[int]
+    to_bin_id: int
+    quantity: int
+    detail_id: Optional[int] = None
+    batch_id: Optional[int] = None
+
+
+@dataclass
+class _DetailState:
+    """移动过程中的明细状态（detail_id为空表示新拆分的明细）"""
+    detail_id: Optional[int]
+    batch_id: int
+    material_id: int
+    bin_id: Optional[int]
+    quantity: int
+    original_bin_id: Optional[int] = None
+    original_quantity: int = 0
+
+
+def _chunks(values: Sequence, size: int = IN_CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _load_details(db: Session, column, values: Iterable[int]) -> List[InventoryDetail]:
+    rows: List[InventoryDetail] = []
+    values = sorted(set(values))
+    for chunk in _chunks(values):
+        rows.extend(db.exec(select(InventoryDetail).where(column.in_(chunk))).all())
+    return rows
+
+
+def _validate_moves(moves: Sequence[TransferMove]):
+    if not moves:
+        raise ValueError("移库明细不能为空")
+    if len(moves) > MAX_TRANSFER_MOVES:
+        raise ValueError(f"单次移库不能超过{MAX_TRANSFER_MOVES}条")
+    for index, move in enumerate(moves, start=1):
+        if move.detail_id is None and move.batch_id is None:
+            raise ValueError(f"第{index}条：需要指定库存明细ID或批次ID")
+        if move.detail_id is None and move.from_bin_id is None:
+            raise ValueError(f"第{index}条：按批次移库时需要指定源货位")
+        if move.quantity <= 0:
+            raise ValueError(f"第{index}条：移库数量必须大于0")
+        if move.from_bin_id is not None and move.from_bin_id == move.to_bin_id:
+            raise ValueError(f"第{index}条：源货位和目标货位相同")
+
+
+def _check_bins(db: Session, bin_ids: Iterable[int]):
+    bin_ids = sorted(set(bin_ids))
+    existing = set()
+    for chunk in _chunks(bin_ids):
+        existing.update(db.exec(select(Bin.id).where(Bin.id.in_(chunk))).all())
+    missing = [bin_id for bin_id in bin_ids if bin_id not in existing]
+    if missing:
+        raise ValueError(f"货位不存在: {', '.join(str(bin_id) for bin_id in missing[:20])}")
+
+
+def transfer_stock(db: Session, moves: Sequence[TransferMove], creator: str) -> Dict[str, int]:
+    """
+    批量移库（全部移动成功或全部不生效）
+
+    Args:
+        db: 数据库会话
+        moves: 移动列表，按顺序执行（后面的移动可以继续移动前面移入的库存）
+        creator: 操作人
+
+    Returns:
+        Dict[str, int]: 移库编号和移动、流水、新增/删除明细、涉及货位的数量
+
+    Raises:
+        ValueError: 参数错误、明细或货位不存在、源货位库存不足
+    """
+    _validate_moves(moves)
+    transfer_id = next_sequence_value(db, TRANSFER_SEQUENCE)
+
+    # 先占用写锁再读取，读取到的数量在提交前不会被其他连接修改
+    begin_write_transaction(db)
+    try:
+        _check_bins(db, [move.to_bin_id for move in moves] + [move.from_bin_id for move in moves if move.from_bin_id is not None])
+
+        by_detail = _load_details(db, InventoryDetail.detail_id, [move.detail_id for move in moves if move.detail_id is not None])
+        batch_ids = {detail.batch_id for detail in by_detail}
+        batch_ids.update(move.batch_id for move in moves if move.batch_id is not None)
+        details = _load_details(db, InventoryDetail.batch_id, batch_ids)
+
+        states: Dict[int, _DetailState] = {}
+        # (批次ID, 货位ID) -> 该批次在该货位的明细（同一货位有多条时取有库存的明细ID最小的一条）
+        locations: Dict[Tuple[int, Optional[int]], _DetailState] = {}
+        for detail in sorted(details, key=lambda row: row.detail_id):
+            state = _DetailState(
+                detail_id=detail.detail_id,
+                batch_id=detail.batch_id,
+                material_id=detail.material_id,
+                bin_id=detail.bin_id,
+                quantity=detail.quantity,
+                original_bin_id=detail.bin_id,
+                original_quantity=detail.quantity
+            )
+            states[detail.detail_id] = state
+            current = locations.get((detail.batch_id, detail.bin_id))
+            if current is None or (current.quantity <= 0 < state.quantity):
+                locations[(detail.batch_id, detail.bin_id)] = state
+        # 明细对象不再使用，避免提交时与批量语句冲突
+        for detail in details + by_detail:
+            if detail in db:
+                db.expunge(detail)
+
+        new_states: List[_DetailState] = []
+        transactions: List[dict] = []
+        touched_bins = set()
+        now = datetime.now()
+
+        for index, move in enumerate(moves, start=1):
+            if move.detail_id is not None:
+                source = states.get(move.detail_id)
+                if source is None:
+                    raise ValueError(f"第{index}条：库存明细 {move.detail_id} 不存在")
+                if move.batch_id is not None and move.batch_id != source.batch_id:
+                    raise ValueError(f"第{index}条：库存明细 {move.detail_id} 不属于批次 {move.batch_id}")
+                if move.from_bin_id is not None and source.bin_id != move.from_bin_id:
+                    raise ValueError(f"第{index}条：库存明细 {move.detail_id} 不在货位 {move.from_bin_id}")
+            else:
+                source = locations.get((move.batch_id, move.from_bin_id))
+                if source is None:
+                    raise ValueError(f"第{index}条：批次 {move.batch_id} 在货位 {move.from_bin_id} 没有库存")
+            if source.bin_id == move.to_bin_id:
+                raise ValueError(f"第{index}条：源货位和目标货位相同")
+            if source.quantity < move.quantity:
+                raise ValueError(
+                    f"第{index}条：批次 {source.batch_id} 在货位 {source.bin_id} 的库存不足，"
+                    f"当前 {source.quantity}，移库 {move.quantity}"
+                )
+
+            from_bin_id = source.bin_id
+            target = locations.get((source.batch_id, move.to_bin_id))
+            source_before = source.quantity
+            target_before = target.quantity if target is not None else 0
+
+            if target is None and source.quantity == move.quantity:
+                # 整条移动：修改明细货位
+                if locations.get((source.batch_id, from_bin_id)) is source:
+                    del locations[(source.batch_id, from_bin_id)]
+                source.bin_id = move.to_bin_id
+                locations[(source.batch_id, move.to_bin_id)] = source
+                source_after = 0
+            else:
+                if target is None:
+                    # 部分移动：拆分出目标货位的新明细
+                    target = _DetailState(
+                        detail_id=None,
+                        batch_id=source.batch_id,
+                        material_id=source.material_id,
+                        bin_id=move.to_bin_id,
+                        quantity=0
+                    )
+                    new_states.append(target)
+                    locations[(source.batch_id, move.to_bin_id)] = target
+                # 移到目标货位已有的明细（合并）
+                source.quantity -= move.quantity
+                target.quantity += move.quantity
+                source_after = source.quantity
+
+            touched_bins.update(bin_id for bin_id in (from_bin_id, move.to_bin_id) if bin_id is not None)
+            for bin_id, change, before, after in (
+                (from_bin_id, -move.quantity, source_before, source_after),
+                (move.to_bin_id, move.quantity, target_before, target_before + move.quantity)
+            ):
+                transactions.append({
+                    "material_id": source.material_id,
+                    "batch_id": source.batch_id,
+                    "bin_id": bin_id,
+                    "change_type": ChangeType.ADJUST,
+                    "quantity_change": change,
+                    "quantity_before": before,
+                    "quantity_after": after,
+                    "reference_type": ReferenceType.TRANSFER,
+                    "reference_id": transfer_id,
+                    "creator": creator,
+                    "transaction_time": now
+                })
+
+        today = date.today()
+        changed = [
+            state for state in states.values()
+            if state.quantity > 0 and (state.quantity != state.original_quantity or state.bin_id != state.original_bin_id)
+        ]
+        emptied = [
+            state.detail_id for state in states.values()
+            if state.quantity == 0 and state.original_quantity > 0
+        ]
+        created = [state for state in new_states if state.quantity > 0]
+
+        if changed:
+            db.exec(update(InventoryDetail), params=[
+                {"detail_id": state.detail_id, "bin_id": state.bin_id, "quantity": state.quantity, "last_updated": today}
+                for state in changed
+            ])
+        if created:
+            db.exec(insert(InventoryDetail), params=[
+                {
+                    "batch_id": state.batch_id,
+                    "material_id": state.material_id,
+                    "bin_id": state.bin_id,
+                    "quantity": state.quantity,
+                    "last_updated": today
+                }
+                for state in created
+            ])
+        for chunk in _chunks(emptied):
+            db.exec(delete(InventoryDetail).where(InventoryDetail.detail_id.in_(chunk)))
+        db.exec(insert(InventoryTransaction), params=transactions)
+
+        refresh_bin_empty_labels(db, touched_bins)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"移库 {transfer_id} 完成：{len(moves)} 条移动，涉及 {len(touched_bins)} 个货位")
+    return {
+        "transfer_id": transfer_id,
+        "move_count": len(moves),
+        "transaction_count": len(transactions),
+        "updated_detail_count": len(changed),
+        "created_detail_count": len(created),
+        "deleted_detail_count": len(emptied),
+        "bin_count": len(touched_bins)
+    }
@@ -0,0 +1,652 @@
+"""
+盘点工具
+
+1. 创建盘点单：按仓库/货位/专业范围，用一条 INSERT ... SELECT 把当前库存明细
+   按(批次, 货位)汇总后冻结为盘点明细的账面数量
+2. 录入实盘数量：JSON批量录入或扫码文件上传，按盘点明细ID、(批次ID, 货位ID)或
+   (批次编号, 货位码)定位，分块解析后用一条 INSERT ... ON CONFLICT DO UPDATE 批量写入；
+   账面上没有的批次货位（盘点中新发现）作为新明细插入，账面数量为0
+3. 差异：盘点明细与器材、批次、货位一次连接查询，差异 = 实盘数量 - 账面数量
+4. 过账：盘点明细与当前库存明细按(批次, 货位)汇总后一次连接得到每行差异和当前数量，
+   批量写入ADJUST流水、批量调整库存明细数量（盘亏按货位分摊到各条明细）、插入新发现的库存明细。
+   按差异调整当前数量，冻结之后的出入库不受影响
+
+全程按块执行批量语句，不逐行查询。
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, bindparam, case, cast, insert, literal, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, func
+
+from models.base.bin import Bin
+from models.base.major import Major
+from models.base.warehouse import Warehouse
+from models.material.inventory_batch import InventoryBatch
+from models.material.inventory_detail import InventoryDetail
+from models.material.inventory_transaction import ChangeType, InventoryTransaction, ReferenceType
+from models.material.material import Material
+from models.material.stocktake import Stocktake, StocktakeItem, StocktakeStatus
+from utils.inventory_stock_utils import IN_CHUNK_SIZE, begin_write_transaction, refresh_bin_empty_labels
+from utils.sequence_utils import next_stocktake_number
+
+logger = logging.getLogger(__name__)
+
+# 单次录入的最大条数
+MAX_COUNT_ENTRIES = 200000
+
+
+@dataclass
+class CountEntry:
+    """
+    一条实盘数量：按以下任一方式定位盘点明细
+    - item_id
+    - batch_id + bin_id
+    - batch_number + bin_code（货位码或货位名称，扫码上传使用）
+    """
+    quantity: int
+    item_id: Optional[int] = None
+    batch_id: Optional[int] = None
+    bin_id: Optional[int] = None
+    batch_number: Optional[str] = None
+    bin_code: Optional[str] = None
+    row: Optional[int] = None
+
+    def label(self) -> str:
+        return f"第{self.row}行" if self.row is not None else "录入"
+
+
+def _chunks(values: Sequence, size: int = IN_CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _lookup(db: Session, key_column, value_columns: tuple, values: Iterable) -> Dict:
+    """按键分块查询，返回 键 -> 值列 的字典"""
+    result = {}
+    values = sorted(set(values))
+    for chunk in _chunks(values):
+        for row in db.exec(select(key_column, *value_columns).where(key_column.in_(chunk))).all():
+            result[row[0]] = tuple(row[1:])
+    return result
+
+
+def _get_stocktake(db: Session, stocktake_id: int, for_update: bool = False) -> Stocktake:
+    stocktake = db.get(Stocktake, stocktake_id, populate_existing=for_update)
+    if not stocktake or stocktake.is_delete:
+        raise LookupError("盘点单不存在")
+    return stocktake
+
+
+def _require_counting(stocktake: Stocktake):
+    if stocktake.status != StocktakeStatus.COUNTING:
+        raise ValueError(f"盘点单 {stocktake.stocktake_number} 不在盘点中，不能修改")
+
+
+def create_stocktake(
+    db: Session,
+    creator: str,
+    warehouse_id: Optional[int] = None,
+    bin_id: Optional[int] = None,
+    major_id: Optional[int] = None,
+    remark: Optional[str] = None
+) -> Stocktake:
+    """
+    创建盘点单并冻结范围内的账面数量
+
+    Args:
+        db: 数据库会话
+        creator: 创建人
+        warehouse_id: 仓库ID范围
+        bin_id: 货位ID范围
+        major_id: 专业ID范围
+        remark: 备注
+
+    Returns:
+        Stocktake: 新建的盘点单
+
+    Raises:
+        ValueError: 范围内的仓库、货位或专业不存在
+    """
+    if warehouse_id is not None and not db.get(Warehouse, warehouse_id):
+        raise ValueError(f"仓库ID {warehouse_id} 不存在")
+    if bin_id is not None:
+        bin_record = db.get(Bin, bin_id)
+        if not bin_record:
+            raise ValueError(f"货位ID {bin_id} 不存在")
+        if warehouse_id is not None and bin_record.warehouse_id != warehouse_id:
+            raise ValueError(f"货位ID {bin_id} 不属于仓库ID {warehouse_id}")
+    if major_id is not None and not db.get(Major, major_id):
+        raise ValueError(f"专业ID {major_id} 不存在")
+
+    stocktake_number = next_stocktake_number(db, datetime.now().strftime("%Y%m%d"))
+
+    begin_write_transaction(db)
+    try:
+        stocktake = Stocktake(
+            stocktake_number=stocktake_number,
+            warehouse_id=warehouse_id,
+            bin_id=bin_id,
+            major_id=major_id,
+            status=StocktakeStatus.COUNTING,
+            snapshot_time=datetime.now(),
+            creator=creator,
+            remark=remark
+        )
+        db.add(stocktake)
+        db.flush()
+
+        quantity_sum = func.sum(InventoryDetail.quantity)
+        source = select(
+            literal(stocktake.stocktake_id),
+            InventoryDetail.batch_id,
+            InventoryDetail.material_id,
+            InventoryDetail.bin_id,
+            quantity_sum
+        )
+        if warehouse_id is not None:
+            source = source.join(Bin, InventoryDetail.bin_id == Bin.id).where(Bin.warehouse_id == warehouse_id)
+        if bin_id is not None:
+            source = source.where(InventoryDetail.bin_id == bin_id)
+        if major_id is not None:
+            source = source.join(Material, InventoryDetail.material_id == Material.id).where(Material.major_id == major_id)
+        source = (
+            source
+            .group_by(InventoryDetail.batch_id, InventoryDetail.material_id, InventoryDetail.bin_id)
+            .having(quantity_sum != 0)
+        )
+        db.exec(insert(StocktakeItem).from_select(
+            ["stocktake_id", "batch_id", "material_id", "bin_id", "expected_quantity"], source
+        ))
+
+        item_count, expected_total = db.exec(
+            select(func.count(), func.coalesce(func.sum(StocktakeItem.expected_quantity), 0))
+            .where(StocktakeItem.stocktake_id == stocktake.stocktake_id)
+        ).one()
+        stocktake.item_count = item_count
+        stocktake.expected_total = int(expected_total)
+        db.add(stocktake)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(stocktake)
+
+    logger.info(f"盘点单 {stocktake_number} 创建成功，冻结明细 {stocktake.item_count} 行")
+    return stocktake
+
+
+def _resolve_entries(
+    db: Session,
+    stocktake: Stocktake,
+    entries: Sequence[CountEntry]
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, Optional[int], int]]]:
+    """
+    解析实盘数量的定位方式
+
+    Returns:
+        (按明细ID的 [(item_id, 数量)], 按批次货位的 [(batch_id, material_id, bin_id, 数量)])
+
+    Raises:
+        ValueError: 数量为负、明细/批次/货位不存在或不在盘点范围内
+    """
+    items = _lookup(
+        db, StocktakeItem.item_id, (StocktakeItem.stocktake_id,),
+        [entry.item_id for entry in entries if entry.item_id is not None]
+    )
+    batches_by_number = _lookup(
+        db, InventoryBatch.batch_number, (InventoryBatch.batch_id,),
+        [entry.batch_number.strip() for entry in entries if entry.item_id is None and entry.batch_number]
+    )
+    bin_codes = {entry.bin_code.strip() for entry in entries if entry.item_id is None and entry.bin_code}
+    bins_by_code = _lookup(db, Bin.bar_code, (Bin.id,), bin_codes)
+    # 没有匹配货位码的按货位名称匹配
+    bins_by_code.update(_lookup(db, Bin.bin_name, (Bin.id,), bin_codes - set(bins_by_code)))
+
+    by_item: List[Tuple[int, int]] = []
+    located: List[Tuple[CountEntry, int, int]] = []
+    for entry in entries:
+        if entry.quantity is None or entry.quantity < 0:
+            raise ValueError(f"{entry.label()}：实盘数量不能为负数")
+        if entry.item_id is not None:
+            if items.get(entry.item_id, (None,))[0] != stocktake.stocktake_id:
+                raise ValueError(f"{entry.label()}：盘点明细 {entry.item_id} 不属于该盘点单")
+            by_item.append((entry.item_id, entry.quantity))
+            continue
+
+        batch_id = entry.batch_id
+        if batch_id is None and entry.batch_number:
+            batch_id = batches_by_number.get(entry.batch_number.strip(), (None,))[0]
+            if batch_id is None:
+                raise ValueError(f"{entry.label()}：批次编号 {entry.batch_number} 不存在")
+        bin_id = entry.bin_id
+        if bin_id is None and entry.bin_code:
+            bin_id = bins_by_code.get(entry.bin_code.strip(), (None,))[0]
+            if bin_id is None:
+                raise ValueError(f"{entry.label()}：货位 {entry.bin_code} 不存在")
+        if batch_id is None or bin_id is None:
+            raise ValueError(f"{entry.label()}：需要指定盘点明细ID，或同时指定批次和货位")
+        located.append((entry, batch_id, bin_id))
+
+    batch_materials = _lookup(db, InventoryBatch.batch_id, (InventoryBatch.material_id,), [row[1] for row in located])
+    bin_warehouses = _lookup(db, Bin.id, (Bin.warehouse_id,), [row[2] for row in located])
+    material_majors = {}
+    if stocktake.major_id is not None:
+        material_majors = _lookup(
+            db, Material.id, (Material.major_id,),
+            [value[0] for value in batch_materials.values()]
+        )
+
+    by_location: List[Tuple[int, int, Optional[int], int]] = []
+    for entry, batch_id, bin_id in located:
+        if batch_id not in batch_materials:
+            raise ValueError(f"{entry.label()}：批次ID {batch_id} 不存在")
+        if bin_id not in bin_warehouses:
+            raise ValueError(f"{entry.label()}：货位ID {bin_id} 不存在")
+        material_id = batch_materials[batch_id][0]
+        if stocktake.bin_id is not None and bin_id != stocktake.bin_id:
+            raise ValueError(f"{entry.label()}：货位ID {bin_id} 不在盘点范围内")
+        if stocktake.warehouse_id is not None and bin_warehouses[bin_id][0] != stocktake.warehouse_id:
+            raise ValueError(f"{entry.label()}：货位ID {bin_id} 不在盘点仓库内")
+        if stocktake.major_id is not None and material_majors.get(material_id, (None,))[0] != stocktake.major_id:
+            raise ValueError(f"{entry.label()}：批次ID {batch_id} 的器材不在盘点专业范围内")
+        by_location.append((batch_id, material_id, bin_id, entry.quantity))
+    return by_item, by_location
+
+
+def _merge_counts(rows: Iterable[tuple], accumulate: bool) -> Dict[tuple, int]:
+    """同一明细多次出现时，累加模式求和，否则以最后一次为准"""
+    merged: Dict[tuple, int] = {}
+    for *key, quantity in rows:
+        key = tuple(key)
+        merged[key] = merged.get(key, 0) + quantity if accumulate else quantity
+    return merged
+
+
+def record_counts(
+    db: Session,
+    stocktake_id: int,
+    entries: Sequence[CountEntry],
+    accumulate: bool = False
+) -> Dict[str, int]:
+    """
+    批量录入实盘数量
+
+    Args:
+        db: 数据库会话
+        stocktake_id: 盘点单ID
+        entries: 实盘数量列表
+        accumulate: True时累加到已录入的实盘数量（扫码逐件计数），False时覆盖
+
+    Returns:
+        Dict[str, int]: 录入的明细行数和新发现的批次货位行数
+
+    Raises:
+        LookupError: 盘点单不存在
+        ValueError: 盘点单不在盘点中或录入数据错误
+    """
+    if not entries:
+        raise ValueError("实盘数量不能为空")
+    if len(entries) > MAX_COUNT_ENTRIES:
+        raise ValueError(f"单次录入不能超过{MAX_COUNT_ENTRIES}条")
+
+    begin_write_transaction(db)
+    try:
+        stocktake = _get_stocktake(db, stocktake_id, for_update=True)
+        _require_counting(stocktake)
+        by_item, by_location = _resolve_entries(db, stocktake, entries)
+        item_counts = _merge_counts(by_item, accumulate)
+        location_counts = _merge_counts(by_location, accumulate)
+        now = datetime.now()
+
+        table = StocktakeItem.__table__
+        if item_counts:
+            counted = table.c.counted_quantity
+            db.exec(
+                table.update()
+                .where(table.c.item_id == bindparam("b_item_id"))
+                .values(
+                    counted_quantity=(func.coalesce(counted, 0) if accumulate else 0) + bindparam("b_quantity"),
+                    count_time=now
+                ),
+                params=[{"b_item_id": item_id, "b_quantity": quantity} for (item_id,), quantity in item_counts.items()]
+            )
+
+        inserted = 0
+        if location_counts:
+            item_count_before = db.exec(
+                select(func.count()).where(StocktakeItem.stocktake_id == stocktake_id)
+            ).one()
+            statement = sqlite_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.stocktake_id, table.c.batch_id, table.c.bin_id],
+                set_={
+                    "counted_quantity": (
+                        func.coalesce(table.c.counted_quantity, 0) + statement.excluded.counted_quantity
+                        if accumulate else statement.excluded.counted_quantity
+                    ),
+                    "count_time": statement.excluded.count_time
+                }
+            )
+            db.exec(statement, params=[
+                {
+                    "stocktake_id": stocktake_id,
+                    "batch_id": batch_id,
+                    "material_id": material_id,
+                    "bin_id": bin_id,
+                    "expected_quantity": 0,
+                    "counted_quantity": quantity,
+                    "count_time": now
+                }
+                for (batch_id, material_id, bin_id), quantity in location_counts.items()
+            ])
+            inserted = db.exec(
+                select(func.count()).where(StocktakeItem.stocktake_id == stocktake_id)
+            ).one() - item_count_before
+
+        if inserted:
+            stocktake.item_count += inserted
+            db.add(stocktake)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "recorded_count": len(item_counts) + len(location_counts),
+        "new_item_count": inserted
+    }
+
+
+def _variance_expression(uncounted_as_zero: bool = False):
+    counted = StocktakeItem.counted_quantity
+    if uncounted_as_zero:
+        counted = func.coalesce(counted, 0)
+    return counted - StocktakeItem.expected_quantity
+
+
+def get_stocktake_summary(db: Session, stocktake_id: int) -> dict:
+    """盘点进度和差异汇总（一次聚合查询）"""
+    variance = _variance_expression()
+    total, counted, variance_count, gain, loss = db.exec(
+        select(
+            func.count(),
+            func.count(StocktakeItem.counted_quantity),
+            func.coalesce(func.sum(cast(variance != 0, Integer)), 0),
+            func.coalesce(func.sum(case((variance > 0, variance), else_=0)), 0),
+            func.coalesce(func.sum(case((variance < 0, -variance), else_=0)), 0)
+        ).where(StocktakeItem.stocktake_id == stocktake_id)
+    ).one()
+    return {
+        "item_count": total,
+        "counted_count": counted,
+        "uncounted_count": total - counted,
+        "variance_count": int(variance_count),
+        "gain_quantity": int(gain),
+        "loss_quantity": int(loss)
+    }
+
+
+def get_stocktake_items(
+    db: Session,
+    stocktake_id: int,
+    only_variance: bool = False,
+    only_uncounted: bool = False,
+    keyword: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    分页查询盘点明细和差异（盘点明细与器材、批次、货位一次连接）
+
+    Raises:
+        LookupError: 盘点单不存在
+    """
+    _get_stocktake(db, stocktake_id)
+    variance = _variance_expression()
+    filters = [StocktakeItem.stocktake_id == stocktake_id]
+    if only_variance:
+        filters.append(variance != 0)
+    if only_uncounted:
+        filters.append(StocktakeItem.counted_quantity.is_(None))
+    if keyword:
+        pattern = f"%{keyword}%"
+        filters.append(or_(
+            Material.material_code.like(pattern),
+            Material.material_name.like(pattern),
+            InventoryBatch.batch_number.like(pattern),
+            Bin.bin_name.like(pattern)
+        ))
+
+    def joined(*columns):
+        return (
+            select(*columns)
+            .select_from(StocktakeItem)
+            .join(Material, StocktakeItem.material_id == Material.id)
+            .join(InventoryBatch, StocktakeItem.batch_id == InventoryBatch.batch_id)
+            .join(Bin, StocktakeItem.bin_id == Bin.id, isouter=True)
+            .where(*filters)
+        )
+
+    total = db.exec(joined(func.count())).one()
+    rows = db.exec(
+        joined(
+            StocktakeItem.item_id,
+            StocktakeItem.batch_id,
+            StocktakeItem.material_id,
+            StocktakeItem.bin_id,
+            Material.material_code,
+            Material.material_name,
+            Material.material_specification,
+            InventoryBatch.batch_number,
+            Bin.bin_name,
+            Bin.bar_code,
+            StocktakeItem.expected_quantity,
+            StocktakeItem.counted_quantity,
+            variance.label("variance"),
+            StocktakeItem.count_time
+        )
+        .order_by(Material.material_code, InventoryBatch.batch_number, Bin.bin_name)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": math.ceil(total / page_size) if total else 0,
+        "items": [dict(row._mapping) for row in rows]
+    }
+
+
+def _deduct_stocktake_losses(db: Session, filters: list, variance, today: date):
+    """
+    盘亏分摊到(批次, 货位)上的各条库存明细（一条 UPDATE ... FROM）
+
+    同一货位有多条明细时按数量从大到小依次扣减，窗口函数累计数量，
+    每条明细扣减 min(数量, 盘亏数量 - 之前明细的累计数量)，不会扣成负数。
+    """
+    ordering = (InventoryDetail.quantity.desc(), InventoryDetail.detail_id)
+    ranked = (
+        select(
+            InventoryDetail.detail_id,
+            InventoryDetail.quantity,
+            (-variance).label("loss"),
+            func.sum(InventoryDetail.quantity).over(
+                partition_by=(InventoryDetail.batch_id, InventoryDetail.bin_id),
+                order_by=ordering,
+                rows=(None, 0)
+            ).label("running")
+        )
+        .join(StocktakeItem, (StocktakeItem.batch_id == InventoryDetail.batch_id)
+              & StocktakeItem.bin_id.is_not_distinct_from(InventoryDetail.bin_id))
+        .where(*filters, variance < 0, InventoryDetail.quantity > 0)
+        .subquery("ranked_details")
+    )
+    taken = (
+        select(
+            ranked.c.detail_id,
+            func.min(ranked.c.quantity, ranked.c.loss - (ranked.c.running - ranked.c.quantity)).label("taken")
+        )
+        .where(ranked.c.running - ranked.c.quantity < ranked.c.loss)
+        .subquery("taken_quantity")
+    )
+    db.exec(
+        update(InventoryDetail)
+        .where(InventoryDetail.detail_id == taken.c.detail_id)
+        .values(quantity=InventoryDetail.quantity - taken.c.taken, last_updated=today),
+        execution_options={"synchronize_session": False}
+    )
+
+    # 各条明细扣减后不为负（汇总检查之外逐条确认）
+    negative_count = db.exec(
+        select(func.count())
+        .select_from(InventoryDetail)
+        .join(StocktakeItem, (StocktakeItem.batch_id == InventoryDetail.batch_id)
+              & StocktakeItem.bin_id.is_not_distinct_from(InventoryDetail.bin_id))
+        .where(*filters, variance < 0, InventoryDetail.quantity < 0)
+    ).one()
+    if negative_count:
+        raise ValueError(f"按差异调整后有 {negative_count} 条库存明细为负，请重新盘点")
+
+
+def post_stocktake(db: Session, stocktake_id: int, poster: str, uncounted_as_zero: bool = False) -> Stocktake:
+    """
+    过账盘点差异：写入ADJUST流水并按差异调整库存明细
+
+    Args:
+        db: 数据库会话
+        stocktake_id: 盘点单ID
+        poster: 过账人
+        uncounted_as_zero: 未盘点的明细按实盘数量0处理（否则未盘点的明细不调整）
+
+    Returns:
+        Stocktake: 过账后的盘点单
+
+    Raises:
+        LookupError: 盘点单不存在
+        ValueError: 盘点单不在盘点中，或冻结后出库导致按差异调整后库存为负
+    """
+    begin_write_transaction(db)
+    try:
+        stocktake = _get_stocktake(db, stocktake_id, for_update=True)
+        _require_counting(stocktake)
+
+        # 当前库存按(批次, 货位)汇总；盘盈加到明细ID最小的一条，盘亏分摊到该货位的各条明细
+        current = (
+            select(
+                InventoryDetail.batch_id,
+                InventoryDetail.bin_id,
+                func.min(InventoryDetail.detail_id).label("detail_id"),
+                func.sum(InventoryDetail.quantity).label("quantity")
+            )
+            .where(InventoryDetail.batch_id.in_(
+                select(StocktakeItem.batch_id).where(StocktakeItem.stocktake_id == stocktake_id)
+            ))
+            .group_by(InventoryDetail.batch_id, InventoryDetail.bin_id)
+            .subquery("current_stock")
+        )
+        variance = _variance_expression(uncounted_as_zero)
+        filters = [StocktakeItem.stocktake_id == stocktake_id, variance != 0]
+        if not uncounted_as_zero:
+            filters.append(StocktakeItem.counted_quantity.is_not(None))
+        rows = db.exec(
+            select(
+                StocktakeItem.batch_id,
+                StocktakeItem.material_id,
+                StocktakeItem.bin_id,
+                variance,
+                current.c.detail_id,
+                func.coalesce(current.c.quantity, 0)
+            )
+            .join(current, (current.c.batch_id == StocktakeItem.batch_id) & current.c.bin_id.is_not_distinct_from(StocktakeItem.bin_id), isouter=True)
+            .where(*filters)
+        ).all()
+
+        negative = [row for row in rows if row[5] + row[3] < 0]
+        if negative:
+            examples = "；".join(
+                f"批次ID {batch_id} 货位ID {bin_id} 当前 {quantity} 差异 {delta}"
+                for batch_id, _, bin_id, delta, _, quantity in negative[:10]
+            )
+            raise ValueError(f"冻结后已出库，按差异调整后库存为负，请重新盘点以下明细：{examples}")
+
+        now = datetime.now()
+        today = date.today()
+        if rows:
+            db.exec(insert(InventoryTransaction), params=[
+                {
+                    "material_id": material_id,
+                    "batch_id": batch_id,
+                    "bin_id": bin_id,
+                    "change_type": ChangeType.ADJUST,
+                    "quantity_change": delta,
+                    "quantity_before": quantity,
+                    "quantity_after": quantity + delta,
+                    "reference_type": ReferenceType.STOCKTAKE,
+                    "reference_id": stocktake_id,
+                    "creator": poster,
+                    "transaction_time": now
+                }
+                for batch_id, material_id, bin_id, delta, _, quantity in rows
+            ])
+
+            existing = [
+                {"b_detail_id": detail_id, "b_delta": delta}
+                for _, _, _, delta, detail_id, _ in rows if detail_id is not None and delta > 0
+            ]
+            if existing:
+                table = InventoryDetail.__table__
+                db.exec(
+                    table.update()
+                    .where(table.c.detail_id == bindparam("b_detail_id"))
+                    .values(quantity=table.c.quantity + bindparam("b_delta"), last_updated=today),
+                    params=existing
+                )
+            if any(row[3] < 0 for row in rows):
+                _deduct_stocktake_losses(db, filters, variance, today)
+            found = [
+                {"batch_id": batch_id, "material_id": material_id, "bin_id": bin_id, "quantity": delta, "last_updated": today}
+                for batch_id, material_id, bin_id, delta, detail_id, _ in rows if detail_id is None
+            ]
+            if found:
+                db.exec(insert(InventoryDetail), params=found)
+            refresh_bin_empty_labels(db, [row[2] for row in rows])
+
+        stocktake.status = StocktakeStatus.POSTED
+        stocktake.variance_count = len(rows)
+        stocktake.variance_quantity = sum(row[3] for row in rows)
+        stocktake.poster = poster
+        stocktake.posted_time = now
+        db.add(stocktake)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(stocktake)
+
+    logger.info(f"盘点单 {stocktake.stocktake_number} 过账完成，差异 {stocktake.variance_count} 行")
+    return stocktake
+
+
+def cancel_stocktake(db: Session, stocktake_id: int) -> Stocktake:
+    """
+    取消盘点单（不调整库存）
+
+    Raises:
+        LookupError: 盘点单不存在
+        ValueError: 盘点单不在盘点中
+    """
+    stocktake = _get_stocktake(db, stocktake_id)
+    _require_counting(stocktake)
+    stocktake.status = StocktakeStatus.CANCELLED
+    db.add(stocktake)
+    db.commit()
+    db.refresh(stocktake)
+    return stocktake
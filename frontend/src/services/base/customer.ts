@@ -123,7 +123,7 @@ export const customerAPI = {
    */
   downloadCustomerErrorFile: async (
     fileName: string,
-    downloadFileName: string = '客户导入错误数据.xls'
+    downloadFileName: string = '客户导入错误数据.xlsx'
   ): Promise<void> => {
     return downloadCustomerErrorFileUtil(fileName, downloadFileName);
   }
@@ -125,7 +125,7 @@ export const supplierAPI = {
    */
   downloadSupplierErrorFile: async (
     fileName: string,
-    downloadFileName: string = '供应商导入错误数据.xls'
+    downloadFileName: string = '供应商导入错误数据.xlsx'
   ): Promise<void> => {
     return downloadSupplierErrorFileUtil(fileName, downloadFileName);
   }
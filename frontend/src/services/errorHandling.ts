@@ -58,7 +58,7 @@ export const handleImportResult = async (
         showClose: true
       })
         .then(() => {
-          downloadErrorFile(error_file_name, `${config.entityName}导入错误数据.xls`)
+          downloadErrorFile(error_file_name, `${config.entityName}导入错误数据.xlsx`)
         })
         .catch(() => {
           // 用户点击取消，不做任何操作
@@ -87,7 +87,7 @@ const getAuthToken = (): string | null => {
  */
 export const downloadErrorFile = async (
   fileName: string,
-  filename: string = '导入错误数据.xls',
+  filename: string = '导入错误数据.xlsx',
   entityType: string = 'supplier'
 ): Promise<void> => {
   try {
@@ -185,7 +185,7 @@ export const downloadErrorFile = async (
     const blobData = await response.blob()
     
     // 强制设置正确的blob类型为Excel文件
-    const blob = new Blob([blobData], { type: 'application/vnd.ms-excel' })
+    const blob = new Blob([blobData], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' })
     
     console.log('文件数据流信息:', {
       blobSize: blob.size,
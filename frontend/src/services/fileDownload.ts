@@ -28,7 +28,7 @@ export const downloadEntityErrorFile = async (
  */
 export const downloadSupplierErrorFile = async (
   fileName: string,
-  downloadFileName: string = '供应商导入错误数据.xls'
+  downloadFileName: string = '供应商导入错误数据.xlsx'
 ): Promise<void> => {
   return downloadErrorFile(fileName, downloadFileName, 'supplier');
 };
@@ -41,7 +41,7 @@ export const downloadSupplierErrorFile = async (
  */
 export const downloadCustomerErrorFile = async (
   fileName: string,
-  downloadFileName: string = '客户导入错误数据.xls'
+  downloadFileName: string = '客户导入错误数据.xlsx'
 ): Promise<void> => {
   return downloadErrorFile(fileName, downloadFileName, 'customer');
 };
@@ -54,7 +54,7 @@ export const downloadCustomerErrorFile = async (
  */
 export const downloadBinErrorFile = async (
   fileName: string,
-  downloadFileName: string = '货位导入错误数据.xls'
+  downloadFileName: string = '货位导入错误数据.xlsx'
 ): Promise<void> => {
   return downloadErrorFile(fileName, downloadFileName, 'bin');
 };
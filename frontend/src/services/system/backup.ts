@@ -5,16 +5,27 @@
  */
 import api from '../base';
 import type {
-  BackupListResponse
+  BackupListResponse,
+  BackupTaskStatus
 } from '../types/system';
 
 export const backupAPI = {
   /**
-   * 创建备份
-   * @returns Promise<{message: string, result: any}>
+   * 创建备份（后台执行）
+   * @returns Promise<{message: string, task: BackupTaskStatus}>
    */
-  createBackup: async (): Promise<{message: string, result: any}> => {
-    const response = await api.post<{message: string, result: any}>('/api/backup/create');
+  createBackup: async (): Promise<{message: string, task: BackupTaskStatus}> => {
+    const response = await api.post<{message: string, task: BackupTaskStatus}>('/api/backup/create');
+    return response.data;
+  },
+
+  /**
+   * 查询后台备份任务状态
+   * @param taskId 备份任务ID
+   * @returns Promise<{task: BackupTaskStatus}>
+   */
+  getBackupStatus: async (taskId: string): Promise<{task: BackupTaskStatus}> => {
+    const response = await api.get<{task: BackupTaskStatus}>(`/api/backup/status/${encodeURIComponent(taskId)}`);
     return response.data;
   },
 
@@ -29,6 +40,10 @@ export const backupAPI = {
     sort_by?: string;
     sort_order?: string;
     days_back?: number;
+    start_date?: string;
+    end_date?: string;
+    page?: number;
+    page_size?: number;
   }): Promise<BackupListResponse> => {
     const response = await api.get<BackupListResponse>('/api/backup/list', { params });
     return response.data;
@@ -111,8 +111,13 @@ export enum ImportStatus {
 export const SUPPORTED_FILE_TYPES = [
   'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', // .xlsx
   'application/vnd.ms-excel', // .xls
+  'text/csv', // .csv
+  'text/tab-separated-values', // .tsv
 ];
 
+// 支持的文件扩展名（部分系统上传CSV/TSV时不提供MIME类型）
+export const SUPPORTED_FILE_EXTENSIONS = ['.xls', '.xlsx', '.csv', '.tsv'];
+
 // 文件大小限制（10MB）
 export const MAX_FILE_SIZE = 10 * 1024 * 1024;
 
@@ -1,4 +1,5 @@
 import { PaginationResult } from './common';
+import type { BatchImportResult } from './import';
 
 // 器材创建模式
 export interface MaterialCreate {
@@ -103,11 +104,7 @@ export interface BatchMaterialDelete {
 }
 
 // 批量导入结果
-export interface MaterialBatchImportResult {
-  success_count: number;
-  error_count: number;
-  errors: string[];
-}
+export type MaterialBatchImportResult = BatchImportResult;
 
 // 器材表单数据（用于创建和编辑）
 export interface MaterialFormData {
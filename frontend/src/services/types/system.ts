@@ -132,6 +132,40 @@ export interface BackupListResponse {
   backups: BackupFileInfo[];
   /** 总数 */
   total_count: number;
+  /** 页码 */
+  page?: number;
+  /** 每页数量（为空时返回全部） */
+  page_size?: number | null;
+}
+
+/**
+ * 后台备份任务状态类型
+ */
+export interface BackupTaskStatus {
+  /** 任务ID */
+  task_id: string;
+  /** 备份类型 */
+  backup_type: string;
+  /** 状态 */
+  status: 'running' | 'completed' | 'failed';
+  /** 进度百分比 */
+  progress: number;
+  /** 已复制页数 */
+  pages_copied: number;
+  /** 总页数 */
+  page_count: number | null;
+  /** 开始时间 */
+  started_at: string;
+  /** 结束时间 */
+  finished_at: string | null;
+  /** 已用秒数 */
+  elapsed_seconds: number;
+  /** 预计剩余秒数 */
+  eta_seconds: number | null;
+  /** 备份结果 */
+  result: any | null;
+  /** 错误信息 */
+  error: string | null;
 }
 
 /**